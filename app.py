@@ -7,7 +7,7 @@ OBSID - Platformă de management decanturi parfumuri
 import eventlet
 eventlet.monkey_patch()
 
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, send_file, redirect, url_for, flash
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_socketio import SocketIO, emit
 import pandas as pd
@@ -17,11 +17,24 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 import database
+import jurnal_bonuri
+import pool_sesiuni
+import lucratori_bonuri
+import joburi
+import transport_loguri
+import loguri_joburi
+import istoric_productie
+import trasare_oblio
+import metrici
+import cache_produse_oblio
+import catalog_produse
+import parsare_comenzi
+import tokenizer_produse
 
 # Încarcă variabilele din .env dacă există
 load_dotenv()
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 import io
 import logging
@@ -29,6 +42,7 @@ import threading
 import eventlet
 import eventlet.queue as queue
 import time
+import platform
 import requests
 
 # Configurare logging
@@ -40,8 +54,22 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Încărcare bază de date produse (SKU mapping)
+# Ambii indecși sunt construiți din același snapshot al catalogului local (catalog_produse).
+# CATALOG este referința publicată: refresher-ul din fundal o înlocuiește atomic, iar
+# handler-ele citesc indecșii din snapshot-ul curent fără să aștepte după rețea.
 PRODUCT_DB = {}
-GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/17FhRBDaknpXgsoTXOkpEWcMf2o55uOjDymlaGiiKUwU/export?format=csv&gid=1884124540"
+CATALOG = None
+GOOGLE_SHEET_URL = catalog_produse.GOOGLE_SHEET_URL
+
+# Interval reîmprospătare catalog în fundal (secunde, 0 = dezactivat)
+CATALOG_REFRESH_SECONDS = int(os.getenv('CATALOG_REFRESH_SECONDS', '3600'))
+
+# Starea ultimei reîmprospătări (expusă în /health/detalii și în UI)
+catalog_refresh_state = {
+    'ultima_verificare': None,
+    'ultima_eroare': None,
+    'ultima_eroare_la': None
+}
 
 def normalize_name(text):
     """
@@ -50,76 +78,53 @@ def normalize_name(text):
     - elimină 'parfum'
     - elimină caractere non-alfanumerice
     """
-    if not isinstance(text, str):
-        return ""
-    text = text.lower()
-    text = text.replace('parfum', '')
-    text = re.sub(r'[^a-z0-9]', '', text)
-    return text
+    return tokenizer_produse.normalizeaza(text)
+
+def aplica_catalog(snapshot):
+    """Publică un snapshot al catalogului (indecșii sunt deja construiți în snapshot)"""
+    global PRODUCT_DB, CATALOG
+
+    # Brandurile din catalog sunt recunoscute de tokenizer în liniile de produs
+    tokenizer_produse.seteazaBranduri(snapshot.branduri)
+
+    PRODUCT_DB = snapshot.nume_la_sku
+    CATALOG = snapshot
 
 def load_product_db():
-    global PRODUCT_DB
-    df_db = None
-    
-    # 1. Încercare încărcare din Google Sheets
-    try:
-        logger.info(f"🌐 Încercare descărcare bază de date din Google Sheets...")
-        response = requests.get(GOOGLE_SHEET_URL, timeout=10)
-        response.raise_for_status()
-        
-        df_db = pd.read_csv(io.BytesIO(response.content))
-        logger.info("✅ Baza de date descărcată cu succes din Google Sheets!")
-        
-        # Salvare cache local (backup)
-        try:
-            df_db.to_excel('produse.xlsx', index=False)
-            logger.info("💾 Cache local actualizat (produse.xlsx)")
-        except Exception as e:
-            logger.warning(f"⚠ Nu s-a putut salva cache-ul local: {e}")
-            
-    except Exception as e:
-        logger.error(f"❌ Eroare la descărcarea din Google Sheets: {e}")
-        logger.info("📂 Încercare încărcare din cache local (produse.xlsx)...")
-    
-    # 2. Fallback la fișier local dacă descărcarea a eșuat
-    if df_db is None:
-        try:
-            possible_paths = [
-                os.path.join(os.path.dirname(__file__), 'produse.xlsx'),
-                os.path.join(os.getcwd(), 'produse.xlsx'),
-                'produse.xlsx'
-            ]
-            
-            db_path = None
-            for path in possible_paths:
-                if os.path.exists(path):
-                    db_path = path
-                    break
-            
-            if db_path:
-                logger.info(f"📂 Încărcare bază de date din local: {db_path}")
-                df_db = pd.read_excel(db_path)
-            else:
-                logger.error("❌ CRITIC: Nu s-a găsit nici baza de date online, nici cea locală!")
-                return
-        except Exception as e:
-            logger.error(f"❌ Eroare la încărcarea locală: {e}")
-            return
+    """
+    Încarcă catalogul la pornire DOAR din surse locale (fără rețea):
+    snapshot-ul SQLite, sau produse.xlsx din repo dacă nu există încă niciun snapshot.
+    Verificarea în Google Sheets se face în fundal (refresh_catalog_loop).
+    """
+    # 1. Snapshot-ul local (SQLite) - disponibil imediat
+    snapshot = catalog_produse.incarca_snapshot()
+    if snapshot:
+        aplica_catalog(snapshot)
+        logger.info(f"📂 Catalog local încărcat: versiunea {snapshot.versiune}, {len(snapshot)} produse")
+        return
 
-    # 3. Procesare date
+    # 2. Fallback la fișierul din repo dacă nu există încă niciun snapshot
     try:
-        count = 0
-        PRODUCT_DB = {} # Reset DB
-        for _, row in df_db.iterrows():
-            nume = str(row['Denumire Produs'])
-            sku = str(row['Cod Produs (SKU)']).strip()
-            if nume and sku and sku.lower() != 'nan':
-                norm_nume = normalize_name(nume)
-                PRODUCT_DB[norm_nume] = sku
-                count += 1
-        logger.info(f"✅ Baza de date produse activă: {count} produse")
+        possible_paths = [
+            os.path.join(os.path.dirname(__file__), 'produse.xlsx'),
+            os.path.join(os.getcwd(), 'produse.xlsx'),
+            'produse.xlsx'
+        ]
+
+        db_path = None
+        for path in possible_paths:
+            if os.path.exists(path):
+                db_path = path
+                break
+
+        if db_path:
+            logger.info(f"📂 Încărcare bază de date din local: {db_path}")
+            aplica_catalog(catalog_produse.importa_din_excel(db_path))
+            logger.info(f"✅ Baza de date produse activă: {len(PRODUCT_DB)} produse (versiunea {CATALOG.versiune})")
+        else:
+            logger.error("❌ CRITIC: Nu s-a găsit baza de date locală! Se așteaptă reîmprospătarea din Google Sheets.")
     except Exception as e:
-        logger.error(f"❌ Eroare la procesarea datelor din DB: {e}")
+        logger.error(f"❌ Eroare la încărcarea locală: {e}")
 
 app = Flask(__name__)
 
@@ -127,6 +132,7 @@ app = Flask(__name__)
 with app.app_context():
     load_product_db()
     database.init_db()
+    jurnal_bonuri.porneste()
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['EXPORT_FOLDER'] = 'exports'
@@ -149,12 +155,16 @@ def load_user(user_id):
 # Inițializare SocketIO pentru WebSocket live logs
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
 
+# Log-urile și progresul rulărilor pleacă grupate (frame 'log_batch'), cu backpressure per client
+transport = transport_loguri.TransportLoguri(socketio)
+
 # Queue-uri globale pentru comunicare între threads
 automation_logs_queue = queue.Queue()
 automation_input_queue = queue.Queue()
 automation_active = False
 stop_requested = False
 current_automation_instance = None # Referință către instanța curentă de automatizare
+job_curent = None # ID-ul jobului în lucru (starea durabilă a rulării este în joburi.py)
 
 # Creare directoare dacă nu există
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -173,25 +183,11 @@ def extrageInfoProdus(text_produs):
     Extrage informații din textul produsului
     Returns: (nume_parfum, cantitate_ml, numar_bucati) sau None dacă nu e decant
     """
-    if 'Decant' not in text_produs:
-        return None
-
-    # Extrage cantitatea în ml (3 ml, 5 ml, 10 ml)
-    match_ml = re.search(r'Decant (\d+) ml parfum (.+?),', text_produs)
-    if not match_ml:
+    record = tokenizer_produse.tokenizeazaProdus(text_produs)
+    if not record.este_decant:
         return None
 
-    cantitate_ml = int(match_ml.group(1))
-    nume_parfum = match_ml.group(2).strip()
-
-    # Extrage numărul de bucăți
-    match_bucati = re.search(r'(\d+\.\d+)$', text_produs.strip())
-    if match_bucati:
-        numar_bucati = float(match_bucati.group(1))
-    else:
-        numar_bucati = 1.0
-
-    return (nume_parfum, cantitate_ml, int(numar_bucati))
+    return (record.nume_parfum, record.ml, record.bucati)
 
 
 def extrageInfoProdusIntreg(text_produs):
@@ -199,20 +195,11 @@ def extrageInfoProdusIntreg(text_produs):
     Extrage informații pentru produse întregi (non-decanturi)
     Returns: (nume_produs, numar_bucati) sau None
     """
-    if 'Decant' in text_produs:
+    record = tokenizer_produse.tokenizeazaProdus(text_produs)
+    if not record.este_intreg:
         return None
-        
-    # Extrage numărul de bucăți de la final (ex: ", 1.00")
-    match_bucati = re.search(r'(\d+\.\d+)$', text_produs.strip())
-    if match_bucati:
-        numar_bucati = float(match_bucati.group(1))
-        # Scoate cantitatea din nume
-        nume_produs = text_produs.rsplit(',', 1)[0].strip()
-    else:
-        numar_bucati = 1.0
-        nume_produs = text_produs.strip()
-        
-    return (nume_produs, int(numar_bucati))
+
+    return (record.nume_intreg, record.bucati)
 
 
 def detecteazaColoane(df):
@@ -258,91 +245,48 @@ def proceseazaComenzi(fisier_path):
         logger.warning("⚠ Baza de date produse este goală! Încerc reîncărcarea...")
         load_product_db()
 
-    df = pd.read_excel(fisier_path)
-
-    # Detectare automată coloane
-    coloana_status, coloana_produse = detecteazaColoane(df)
-
-    # Verificare coloană atribute (pentru SKU)
-    coloana_atribute = None
-    for col in df.columns:
-        col_lower = str(col).lower()
-        if any(keyword in col_lower for keyword in ['atribute', 'atribut']):
-            coloana_atribute = col
-            break
-
-    # Filtrare comenzi finalizate (flexibil - acceptă variante)
-    df_finalizate = df[df[coloana_status].astype(str).str.contains('Finalizata|Confirmata', case=False, na=False)]
-
-    # Raport agregat pe SKU (în loc de doar pe nume+cantitate)
-    raport = defaultdict(lambda: {'nume': '', 'cantitate_ml': 0, 'bucati': 0})
-    
-    # Raport separat pentru produse întregi
-    raport_intregi = defaultdict(lambda: {'nume': '', 'bucati': 0})
+    # Același snapshot pentru tot fișierul, chiar dacă refresher-ul publică între timp unul nou
+    catalog = CATALOG
+    product_db = catalog.nume_la_sku if catalog else PRODUCT_DB
+    index_fuzzy = catalog.index_fuzzy if catalog else None
 
     # Log debug pentru DB
-    logger.info(f"🔍 Procesare comenzi... DB size: {len(PRODUCT_DB)}")
-
-    for idx, row in df_finalizate.iterrows():
-        produse_text = str(row[coloana_produse])
-        # atribute_text = str(row[coloana_atribute]) if coloana_atribute else '' # Nu mai folosim atribute
-
-        produse = produse_text.split(' | ')
+    logger.info(f"🔍 Procesare comenzi... DB size: {len(product_db)}")
+
+    raport = None
+    raport_intregi = None
+    total_comenzi = 0
+    total_finalizate = 0
+    inceput = time.monotonic()
+
+    # Citire în flux: blocuri de rânduri (doar coloanele necesare), agregate incremental
+    for df in parsare_comenzi.citesteExportInBlocuri(fisier_path):
+        # Detectare automată coloane
+        coloana_status, coloana_produse = detecteazaColoane(df)
+
+        # Filtrare comenzi finalizate (flexibil - acceptă variante)
+        df_finalizate = df[df[coloana_status].astype(str).str.contains('Finalizata|Confirmata', case=False, na=False)]
+        total_comenzi += len(df)
+        total_finalizate += len(df_finalizate)
+
+        # Parsare columnară: un rând per produs, câmpurile extrase o singură dată per text distinct
+        produse = parsare_comenzi.explodeazaProduse(df_finalizate[coloana_produse])
+        campuri = parsare_comenzi.extrageCampuriProduse(produse, catalog)
+
+        # Agregare pe SKU (decanturi) și separat pentru produse întregi
+        raport, raport_intregi = parsare_comenzi.agregheazaRaport(
+            campuri, product_db, raport, raport_intregi, index_fuzzy
+        )
 
-        for i, produs in enumerate(produse):
-            # 1. Încearcă procesare ca DECANT
-            info = extrageInfoProdus(produs.strip())
-            if info:
-                nume_parfum, cantitate_ml, numar_bucati = info
-                
-                # Căutare SKU
-                found_sku = 'N/A'
-                
-                # 1. Căutare în baza de date produse (Prioritate MAXIMĂ)
-                # Curățăm numele produsului din comandă (scoatem cantitatea de la final ", 1.00")
-                produs_clean = re.sub(r', \d+\.\d+$', '', produs.strip())
-                produs_norm = normalize_name(produs_clean)
-                
-                if produs_norm in PRODUCT_DB:
-                    found_sku = PRODUCT_DB[produs_norm]
-                else:
-                    logger.warning(f"⚠ Produs negăsit în DB: {produs_clean} (norm: {produs_norm}). SKU setat la N/A.")
-                    found_sku = 'N/A'
-                
-                sku = found_sku
+    inregistreaza_parsare('raport', inceput, total_comenzi)
+    return raport, raport_intregi, total_finalizate, total_comenzi
 
-                # FILTRARE SUPLIMENTARĂ: Exclude produsele care nu sunt decanturi (nu au extensie -3/-5/-10)
-                if sku != 'N/A' and not re.search(r'-\d+$', sku):
-                    logger.info(f"Produs exclus (SKU non-decant): {nume_parfum} | SKU: {sku}")
-                    continue
-                
-                if sku == 'N/A':
-                     logger.warning(f"Produs cu SKU N/A acceptat: {nume_parfum}")
 
-                # Agregare pe SKU
-                raport[sku]['nume'] = nume_parfum
-                raport[sku]['cantitate_ml'] = cantitate_ml
-                raport[sku]['bucati'] += numar_bucati
-            
-            # 2. Dacă nu e decant, verifică dacă e PRODUS ÎNTREG
-            else:
-                info_intreg = extrageInfoProdusIntreg(produs.strip())
-                if info_intreg:
-                    nume_produs, numar_bucati = info_intreg
-                    
-                    # Căutare SKU pentru produs întreg
-                    produs_clean = re.sub(r', \d+\.\d+$', '', produs.strip())
-                    produs_norm = normalize_name(produs_clean)
-                    
-                    sku = PRODUCT_DB.get(produs_norm, 'N/A')
-                    
-                    # Agregare
-                    key = sku if sku != 'N/A' else nume_produs
-                    raport_intregi[key]['nume'] = nume_produs
-                    raport_intregi[key]['bucati'] += numar_bucati
-                    raport_intregi[key]['sku'] = sku
-
-    return raport, raport_intregi, len(df_finalizate), len(df)
+def inregistreaza_parsare(tip, inceput, randuri):
+    """Durata și rândurile unui export parsat, pentru /metrics"""
+    metrici.PARSARE_SECUNDE.observa(time.monotonic() - inceput, tip=tip)
+    metrici.PARSARE_RANDURI.inc(randuri, tip=tip)
+    metrici.PARSARE_EXPORTURI.inc(tip=tip)
 
 
 def genereazaTabelRaport(raport):
@@ -395,58 +339,113 @@ def genereazaTabelRaport(raport):
 
 def load_product_database():
     """
-    Încarcă baza de date de produse din Google Sheets
+    Reverifică baza de date de produse (cerere condiționată către Google Sheets)
+    și publică noul snapshot. Rulează în fundal - nu se apelează din request-uri.
     Returns: dict {sku: nume_produs}
     """
-    import requests
-    import csv
-    from io import StringIO
-
-    GOOGLE_SHEETS_URL = "https://docs.google.com/spreadsheets/d/17FhRBDaknpXgsoTXOkpEWcMf2o55uOjDymlaGiiKUwU/export?format=csv&gid=1884124540"
-
+    catalog_refresh_state['ultima_verificare'] = datetime.now().isoformat()
     try:
-        logger.info("📊 Încărcare bază de date produse din Google Sheets...")
-        response = requests.get(GOOGLE_SHEETS_URL, timeout=30, allow_redirects=True)
-        response.raise_for_status()
-
-        # Parse CSV
-        csv_content = StringIO(response.text)
-        reader = csv.DictReader(csv_content)
-
-        product_db = {}
-        for row in reader:
-            sku = row.get('Cod Produs (SKU)', '').strip()
-            nume = row.get('Denumire Produs', '').strip()
-            if sku and nume:
-                product_db[sku] = nume
-
-        logger.info(f"✅ Încărcate {len(product_db)} produse din baza de date")
-        return product_db
+        logger.info("📊 Verificare bază de date produse din Google Sheets...")
+        with metrici.CATALOG_REIMPROSPATARE_SECUNDE.cronometreaza():
+            snapshot = catalog_produse.reimprospateaza(GOOGLE_SHEET_URL)
+            aplica_catalog(snapshot)
+        catalog_refresh_state['ultima_eroare'] = None
+        catalog_refresh_state['ultima_eroare_la'] = None
+        metrici.CATALOG_REIMPROSPATARI.inc(rezultat='ok')
+        logger.info(f"✅ Catalog activ: versiunea {snapshot.versiune}, {len(snapshot)} produse")
     except Exception as e:
-        logger.warning(f"⚠️ Nu s-a putut încărca baza de date produse: {e}")
-        return {}
+        catalog_refresh_state['ultima_eroare'] = str(e)
+        catalog_refresh_state['ultima_eroare_la'] = datetime.now().isoformat()
+        metrici.CATALOG_REIMPROSPATARI.inc(rezultat='eroare')
+        logger.warning(f"⚠️ Nu s-a putut reîmprospăta baza de date produse: {e}")
 
+    return get_product_database()
 
-# Cache pentru baza de date produse (se reîncarcă la fiecare repornire)
-_product_db_cache = None
-_product_db_cache_time = None
 
 def get_product_database():
     """
-    Returnează baza de date de produse, cu cache de 1 oră
+    Returnează baza de date de produse {sku: nume} din snapshot-ul curent (fără rețea)
     """
-    global _product_db_cache, _product_db_cache_time
-    from datetime import datetime, timedelta
+    catalog = CATALOG
+    return catalog.sku_la_nume if catalog else {}
 
-    # Verifică dacă cache-ul e valid (mai vechi de 1 oră)
-    if _product_db_cache is not None and _product_db_cache_time is not None:
-        if datetime.now() - _product_db_cache_time < timedelta(hours=1):
-            return _product_db_cache
 
-    # Reîncarcă baza de date
-    _product_db_cache = load_product_database()
-    _product_db_cache_time = datetime.now()
-    return _product_db_cache
+def refresh_catalog_loop():
+    """Green thread: reîmprospătează catalogul periodic, în afara request-urilor"""
+    while True:
+        load_product_database()
+        # După o eroare reîncercăm mai repede (max 5 minute), altfel la intervalul normal
+        if catalog_refresh_state['ultima_eroare']:
+            socketio.sleep(min(CATALOG_REFRESH_SECONDS, 300))
+        else:
+            socketio.sleep(CATALOG_REFRESH_SECONDS)
+
+
+def get_catalog_status():
+    """Vârsta catalogului și starea ultimei reîmprospătări (pentru /health/detalii și UI)"""
+    catalog = CATALOG
+    acum = time.time()
+    return {
+        'versiune': catalog.versiune if catalog else None,
+        'produse': len(catalog) if catalog else 0,
+        'sursa': catalog.sursa if catalog else None,
+        'varsta_secunde': int(acum - catalog.creat_la) if catalog else None,
+        'verificat_acum_secunde': int(acum - catalog.verificat_la) if catalog else None,
+        'ultima_verificare': catalog_refresh_state['ultima_verificare'],
+        'ultima_eroare': catalog_refresh_state['ultima_eroare'],
+        'ultima_eroare_la': catalog_refresh_state['ultima_eroare_la']
+    }
+
+
+# Reîmprospătare catalog în fundal (green thread eventlet)
+if CATALOG_REFRESH_SECONDS > 0:
+    socketio.start_background_task(refresh_catalog_loop)
+
+# Golirea jurnalului de bonuri în PostgreSQL (reia și ce a rămas de la rularea anterioară)
+socketio.start_background_task(jurnal_bonuri.bucla_golire)
+
+# Partițiile lunare: create din timp și arhivate și când procesul rulează luni întregi fără restart
+if database.INTERVAL_INTRETINERE > 0:
+    socketio.start_background_task(database.bucla_intretinere_partitii)
+
+
+def automatizare_headless():
+    """OblioAutomation headless pentru sesiunile pre-încălzite din pool"""
+    from automatizare_oblio_selenium import OblioAutomation
+    return OblioAutomation(use_existing_profile=False, headless=True)
+
+
+# Sesiuni browser: închiderea celor inactive + pre-încălzire opțională (SESIUNI_MIN, doar pe server)
+socketio.start_background_task(pool_sesiuni.bucla_curatare)
+if pool_sesiuni.SESIUNI_MIN > 0 and platform.system() == 'Linux' and os.environ.get('OBLIO_EMAIL'):
+    socketio.start_background_task(
+        pool_sesiuni.preincalzeste, automatizare_headless,
+        os.environ.get('OBLIO_EMAIL'), os.environ.get('OBLIO_PASSWORD')
+    )
+
+
+def numeBonProductie(sku, product_db):
+    """
+    Numele CORECT al bonului din baza de date Google Sheets
+    Fallback: "Decant {ml}ml {parfum}" din produsul de bază, apoi "Decant {ml}ml (SKU: ...)"
+    """
+    # Extrage ml din SKU pentru a determina tipul de decant
+    match_sku_ml = re.search(r'-(\d{1,2})$', sku)
+    ml = match_sku_ml.group(1) if match_sku_ml else '?'
+
+    if sku in product_db:
+        return product_db[sku]
+
+    # Fallback: construiește un nume generic
+    base_sku = re.sub(r'-\d{1,2}$', '', sku)
+    if base_sku in product_db:
+        base_name = product_db[base_sku]
+        # Extrage doar numele parfumului din denumirea completă
+        match_parfum = re.search(r'Parfum (.+?),', base_name)
+        if match_parfum:
+            return f"Decant {ml}ml {match_parfum.group(1)}"
+
+    return f"Decant {ml}ml (SKU: {sku})"
 
 
 def proceseazaBonuriProductie(fisier_path, statuses=None):
@@ -465,127 +464,77 @@ def proceseazaBonuriProductie(fisier_path, statuses=None):
     if statuses is None:
         statuses = ['Finalizata', 'Confirmata']
 
-    df = pd.read_excel(fisier_path)
-
-    # Detectare automată coloane
-    coloana_status, coloana_produse = detecteazaColoane(df)
-
-    # Verificare coloană atribute
-    coloana_atribute = None
-    for col in df.columns:
-        col_lower = str(col).lower()
-        if any(keyword in col_lower for keyword in ['atribute', 'atribut']):
-            coloana_atribute = col
-            break
-
-    if not coloana_atribute:
-        raise ValueError('Nu s-a găsit coloana cu atributele produselor')
-
-    # Detectare coloane order_id și order_number
-    coloana_order_id = None
-    coloana_order_number = None
-    for col in df.columns:
-        col_lower = str(col).lower()
-        if 'id comanda' in col_lower or 'id_comanda' in col_lower:
-            coloana_order_id = col
-        if 'numar comanda' in col_lower or 'numar_comanda' in col_lower or col_lower == 'numar comanda':
-            coloana_order_number = col
-
-    logger.info(f"📋 Coloane detectate: order_id='{coloana_order_id}', order_number='{coloana_order_number}'")
-
     # Încarcă baza de date de produse din Google Sheets
     product_db = get_product_database()
 
-    # Filtrare comenzi după statusurile selectate
     # Construiește pattern regex din lista de statusuri
     status_pattern = '|'.join([re.escape(s) for s in statuses])
     logger.info(f"🔍 Filtru status: {status_pattern}")
-    df_finalizate = df[df[coloana_status].astype(str).str.contains(status_pattern, case=False, na=False)]
-    logger.info(f"📊 Comenzi găsite cu statusurile selectate: {len(df_finalizate)} din {len(df)}")
-
-    # Lista de bonuri NEAGREGATE (per comandă pentru tracking precis)
-    bonuri_list = []
-
-    for idx, row in df_finalizate.iterrows():
-        atribute_text = str(row[coloana_atribute])
-
-        # Extrage order_id și order_number din rând
-        order_id = None
-        order_number = None
-
-        if coloana_order_id:
-            try:
-                order_id = int(row[coloana_order_id])
-            except (ValueError, TypeError):
-                order_id = None
-
-        if coloana_order_number:
-            try:
-                order_number = int(row[coloana_order_number])
-            except (ValueError, TypeError):
-                order_number = None
-
-        # Extrage TOATE SKU-urile din atribute - format: "SKU: (atribute...)"
-        # Pattern: caută toate SKU-urile care au format XXXXXX-3, XXXXXX-5, XXXXXX-10 (decanturi)
-        # sau XXXXXX (parfumuri 100ml) urmate de ": ("
-        sku_matches = re.findall(r'(\d{10,}-\d{1,2}|\d{10,}):\s*\(', atribute_text)
-
-        for sku in sku_matches:
-            # Doar decanturi (SKU-uri care au sufixul -3, -5 sau -10)
-            if not re.search(r'-\d{1,2}$', sku):
-                continue  # Skip parfumuri 100ml
-
-            cantitate = 1  # Default
-
-            # Extrage ml din SKU pentru a determina tipul de decant
-            match_sku_ml = re.search(r'-(\d{1,2})$', sku)
-            ml = match_sku_ml.group(1) if match_sku_ml else '?'
-
-            # Obține numele CORECT din baza de date Google Sheets
-            if sku in product_db:
-                nume_complet = product_db[sku]
-            else:
-                # Fallback: construiește un nume generic
-                base_sku = re.sub(r'-\d{1,2}$', '', sku)
-                if base_sku in product_db:
-                    base_name = product_db[base_sku]
-                    # Extrage doar numele parfumului din denumirea completă
-                    match_parfum = re.search(r'Parfum (.+?),', base_name)
-                    if match_parfum:
-                        nume_complet = f"Decant {ml}ml {match_parfum.group(1)}"
-                    else:
-                        nume_complet = f"Decant {ml}ml (SKU: {sku})"
-                else:
-                    nume_complet = f"Decant {ml}ml (SKU: {sku})"
-
-            # Adaugă bon individual cu info despre comandă
-            bonuri_list.append({
-                'sku': sku,
-                'nume': nume_complet,
-                'cantitate': cantitate,
-                'order_id': order_id,
-                'order_number': order_number
-            })
 
     # AGREGARE pentru afișare: grupăm bonurile identice (același SKU din aceeași comandă)
     # dar păstrăm referința la comenzi
-    bonuri_agregate = defaultdict(lambda: {
-        'nume': '',
-        'cantitate': 0,
-        'comenzi': [],
-        'order_ids': [],
-        'order_numbers': []
-    })
+    bonuri_agregate = {}
+    total_comenzi = 0
+    total_finalizate = 0
+    total_bonuri = 0
+    inceput = time.monotonic()
+
+    # Citire în flux: blocuri de rânduri (doar coloanele necesare), agregate incremental
+    for index_bloc, df in enumerate(parsare_comenzi.citesteExportInBlocuri(fisier_path)):
+        # Detectare automată coloane
+        coloana_status, coloana_produse = detecteazaColoane(df)
+
+        # Verificare coloană atribute
+        coloana_atribute = None
+        for col in df.columns:
+            col_lower = str(col).lower()
+            if any(keyword in col_lower for keyword in ['atribute', 'atribut']):
+                coloana_atribute = col
+                break
 
-    for bon in bonuri_list:
-        sku = bon['sku']
-        bonuri_agregate[sku]['nume'] = bon['nume']
-        bonuri_agregate[sku]['cantitate'] += bon['cantitate']
-        if bon['order_number']:
-            bonuri_agregate[sku]['comenzi'].append(str(bon['order_number']))
-            bonuri_agregate[sku]['order_numbers'].append(bon['order_number'])
-        if bon['order_id']:
-            bonuri_agregate[sku]['order_ids'].append(bon['order_id'])
+        if not coloana_atribute:
+            raise ValueError('Nu s-a găsit coloana cu atributele produselor')
+
+        # Detectare coloane order_id și order_number
+        coloana_order_id = None
+        coloana_order_number = None
+        for col in df.columns:
+            col_lower = str(col).lower()
+            if 'id comanda' in col_lower or 'id_comanda' in col_lower:
+                coloana_order_id = col
+            if 'numar comanda' in col_lower or 'numar_comanda' in col_lower or col_lower == 'numar comanda':
+                coloana_order_number = col
+
+        if index_bloc == 0:
+            logger.info(f"📋 Coloane detectate: order_id='{coloana_order_id}', order_number='{coloana_order_number}'")
+
+        # Filtrare comenzi după statusurile selectate
+        df_finalizate = df[df[coloana_status].astype(str).str.contains(status_pattern, case=False, na=False)]
+        total_comenzi += len(df)
+        total_finalizate += len(df_finalizate)
+
+        # Bonuri NEAGREGATE (un rând per comandă + SKU) extrase vectorizat din coloana de atribute
+        bonuri_df = parsare_comenzi.extrageBonuriDinAtribute(
+            df_finalizate, coloana_atribute, coloana_order_id, coloana_order_number
+        )
+        total_bonuri += len(bonuri_df)
+
+        for sku, grup in bonuri_df.groupby('sku', sort=False):
+            if sku not in bonuri_agregate:
+                bonuri_agregate[sku] = {
+                    'nume': numeBonProductie(sku, product_db),
+                    'cantitate': 0,
+                    'comenzi': [],
+                    'order_ids': [],
+                    'order_numbers': []
+                }
+            order_numbers = [n for n in grup['order_number'] if n]
+            bonuri_agregate[sku]['cantitate'] += len(grup)
+            bonuri_agregate[sku]['comenzi'].extend(str(n) for n in order_numbers)
+            bonuri_agregate[sku]['order_numbers'].extend(order_numbers)
+            bonuri_agregate[sku]['order_ids'].extend(i for i in grup['order_id'] if i)
+
+    logger.info(f"📊 Comenzi găsite cu statusurile selectate: {total_finalizate} din {total_comenzi}")
 
     # Sortare după cantitate (descrescător)
     bonuri_sortate = sorted(bonuri_agregate.items(), key=lambda x: x[1]['cantitate'], reverse=True)
@@ -607,7 +556,8 @@ def proceseazaBonuriProductie(fisier_path, statuses=None):
             'order_numbers': order_numbers_unice
         })
 
-    logger.info(f"📦 Procesat: {len(rezultat)} SKU-uri unice din {len(bonuri_list)} bonuri totale")
+    logger.info(f"📦 Procesat: {len(rezultat)} SKU-uri unice din {total_bonuri} bonuri totale")
+    inregistreaza_parsare('bonuri', inceput, total_comenzi)
     return rezultat
 
 
@@ -957,10 +907,111 @@ def download_model():
 
 @app.route('/health')
 def health():
-    """Health check endpoint"""
+    """Health check endpoint (liveness pentru healthcheck-ul containerului - fără autentificare)"""
     return jsonify({'status': 'healthy', 'service': 'OBSID Decant Manager'})
 
 
+@app.route('/health/detalii', methods=['GET'])
+@login_required
+def health_detalii():
+    """Starea internă a subsistemelor (catalog, pool-uri, jurnal, joburi, trasări) - doar autentificat"""
+    return jsonify({
+        'status': 'healthy',
+        'service': 'OBSID Decant Manager',
+        'catalog': get_catalog_status(),
+        'memo_linii': parsare_comenzi.memo_linii.statistici(),
+        'db_pool': database.get_statistici_pool(),
+        'jurnal_bonuri': jurnal_bonuri.statistici(),
+        'sesiuni_browser': pool_sesiuni.pool.statistici(),
+        'lucratori_bonuri': lucratori_bonuri.statistici(),
+        'joburi': joburi.statistici(),
+        'istoric_productie': istoric_productie.statistici(),
+        'transport_loguri': transport.statistici(),
+        'cache_produse_oblio': cache_produse_oblio.statistici(),
+        'timpi_pasi_oblio': trasare_oblio.statistici()
+    })
+
+
+def _varsta_catalog():
+    catalog = CATALOG
+    return time.time() - catalog.creat_la if catalog else None
+
+
+def _statistica(functie, *chei):
+    """Citește câmpurile `chei` din statisticile unui modul: {cheie: valoare} pentru un indicator etichetat"""
+    def citeste():
+        stare = functie()
+        return {cheie: stare.get(cheie) for cheie in chei} if stare else None
+    return citeste
+
+
+# Valori citite la fiecare scrape /metrics din starea modulelor
+metrici.indicator('decanturi_catalog_varsta_secunde', 'Vârsta snapshot-ului curent al catalogului de produse',
+                  _varsta_catalog)
+metrici.indicator('decanturi_catalog_produse', 'Produse în catalogul activ',
+                  lambda: len(CATALOG) if CATALOG else 0)
+metrici.indicator('decanturi_db_pool_conexiuni', 'Conexiunile pool-ului DB, după stare',
+                  _statistica(database.get_statistici_pool, 'deschise', 'ocupate', 'libere', 'maxim'), ('stare',))
+metrici.indicator('decanturi_db_pool_evenimente_total', 'Conexiuni DB create / refolosite / aruncate de pool',
+                  _statistica(database.get_statistici_pool, 'create', 'refolosite', 'aruncate'), ('eveniment',),
+                  tip='counter')
+metrici.indicator('decanturi_sesiuni_browser', 'Sesiunile Selenium din pool, după stare',
+                  _statistica(pool_sesiuni.pool.statistici, 'libere', 'imprumutate', 'maxim'), ('stare',))
+metrici.indicator('decanturi_sesiuni_browser_memorie_mb', 'Memoria rezidentă a browserelor din pool (MB)',
+                  lambda: pool_sesiuni.pool.memorie_mb(vechime_max=pool_sesiuni.SESIUNI_MEMORIE_CACHE))
+metrici.indicator('decanturi_lucratori_bonuri_activi', 'Browsere care creează bonuri în acest moment',
+                  lambda: lucratori_bonuri.statistici()['lucratori_activi'])
+metrici.indicator('decanturi_automatizare_activa', 'O rulare de automatizare este în curs (0/1)',
+                  lambda: int(bool(automation_active)))
+metrici.indicator('decanturi_socket_coada_evenimente', 'Evenimente Socket.IO în buffer-ele clienților, netrimise încă',
+                  lambda: transport.statistici()['in_buffer'])
+metrici.indicator('decanturi_socket_clienti', 'Clienți cu buffer în transportul de log-uri',
+                  lambda: transport.statistici()['clienti'])
+metrici.indicator('decanturi_socket_evenimente_total', 'Transportul Socket.IO: evenimente primite, omise la backpressure, frame-uri trimise, ack-uri expirate',
+                  _statistica(transport.statistici, 'evenimente', 'omise', 'frameuri', 'ack_expirate'), ('tip',),
+                  tip='counter')
+metrici.colector(trasare_oblio.metrici_prometheus)
+
+
+@app.route('/metrics')
+def metrics():
+    """Contoare, histograme și durata pașilor Oblio (p50 / p95 / p99) în format text Prometheus"""
+    return Response(metrici.exporta(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/statistici')
+@login_required
+def statistici():
+    """
+    Statistici pre-agregate pe zile, SKU-uri și mărimi de decant (pentru dashboard)
+    Parametri: de_la, pana_la (YYYY-MM-DD, implicit ultimele 30 de zile), ml (opțional)
+    """
+    try:
+        azi = datetime.now().date()
+        pana_la = datetime.strptime(request.args.get('pana_la', azi.isoformat()), '%Y-%m-%d').date()
+        de_la = datetime.strptime(
+            request.args.get('de_la', (pana_la - timedelta(days=29)).isoformat()), '%Y-%m-%d'
+        ).date()
+        ml = request.args.get('ml', type=int)
+    except ValueError:
+        return jsonify({'error': 'Datele trebuie să fie în formatul YYYY-MM-DD'}), 400
+
+    if de_la > pana_la:
+        return jsonify({'error': 'Intervalul este inversat (de_la > pana_la)'}), 400
+
+    zile = database.get_statistici_zilnice(de_la, pana_la)
+    if zile is None:
+        return jsonify({'error': 'Baza de date nu este disponibilă'}), 503
+
+    return jsonify({
+        'de_la': de_la.isoformat(),
+        'pana_la': pana_la.isoformat(),
+        'zile': zile,
+        'sku': database.get_statistici_sku(de_la, pana_la, ml) or [],
+        'ml': database.get_statistici_ml(de_la, pana_la) or []
+    })
+
+
 @app.route('/test-db')
 def test_db():
     """Test database connection - pentru debugging"""
@@ -981,10 +1032,13 @@ def test_db():
         else:
             result['database_url_preview'] = 'invalid format'
 
-    # Test conexiune
+    # Test conexiune (prin pool, ca operațiile reale)
     try:
-        conn = database.get_db_connection()
-        if conn:
+        with database.conexiune() as conn:
+            if not conn:
+                result['connection_test'] = 'FAILED - conn is None'
+                return jsonify(result)
+
             result['connection_test'] = 'SUCCESS'
 
             # Test insert
@@ -993,7 +1047,7 @@ def test_db():
                 cur.execute('''
                     INSERT INTO bonuri_procesate (sku, nume_produs, cantitate, order_id, order_number, data_procesare)
                     VALUES ('TEST-DEBUG-123', 'Test Debug Connection', 1, 9999, 99999, CURRENT_DATE)
-                    ON CONFLICT (sku, order_number) DO UPDATE SET data_procesare = CURRENT_DATE
+                    ON CONFLICT (sku, order_number, data_procesare) DO UPDATE SET cantitate = EXCLUDED.cantitate
                     RETURNING id
                 ''')
                 row = cur.fetchone()
@@ -1013,9 +1067,7 @@ def test_db():
             except Exception as e:
                 result['select_test'] = f'FAILED: {str(e)}'
 
-            conn.close()
-        else:
-            result['connection_test'] = 'FAILED - conn is None'
+        result['pool'] = database.get_statistici_pool()
     except Exception as e:
         result['connection_test'] = f'FAILED: {str(e)}'
 
@@ -1049,19 +1101,6 @@ def start_automation_selenium():
             headless=is_linux  # True pe server (headless), False pe Windows (cu GUI)
         )
 
-        # Setup driver
-        if not automation.setup_driver():
-            error_msg = 'Nu s-a putut porni Chrome WebDriver.'
-            if is_linux:
-                error_msg += ' Verifică logs în automatizare_oblio.log pentru detalii.'
-            else:
-                error_msg += ' Verifică că Chrome este instalat și rulează cu --remote-debugging-port=9222'
-
-            return jsonify({
-                'error': error_msg,
-                'hint': 'Windows: Pornește Chrome cu remote debugging. Linux: Verifică logs.'
-            }), 500
-
         # Citește credențialele Oblio din environment variables
         oblio_email = os.environ.get('OBLIO_EMAIL')
         oblio_password = os.environ.get('OBLIO_PASSWORD')
@@ -1083,12 +1122,27 @@ def start_automation_selenium():
                     'error': 'Credențiale Oblio lipsă! Setează OBLIO_EMAIL și OBLIO_PASSWORD în environment variables.',
                     'hint': 'Cookies HttpOnly nu pot fi accesate din JavaScript - folosim email/password.'
                 }), 500
-        
-        # Procesează bonurile
-        stats = automation.process_bonuri(bonuri, oblio_cookies, oblio_email, oblio_password)
 
-        # Închide browser
-        automation.close()
+        # Sesiune browser din pool (caldă și autentificată dacă există)
+        if not pool_sesiuni.pool.imprumuta(automation, oblio_email, oblio_password):
+            error_msg = 'Nu s-a putut porni Chrome WebDriver.'
+            if is_linux:
+                error_msg += ' Verifică logs în automatizare_oblio.log pentru detalii.'
+            else:
+                error_msg += ' Verifică că Chrome este instalat și rulează cu --remote-debugging-port=9222'
+
+            return jsonify({
+                'error': error_msg,
+                'hint': 'Windows: Pornește Chrome cu remote debugging. Linux: Verifică logs.'
+            }), 500
+
+        # Procesează bonurile (sesiunea revine în pool, sau e închisă dacă rularea a eșuat)
+        eroare_rulare = True
+        try:
+            stats = automation.process_bonuri(bonuri, oblio_cookies, oblio_email, oblio_password)
+            eroare_rulare = False
+        finally:
+            pool_sesiuni.pool.returneaza(automation, stricata=eroare_rulare)
 
         # Returnează rezultatul
         return jsonify({
@@ -1101,6 +1155,142 @@ def start_automation_selenium():
         return jsonify({'error': f'Eroare la automatizare: {str(e)}'}), 500
 
 
+# ============================================================
+# JOBURI - rulări persistente (supraviețuiesc restartului / închiderii tab-ului)
+# ============================================================
+
+def porneste_job(job, client_sid=None):
+    """
+    Pornește în fundal rularea unui job deja revendicat (doar bonurile rămase, în ordinea inițială)
+    Fără client_sid (REST / reluare după restart) log-urile ajung la toți clienții conectați.
+    """
+    global automation_active, stop_requested, job_curent
+    automation_active = True
+    stop_requested = False
+    job_curent = job['id']
+
+    # Clientul care pornește jobul îl urmărește de la evenimentul curent încolo
+    if client_sid:
+        loguri_joburi.aboneaza(transport, job['id'], client_sid, dupa=loguri_joburi.ultima_secventa(job['id']))
+
+    socketio.start_background_task(
+        run_automation_with_live_logs,
+        joburi.bonuri_ramase(job['id']),
+        client_sid,
+        job['force_mode'],
+        job['id']
+    )
+
+
+def porneste_urmatorul_job():
+    """Dacă nu rulează nimic, ia în lucru cel mai vechi job din coadă"""
+    if automation_active:
+        return None
+    job = joburi.revendica()
+    if job:
+        logger.info(f"📋 Pornesc jobul {job['id']} din coadă ({job['total']} bonuri)")
+        porneste_job(job)
+    return job
+
+
+@app.route('/joburi', methods=['GET'])
+@login_required
+def lista_joburi():
+    """Ultimele joburi și jobul în lucru"""
+    return jsonify({
+        'joburi': joburi.lista(int(request.args.get('limita', 20))),
+        'job_curent': job_curent if automation_active else None
+    })
+
+
+@app.route('/joburi', methods=['POST'])
+@login_required
+def adauga_job():
+    """
+    Pune un job în coadă: {'bonuri': [...], 'force_mode': false}
+    Pornește imediat dacă nu rulează altă automatizare, altfel la terminarea celei curente.
+    """
+    data = request.get_json() or {}
+    bonuri = data.get('bonuri', [])
+    if not bonuri:
+        return jsonify({'error': 'Nu există bonuri de procesat'}), 400
+
+    job_id = joburi.creeaza(bonuri, data.get('force_mode', False))
+    job = porneste_urmatorul_job()
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'pornit': bool(job and job['id'] == job_id)
+    }), 202
+
+
+@app.route('/joburi/<job_id>', methods=['GET'])
+@login_required
+def detalii_job(job_id):
+    """Starea jobului și a fiecărui bon"""
+    job = joburi.job(job_id, cu_bonuri=True)
+    if job is None:
+        return jsonify({'error': 'Job inexistent'}), 404
+    return jsonify(job)
+
+
+@app.route('/joburi/<job_id>/loguri', methods=['GET'])
+@login_required
+def loguri_job(job_id):
+    """Evenimentele jurnalizate ale jobului cu secvența > dupa (?dupa=N)"""
+    if joburi.job(job_id) is None:
+        return jsonify({'error': 'Job inexistent'}), 404
+    dupa = int(request.args.get('dupa', 0))
+    return jsonify({
+        'job_id': job_id,
+        'evenimente': loguri_joburi.citeste(job_id, dupa)
+    })
+
+
+@app.route('/joburi/<job_id>/reluare', methods=['POST'])
+@login_required
+def reluare_job(job_id):
+    """Reia un job întrerupt / oprit / eșuat de la primul bon neterminat"""
+    if automation_active:
+        return jsonify({'error': 'O automatizare este deja în desfășurare', 'job_curent': job_curent}), 409
+
+    job = joburi.revendica(job_id)
+    if job is None:
+        return jsonify({'error': 'Jobul nu există sau nu poate fi reluat (rulează / este finalizat)'}), 409
+
+    porneste_job(job)
+    return jsonify({'success': True, 'job_id': job_id, 'bonuri_ramase': len(joburi.bonuri_ramase(job_id))})
+
+
+@app.route('/joburi/<job_id>/oprire', methods=['POST'])
+@login_required
+def oprire_job(job_id):
+    """Oprește jobul după bonurile aflate în lucru (se poate relua ulterior)"""
+    global stop_requested
+    if not joburi.cere_oprire(job_id):
+        return jsonify({'error': 'Jobul nu este în lucru'}), 409
+    if job_id == job_curent:
+        stop_requested = True
+    return jsonify({'success': True, 'job_id': job_id})
+
+
+@app.route('/trasari', methods=['GET'])
+@login_required
+def lista_trasari():
+    """Cele mai recente trasări de rulări (span-urile pașilor Oblio)"""
+    return jsonify({'trasari': trasare_oblio.lista()})
+
+
+@app.route('/trasari/<id_rulare>', methods=['GET'])
+@login_required
+def detalii_trasare(id_rulare):
+    """Trasarea unei rulări: operațiile cu span-urile lor și sumarul per pas"""
+    trasare = trasare_oblio.citeste(id_rulare)
+    if trasare is None:
+        return jsonify({'error': 'Trasare inexistentă'}), 404
+    return jsonify(trasare)
+
+
 # ============================================================
 # WEBSOCKET HANDLERS - Live Terminal cu Interactive Input
 # ============================================================
@@ -1114,8 +1304,31 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    """Client deconectat de la WebSocket"""
+    """Client deconectat de la WebSocket (rularea continuă, log-urile rămân în jurnalul jobului)"""
     logger.info(f"🔌 Client deconectat de la WebSocket")
+    transport.dezaboneaza(request.sid)
+
+
+@socketio.on('urmareste_job')
+def handle_urmareste_job(data):
+    """
+    Handshake la (re)conectare: {'job_id': ..., 'dupa': ultima secvență văzută}
+    Clientul primește doar evenimentele care i-au lipsit, apoi cele live ale jobului.
+    Oricâți clienți pot urmări același job.
+    """
+    job_id = (data or {}).get('job_id')
+    job = joburi.job(job_id) if job_id else None
+    if job is None:
+        emit('log', {'type': 'error', 'message': f'❌ Jobul {job_id} nu există'})
+        return
+
+    try:
+        dupa = int((data or {}).get('dupa') or 0)
+    except (TypeError, ValueError):
+        dupa = 0
+
+    reluate = loguri_joburi.aboneaza(transport, job_id, request.sid, dupa=dupa)
+    emit('job_urmarit', {'job_id': job_id, 'stare': job['stare'], 'reluate': reluate})
 
 
 @socketio.on('stop_automation')
@@ -1123,6 +1336,8 @@ def handle_stop_automation():
     global stop_requested, automation_active
     if automation_active:
         stop_requested = True
+        if job_curent:
+            joburi.cere_oprire(job_curent)
         logger.info("🛑 Cerere de oprire automatizare primită")
         emit('log', {'type': 'warning', 'message': '⚠️ Se încearcă oprirea automatizării...'})
     else:
@@ -1161,20 +1376,39 @@ def handle_start_automation_live(data):
     # DEBUG: Test emit înainte de thread
     emit('log', {'type': 'warning', 'message': '⚡ IMEDIAT PORNESC THREAD-UL...'})
 
-    # Pornește automation cu socketio.start_background_task (FUNCȚIONEAZĂ cu eventlet!)
+    # Rularea devine un job persistent, pornit cu socketio.start_background_task (FUNCȚIONEAZĂ cu eventlet!)
     try:
-        socketio.start_background_task(
-            run_automation_with_live_logs,
-            bonuri,
-            request.sid,
-            force_mode
-        )
-        emit('log', {'type': 'success', 'message': '✅ BACKGROUND TASK PORNIT! Așteaptă logs...'})
+        job_id = joburi.creeaza(bonuri, force_mode)
+        porneste_job(joburi.revendica(job_id), request.sid)
+        emit('job_creat', {'job_id': job_id, 'total': len(bonuri)})
+        emit('log', {'type': 'success', 'message': f'✅ BACKGROUND TASK PORNIT (job {job_id})! Așteaptă logs...'})
     except Exception as e:
         emit('log', {'type': 'error', 'message': f'❌ EROARE LA PORNIRE TASK: {str(e)}'})
         automation_active = False
 
 
+@socketio.on('resume_job')
+def handle_resume_job(data):
+    """
+    Reia un job (după restart sau după închiderea tab-ului) de la primul bon neterminat
+    """
+    job_id = (data or {}).get('job_id')
+
+    if automation_active:
+        emit('log', {'type': 'error', 'message': '⚠️ O automatizare este deja în desfășurare!'})
+        emit('automation_status', {'active': True, 'job_id': job_curent})
+        return
+
+    job = joburi.revendica(job_id) if job_id else None
+    if job is None:
+        emit('log', {'type': 'error', 'message': f'❌ Jobul {job_id} nu există sau nu poate fi reluat'})
+        emit('automation_complete', {'success': False, 'error': 'Job not resumable'})
+        return
+
+    emit('log', {'type': 'info', 'message': f'🔁 RELUARE JOB {job_id}: {len(joburi.bonuri_ramase(job_id))}/{job["total"]} bonuri rămase'})
+    porneste_job(job, request.sid)
+
+
 @socketio.on('user_input')
 def handle_user_input(data):
     """
@@ -1206,7 +1440,7 @@ def send_heartbeat(client_sid, stop_event):
             break
 
 
-def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
+def run_automation_with_live_logs(bonuri, client_sid, force_mode=False, job_id=None):
     """
     Rulează automatizarea în background și trimite logs live
     FOLOSEȘTE socketio.start_background_task() care funcționează cu eventlet!
@@ -1214,8 +1448,9 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
         bonuri: Lista de bonuri de procesat
         client_sid: Session ID al clientului WebSocket
         force_mode: Dacă True, procesează TOATE bonurile fără verificare duplicate
+        job_id: Jobul persistent (joburi.py) - bonurile poartă '_job_idx', progresul se salvează per bon
     """
-    global automation_active, stop_requested
+    global automation_active, stop_requested, job_curent
 
     # Event pentru oprirea heartbeat
     import threading
@@ -1224,34 +1459,51 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
     # Pornește heartbeat în background
     socketio.start_background_task(send_heartbeat, client_sid, stop_heartbeat)
 
+    automation = None
+    eroare_rulare = False
+    stare_job, eroare_job = 'eroare', None
+    job_info = joburi.job(job_id) if job_id else None
+    # Un job deja verificat (Smart Resume la prima rulare) se reia fără scraping în Oblio
+    reluare = bool(job_info and job_info['verificat'])
+    # Evenimentele jobului se jurnalizează și ajung la toți clienții abonați (nu doar la client_sid)
+    emitator = loguri_joburi.EmitatorJob(transport, job_id) if job_id else transport
+    # Span-urile pașilor din bonuri și transfer, exportate la final în uploads/trasari/<id>.json
+    trasare = trasare_oblio.Rulare(job_id=job_id, bonuri=len(bonuri), force_mode=force_mode)
+    # Bonurile rulării pentru /metrics: create, eșuate definitiv, încercări de retry
+    bonuri_rulare = {'creat': 0, 'esuat': 0, 'reincercat': 0}
+
+    def numara_bon(rezultat):
+        bonuri_rulare[rezultat] += 1
+        metrici.BONURI.inc(rezultat=rezultat)
+
     # Cu socketio.start_background_task() NU mai trebuie app.app_context()!
     try:
-        socketio.emit('log', {
+        emitator.emit('log', {
             'type': 'info',
             'message': '🔧 START BACKGROUND TASK - Pornire automation...'
         }, room=client_sid)
 
         # CRITICAL: Try to import with detailed error
         try:
-            socketio.emit('log', {
+            emitator.emit('log', {
                 'type': 'info',
                 'message': '📥 Încerc să importez automatizare_oblio_selenium...'
             }, room=client_sid)
 
             from automatizare_oblio_selenium import OblioAutomation
 
-            socketio.emit('log', {
+            emitator.emit('log', {
                 'type': 'success',
                 'message': '✅ OblioAutomation importat cu succes!'
             }, room=client_sid)
         except ImportError as ie:
-            socketio.emit('log', {
+            emitator.emit('log', {
                 'type': 'error',
                 'message': f'❌ IMPORT ERROR: {str(ie)}'
             }, room=client_sid)
             raise
         except Exception as ie:
-            socketio.emit('log', {
+            emitator.emit('log', {
                 'type': 'error',
                 'message': f'❌ EROARE LA IMPORT: {str(ie)}'
             }, room=client_sid)
@@ -1259,14 +1511,14 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
 
         import platform
 
-        socketio.emit('log', {
+        emitator.emit('log', {
             'type': 'info',
             'message': '📦 Import-uri OK - Inițializare Selenium...'
         }, room=client_sid)
 
         is_linux = platform.system() == 'Linux'
 
-        socketio.emit('log', {
+        emitator.emit('log', {
             'type': 'info',
             'message': f'🖥️ Sistem detectat: {"Linux (Headless)" if is_linux else "Windows (Visual)"}'
         }, room=client_sid)
@@ -1275,28 +1527,35 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
         automation = OblioAutomation(
             use_existing_profile=not is_linux,
             headless=is_linux,
-            log_callback=lambda msg, level: socketio.emit('log', {
+            log_callback=lambda msg, level: emitator.emit('log', {
                 'type': level,
                 'message': msg,
                 'timestamp': time.time()
             }, room=client_sid),
-            input_callback=lambda prompt: wait_for_user_input(prompt, client_sid)
+            input_callback=lambda prompt: wait_for_user_input(prompt, client_sid),
+            trasare=trasare
         )
         
         # Setăm instanța globală pentru a putea fi oprită
         global current_automation_instance
         current_automation_instance = automation
 
-        # Setup driver
-        if not automation.setup_driver():
-            socketio.emit('log', {
+        # Credențiale Oblio
+        oblio_email = os.environ.get('OBLIO_EMAIL')
+        oblio_password = os.environ.get('OBLIO_PASSWORD')
+
+        # Sesiune browser din pool (caldă și autentificată dacă a rămas una de la rularea anterioară)
+        if not pool_sesiuni.pool.imprumuta(automation, oblio_email, oblio_password):
+            automation = None
+            emitator.emit('log', {
                 'type': 'error',
                 'message': '❌ Nu s-a putut porni Chrome WebDriver'
             }, room=client_sid)
-            socketio.emit('automation_complete', {
+            emitator.emit('automation_complete', {
                 'success': False,
                 'error': 'ChromeDriver failed to start'
             }, room=client_sid)
+            eroare_job = 'ChromeDriver failed to start'
             return
 
         # Procesează bonuri BON CU BON (fix timeout!)
@@ -1307,19 +1566,15 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
             'errors': []
         }
 
-        # Credențiale Oblio
-        oblio_email = os.environ.get('OBLIO_EMAIL')
-        oblio_password = os.environ.get('OBLIO_PASSWORD')
-        
         if oblio_email:
-            socketio.emit('log', {
+            emitator.emit('log', {
                 'type': 'info',
                 'message': f'🔐 Folosesc credențiale din ENV: {oblio_email}'
             }, room=client_sid)
 
         # --- SMART RESUME: Verifică ce s-a lucrat deja (per comandă!) ---
         if force_mode:
-            socketio.emit('log', {
+            emitator.emit('log', {
                 'type': 'warning',
                 'message': '⚠️ FORCE MODE ACTIVAT: Procesez TOATE bonurile fără verificare duplicate!'
             }, room=client_sid)
@@ -1332,28 +1587,50 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
                     order_nums = bon.get('order_numbers', [])
                     all_order_numbers.update(order_nums)
 
-                socketio.emit('log', {
+                luni_cautare = database.luni_smart_resume()
+                emitator.emit('log', {
                     'type': 'info',
-                    'message': f'🔍 Verific {len(all_order_numbers)} comenzi în baza de date...'
+                    'message': f'🔍 Verific {len(all_order_numbers)} comenzi în baza de date'
+                               + (f' (bonuri din ultimele {luni_cautare} luni)...' if luni_cautare else '...')
                 }, room=client_sid)
 
                 # 1. Verificare în Baza de Date (PostgreSQL) - per (sku, order_number)
                 processed_pairs_db = database.get_bonuri_procesate_pentru_comenzi(list(all_order_numbers))
 
+                # Bonurile create în Oblio dar încă negolite din jurnalul local contează ca procesate
+                processed_pairs_db |= jurnal_bonuri.in_asteptare()
+
                 if processed_pairs_db:
-                    socketio.emit('log', {
+                    emitator.emit('log', {
                         'type': 'info',
                         'message': f'📊 Găsite {len(processed_pairs_db)} perechi (SKU, comandă) deja procesate în DB.'
                     }, room=client_sid)
 
                 # 2. Verificare în Oblio (Scraping) - Fallback pentru SKU-uri fără order tracking
-                processed_texts_oblio = []
-                if automation.login_if_needed(oblio_email, oblio_password):
-                    processed_texts_oblio = automation.get_todays_processed_texts()
+                # La reluarea unui job, bonurile fără comenzi au deja starea lor în job
+                index_oblio = None
+                index_indisponibil = False
+                if reluare:
+                    emitator.emit('log', {
+                        'type': 'info',
+                        'message': f'🔁 Reluare job {job_id}: fără verificare în Oblio, continui de la bonurile neterminate.'
+                    }, room=client_sid)
+                elif automation.login_if_needed(oblio_email, oblio_password):
+                    # Index local incremental: se citesc din Oblio doar bonurile apărute de la ultima rulare
+                    if automation.sincronizeaza_istoric_productie() is None:
+                        emitator.emit('log', {
+                            'type': 'warning',
+                            'message': '⚠️ Istoricul de producție Oblio nu a putut fi actualizat - recitesc tot raportul de azi...'
+                        }, room=client_sid)
+                        index_indisponibil = automation.sincronizeaza_istoric_productie(complet=True) is None
+                    # Un index vechi / incomplet ar lăsa bonuri deja create să fie create din nou
+                    if not index_indisponibil:
+                        index_oblio = istoric_productie.index_zi()
 
                 # Filtrare bonuri
                 initial_count = len(bonuri)
                 bonuri_filtrate = []
+                neverificate = 0
 
                 for bon in bonuri:
                     sku = bon.get('sku', '')
@@ -1381,35 +1658,34 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
 
                         if len(comenzi_neprocesate) < len(order_numbers):
                             logger.info(f"⏭️ Parțial (DB): {nume} - {len(order_numbers) - len(comenzi_neprocesate)}/{len(order_numbers)} comenzi deja procesate")
+                    elif index_indisponibil:
+                        neverificate += 1
                     else:
                         # Fallback pentru bonuri fără order tracking - verificăm doar în Oblio
-                        is_processed = False
-
-                        if processed_texts_oblio:
-                            for text in processed_texts_oblio:
-                                if sku and len(sku) > 3 and sku in text:
-                                    is_processed = True
-                                    break
-                                if nume and len(nume) > 5:
-                                    match_parfum = re.search(r'Decant \d+ ?ml (parfum )?(.+)', nume, re.IGNORECASE)
-                                    if match_parfum:
-                                        nume_parfum_doar = match_parfum.group(2).strip()
-                                        if len(nume_parfum_doar) > 4 and nume_parfum_doar in text:
-                                            match_ml = re.search(r'Decant (\d+)', nume)
-                                            if match_ml and match_ml.group(1) in text:
-                                                is_processed = True
-                                                break
+                        # Căutare exactă după SKU sau (ml, nume parfum) în bonurile de azi
+                        is_processed = bool(index_oblio and index_oblio.contine(sku, nume))
 
                         if is_processed:
                             logger.info(f"⏭️ Skip (Oblio): {nume} (SKU: {sku})")
                         else:
                             bonuri_filtrate.append(bon)
 
+                if neverificate:
+                    # Fără index nu se poate ști care bonuri fără comenzi există deja în Oblio - oprim rularea
+                    eroare_job = (f'Istoricul de producție Oblio nu a putut fi citit: {neverificate} bonuri fără comenzi '
+                                  f'asociate nu pot fi verificate de duplicate. Reîncearcă (sau folosește Force Mode).')
+                    emitator.emit('log', {'type': 'error', 'message': f'❌ {eroare_job}'}, room=client_sid)
+                    emitator.emit('automation_complete', {'success': False, 'error': eroare_job}, room=client_sid)
+                    return
+
                 bonuri = bonuri_filtrate
                 skipped_count = initial_count - len(bonuri)
 
+                if job_id:
+                    joburi.aplica_verificare(job_id, bonuri)
+
                 if skipped_count > 0:
-                    socketio.emit('log', {
+                    emitator.emit('log', {
                         'type': 'warning',
                         'message': f'⏭️ SMART RESUME: Am sărit peste {skipped_count} bonuri deja procesate.'
                     }, room=client_sid)
@@ -1418,113 +1694,110 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
                     stats['skipped'] = skipped_count
 
                 if len(bonuri) == 0:
-                    socketio.emit('log', {
+                    emitator.emit('log', {
                         'type': 'success',
                         'message': '✅ Toate bonurile din listă au fost deja procesate!'
                     }, room=client_sid)
 
             except Exception as e:
                 logger.error(f"Eroare Smart Resume: {e}")
-                socketio.emit('log', {
+                emitator.emit('log', {
                     'type': 'warning',
                     'message': f'⚠️ Eroare la verificarea istoricului: {e}'
                 }, room=client_sid)
         # ----------------------------------------------------
 
-        # Procesare BON cu BON cu progress live (BATCH OPTIMIZATION)
-        batch_size = 5 # Procesăm câte 5 bonuri în paralel (crescut de la 3)
+        # Procesare cu mai multe browsere în paralel (lucratori_bonuri), progress live per bon
         retryable_bonuri = [] # Lista pentru bonuri care pot fi reîncercate (timeout, erori rețea)
-        
-        for i in range(0, len(bonuri), batch_size):
-            if stop_requested:
-                break
-                
-            batch = bonuri[i:i + batch_size]
-            batch_indices = range(i + 1, i + len(batch) + 1)
-            
-            socketio.emit('log', {
+
+        # Bonurile reușite la rulările anterioare ale jobului intră și ele în nota de transfer
+        if job_id:
+            anterioare = joburi.bonuri_reusite(job_id)
+            if anterioare:
+                stats['successful_products'] = anterioare
+                stats['anterioare'] = len(anterioare)
+                emitator.emit('log', {
+                    'type': 'info',
+                    'message': f'📋 Job {job_id}: {len(anterioare)} bonuri create deja la rulările anterioare.'
+                }, room=client_sid)
+
+        def automatizare_lucrator(nr):
+            """OblioAutomation headless pentru lucrătorii 2..N (log-uri cu prefixul browser-ului)"""
+            return OblioAutomation(
+                use_existing_profile=False,
+                headless=True,
+                log_callback=lambda msg, level: emitator.emit('log', {
+                    'type': level,
+                    'message': f'[B{nr}] {msg}',
+                    'timestamp': time.time()
+                }, room=client_sid),
+                trasare=trasare
+            )
+
+        def bon_terminat(idx, bon, res):
+            sku = res['sku']
+            success = res['success']
+            msg = res['message']
+
+            if success:
+                stats['success'] += 1
+                stats.setdefault('successful_products', []).append(bon)
+                joburi.marcheaza_bon(job_id, bon, 'reusit', msg)
+                numara_bon('creat')
+
+                emitator.emit('bon_complete', {
+                    'index': idx,
+                    'total': len(bonuri),
+                    'success': True,
+                    'sku': sku,
+                    'message': f'✅ Bon {idx}/{len(bonuri)} finalizat cu succes!'
+                }, room=client_sid)
+            else:
+                stats['failed'] += 1
+                stats['errors'].append({'sku': sku, 'error': msg})
+
+                # Verificăm dacă eroarea este retryable (NU este stoc insuficient)
+                if "stoc insuficient" not in msg.lower():
+                    retryable_bonuri.append(bon)
+                    joburi.marcheaza_bon(job_id, bon, 'reincercare', msg)
+                    logger.info(f"🔄 Bon adăugat la coada de retry: {sku} (Eroare: {msg})")
+                else:
+                    joburi.marcheaza_bon(job_id, bon, 'esuat', msg)
+                    numara_bon('esuat')
+
+                emitator.emit('bon_complete', {
+                    'index': idx,
+                    'total': len(bonuri),
+                    'success': False,
+                    'sku': sku,
+                    'message': f'❌ Bon {idx}/{len(bonuri)} eșuat: {msg}'
+                }, room=client_sid)
+
+        if bonuri:
+            numar_lucratori = lucratori_bonuri.numar_lucratori(len(bonuri), automation)
+            emitator.emit('log', {
                 'type': 'info',
-                'message': f'🚀 Procesare batch {i//batch_size + 1}: {len(batch)} bonuri în paralel...'
+                'message': f'🚀 Procesare {len(bonuri)} bonuri cu {numar_lucratori} browsere în paralel...'
             }, room=client_sid)
-            
-            # Emit progress pentru toate din batch
-            for idx, bon in zip(batch_indices, batch):
-                socketio.emit('progress', {
+
+            # Emit progress pentru toate bonurile din coadă
+            for idx, bon in enumerate(bonuri, 1):
+                emitator.emit('progress', {
                     'current': idx,
                     'total': len(bonuri),
                     'sku': bon.get('sku'),
                     'nume': bon.get('nume', ''),
                     'cantitate': bon.get('cantitate', 1)
                 }, room=client_sid)
-            
-            eventlet.sleep(0.1)
 
-            try:
-                # Apelăm metoda de batch
-                results = automation.create_production_vouchers_batch(
-                    batch,
-                    None,   # cookies
-                    oblio_email,
-                    oblio_password
-                )
-                
-                # Procesăm rezultatele
-                for res in results:
-                    sku = res['sku']
-                    success = res['success']
-                    msg = res['message']
-                    
-                    # Găsim indexul original
-                    original_idx = next((idx for idx, b in zip(batch_indices, batch) if b.get('sku') == sku), 0)
-                    original_bon = next((b for b in batch if b.get('sku') == sku), {})
-                    
-                    if success:
-                        stats['success'] += 1
-                        stats.setdefault('successful_products', []).append(original_bon)
-                        
-                        socketio.emit('bon_complete', {
-                            'index': original_idx,
-                            'total': len(bonuri),
-                            'success': True,
-                            'sku': sku,
-                            'message': f'✅ Bon {original_idx}/{len(bonuri)} finalizat cu succes!'
-                        }, room=client_sid)
-                    else:
-                        stats['failed'] += 1
-                        stats['errors'].append({'sku': sku, 'error': msg})
-                        
-                        # Verificăm dacă eroarea este retryable (NU este stoc insuficient)
-                        if "stoc insuficient" not in msg.lower():
-                            retryable_bonuri.append(original_bon)
-                            logger.info(f"🔄 Bon adăugat la coada de retry: {sku} (Eroare: {msg})")
-                        
-                        socketio.emit('bon_complete', {
-                            'index': original_idx,
-                            'total': len(bonuri),
-                            'success': False,
-                            'sku': sku,
-                            'message': f'❌ Bon {original_idx}/{len(bonuri)} eșuat: {msg}'
-                        }, room=client_sid)
-                        
-                eventlet.sleep(0.5)
+            eventlet.sleep(0.1)
 
-            except Exception as e:
-                logger.error(f"❌ Eroare la procesarea batch-ului: {e}")
-                # Mark all in batch as failed
-                for idx, bon in zip(batch_indices, batch):
-                    stats['failed'] += 1
-                    stats['errors'].append({'sku': bon.get('sku'), 'error': str(e)})
-                    
-                    # Adăugăm tot batch-ul la retry
-                    retryable_bonuri.append(bon)
-                    
-                    socketio.emit('bon_complete', {
-                        'index': idx,
-                        'total': len(bonuri),
-                        'success': False,
-                        'sku': bon.get('sku'),
-                        'message': f'❌ Eroare batch: {str(e)[:100]}'
-                    }, room=client_sid)
+            lucratori_bonuri.proceseaza(
+                bonuri, automation, automatizare_lucrator,
+                oblio_email, oblio_password,
+                la_rezultat=bon_terminat,
+                oprit=lambda: stop_requested or joburi.oprire_ceruta(job_id)
+            )
 
         # ============================================================
         # ETAPA 1.5: RETRY PENTRU BONURI EȘUATE (Timeout, Erori rețea) - 3 ÎNCERCĂRI
@@ -1535,77 +1808,63 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
             if not retryable_bonuri or stop_requested:
                 break
 
-            socketio.emit('log', {
+            emitator.emit('log', {
                 'type': 'warning',
                 'message': f'🔄 RETRY ROUND {retry_round}/{MAX_RETRY_ATTEMPTS}: {len(retryable_bonuri)} bonuri eșuate...'
             }, room=client_sid)
 
-            # Procesăm retry-urile secvențial sau în batch-uri mici (2) pentru siguranță
-            retry_batch_size = 2
             still_failing = []  # Bonuri care încă eșuează după acest round
 
-            for i in range(0, len(retryable_bonuri), retry_batch_size):
-                if stop_requested:
-                    break
+            def retry_terminat(idx, bon, res, retry_round=retry_round, still_failing=still_failing):
+                sku = res['sku']
+                msg = res['message']
+                numara_bon('reincercat')
 
-                batch = retryable_bonuri[i:i + retry_batch_size]
+                if res['success']:
+                    # Actualizăm stats: scădem din failed, adăugăm la success
+                    stats['failed'] -= 1
+                    stats['success'] += 1
+                    stats.setdefault('successful_products', []).append(bon)
+                    joburi.marcheaza_bon(job_id, bon, 'reusit', msg)
+                    numara_bon('creat')
 
-                socketio.emit('log', {
-                    'type': 'info',
-                    'message': f'🔄 Batch {i//retry_batch_size + 1}: {len(batch)} bonuri...'
-                }, room=client_sid)
+                    # Scoatem eroarea veche din listă
+                    stats['errors'] = [err for err in stats['errors'] if err['sku'] != sku]
 
-                try:
-                    results = automation.create_production_vouchers_batch(
-                        batch,
-                        None,
-                        oblio_email,
-                        oblio_password
-                    )
-
-                    for res in results:
-                        sku = res['sku']
-                        success = res['success']
-                        msg = res['message']
-
-                        original_bon = next((b for b in batch if b.get('sku') == sku), {})
-
-                        if success:
-                            # Actualizăm stats: scădem din failed, adăugăm la success
-                            stats['failed'] -= 1
-                            stats['success'] += 1
-                            stats.setdefault('successful_products', []).append(original_bon)
-
-                            # Scoatem eroarea veche din listă
-                            stats['errors'] = [err for err in stats['errors'] if err['sku'] != sku]
-
-                            socketio.emit('log', {
-                                'type': 'success',
-                                'message': f'✅ RETRY REUȘIT pentru {sku} (round {retry_round})!'
-                            }, room=client_sid)
-                        else:
-                            # Încă eșuat, adăugăm pentru următorul round
-                            still_failing.append(original_bon)
-
-                            if retry_round == MAX_RETRY_ATTEMPTS:
-                                # Ultima încercare - screenshot și Cloudinary
-                                socketio.emit('log', {
-                                    'type': 'error',
-                                    'message': f'❌ FINAL FAIL pentru {sku} după {MAX_RETRY_ATTEMPTS} încercări: {msg}'
-                                }, room=client_sid)
-
-                                # TODO: Screenshot + Cloudinary upload (implementare în viitor)
-                                # automation.take_screenshot_and_upload(sku, msg)
-                            else:
-                                socketio.emit('log', {
-                                    'type': 'warning',
-                                    'message': f'⚠️ RETRY {retry_round} EȘUAT pentru {sku}: {msg}'
-                                }, room=client_sid)
-
-                except Exception as e:
-                    logger.error(f"❌ Eroare la retry batch: {e}")
-                    # Păstrăm batch-ul pentru următorul round
-                    still_failing.extend(batch)
+                    emitator.emit('log', {
+                        'type': 'success',
+                        'message': f'✅ RETRY REUȘIT pentru {sku} (round {retry_round})!'
+                    }, room=client_sid)
+                else:
+                    # Încă eșuat, adăugăm pentru următorul round
+                    still_failing.append(bon)
+                    joburi.marcheaza_bon(job_id, bon, 'esuat' if retry_round == MAX_RETRY_ATTEMPTS else 'reincercare', msg)
+                    if retry_round == MAX_RETRY_ATTEMPTS:
+                        numara_bon('esuat')
+
+                    if retry_round == MAX_RETRY_ATTEMPTS:
+                        # Ultima încercare - screenshot și Cloudinary
+                        emitator.emit('log', {
+                            'type': 'error',
+                            'message': f'❌ FINAL FAIL pentru {sku} după {MAX_RETRY_ATTEMPTS} încercări: {msg}'
+                        }, room=client_sid)
+
+                        # TODO: Screenshot + Cloudinary upload (implementare în viitor)
+                        # automation.take_screenshot_and_upload(sku, msg)
+                    else:
+                        emitator.emit('log', {
+                            'type': 'warning',
+                            'message': f'⚠️ RETRY {retry_round} EȘUAT pentru {sku}: {msg}'
+                        }, room=client_sid)
+
+            # Retry-urile trec prin aceiași lucrători, cu cel mult 2 browsere pentru siguranță
+            lucratori_bonuri.proceseaza(
+                retryable_bonuri, automation, automatizare_lucrator,
+                oblio_email, oblio_password,
+                la_rezultat=retry_terminat,
+                oprit=lambda: stop_requested or joburi.oprire_ceruta(job_id),
+                lucratori=2
+            )
 
             # Pregătim următorul round cu bonurile care încă eșuează
             retryable_bonuri = still_failing
@@ -1615,14 +1874,15 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
 
         # Check stop request outside loop
         if stop_requested:
-            socketio.emit('log', {
+            emitator.emit('log', {
                 'type': 'warning',
                 'message': '🛑 Automatizare oprită manual de utilizator!'
             }, room=client_sid)
-            socketio.emit('automation_complete', {
+            emitator.emit('automation_complete', {
                 'success': False,
                 'error': 'Stopped by user'
             }, room=client_sid)
+            stare_job = 'oprit'
             return # Exit function
 
         # ============================================================
@@ -1645,63 +1905,93 @@ def run_automation_with_live_logs(bonuri, client_sid, force_mode=False):
                 products_to_transfer.append(prod)
             else:
                 logger.info(f"Skip transfer produs non-decant: {prod.get('nume')} (SKU: {sku})")
-                socketio.emit('log', {
+                emitator.emit('log', {
                     'type': 'info',
                     'message': f'ℹ️ Skip transfer pentru produs întreg: {prod.get("nume")}'
                 }, room=client_sid)
 
-        if products_to_transfer and not stop_requested:
-            socketio.emit('log', {
+        if job_info and job_info['transfer'] == 'facut':
+            # Reluare după un restart survenit după emiterea notei - nu o emitem de două ori
+            emitator.emit('log', {
+                'type': 'info',
+                'message': f'ℹ️ Nota de transfer pentru jobul {job_id} a fost deja emisă.'
+            }, room=client_sid)
+        elif products_to_transfer and not stop_requested:
+            emitator.emit('log', {
                 'type': 'info',
                 'message': f'🚚 START TRANSFER GESTIUNE pentru {len(products_to_transfer)} produse (din total {len(successful_products)})...'
             }, room=client_sid)
             eventlet.sleep(1)
 
             transfer_success = automation.create_transfer_note(products_to_transfer)
-            
+            if job_id:
+                joburi.marcheaza_transfer(job_id, 'facut' if transfer_success else 'esuat')
+
             if transfer_success:
-                socketio.emit('log', {
+                emitator.emit('log', {
                     'type': 'success',
                     'message': '✅ NOTA DE TRANSFER EMISĂ CU SUCCES!'
                 }, room=client_sid)
             else:
-                socketio.emit('log', {
+                emitator.emit('log', {
                     'type': 'error',
                     'message': '❌ EROARE LA EMITEREA NOTEI DE TRANSFER!'
                 }, room=client_sid)
         else:
             if not products_to_transfer:
-                socketio.emit('log', {
+                emitator.emit('log', {
                     'type': 'warning',
                     'message': '⚠️ Nu există decanturi de transferat (doar produse întregi sau lista e goală).'
                 }, room=client_sid)
 
-        # Închide browser
-        automation.close()
-
         # Trimite rezultat final
-        socketio.emit('automation_complete', {
+        emitator.emit('automation_complete', {
             'success': True,
             'stats': stats,
             'failed_products': stats.get('errors', []),
             'message': f'✅ Automatizare finalizată! {stats["success"]}/{stats["total"]} bonuri create'
         }, room=client_sid)
+        stare_job = 'finalizat'
 
     except Exception as e:
+        eroare_rulare = True
+        eroare_job = str(e)
         logger.error(f"❌ Eroare în automation: {e}", exc_info=True)
-        socketio.emit('log', {
+        emitator.emit('log', {
             'type': 'error',
             'message': f'❌ EROARE: {str(e)}'
         }, room=client_sid)
-        socketio.emit('automation_complete', {
+        emitator.emit('automation_complete', {
             'success': False,
             'error': str(e)
         }, room=client_sid)
     finally:
+        # Sesiunea browser revine în pool (o eroare neprevăzută o închide în loc s-o păstreze)
+        if automation is not None:
+            pool_sesiuni.pool.returneaza(automation, stricata=eroare_rulare)
+
         # Oprește heartbeat
         stop_heartbeat.set()
         automation_active = False
 
+        if trasare.operatii and trasare.salveaza():
+            logger.info(f"⏱️ Trasare rulare salvată: {trasare.id} ({len(trasare.operatii)} operații)")
+
+        for rezultat, numar in bonuri_rulare.items():
+            metrici.BONURI_PER_RULARE.observa(numar, rezultat=rezultat)
+        metrici.RULARI.inc(stare=stare_job)
+
+        # Starea finală a jobului; un job terminat normal pornește următorul job din coadă
+        if job_id:
+            job_curent = None
+            loguri_joburi.inchide(job_id)
+            try:
+                joburi.finalizeaza(job_id, stare_job, eroare_job)
+                if stare_job == 'finalizat':
+                    porneste_urmatorul_job()
+            except Exception as e:
+                logger.error(f"❌ Eroare la actualizarea jobului {job_id}: {e}")
+
 
 def wait_for_user_input(prompt, client_sid):
     """
@@ -1719,7 +2009,7 @@ def wait_for_user_input(prompt, client_sid):
 
     # Trimite prompt către frontend
     logger.info(f"📤 Emit 'input_required' către client {client_sid}")
-    socketio.emit('input_required', prompt, room=client_sid)
+    transport.emit('input_required', prompt, room=client_sid)
     logger.info(f"✅ Emit trimis! Aștept răspuns în queue...")
 
     # Așteaptă răspuns în queue (cu timeout)
@@ -1729,13 +2019,25 @@ def wait_for_user_input(prompt, client_sid):
         return user_input.get('value')
     except queue.Empty:
         logger.error("⏱️ TIMEOUT - nu s-a primit input în 5 minute!")
-        socketio.emit('log', {
+        transport.emit('log', {
             'type': 'error',
             'message': '⏱️ Timeout - nu s-a primit input de la utilizator'
         }, room=client_sid)
         return None
 
 
+# Joburi rămase în lucru la oprirea procesului anterior: pe server se reiau automat,
+# fără să aștepte ca utilizatorul să redeschidă pagina (JOBURI_RELUARE_AUTOMATA=0 dezactivează)
+joburi_intrerupte = joburi.recupereaza()
+loguri_joburi.curata()
+trasare_oblio.curata()
+if (joburi_intrerupte and os.environ.get('JOBURI_RELUARE_AUTOMATA', '1') == '1'
+        and platform.system() == 'Linux' and os.environ.get('OBLIO_EMAIL')):
+    job_reluat = joburi.revendica(joburi_intrerupte[0])
+    if job_reluat:
+        porneste_job(job_reluat)
+
+
 # ============================================================
 # START APPLICATION
 # ============================================================
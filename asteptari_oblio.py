@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Așteptări pe evenimente pentru paginile Oblio (în locul pauzelor fixe time.sleep)
+Paginile Oblio sunt jQuery + AJAX: după fiecare acțiune (selecție produs, cantitate, click)
+pagina face cereri XHR și rescrie DOM-ul. În loc să dormim 0.5-3 s "ca să fie sigur",
+un script injectat în pagină numără cererile XHR/fetch în curs și momentul ultimei mutații DOM,
+iar funcțiile de aici așteaptă (WebDriverWait, poll 50 ms) exact starea de care e nevoie:
+- retea_libera: nicio cerere în curs (nici jQuery.active) de cel puțin `liniste` secunde
+- dom_stabil: nicio mutație DOM de cel puțin `liniste` secunde
+- valoare_schimbata: valoarea unui input diferă de cea veche
+- reteta_recalculata: rețeta s-a reîncărcat după #pp_quantity (butonul de salvare reactivat)
+
+Toate întorc True/False (la timeout nu aruncă) - ca pauzele pe care le înlocuiesc.
+Durata pașilor se măsoară în trasare_oblio.py.
+"""
+
+import logging
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+POLL = 0.05
+
+# Instalat o singură dată per document (idempotent); observă și documentul gol, înainte de <html>
+JS_HOOKURI = """
+(function() {
+    if (window.__obsidAsteptari) { return; }
+    var st = window.__obsidAsteptari = {
+        pending: 0,
+        ultimaCerere: performance.now(),
+        ultimaMutatie: performance.now()
+    };
+    var gata = function() {
+        st.pending = Math.max(0, st.pending - 1);
+        st.ultimaCerere = performance.now();
+    };
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        st.pending++;
+        st.ultimaCerere = performance.now();
+        this.addEventListener('loadend', gata);
+        try {
+            return send.apply(this, arguments);
+        } catch (e) {
+            gata();
+            throw e;
+        }
+    };
+    if (window.fetch) {
+        var fetchOriginal = window.fetch;
+        window.fetch = function() {
+            st.pending++;
+            st.ultimaCerere = performance.now();
+            return fetchOriginal.apply(this, arguments).finally(gata);
+        };
+    }
+    new MutationObserver(function() { st.ultimaMutatie = performance.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+})();
+"""
+
+JS_STARE = """
+var st = window.__obsidAsteptari;
+if (!st) { return null; }
+var acum = performance.now();
+return {
+    pending: st.pending + ((window.jQuery && jQuery.active) || 0),
+    cerere_ms: acum - st.ultimaCerere,
+    mutatie_ms: acum - st.ultimaMutatie,
+    ready: document.readyState
+};
+"""
+
+
+def instaleaza(driver):
+    """
+    Injectează hook-urile: pentru fiecare document nou (CDP, înainte de scripturile paginii)
+    și în documentul curent. Sigur de apelat repetat.
+    """
+    if not getattr(driver, '_obsid_asteptari_cdp', False):
+        try:
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': JS_HOOKURI})
+            driver._obsid_asteptari_cdp = True
+        except (AttributeError, WebDriverException) as e:
+            # Fără CDP (alt browser / driver remote) - hook-urile se instalează la prima așteptare
+            logger.debug(f"Hook-uri CDP indisponibile: {e}")
+    try:
+        driver.execute_script(JS_HOOKURI)
+    except WebDriverException as e:
+        logger.debug(f"Instalare hook-uri așteptare eșuată: {e}")
+
+
+def _stare(driver):
+    """Starea din pagină; instalează hook-urile dacă documentul e nou (navigare fără CDP)"""
+    try:
+        stare = driver.execute_script(JS_STARE)
+        if stare is None:
+            driver.execute_script(JS_HOOKURI)
+        return stare
+    except WebDriverException:
+        return None
+
+
+def _asteapta(driver, conditie, timeout, descriere):
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL).until(conditie)
+        return True
+    except TimeoutException:
+        logger.debug(f"⏳ Timeout ({timeout}s) la așteptarea: {descriere}")
+        return False
+
+
+def retea_libera(driver, timeout=10, liniste=0.1):
+    """Nicio cerere XHR / fetch / jQuery.ajax în curs, de cel puțin `liniste` secunde"""
+    def conditie(d):
+        stare = _stare(d)
+        return bool(stare) and stare['ready'] == 'complete' and stare['pending'] == 0 \
+            and stare['cerere_ms'] >= liniste * 1000
+    return _asteapta(driver, conditie, timeout, 'rețea liberă')
+
+
+def dom_stabil(driver, timeout=5, liniste=0.2):
+    """Nicio mutație DOM de cel puțin `liniste` secunde (animații, re-randări jQuery)"""
+    def conditie(d):
+        stare = _stare(d)
+        return bool(stare) and stare['mutatie_ms'] >= liniste * 1000
+    return _asteapta(driver, conditie, timeout, 'DOM stabil')
+
+
+def pagina_linistita(driver, timeout=10):
+    """Rețea liberă și DOM stabil - echivalentul pauzelor "așteaptă să se încarce" """
+    return retea_libera(driver, timeout) and dom_stabil(driver, timeout, liniste=0.1)
+
+
+def valoare_schimbata(driver, locator, valoare_veche, timeout=5):
+    """
+    Așteaptă ca valoarea unui input (By, selector) să difere de `valoare_veche`
+    Returns: valoarea nouă sau None la timeout
+    """
+    rezultat = {}
+
+    def conditie(d):
+        try:
+            valoare = d.find_element(*locator).get_attribute('value')
+        except WebDriverException:
+            return False
+        if valoare != valoare_veche:
+            rezultat['valoare'] = valoare
+            return True
+        return False
+
+    _asteapta(driver, conditie, timeout, f'valoare schimbată {locator[1]}')
+    return rezultat.get('valoare')
+
+
+def reteta_recalculata(driver, timeout=10, fara_cereri=0.3):
+    """
+    După selecția produsului / schimbarea #pp_quantity Oblio reîncarcă rețeta prin AJAX
+    (get_product_recipe_add, get_costs) și dezactivează #invoice_preview_btn până termină.
+    Cererea pornește asincron după acțiune: considerăm rețeta gata când o cerere s-a încheiat
+    după începutul așteptării sau, dacă nu pornește niciuna, după `fara_cereri` secunde.
+    """
+    inceput = time.monotonic()
+
+    def conditie(d):
+        stare = _stare(d)
+        if not stare or stare['pending']:
+            return False
+        trecut_ms = (time.monotonic() - inceput) * 1000
+        if stare['cerere_ms'] >= trecut_ms and trecut_ms < fara_cereri * 1000:
+            return False
+        return d.execute_script(
+            "var b = document.getElementById('invoice_preview_btn');"
+            "return !b || !b.classList.contains('disabled');"
+        )
+    return _asteapta(driver, conditie, timeout, 'rețetă recalculată') and dom_stabil(driver, timeout, liniste=0.1)
+
+
+def url_contine(driver, fragment, timeout=10):
+    """URL-ul curent conține fragmentul (redirect după submit)"""
+    return _asteapta(driver, lambda d: fragment in d.current_url, timeout, f'URL cu {fragment}')
+
+
+def modal_inchis(driver, timeout=3):
+    """Niciun modal Bootstrap vizibil (după OK / DA în popup)"""
+    return _asteapta(
+        driver,
+        lambda d: not d.execute_script("return document.querySelectorAll('.modal.show').length;"),
+        timeout, 'modal închis'
+    )
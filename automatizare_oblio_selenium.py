@@ -12,6 +12,7 @@ Data: 2025-11-19
 
 import time
 import json
+import contextlib
 import sys
 import os
 import re
@@ -28,6 +29,13 @@ import logging
 import cloudinary
 import cloudinary.uploader
 import database
+import jurnal_bonuri
+import cookies_oblio
+import motor_http_oblio
+import cache_produse_oblio
+import asteptari_oblio
+import istoric_productie
+import trasare_oblio
 
 # Configurare Cloudinary (OBSID account)
 cloudinary.config(
@@ -47,11 +55,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rândurile raportului /report/production: link-ul bonului (a.font-bold) și textul fiecărei celule
+JS_RANDURI_RAPORT_PRODUCTIE = """
+return Array.prototype.map.call(
+    document.querySelectorAll('#content-table tbody tr.table_row'),
+    function (tr) {
+        var link = tr.querySelector('a.font-bold');
+        return {
+            href: link ? link.getAttribute('href') : null,
+            numar: link ? link.textContent.trim() : null,
+            celule: Array.prototype.map.call(tr.querySelectorAll('td'), function (td) { return td.innerText; })
+        };
+    }
+);
+"""
+
 
 class OblioAutomation:
     """Clasa pentru automatizarea bonurilor de producție în Oblio"""
 
-    def __init__(self, use_existing_profile=True, headless=False, log_callback=None, input_callback=None):
+    def __init__(self, use_existing_profile=True, headless=False, log_callback=None, input_callback=None,
+                 trasare=None):
         """
         Inițializare automation
 
@@ -60,13 +84,17 @@ class OblioAutomation:
             headless (bool): Rulează în mod headless (fără interfață grafică)
             log_callback (callable): Funcție pentru logging live: log_callback(message, level)
             input_callback (callable): Funcție pentru input interactiv: input_callback(prompt_dict) -> str
+            trasare (trasare_oblio.Rulare): Trasarea rulării în care intră span-urile bonurilor / transferului
         """
         self.driver = None
         self.use_existing_profile = use_existing_profile
         self.headless = headless
         self.log_callback = log_callback
         self.input_callback = input_callback
+        self.trasare = trasare
         self.stop_requested = False # Flag pentru oprire
+        self._cookies_restaurate = False  # Sesiune restaurată din cookie jar-ul salvat
+        self.ultima_eroare_bon = None     # Motivul ultimului create_production_voucher eșuat
         self.stats = {
             'total': 0,
             'success': 0,
@@ -452,6 +480,12 @@ class OblioAutomation:
             if not is_linux and not self.headless:
                 self.driver.maximize_window()
 
+            # Sesiunea Oblio salvată (dacă există) se restaurează înainte de prima navigare
+            self.restore_saved_cookies()
+
+            # Contorul de cereri XHR + observatorul DOM pentru așteptările pe evenimente
+            asteptari_oblio.instaleaza(self.driver)
+
             return True
         except Exception as e:
             logger.error(f"❌ Eroare la pornirea Chrome: {e}")
@@ -792,6 +826,63 @@ class OblioAutomation:
             logger.error(f"❌ Eroare la încărcarea cookies: {e}")
             return False
 
+    def restore_saved_cookies(self):
+        """
+        Restaurează cookie-urile salvate după ultimul login reușit (cookies_oblio), înainte de
+        prima navigare. Prin CDP se setează fără încărcarea vreunei pagini; dacă CDP nu e
+        disponibil se folosește load_cookies_from_json.
+
+        Returns:
+            bool: True dacă au fost restaurate cookie-uri (Oblio le validează la prima navigare)
+        """
+        cookies = cookies_oblio.incarca()
+        if not cookies:
+            return False
+
+        restaurate = 0
+        try:
+            for cookie in cookies:
+                parametri = {
+                    'name': cookie['name'],
+                    'value': cookie['value'],
+                    'domain': cookie.get('domain', '.oblio.eu'),
+                    'path': cookie.get('path', '/'),
+                    'secure': cookie.get('secure', False),
+                    'httpOnly': cookie.get('httpOnly', False),
+                }
+                if cookie.get('sameSite'):
+                    parametri['sameSite'] = cookie['sameSite']
+                if cookie.get('expiry'):
+                    parametri['expires'] = cookie['expiry']
+
+                rezultat = self.driver.execute_cdp_cmd('Network.setCookie', parametri)
+                if rezultat.get('success', True):
+                    restaurate += 1
+        except Exception as e:
+            logger.warning(f"⚠️ CDP indisponibil pentru cookies ({e}) - încarc prin navigare")
+            self._cookies_restaurate = self.load_cookies_from_json(cookies)
+            return self._cookies_restaurate
+
+        self._cookies_restaurate = restaurate > 0
+        if restaurate:
+            self._log(f"🍪 Sesiune Oblio restaurată din jar ({restaurate} cookie-uri)", 'info')
+        return self._cookies_restaurate
+
+    def save_session_cookies(self):
+        """Salvează (criptat) cookie-urile sesiunii curente după un login reușit"""
+        try:
+            if self.driver and "login" not in self.driver.current_url.lower():
+                cookies_oblio.salveaza(self.driver.get_cookies())
+        except Exception as e:
+            logger.warning(f"⚠️ Nu am putut salva cookie-urile Oblio: {e}")
+
+    def _discard_saved_cookies(self):
+        """Sesiunea restaurată a fost respinsă de Oblio (redirect la login) - jar-ul nu mai e bun"""
+        if self._cookies_restaurate:
+            self._log("🍪 Sesiunea salvată a fost respinsă de Oblio - re-login", 'warning')
+            cookies_oblio.sterge()
+            self._cookies_restaurate = False
+
     def wait_for_manual_login(self, timeout=90):
         """
         Așteaptă ca utilizatorul să se logheze manual (inclusiv 2FA)
@@ -1071,8 +1162,33 @@ class OblioAutomation:
                 time.sleep(delay)
         # logger.debug(f"⌨️ Tastat: {text}")
 
+    @staticmethod
+    def _randuri_bonuri_db(sku, nume, order_ids, order_numbers):
+        """Rândurile pentru database.adauga_bonuri_bulk: câte unul pentru fiecare comandă acoperită de bon"""
+        order_ids = order_ids or []
+        return [
+            (sku, nume, 1, order_ids[idx] if idx < len(order_ids) else None, order_num)
+            for idx, order_num in enumerate(order_numbers)
+        ]
+
+    @staticmethod
+    def _salveaza_bonuri_db(rows):
+        """
+        Înregistrează bonurile în jurnalul local (fsync, microsecunde) - flusher-ul le duce în Postgres.
+        Doar dacă discul refuză scrierea se salvează direct în DB, sincron.
+        """
+        return jurnal_bonuri.inregistreaza(rows) or database.adauga_bonuri_bulk(rows)
+
+    def _log_salvare_db(self, sku, rows):
+        comenzi = [row[4] for row in rows if row[4] is not None]
+        if comenzi:
+            self._log(f"💾 Salvat în DB: {sku} - {len(comenzi)} comenzi (#{', #'.join(str(c) for c in comenzi)})", 'info')
+        else:
+            self._log(f"💾 Salvat în DB: {sku} (fără order tracking)", 'info')
+
     def create_production_voucher(self, sku, quantity, oblio_cookies=None, oblio_email=None, oblio_password=None,
-                                   nume=None, order_id=None, order_number=None):
+                                   nume=None, order_id=None, order_number=None, order_ids=None, order_numbers=None,
+                                   sectiune_trimitere=None):
         """
         Creează un bon de producție în Oblio
 
@@ -1085,20 +1201,31 @@ class OblioAutomation:
             nume (str): Numele produsului (opțional, pentru salvare în DB)
             order_id (int): ID-ul comenzii din Excel (opțional, pentru tracking)
             order_number (int): Numărul comenzii (opțional, pentru tracking duplicate)
+            order_ids (list): ID-urile tuturor comenzilor acoperite de bon (opțional)
+            order_numbers (list): Numerele tuturor comenzilor acoperite de bon (opțional)
+            sectiune_trimitere: context manager ținut de la click-ul de salvare până la finalizare
+                (lucratori_bonuri: locul din OBLIO_CONCURENTA_MAX); completarea formularului rămâne în afara lui
 
         Returns:
-            bool: True dacă succès, False dacă eșec
+            bool: True dacă succès, False dacă eșec (motivul în self.ultima_eroare_bon)
         """
         # Salvăm parametrii pentru folosire la salvarea în DB
         self._current_voucher_info = {
             'nume': nume or f"Produs {sku}",
             'order_id': order_id,
-            'order_number': order_number
+            'order_number': order_number,
+            'order_ids': order_ids or [],
+            'order_numbers': order_numbers or []
         }
         self._log(f"{'='*60}", 'info')
         self._log(f"🎯 Creare bon: SKU={sku}, Cantitate={quantity}", 'info')
         self._log(f"{'='*60}", 'info')
 
+        cronometru = trasare_oblio.Cronometru('bon.', self.trasare, sku=sku, cantitate=quantity)
+        bon_reusit = False
+        self.ultima_eroare_bon = None
+        trimitere = contextlib.ExitStack()
+
         try:
             # Navighează la pagina de producție
             url = "https://www.oblio.eu/stock/production/"
@@ -1119,10 +1246,12 @@ class OblioAutomation:
                 )
             except:
                 self._log("⚠️ Timeout așteptare pagină producție", 'warning')
+            cronometru.marcheaza('navigare')
             
             # Verifică dacă suntem pe pagina de login (nu suntem autentificați)
             if "login" in self.driver.current_url.lower():
                 self._log("⚠️ Nu suntem autentificați!", 'warning')
+                self._discard_saved_cookies()
 
                 # PRIORITATE 1: Încearcă cookies (dacă sunt disponibile)
                 if oblio_cookies and len(oblio_cookies) > 0:
@@ -1132,7 +1261,7 @@ class OblioAutomation:
                         # Navighează din nou la pagina de producție
                         self._log(f"🌐 Re-navigare la: {url}", 'info')
                         self.driver.get(url)
-                        time.sleep(2)
+                        asteptari_oblio.pagina_linistita(self.driver)
                     else:
                         self._log("⚠️ Autentificare cu cookies eșuată", 'warning')
 
@@ -1153,10 +1282,13 @@ class OblioAutomation:
                         if not self.wait_for_manual_login(timeout=90):
                             raise Exception("Login manual eșuat sau timeout!")
 
+                    # Login reușit - sesiunea se salvează pentru rulările următoare
+                    self.save_session_cookies()
+
                     # După login, navighează la pagina de producție
                     self._log(f"🌐 Navigare la pagina de producție...", 'info')
                     self.driver.get(url)
-                    time.sleep(3)  # Așteaptă încărcare pagină
+                    asteptari_oblio.pagina_linistita(self.driver)  # Așteaptă încărcare pagină
 
                     # Verifică URL curent
                     current_url = self.driver.current_url
@@ -1166,7 +1298,7 @@ class OblioAutomation:
                     if "production" not in current_url.lower():
                         self._log(f"⚠️ Nu suntem pe pagina de producție! Re-navighează...", 'warning')
                         self.driver.get(url)
-                        time.sleep(3)
+                        asteptari_oblio.pagina_linistita(self.driver)
                         self._log(f"📍 URL după re-navigare: {self.driver.current_url}", 'info')
 
             # PASUL 1: Găsește și completează câmpul SKU
@@ -1177,47 +1309,54 @@ class OblioAutomation:
                 raise Exception("Element #pp_name nu a fost găsit!")
 
             logger.info(f"✅ Câmp SKU găsit")
+            cronometru.marcheaza('verificare_login')
 
-            # Tastează SKU character-by-character pentru autocomplete
-            logger.info(f"⌨️ Tastare SKU: {sku}")
-            self.type_slowly(pp_name_input, sku, delay=0.01)
+            # ID-ul produsului din cache - fără tastare și fără așteptarea autocomplete-ului
+            din_cache = self._selecteaza_produs_din_cache(sku)
 
-            # Trigger autocomplete
-            pp_name_input.send_keys(Keys.SPACE)
-            pp_name_input.send_keys(Keys.BACKSPACE)
-            
-            # PASUL 2: Așteaptă și selectează din autocomplete
-            logger.info("🔍 Așteptare autocomplete...")
-            
-            try:
-                # Așteaptă explicit lista de autocomplete (max 3 secunde)
-                autocomplete_items = WebDriverWait(self.driver, 3).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".ui-menu-item"))
-                )
+            if din_cache:
+                cronometru.marcheaza('produs_cache')
+            else:
+                # Tastează SKU character-by-character pentru autocomplete
+                logger.info(f"⌨️ Tastare SKU: {sku}")
+                self.type_slowly(pp_name_input, sku, delay=0.01)
 
-                if len(autocomplete_items) > 0:
-                    logger.info(f"✅ Autocomplete găsit: {len(autocomplete_items)} rezultate")
-                    first_item = autocomplete_items[0]
-                    logger.info(f"🖱️ Click pe primul rezultat: {first_item.text[:50]}...")
-                    first_item.click()
-                    # Așteaptă puțin ca Oblio să populeze câmpurile ascunse (ID produs)
-                    time.sleep(0.5)
-                else:
-                    logger.warning("⚠️ Autocomplete gol, încerc ENTER...")
+                # Trigger autocomplete
+                pp_name_input.send_keys(Keys.SPACE)
+                pp_name_input.send_keys(Keys.BACKSPACE)
+                cronometru.marcheaza('tastare_sku')
+
+                # PASUL 2: Așteaptă și selectează din autocomplete
+                logger.info("🔍 Așteptare autocomplete...")
+
+                try:
+                    # Așteaptă explicit lista de autocomplete (max 3 secunde)
+                    autocomplete_items = WebDriverWait(self.driver, 3).until(
+                        EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".ui-menu-item"))
+                    )
+
+                    if len(autocomplete_items) > 0:
+                        logger.info(f"✅ Autocomplete găsit: {len(autocomplete_items)} rezultate")
+                        first_item = autocomplete_items[0]
+                        logger.info(f"🖱️ Click pe primul rezultat: {first_item.text[:50]}...")
+                        first_item.click()
+                    else:
+                        logger.warning("⚠️ Autocomplete gol, încerc ENTER...")
+                        pp_name_input.send_keys(Keys.ENTER)
+                except TimeoutException:
+                    logger.warning("⚠️ Timeout autocomplete, încerc ENTER...")
+                    pp_name_input.send_keys(Keys.ENTER)
+                except Exception as e:
+                    logger.warning(f"⚠️ Eroare autocomplete: {e}, încerc ENTER...")
                     pp_name_input.send_keys(Keys.ENTER)
-                    time.sleep(0.5)
-            except TimeoutException:
-                logger.warning("⚠️ Timeout autocomplete, încerc ENTER...")
-                pp_name_input.send_keys(Keys.ENTER)
-                time.sleep(0.5)
-            except Exception as e:
-                logger.warning(f"⚠️ Eroare autocomplete: {e}, încerc ENTER...")
-                pp_name_input.send_keys(Keys.ENTER)
-                time.sleep(0.5)
+
+                # Oblio populează ID-ul ascuns la selecție, apoi încarcă rețeta prin AJAX
+                if asteptari_oblio.valoare_schimbata(self.driver, (By.ID, "pp_name_id"), "", timeout=3):
+                    asteptari_oblio.reteta_recalculata(self.driver)
+                cronometru.marcheaza('autocomplete')
 
             # PASUL 3: Verifică că produsul a fost selectat
             logger.info("🔍 Verificare selecție produs...")
-            time.sleep(1)
 
             # Verifică dacă a apărut pop-up cu mesaj de eroare/instrucțiuni
             try:
@@ -1226,11 +1365,11 @@ class OblioAutomation:
                     modal_text = modal_message.text
                     if "Selecteaza produsul" in modal_text or "produsul pentru productie" in modal_text.lower():
                         logger.error(f"❌ Pop-up detectat: Produsul {sku} NU există în Oblio!")
+                        cache_produse_oblio.invalideaza(sku)
                         # Închide pop-up-ul
                         try:
                             ok_btn = modal_message.find_element(By.CSS_SELECTOR, ".ok-message-modal")
                             ok_btn.click()
-                            time.sleep(0.5)
                         except:
                             pass
                         raise Exception(f"Produsul cu SKU '{sku}' NU EXISTĂ în baza de date Oblio! Verifică SKU-ul.")
@@ -1241,10 +1380,14 @@ class OblioAutomation:
                 pp_name_id = self.driver.find_element(By.ID, "pp_name_id")
                 if pp_name_id.get_attribute("value"):
                     logger.info(f"✅ Produs selectat: ID={pp_name_id.get_attribute('value')}")
+                    if not din_cache:
+                        self._memoreaza_produs_selectat(sku)
                 else:
+                    cache_produse_oblio.invalideaza(sku)
                     raise Exception(f"Produsul cu SKU '{sku}' nu a fost selectat! SKU invalid sau nu există în baza de date Oblio.")
             except NoSuchElementException:
                 raise Exception("Element #pp_name_id nu a fost găsit!")
+            cronometru.marcheaza('verificare_produs')
 
             # PASUL 4: Completează cantitatea
             logger.info(f"🔢 Completare cantitate: {quantity}")
@@ -1256,14 +1399,14 @@ class OblioAutomation:
             # FIX: Șterge COMPLET câmpul înainte de a introduce valoarea
             # clear() uneori nu funcționează, deci folosim Ctrl+A + Delete
             pp_quantity_input.click()
-            time.sleep(0.2)
             pp_quantity_input.send_keys(Keys.CONTROL + "a")  # Select all
-            time.sleep(0.1)
             pp_quantity_input.send_keys(Keys.DELETE)  # Delete
-            time.sleep(0.1)
             pp_quantity_input.send_keys(str(quantity))  # Introduce cantitatea
-            time.sleep(0.5) # Așteaptă ca Oblio să calculeze rețeta (optimizat)
+            # Blur (TAB) declanșează update_pp_quantity() -> Oblio recalculează rețeta prin AJAX
+            pp_quantity_input.send_keys(Keys.TAB)
+            asteptari_oblio.reteta_recalculata(self.driver)
             logger.info(f"✅ Cantitate setată: {quantity}")
+            cronometru.marcheaza('cantitate')
 
             # --- VERIFICARE STOC (NOU) ---
             logger.info("🔍 Verificare stoc materii prime...")
@@ -1290,6 +1433,7 @@ class OblioAutomation:
                         if consumed_val > stock_val:
                             logger.warning(f"⚠️ STOC INSUFICIENT! Necesar: {consumed_val}, Disponibil: {stock_val}")
                             self._log(f"⚠️ STOC INSUFICIENT pentru {sku}! Necesar: {consumed_val}, Disponibil: {stock_val}. Se sare peste acest bon.", 'warning')
+                            self.ultima_eroare_bon = f"Stoc insuficient (Necesar: {consumed_val}, Disponibil: {stock_val})"
                             # Captură screenshot pentru stoc insuficient
                             self.capture_error_screenshot(sku, "stoc_insuficient")
 
@@ -1304,6 +1448,7 @@ class OblioAutomation:
             
             except Exception as e:
                 logger.warning(f"⚠️ Eroare la verificarea stocului (non-blocant): {e}")
+            cronometru.marcheaza('stoc')
             # --- END VERIFICARE STOC ---
 
             # PASUL 5: Click pe butonul de previzualizare/salvare
@@ -1404,7 +1549,7 @@ class OblioAutomation:
                         if modal_button.is_displayed():
                             logger.info(f"✅ Modal găsit, închid: {selector}")
                             modal_button.click()
-                            time.sleep(1)
+                            asteptari_oblio.modal_inchis(self.driver)
                             break
                     except:
                         continue
@@ -1414,11 +1559,15 @@ class OblioAutomation:
             # Scroll la buton pentru a fi sigur că e vizibil
             try:
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", save_button)
-                time.sleep(0.5)
                 logger.info("✅ Scroll la butonul de salvare")
             except:
                 pass
 
+            # De aici bonul ajunge în Oblio - locul de concurență se ține până la finalizare
+            if sectiune_trimitere is not None:
+                trimitere.enter_context(sectiune_trimitere)
+                cronometru.marcheaza('asteptare_trimitere')
+
             # Click salvare (Previzualizare) - FORȚAT prin JavaScript
             logger.info("🖱️ Click buton salvare (prin JavaScript pentru bypass validare UI)...")
 
@@ -1463,14 +1612,12 @@ class OblioAutomation:
                 """, save_button)
 
                 logger.info(f"✅ Click executat: {click_result}")
-                time.sleep(2)
 
             except Exception as e:
                 logger.warning(f"⚠️ JavaScript click eșuat: {e}")
                 # Ultimate fallback: click normal
                 try:
                     save_button.click()
-                    time.sleep(1)
                 except Exception as e2:
                     logger.error(f"❌ Click normal EȘUAT: {e2}")
 
@@ -1492,9 +1639,12 @@ class OblioAutomation:
             except:
                 pass
 
+            cronometru.marcheaza('click_salvare')
+
             # PASUL 6: Verifică dacă am fost redirectat la pagina de preview
             logger.info("🔍 Verificare redirect la pagina de preview...")
-            time.sleep(3)  # Mărit de la 1.5s la 3s pentru a aștepta redirect
+            asteptari_oblio.url_contine(self.driver, "/stock/preview_production/", timeout=15)
+            cronometru.marcheaza('redirect')
 
             current_url = self.driver.current_url
             logger.info(f"📍 URL curent după submit: {current_url}")
@@ -1537,7 +1687,6 @@ class OblioAutomation:
 
                     logger.info("🖱️ Click pe 'Lanseaza in Productie'...")
                     launch_button.click()
-                    time.sleep(0.5) # Optimizat: 1.5s → 0.5s
 
                     # PASUL 8: Click pe butonul OK din popup modal
                     logger.info("🔍 Căutare buton OK în popup modal...")
@@ -1562,7 +1711,8 @@ class OblioAutomation:
                     if ok_button:
                         logger.info("🖱️ Click pe butonul OK din popup...")
                         ok_button.click()
-                        time.sleep(0.5) # Optimizat: 1s → 0.5s
+                        # OK navighează la production_save - așteptăm pagina nouă
+                        asteptari_oblio.pagina_linistita(self.driver)
                     else:
                         logger.warning("⚠️ Butonul OK nu a fost găsit (poate nu a apărut popup-ul)")
 
@@ -1591,15 +1741,13 @@ class OblioAutomation:
 
                     logger.info("🖱️ Click pe 'Finalizeaza Productia'...")
                     finalize_button.click()
-                    time.sleep(1) # Optimizat: 2s → 1s
+                    asteptari_oblio.pagina_linistita(self.driver)
+                    cronometru.marcheaza('lansare_finalizare')
 
                     # PASUL 10: Handler pentru popup-ul de confirmare preț
                     # "Pretul de vanzare este mai mic decat costul de achizitie. Continuati?"
                     logger.info("🔍 Verificare popup confirmare preț...")
                     try:
-                        # Așteaptă puțin pentru a permite popup-ului să apară
-                        time.sleep(0.5)
-
                         # Căutăm butonul "DA" din popup-ul de confirmare preț
                         price_confirm_selectors = [
                             (By.CSS_SELECTOR, "button.ok-confirm-modal1"),
@@ -1611,7 +1759,8 @@ class OblioAutomation:
                         price_confirm_button = None
                         for by, selector in price_confirm_selectors:
                             try:
-                                price_confirm_button = WebDriverWait(self.driver, 2).until(
+                                # Pagina e deja liniștită - popup-ul fie e afișat, fie nu apare
+                                price_confirm_button = WebDriverWait(self.driver, 0.5).until(
                                     EC.element_to_be_clickable((by, selector))
                                 )
                                 if price_confirm_button and price_confirm_button.is_displayed():
@@ -1623,7 +1772,7 @@ class OblioAutomation:
                         if price_confirm_button and price_confirm_button.is_displayed():
                             logger.info("🖱️ Click pe butonul 'DA' din popup-ul de confirmare preț...")
                             price_confirm_button.click()
-                            time.sleep(1)
+                            asteptari_oblio.pagina_linistita(self.driver)
                             logger.info("✅ Popup confirmare preț acceptat!")
                         else:
                             logger.info("ℹ️ Popup confirmare preț nu a apărut (preț OK)")
@@ -1651,7 +1800,7 @@ class OblioAutomation:
 
                 logger.info("🔍 Navigare la raportul de producție pentru verificare...")
                 self.driver.get("https://www.oblio.eu/report/production")
-                time.sleep(3)
+                asteptari_oblio.pagina_linistita(self.driver)
 
                 # Căutăm un bon cu data de azi și SKU-ul nostru
                 from datetime import datetime
@@ -1705,6 +1854,8 @@ class OblioAutomation:
                     logger.error(f"❌ Eroare la verificarea raportului: {e}")
 
             # Rezultat final
+            cronometru.marcheaza('verificare')
+            self._log(f"⏱️ {sku}: {cronometru.rezumat()}", 'info')
             if success:
                 msg = f"🎉 BON DE PRODUCȚIE FINALIZAT CU SUCCES! SKU={sku}, Cantitate={quantity}"
                 if production_id:
@@ -1717,20 +1868,24 @@ class OblioAutomation:
                 try:
                     voucher_info = getattr(self, '_current_voucher_info', {})
                     nume = voucher_info.get('nume', f"Produs {sku}")
-                    order_id = voucher_info.get('order_id')
-                    order_number = voucher_info.get('order_number')
+                    order_numbers = voucher_info.get('order_numbers') or []
 
-                    database.adauga_bon(sku, nume, quantity, order_id, order_number)
-                    if order_number:
-                        self._log(f"💾 Salvat în DB: {sku} comanda #{order_number}", 'info')
+                    if order_numbers:
+                        rows = self._randuri_bonuri_db(sku, nume, voucher_info.get('order_ids'), order_numbers)
                     else:
-                        self._log(f"💾 Salvat în DB: {sku}", 'info')
+                        rows = [(sku, nume, quantity, voucher_info.get('order_id'), voucher_info.get('order_number'))]
+
+                    if self._salveaza_bonuri_db(rows):
+                        self._log_salvare_db(sku, rows)
                 except Exception as e:
                     self._log(f"⚠️ Eroare salvare DB: {e}", 'warning')
+                cronometru.marcheaza('salvare_db')
 
+                bon_reusit = True
                 return True
             else:
                 self._log(f"❌ BONUL NU A FOST FINALIZAT! SKU={sku} - Eroare la finalizarea producției", 'error')
+                self.ultima_eroare_bon = 'Bon nu a fost finalizat - eroare la unul din pașii de finalizare'
                 self.stats['failed'] += 1
                 self.stats['errors'].append({
                     'sku': sku,
@@ -1741,6 +1896,7 @@ class OblioAutomation:
 
         except Exception as e:
             self._log(f"❌ EROARE la crearea bonului: {e}", 'error')
+            self.ultima_eroare_bon = str(e)
             self.stats['failed'] += 1
             self.stats['errors'].append({
                 'sku': sku,
@@ -1757,6 +1913,9 @@ class OblioAutomation:
                 pass
 
             return False
+        finally:
+            trimitere.close()
+            cronometru.incheie(succes=bon_reusit)
 
     def create_transfer_note(self, products_list):
         """
@@ -1776,12 +1935,16 @@ class OblioAutomation:
         self._log(f"🚚 START TRANSFER GESTIUNE: {len(products_list)} produse", 'info')
         self._log(f"📍 Din 'Materiale consumabile' -> 'Marfuri'", 'info')
 
+        cronometru = trasare_oblio.Cronometru('transfer.', self.trasare, produse=len(products_list))
+        transfer_reusit = False
+
         try:
             # Navigare la pagina de transfer
             url = "https://www.oblio.eu/stock/transfer/"
             self._log(f"🌐 Navigare la: {url}", 'info')
             self.driver.get(url)
-            time.sleep(3)
+            asteptari_oblio.pagina_linistita(self.driver)
+            cronometru.marcheaza('pagina')
 
             # PASUL 1: Selectare Gestiune Sursă (Materiale consumabile)
             self._log("🔍 Selectare gestiune sursă: Materiale consumabile...", 'info')
@@ -1791,7 +1954,7 @@ class OblioAutomation:
                 gestiune_select = Select(self.wait_for_element(By.ID, "gestiune1"))
                 gestiune_select.select_by_value("237258") # Materiale consumabile
                 self._log("✅ Gestiune sursă selectată: Materiale consumabile (237258)", 'info')
-                time.sleep(1)
+                asteptari_oblio.pagina_linistita(self.driver, timeout=5)
                 
                 # Gestiunea Destinație este implicit "Marfuri" (237255), nu o mai selectăm explicit
                 
@@ -1805,9 +1968,10 @@ class OblioAutomation:
                 if ok_button:
                     self._log("✅ Popup găsit, click OK...", 'info')
                     ok_button.click()
-                    time.sleep(1.5)
+                    asteptari_oblio.modal_inchis(self.driver)
             except:
                 self._log("ℹ️ Popup-ul nu a apărut sau a fost deja închis", 'info')
+            cronometru.marcheaza('gestiune')
 
             # PASUL 3: Adăugare produse în listă
             for i, prod in enumerate(products_list, 1):
@@ -1826,7 +1990,7 @@ class OblioAutomation:
                             confirm_btn.click()
                         except:
                             self.driver.execute_script("arguments[0].click();", confirm_btn)
-                        time.sleep(1.5)
+                        asteptari_oblio.modal_inchis(self.driver)
                 except:
                     pass
                 
@@ -1846,7 +2010,6 @@ class OblioAutomation:
                 
                 # Asigură-te că elementul este vizibil și interactabil
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", name_input)
-                time.sleep(0.5)
                 
                 # Așteaptă ca elementul să fie interactabil
                 try:
@@ -1883,12 +2046,13 @@ class OblioAutomation:
                                 )
                             except: pass
                             
-                            time.sleep(1.0) # Așteaptă popularea câmpurilor
+                            # Selecția cere prin AJAX prețul / stocul produsului
+                            asteptari_oblio.retea_libera(self.driver, timeout=5)
                             product_selected = True
                             break
                         else:
                             self._log(f"⚠️ Autocomplete gol pentru {sku} (încercare {attempt+1})", 'warning')
-                            time.sleep(1)
+                            asteptari_oblio.retea_libera(self.driver, timeout=3)
                             
                     except StaleElementReferenceException:
                         self._log(f"⚠️ Stale element la selectare produs {sku}, reîncerc...", 'warning')
@@ -1901,7 +2065,7 @@ class OblioAutomation:
                     self._log(f"❌ Nu s-a putut selecta produsul {sku}!", 'error')
                     # Putem încerca un ENTER ca ultimă soluție
                     name_input.send_keys(Keys.ENTER)
-                    time.sleep(1)
+                    asteptari_oblio.retea_libera(self.driver, timeout=5)
 
                 # 3.3 Setare Cantitate
                 qty_input = self.wait_for_element(By.ID, "ap_quantity")
@@ -1913,15 +2077,14 @@ class OblioAutomation:
                     qty_input.click()
                 except:
                     self.driver.execute_script("arguments[0].click();", qty_input)
-                    
-                time.sleep(0.2)
+
                 qty_input.send_keys(Keys.CONTROL + "a")
                 qty_input.send_keys(Keys.DELETE)
                 qty_input.send_keys(str(quantity))
                 
                 # 3.4 Setare Preț (OBLIGATORIU pentru transfer)
-                # Așteptăm puțin să vedem dacă Oblio completează prețul
-                time.sleep(1.0)
+                # Așteptăm să vedem dacă Oblio completează prețul (cererea AJAX a selecției)
+                asteptari_oblio.retea_libera(self.driver, timeout=5)
                 try:
                     price_input = self.driver.find_element(By.ID, "ap_price_2")
                     self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", price_input)
@@ -1929,10 +2092,11 @@ class OblioAutomation:
                     # Verificăm dacă are valoare
                     current_val = price_input.get_attribute("value")
                     
-                    # Dacă e gol sau 0, mai așteptăm puțin
+                    # Dacă e gol sau 0, mai așteptăm puțin să se schimbe
                     if not current_val or current_val.strip() == "" or current_val == "0" or current_val == "0.00":
-                        time.sleep(1.0)
-                        current_val = price_input.get_attribute("value")
+                        current_val = asteptari_oblio.valoare_schimbata(
+                            self.driver, (By.ID, "ap_price_2"), current_val, timeout=1
+                        ) or price_input.get_attribute("value")
                     
                     # Verificăm din nou și setăm default 19.99 dacă e necesar
                     should_set_price = False
@@ -1965,7 +2129,6 @@ class OblioAutomation:
                 add_btn = self.driver.find_element(By.CSS_SELECTOR, ".btn-add-product-on-doc")
                 # Scroll la buton pentru a evita suprapunerea
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", add_btn)
-                time.sleep(0.5)
                 
                 # Folosim DOAR execute_script pentru a evita dublarea click-urilor
                 self.driver.execute_script("arguments[0].click();", add_btn)
@@ -1995,7 +2158,7 @@ class OblioAutomation:
                             self.driver.execute_script("arguments[0].click();", confirm_btn)
                         
                         # Așteptăm să dispară popup-ul
-                        time.sleep(1.5)
+                        asteptari_oblio.modal_inchis(self.driver)
                         try:
                             WebDriverWait(self.driver, 2).until(
                                 EC.invisibility_of_element_located((By.CSS_SELECTOR, ".ok-confirm-modal"))
@@ -2007,9 +2170,9 @@ class OblioAutomation:
                     pass
                 # --- END VERIFICARE POPUP ---
                 
-                # Așteaptă ca rândul să fie procesat și input-ul să fie golit/resetat
-                # Verificăm dacă input-ul de nume este gol sau așteptăm puțin mai mult
-                time.sleep(2) 
+                # Așteaptă ca rândul să fie procesat (recalcularea totalurilor) înainte de produsul următor
+                asteptari_oblio.pagina_linistita(self.driver, timeout=5)
+                cronometru.marcheaza('produs', sku=sku)
 
 
             # PASUL 4: Previzualizare Transfer
@@ -2031,7 +2194,7 @@ class OblioAutomation:
                                 modal_button.click()
                             except:
                                 self.driver.execute_script("arguments[0].click();", modal_button)
-                            time.sleep(1)
+                            asteptari_oblio.modal_inchis(self.driver)
                     except:
                         continue
             except:
@@ -2062,7 +2225,6 @@ class OblioAutomation:
                 # Scroll și Click
                 try:
                     self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", preview_btn)
-                    time.sleep(0.5)
                     
                     # Click robust (încearcă să execute funcția din onclick direct)
                     self.driver.execute_script("""
@@ -2082,7 +2244,8 @@ class OblioAutomation:
             # Așteptăm redirect sau popup
             max_retries = 5
             for i in range(max_retries):
-                time.sleep(1)
+                # Validările AJAX (stoc / preț) și apoi submit-ul formularului
+                asteptari_oblio.pagina_linistita(self.driver, timeout=5)
                 
                 # 1. Verificăm dacă a apărut un popup de confirmare (ex: preț modificat)
                 try:
@@ -2093,7 +2256,7 @@ class OblioAutomation:
                             confirm_btn.click()
                         except:
                             self.driver.execute_script("arguments[0].click();", confirm_btn)
-                        time.sleep(2) # Așteptăm să se proceseze
+                        asteptari_oblio.pagina_linistita(self.driver)  # Așteptăm să se proceseze
                         continue # Mai verificăm o dată
                 except:
                     pass
@@ -2117,14 +2280,13 @@ class OblioAutomation:
                         try:
                             ok_btn = error_modal.find_element(By.CSS_SELECTOR, ".ok-message-modal")
                             ok_btn.click()
-                            time.sleep(1)
+                            asteptari_oblio.modal_inchis(self.driver)
                         except:
                             pass
 
                         # SCREENSHOT 2: Produsele de sus (pentru debug stoc) - upload Cloudinary
                         try:
                             self.driver.execute_script("window.scrollTo(0, 0);")
-                            time.sleep(1)
                             screenshot_url2 = self.capture_error_screenshot("transfer", "products_debug")
                             if screenshot_url2:
                                 self._log(f"🖼️ Screenshot produse debug: {screenshot_url2}", 'info')
@@ -2137,15 +2299,17 @@ class OblioAutomation:
                 if "preview_transfer" in self.driver.current_url:
                     break
             # --- END VERIFICARE POST-SUBMIT ---
+            cronometru.marcheaza('submit')
             
             # Așteptare redirect
-            time.sleep(3)
-            
+            asteptari_oblio.url_contine(self.driver, "/stock/preview_transfer/", timeout=5)
+
             # Verificare URL
             if "/stock/preview_transfer/" not in self.driver.current_url:
                 self._log("⚠️ Redirect întârziat, mai încerc o dată submit...", 'warning')
                 self.driver.execute_script("submit_form_doc();")
-                time.sleep(3)
+                asteptari_oblio.url_contine(self.driver, "/stock/preview_transfer/", timeout=10)
+            cronometru.marcheaza('redirect')
 
             if "/stock/preview_transfer/" in self.driver.current_url:
                 self._log("✅ Redirectat la previzualizare transfer", 'info')
@@ -2157,8 +2321,11 @@ class OblioAutomation:
                 if issue_btn:
                     issue_btn.click()
                     self._log("🖱️ Click 'Emite Nota transfer'", 'info')
-                    time.sleep(3)
+                    asteptari_oblio.pagina_linistita(self.driver)
+                    cronometru.marcheaza('emitere')
+                    self._log(f"⏱️ Transfer {len(products_list)} produse: {cronometru.rezumat()}", 'info')
                     self._log("🎉 TRANSFER FINALIZAT CU SUCCES!", 'success')
+                    transfer_reusit = True
                     return True
                 else:
                     raise Exception("Butonul de emitere nu a fost găsit!")
@@ -2194,6 +2361,100 @@ class OblioAutomation:
                 pass
 
             return False
+        finally:
+            cronometru.incheie(succes=transfer_reusit)
+
+    def _selecteaza_produs_din_cache(self, sku, timeout=5):
+        """
+        Selectează produsul cu ID-ul din cache: setează #pp_name_id / #pp_name și declanșează
+        încărcarea rețetei exact ca selecția din autocomplete (check_delete_update_product)
+
+        Returns:
+            True dacă rețeta s-a încărcat, False dacă SKU-ul nu e în cache sau Oblio a respins ID-ul
+        """
+        intrare = cache_produse_oblio.cauta(sku)
+        if not intrare:
+            return False
+
+        produs_id, eticheta = intrare
+        try:
+            self.driver.execute_script(
+                "$('#pp_name').val(arguments[1]); $('#pp_name_id').val(arguments[0]);"
+                "check_delete_update_product();",
+                produs_id, eticheta or sku
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Selecție din cache indisponibilă pentru {sku}: {e}")
+            return False
+
+        try:
+            # Rândurile rețetei apar doar pentru un ID de produs valid
+            WebDriverWait(self.driver, timeout).until(EC.presence_of_element_located((By.ID, "ap_1_quantity2")))
+        except TimeoutException:
+            self._log(f"🗑️ ID-ul din cache pentru {sku} ({produs_id}) a fost respins de Oblio - se folosește autocomplete", 'warning')
+            cache_produse_oblio.invalideaza(sku)
+            try:
+                self.driver.execute_script("$('#pp_name').val(''); $('#pp_name_id').val('');")
+            except Exception:
+                pass
+            return False
+
+        logger.info(f"🗂️ Produs selectat din cache: {sku} -> ID={produs_id}")
+        return True
+
+    def _memoreaza_produs_selectat(self, sku):
+        """Reține în cache ID-ul și eticheta produsului tocmai selectat din autocomplete"""
+        try:
+            produs_id = self.driver.find_element(By.ID, "pp_name_id").get_attribute("value")
+            eticheta = self.driver.find_element(By.ID, "pp_name").get_attribute("value")
+        except Exception:
+            return
+        if produs_id:
+            cache_produse_oblio.memoreaza(sku, produs_id, eticheta)
+
+    def _salveaza_bon_batch(self, item):
+        """Salvarea în DB a unui bon finalizat din batch (item: dict cu sku, qty/cantitate, nume, order_*)"""
+        sku = item['sku']
+        try:
+            nume = item.get('nume') or f"Produs {sku}"
+            order_numbers = item.get('order_numbers') or []
+
+            if order_numbers:
+                # O înregistrare pentru fiecare comandă, toate într-un singur upsert
+                rows = self._randuri_bonuri_db(sku, nume, item.get('order_ids'), order_numbers)
+            else:
+                # Fallback fără order tracking
+                rows = [(sku, nume, item.get('qty', item.get('cantitate', 1)), None, None)]
+
+            if self._salveaza_bonuri_db(rows):
+                self._log_salvare_db(sku, rows)
+        except Exception as e:
+            self._log(f"⚠️ Eroare salvare DB: {e}", 'warning')
+
+    def _batch_http(self, batch_list):
+        """
+        Trimite batch-ul prin motorul HTTP direct, cu cookie-urile sesiunii Selenium curente
+
+        Returns:
+            (rezultate finale, bonurile de reluat prin Selenium - cele care nu au ajuns în Oblio)
+        """
+        self._log(f"⚡ START BATCH HTTP: {len(batch_list)} bonuri...", 'info')
+        results = []
+        ramase = []
+
+        motor = motor_http_oblio.MotorHttpOblio.din_driver(self.driver, log_callback=self._log)
+        for item, rezultat in zip(batch_list, motor.create_production_vouchers_batch(batch_list)):
+            if rezultat['success']:
+                self.stats['success'] += 1
+                self._salveaza_bon_batch(item)
+            elif rezultat['fallback']:
+                ramase.append(item)
+                continue
+            elif "stoc insuficient" not in rezultat['message'].lower():
+                self.stats['failed'] += 1
+            results.append({'sku': rezultat['sku'], 'success': rezultat['success'], 'message': rezultat['message']})
+
+        return results, ramase
 
     def create_production_vouchers_batch(self, batch_list, oblio_cookies=None, oblio_email=None, oblio_password=None):
         """
@@ -2205,6 +2466,16 @@ class OblioAutomation:
         Returns:
             list: Listă de rezultate [{'sku': '...', 'success': True/False, 'message': '...'}]
         """
+        cronometru = trasare_oblio.Cronometru('batch.', self.trasare, bonuri=len(batch_list))
+        results = []
+        try:
+            results = self._creeaza_batch(batch_list, cronometru, oblio_cookies, oblio_email, oblio_password)
+            return results
+        finally:
+            cronometru.incheie(reusite=sum(1 for r in results if r.get('success')))
+
+    def _creeaza_batch(self, batch_list, cronometru, oblio_cookies, oblio_email, oblio_password):
+        """Fluxul batch propriu-zis; pașii fiecărui tab se marchează în cronometru (cu SKU-ul tabului)"""
         results = []
         tabs = []
         main_window = self.driver.current_window_handle
@@ -2222,11 +2493,12 @@ class OblioAutomation:
             )
         except:
             pass # Continuăm verificarea
-            
-        time.sleep(1) # Extra safety
+
+        asteptari_oblio.pagina_linistita(self.driver, timeout=5)
         
         if "login" in self.driver.current_url.lower():
             self._log("🔐 Login necesar înainte de batch...", 'warning')
+            self._discard_saved_cookies()
             if oblio_cookies:
                 self.load_cookies_from_json(oblio_cookies)
                 self.driver.get(url_prod)
@@ -2239,6 +2511,8 @@ class OblioAutomation:
             else:
                 self.wait_for_manual_login()
                 self.driver.get(url_prod)
+
+            self.save_session_cookies()
                 
         # Verificăm din nou dacă suntem logați
         # Așteptăm explicit elementul #pp_name care confirmă că suntem pe pagina de producție
@@ -2252,6 +2526,15 @@ class OblioAutomation:
              # Captură screenshot pentru login eșuat
              self.capture_error_screenshot("batch", "login_failed")
              return [{'sku': b.get('sku'), 'success': False, 'message': 'Login failed - Page not loaded'} for b in batch_list]
+        cronometru.marcheaza('login')
+
+        # Motorul HTTP direct (OBLIO_MOTOR=http) - Selenium rămâne doar pentru ce nu a ajuns în Oblio
+        if motor_http_oblio.MOTOR_OBLIO == 'http':
+            results, batch_list = self._batch_http(batch_list)
+            cronometru.marcheaza('motor_http')
+            if not batch_list:
+                return results
+            self._log(f"🔁 {len(batch_list)} bonuri reluate prin Selenium", 'warning')
 
         self._log(f"🚀 START BATCH: {len(batch_list)} bonuri în paralel...", 'info')
         
@@ -2285,6 +2568,8 @@ class OblioAutomation:
                 'index': i
             })
 
+        cronometru.marcheaza('deschidere_taburi')
+
         # 2. Completează formularele (FILL)
         self._log("📝 [BATCH] Completare formulare...", 'info')
         for tab in tabs:
@@ -2305,26 +2590,35 @@ class OblioAutomation:
                 if not pp_name_input:
                     raise Exception("Input SKU negăsit")
                     
-                pp_name_input.clear()
-                self.type_slowly(pp_name_input, sku, delay=0.01)
-                pp_name_input.send_keys(Keys.SPACE)
-                pp_name_input.send_keys(Keys.BACKSPACE)
-                
-                # Autocomplete
-                try:
-                    autocomplete_items = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".ui-menu-item"))
-                    )
-                    if len(autocomplete_items) > 0:
-                        first_item = WebDriverWait(self.driver, 3).until(
-                            EC.element_to_be_clickable(autocomplete_items[0])
+                if self._selecteaza_produs_din_cache(sku):
+                    self._log(f"🗂️ [Tab {tab['index']+1}] {sku} selectat din cache", 'info')
+                else:
+                    pp_name_input.clear()
+                    self.type_slowly(pp_name_input, sku, delay=0.01)
+                    pp_name_input.send_keys(Keys.SPACE)
+                    pp_name_input.send_keys(Keys.BACKSPACE)
+
+                    # Autocomplete
+                    try:
+                        autocomplete_items = WebDriverWait(self.driver, 5).until(
+                            EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".ui-menu-item"))
                         )
-                        first_item.click()
-                    else:
+                        if len(autocomplete_items) > 0:
+                            first_item = WebDriverWait(self.driver, 3).until(
+                                EC.element_to_be_clickable(autocomplete_items[0])
+                            )
+                            first_item.click()
+                        else:
+                            pp_name_input.send_keys(Keys.ENTER)
+                    except:
                         pp_name_input.send_keys(Keys.ENTER)
-                except:
-                    pp_name_input.send_keys(Keys.ENTER)
-                
+
+                    # ID-ul ascuns se completează la selecție, apoi se încarcă rețeta
+                    if asteptari_oblio.valoare_schimbata(self.driver, (By.ID, "pp_name_id"), "", timeout=3):
+                        asteptari_oblio.reteta_recalculata(self.driver)
+                    self._memoreaza_produs_selectat(sku)
+                cronometru.marcheaza('produs', sku=sku)
+
                 # Cantitate
                 pp_quantity_input = self.wait_for_element(By.ID, "pp_quantity", timeout=5)
                 if pp_quantity_input:
@@ -2332,9 +2626,12 @@ class OblioAutomation:
                     pp_quantity_input.send_keys(Keys.CONTROL + "a")
                     pp_quantity_input.send_keys(Keys.DELETE)
                     pp_quantity_input.send_keys(str(qty))
-                
+                    # Blur (TAB) -> update_pp_quantity() recalculează rețeta prin AJAX
+                    pp_quantity_input.send_keys(Keys.TAB)
+                    asteptari_oblio.reteta_recalculata(self.driver)
+                cronometru.marcheaza('cantitate', sku=sku)
+
                 # --- VERIFICARE STOC (BATCH) ---
-                time.sleep(1.0) # Așteaptă calculare rețetă
                 try:
                     # Caută input-ul de cantitate consumată (ap_1_quantity2)
                     consumed_qty_input = self.wait_for_element(By.ID, "ap_1_quantity2", timeout=2)
@@ -2358,9 +2655,11 @@ class OblioAutomation:
                                 self.capture_error_screenshot(sku, "stoc_insuficient")
                                 tab['status'] = 'skipped'
                                 tab['error'] = f"Stoc insuficient (Necesar: {consumed_val}, Disponibil: {stock_val})"
+                                cronometru.marcheaza('stoc', sku=sku)
                                 continue # Skip la următorul tab
                 except Exception as e:
                     self._log(f"⚠️ [Tab {tab['index']+1}] Eroare verificare stoc: {e}", 'warning')
+                cronometru.marcheaza('stoc', sku=sku)
                 # --- END VERIFICARE STOC ---
                 
                 tab['status'] = 'filled'
@@ -2371,6 +2670,7 @@ class OblioAutomation:
                 self.capture_error_screenshot(tab.get('sku', 'unknown'), "completare_error")
                 tab['status'] = 'error'
                 tab['error'] = str(e)
+                cronometru.marcheaza('eroare_completare', sku=tab.get('sku'))
 
         # 3. Salvare și Finalizare (SUBMIT)
         self._log("💾 [BATCH] Salvare și finalizare...", 'info')
@@ -2400,12 +2700,14 @@ class OblioAutomation:
                 
                 # Click JS
                 self.driver.execute_script("arguments[0].click();", save_button)
+                cronometru.marcheaza('click_salvare', sku=sku)
                 
                 # Așteaptă redirect (mai mult timp pentru siguranță)
                 try:
                     WebDriverWait(self.driver, 10).until(EC.url_contains("/preview_production/"))
                 except TimeoutException:
                     self._log(f"⚠️ Timeout redirect după salvare {sku}. Verific erori...", 'warning')
+                cronometru.marcheaza('redirect', sku=sku)
 
                 # Verifică redirect
                 current_url = self.driver.current_url
@@ -2431,13 +2733,15 @@ class OblioAutomation:
 
                     if launch_btn:
                         # Folosește safe_click pentru a evita interceptarea de overlay-uri
-                        if not self.safe_click(launch_btn, retries=3, wait_after=1.0):
+                        if not self.safe_click(launch_btn, retries=3, wait_after=0):
                             raise Exception("Nu s-a putut face click pe butonul Lansare (overlay intercept)")
 
                         # Confirmă Popup
                         ok_btn = self.wait_for_clickable(By.CSS_SELECTOR, ".ok-message-modal", timeout=3)
                         if ok_btn:
-                            self.safe_click(ok_btn, retries=2, wait_after=1.0)
+                            self.safe_click(ok_btn, retries=2, wait_after=0)
+                            # OK navighează la production_save - așteptăm pagina nouă
+                            asteptari_oblio.pagina_linistita(self.driver)
 
                         # Finalizează
                         finalize_btn = None
@@ -2453,30 +2757,17 @@ class OblioAutomation:
                             except: continue
 
                         if finalize_btn:
-                            if not self.safe_click(finalize_btn, retries=3, wait_after=2.0):
+                            if not self.safe_click(finalize_btn, retries=3, wait_after=0):
                                 raise Exception("Nu s-a putut face click pe butonul Finalizare (overlay intercept)")
+                            asteptari_oblio.pagina_linistita(self.driver)
+                            cronometru.marcheaza('lansare_finalizare', sku=sku)
 
                             results.append({'sku': sku, 'success': True, 'message': 'Bon creat cu succes'})
                             self.stats['success'] += 1
 
                             # Salvare în DB - pentru FIECARE comandă din order_numbers
-                            try:
-                                nume = tab.get('nume', f"Produs {sku}")
-                                order_ids = tab.get('order_ids', [])
-                                order_numbers = tab.get('order_numbers', [])
-
-                                if order_numbers:
-                                    # Salvăm câte o înregistrare pentru fiecare comandă
-                                    for idx, order_num in enumerate(order_numbers):
-                                        order_id = order_ids[idx] if idx < len(order_ids) else None
-                                        database.adauga_bon(sku, nume, 1, order_id, order_num)
-                                        self._log(f"💾 Salvat în DB: {sku} comanda #{order_num}", 'info')
-                                else:
-                                    # Fallback fără order tracking
-                                    database.adauga_bon(sku, nume, qty)
-                                    self._log(f"💾 Salvat în DB: {sku} (fără order tracking)", 'info')
-                            except Exception as e:
-                                self._log(f"⚠️ Eroare salvare DB: {e}", 'warning')
+                            self._salveaza_bon_batch(tab)
+                            cronometru.marcheaza('salvare_db', sku=sku)
                         else:
                             raise Exception("Buton Finalizare negăsit")
                     else:
@@ -2501,9 +2792,12 @@ class OblioAutomation:
 
                 results.append({'sku': tab['sku'], 'success': False, 'message': error_msg})
                 self.stats['failed'] += 1
+                cronometru.marcheaza('eroare_salvare', sku=tab['sku'])
             finally:
                 self.driver.close()
 
+        self._log(f"⏱️ Batch {len(tabs)} bonuri: {cronometru.rezumat()}", 'info')
+
         # Revino la fereastra principală (dacă mai există, altfel switch la ultima rămasă)
         try:
             self.driver.switch_to.window(main_window)
@@ -2540,7 +2834,10 @@ class OblioAutomation:
 
             self._log(f"📦 Bon {i}/{len(bonuri)}", 'info')
 
-            success = self.create_production_voucher(sku, cantitate, oblio_cookies, oblio_email, oblio_password)
+            success = self.create_production_voucher(
+                sku, cantitate, oblio_cookies, oblio_email, oblio_password,
+                nume=bon.get('nume'), order_ids=bon.get('order_ids'), order_numbers=bon.get('order_numbers')
+            )
 
             if success:
                 self._log(f"✅ Bon {i}/{len(bonuri)} - SUCCESS", 'success')
@@ -2579,87 +2876,104 @@ class OblioAutomation:
             except:
                 pass
 
-    def get_todays_processed_texts(self):
+    def sincronizeaza_istoric_productie(self, max_pages=10, complet=False):
         """
-        Returnează o listă cu textul complet al rândurilor procesate astăzi.
-        Navighează prin pagini până găsește o dată diferită de azi.
+        Aduce în indexul local (istoric_productie) bonurile de producție de azi apărute în Oblio
+        de la ultima sincronizare. Raportul e sortat descrescător, deci citirea se oprește la ținta
+        sincronizării sau la zilele anterioare - de obicei e suficientă prima pagină.
+        Ținta e ultimul id indexat, sau limita de jos rămasă de la o sincronizare oprită la
+        max_pages (golul dintre ele se citește acum).
+
+        Args:
+            complet: True = recitește tot raportul de azi, indiferent de index (fallback)
+
+        Returns:
+            int: numărul de bonuri noi indexate; None la eroare sau dacă ținta nu a fost atinsă
+                 în max_pages (indexul zilei e incomplet și nu trebuie folosit ca atare)
         """
-        processed_texts = []
         try:
             self._log("🔍 Verificare istoric producție (pentru a evita duplicate)...", 'info')
             self.driver.get("https://www.oblio.eu/report/production")
-            time.sleep(2)
-            
+            asteptari_oblio.pagina_linistita(self.driver)
+
             from datetime import datetime
-            today = datetime.now().strftime("%d.%m.%Y")
-            
+            azi = datetime.now().strftime("%Y-%m-%d")
+            limita = istoric_productie.limita_jos()
+            tinta = 0 if complet else (limita if limita is not None else istoric_productie.ultimul_id())
+
+            randuri_noi = []
             page = 1
-            max_pages = 10 # Limită de siguranță pentru a nu bloca scriptul
-            
+            tinta_atinsa = False
             while page <= max_pages:
                 # Așteaptă încărcarea tabelului
                 try:
                     WebDriverWait(self.driver, 5).until(
                         EC.presence_of_element_located((By.CSS_SELECTOR, "#content-table tbody tr.table_row"))
                     )
-                except:
+                except TimeoutException:
                     self._log("ℹ️ Tabelul de raport pare gol sau nu s-a încărcat.", 'info')
+                    tinta_atinsa = True
                     break
 
-                rows = self.driver.find_elements(By.CSS_SELECTOR, "#content-table tbody tr.table_row")
-                if not rows:
+                # Toate rândurile paginii într-un singur apel (nu câte un row.text per rând)
+                randuri_pagina = self.driver.execute_script(JS_RANDURI_RAPORT_PRODUCTIE) or []
+                if not randuri_pagina:
+                    tinta_atinsa = True
                     break
-                
-                found_today = False
-                stop_search = False
-                
-                self._log(f"📄 Pagina {page}: Analizez {len(rows)} rânduri...", 'info')
 
-                for row in rows:
-                    try:
-                        text = row.text
-                        # Verificăm data
-                        if today in text:
-                            processed_texts.append(text)
-                            found_today = True
-                        else:
-                            # Dacă găsim o dată care NU e azi, verificăm dacă e mai veche
-                            # Regex pentru dată DD.MM.YYYY
-                            match_date = re.search(r'(\d{2})\.(\d{2})\.(\d{4})', text)
-                            if match_date:
-                                date_str = match_date.group(0)
-                                if date_str != today:
-                                    # Presupunem sortare descrescătoare, deci ne putem opri
-                                    stop_search = True
-                                    # break # Nu dăm break imediat, poate sunt amestecate? De obicei sunt sortate.
-                    except:
+                for rand in randuri_pagina:
+                    parsat = istoric_productie.parseaza_rand(rand.get('href'), rand.get('numar'), rand.get('celule') or [])
+                    if parsat is None:
                         continue
-                
-                if stop_search:
-                    self._log("⏹️ Am ajuns la bonuri din zilele anterioare. Mă opresc.", 'info')
+                    # Sortare descrescătoare: de la ținta sincronizării sau din zilele trecute restul sunt cunoscute
+                    if parsat.productie_id <= tinta or parsat.data < azi:
+                        tinta_atinsa = True
+                        break
+                    randuri_noi.append(parsat)
+
+                self._log(f"📄 Pagina {page}: {len(randuri_noi)} bonuri citite până acum", 'info')
+                if tinta_atinsa:
                     break
-                    
+
                 # Navigare pagina următoare
                 try:
-                    # Căutăm butonul Next activ
                     next_li = self.driver.find_element(By.CSS_SELECTOR, "ul.pagination li.next")
-                    if "disabled" in next_li.get_attribute("class"):
-                        break # Ultima pagină
-                        
+                    if "disabled" in (next_li.get_attribute("class") or ""):
+                        tinta_atinsa = True
+                        break  # Ultima pagină
+
                     next_link = next_li.find_element(By.TAG_NAME, "a")
+                    primul_href = randuri_pagina[0].get('href')
                     self.driver.execute_script("arguments[0].click();", next_link)
-                    time.sleep(2)
+                    # Pagina e gata când primul rând s-a schimbat
+                    WebDriverWait(self.driver, 10).until(
+                        lambda d: (d.execute_script(JS_RANDURI_RAPORT_PRODUCTIE) or [{}])[0].get('href') != primul_href
+                    )
                     page += 1
-                except Exception as e:
-                    # self._log(f"ℹ️ Nu mai există pagini următoare ({e})", 'info')
+                except NoSuchElementException:
+                    tinta_atinsa = True  # Fără paginare - o singură pagină
                     break
-            
-            self._log(f"✅ Găsite {len(processed_texts)} bonuri procesate astăzi.", 'info')
-            return processed_texts
-            
+                except TimeoutException:
+                    break
+
+            noi = istoric_productie.adauga(randuri_noi)
+            istoric_productie.inregistreaza_sincronizare(min(page, max_pages))
+
+            if not tinta_atinsa:
+                # Golul până la țintă se citește la următoarea sincronizare
+                istoric_productie.seteaza_limita_jos(tinta)
+                self._log(f"⚠️ Istoric producție incomplet: ținta #{tinta} neatinsă în {max_pages} pagini "
+                          f"({noi} bonuri noi indexate).", 'warning')
+                return None
+
+            if limita is not None:
+                istoric_productie.seteaza_limita_jos(None)
+            self._log(f"✅ Istoric producție actualizat: {noi} bonuri noi ({page} pagini citite).", 'info')
+            return noi
+
         except Exception as e:
             self._log(f"⚠️ Eroare la citirea istoricului: {e}", 'warning')
-            return []
+            return None
 
     def login_if_needed(self, email=None, password=None):
         """Asigură autentificarea în Oblio"""
@@ -2670,6 +2984,7 @@ class OblioAutomation:
             # Verifică dacă suntem pe pagina de login
             if "login" in self.driver.current_url.lower():
                 self._log("🔐 Autentificare necesară pentru verificare...", 'info')
+                self._discard_saved_cookies()
                 
                 if email and password:
                     # Verificăm dacă metoda login_to_oblio există (ar trebui)
@@ -2683,6 +2998,8 @@ class OblioAutomation:
                 else:
                     self._log("⚠️ Nu am credențiale pentru login automat!", 'warning')
                     return False
+
+                self.save_session_cookies()
                     
             # Verificare finală
             if "login" not in self.driver.current_url.lower():
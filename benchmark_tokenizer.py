@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark: tokenizer_produse vs. funcțiile vechi de extragere
+(extrageInfoProdus + extrageInfoProdusIntreg + re.sub pentru curățare + normalize_name)
+
+Utilizare: python benchmark_tokenizer.py [fisier_comenzi.xlsx] [repetari]
+"""
+
+import re
+import sys
+import timeit
+
+import pandas as pd
+
+from tokenizer_produse import tokenizeazaProdus
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+
+# ============================================================
+# Implementarea veche (copiată din app.py, înainte de tokenizer)
+# ============================================================
+
+def normalize_name(text):
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    text = text.replace('parfum', '')
+    text = re.sub(r'[^a-z0-9]', '', text)
+    return text
+
+
+def extrageInfoProdus(text_produs):
+    if 'Decant' not in text_produs:
+        return None
+    match_ml = re.search(r'Decant (\d+) ml parfum (.+?),', text_produs)
+    if not match_ml:
+        return None
+    cantitate_ml = int(match_ml.group(1))
+    nume_parfum = match_ml.group(2).strip()
+    match_bucati = re.search(r'(\d+\.\d+)$', text_produs.strip())
+    numar_bucati = float(match_bucati.group(1)) if match_bucati else 1.0
+    return (nume_parfum, cantitate_ml, int(numar_bucati))
+
+
+def extrageInfoProdusIntreg(text_produs):
+    if 'Decant' in text_produs:
+        return None
+    match_bucati = re.search(r'(\d+\.\d+)$', text_produs.strip())
+    if match_bucati:
+        numar_bucati = float(match_bucati.group(1))
+        nume_produs = text_produs.rsplit(',', 1)[0].strip()
+    else:
+        numar_bucati = 1.0
+        nume_produs = text_produs.strip()
+    return (nume_produs, int(numar_bucati))
+
+
+def parseazaVechi(produs):
+    """Aceiași pași ca bucla veche din proceseazaComenzi()"""
+    info = extrageInfoProdus(produs)
+    if not info:
+        info = extrageInfoProdusIntreg(produs)
+    produs_clean = re.sub(r', \d+\.\d+$', '', produs)
+    return info, normalize_name(produs_clean)
+
+
+def parseazaNou(produs):
+    record = tokenizeazaProdus(produs)
+    return record, record.cheie
+
+
+def main():
+    fisier = sys.argv[1] if len(sys.argv) > 1 else '45.xlsx'
+    repetari = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    df = pd.read_excel(fisier)
+    coloana_produse = next(c for c in df.columns if 'produse' in str(c).lower())
+    linii = [p.strip() for text in df[coloana_produse].astype(str) for p in text.split(' | ')]
+
+    # Verificare: ambele implementări dau aceleași rezultate
+    for linie in linii:
+        info, cheie = parseazaVechi(linie)
+        record, cheie_noua = parseazaNou(linie)
+        if record.este_decant:
+            info_nou = (record.nume_parfum, record.ml, record.bucati)
+        elif record.este_intreg:
+            info_nou = (record.nume_intreg, record.bucati)
+        else:
+            info_nou = None
+        assert info == info_nou and cheie == cheie_noua, f"Diferență la: {linie}"
+
+    print(f'📊 {len(linii)} linii de produs din {fisier}, {repetari} repetări\n')
+
+    t_vechi = timeit.timeit(lambda: [parseazaVechi(l) for l in linii], number=repetari)
+    t_nou = timeit.timeit(lambda: [parseazaNou(l) for l in linii], number=repetari)
+
+    total = len(linii) * repetari
+    print(f'  Funcții vechi (4 regex-uri / linie): {t_vechi:.3f}s  ({t_vechi / total * 1e6:.2f} µs/linie)')
+    print(f'  Tokenizer (un singur pas):           {t_nou:.3f}s  ({t_nou / total * 1e6:.2f} µs/linie)')
+    print(f'\n  Accelerare: {t_vechi / t_nou:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Cache persistent SKU -> ID produs Oblio (pp_name_id), în SQLite lângă catalogul de produse
+Pentru fiecare bon, automatizarea tasta SKU-ul în #pp_name și aștepta autocomplete-ul (3-5 s)
+doar ca să obțină ID-ul ascuns al produsului - care practic nu se schimbă niciodată.
+- memoreaza(): după o selecție reușită din autocomplete (Selenium sau motorul HTTP)
+- cauta(): la un hit ID-ul și eticheta se setează direct, fără tastare
+- invalideaza(): când Oblio respinge ID-ul (produs șters / recreat), următorul bon refolosește autocomplete-ul
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CACHE_DB_PATH = os.getenv('CACHE_PRODUSE_OBLIO_PATH', os.path.join('uploads', 'produse_oblio.sqlite'))
+
+_lock = threading.Lock()
+_memorie = None   # sku -> (produs_id, eticheta), încărcat leneș din SQLite
+_stare = {'hituri': 0, 'ratari': 0, 'invalidate': 0}
+
+
+def _conexiune():
+    """Conexiune SQLite (o conexiune per apel, ca în catalog_produse.py)"""
+    director = os.path.dirname(CACHE_DB_PATH)
+    if director:
+        os.makedirs(director, exist_ok=True)
+
+    conn = sqlite3.connect(CACHE_DB_PATH, timeout=10)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS produse_oblio (
+            sku TEXT PRIMARY KEY,
+            produs_id TEXT NOT NULL,
+            eticheta TEXT,
+            actualizat_la REAL NOT NULL
+        )
+    ''')
+    return conn
+
+
+def _incarca():
+    """Cache-ul din memorie (prima apelare îl citește din SQLite). Se apelează sub _lock."""
+    global _memorie
+    if _memorie is None:
+        _memorie = {}
+        try:
+            conn = _conexiune()
+            try:
+                for sku, produs_id, eticheta in conn.execute('SELECT sku, produs_id, eticheta FROM produse_oblio'):
+                    _memorie[sku] = (produs_id, eticheta)
+            finally:
+                conn.close()
+            logger.info(f"🗂️ Cache produse Oblio: {len(_memorie)} SKU-uri încărcate")
+        except sqlite3.Error as e:
+            logger.error(f"❌ Eroare citire cache produse Oblio: {e}")
+    return _memorie
+
+
+def _cheie(sku):
+    return (sku or '').strip().upper()
+
+
+def cauta(sku):
+    """
+    Returns: (produs_id, eticheta) sau None dacă SKU-ul nu a mai fost selectat
+    """
+    with _lock:
+        rezultat = _incarca().get(_cheie(sku))
+        _stare['hituri' if rezultat else 'ratari'] += 1
+    return rezultat
+
+
+def memoreaza(sku, produs_id, eticheta=None):
+    """Reține ID-ul produsului selectat pentru SKU (suprascrie o valoare veche)"""
+    cheie = _cheie(sku)
+    if not cheie or not produs_id:
+        return
+
+    produs_id = str(produs_id)
+    with _lock:
+        memorie = _incarca()
+        if memorie.get(cheie) == (produs_id, eticheta):
+            return
+        memorie[cheie] = (produs_id, eticheta)
+
+        try:
+            conn = _conexiune()
+            try:
+                with conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO produse_oblio (sku, produs_id, eticheta, actualizat_la) VALUES (?, ?, ?, ?)',
+                        (cheie, produs_id, eticheta, time.time())
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"❌ Eroare scriere cache produse Oblio: {e}")
+
+
+def invalideaza(sku):
+    """Șterge maparea unui SKU (ID respins de Oblio)"""
+    cheie = _cheie(sku)
+    with _lock:
+        if _incarca().pop(cheie, None) is None:
+            return
+        _stare['invalidate'] += 1
+
+        try:
+            conn = _conexiune()
+            try:
+                with conn:
+                    conn.execute('DELETE FROM produse_oblio WHERE sku = ?', (cheie,))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"❌ Eroare ștergere din cache produse Oblio: {e}")
+
+    logger.info(f"🗑️ Cache produse Oblio: ID-ul pentru {cheie} a fost invalidat")
+
+
+def statistici():
+    """Starea cache-ului (pentru /health/detalii)"""
+    with _lock:
+        return {
+            'produse': len(_incarca()),
+            **_stare,
+        }
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Catalog local de produse (snapshot versionat în SQLite)
+Înlocuiește descărcarea completă a Google Sheet-ului la fiecare pornire / oră:
+- la pornire snapshot-ul curent se încarcă din SQLite în câteva milisecunde
+- reîmprospătarea folosește cereri condiționate (ETag / Last-Modified) și hash-ul conținutului,
+  deci o versiune nouă se scrie doar când foaia s-a schimbat efectiv
+- ambii indecși (nume normalizat -> SKU și SKU -> nume) se construiesc din același snapshot,
+  împreună cu indexul de trigrame pentru potrivirea aproximativă (rezolvare_fuzzy)
+"""
+
+import csv
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import time
+
+import requests
+
+from rezolvare_fuzzy import IndexFuzzy
+from tokenizer_produse import normalizeaza
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/17FhRBDaknpXgsoTXOkpEWcMf2o55uOjDymlaGiiKUwU/export?format=csv&gid=1884124540"
+
+CATALOG_DB_PATH = os.getenv('CATALOG_DB_PATH', os.path.join('uploads', 'catalog_produse.sqlite'))
+
+# Câte versiuni vechi păstrăm în SQLite (pentru comparație / revenire manuală)
+PASTREAZA_VERSIUNI = 3
+
+COLOANA_SKU = 'Cod Produs (SKU)'
+COLOANA_NUME = 'Denumire Produs'
+COLOANA_BRAND = 'Marca (Brand)'
+
+
+class SnapshotCatalog:
+    """O versiune imutabilă a catalogului, cu indecșii derivați din ea"""
+
+    def __init__(self, versiune, produse, creat_la, verificat_la, sursa):
+        self.versiune = versiune
+        self.produse = produse            # lista de (sku, nume, brand), în ordinea din foaie
+        self.creat_la = creat_la
+        self.verificat_la = verificat_la
+        self.sursa = sursa
+
+        # Index pentru parsarea comenzilor: nume normalizat -> SKU (ultima apariție câștigă)
+        self.nume_la_sku = {}
+        # Index pentru bonuri de producție: SKU -> denumire completă
+        self.sku_la_nume = {}
+        branduri = set()
+
+        for sku, nume, brand in produse:
+            self.nume_la_sku[normalizeaza(nume)] = sku
+            self.sku_la_nume[sku] = nume
+            if brand:
+                branduri.add(brand)
+
+        self.branduri = sorted(branduri)
+
+        # Index de trigrame pentru sugestiile la produsele negăsite exact (construit o dată per snapshot)
+        self.index_fuzzy = IndexFuzzy(produse, self.branduri)
+
+    def __len__(self):
+        return len(self.produse)
+
+
+def _conexiune():
+    """Conexiune SQLite (o conexiune per apel, ca în database.py)"""
+    director = os.path.dirname(CATALOG_DB_PATH)
+    if director:
+        os.makedirs(director, exist_ok=True)
+
+    conn = sqlite3.connect(CATALOG_DB_PATH, timeout=10)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_versiuni (
+            versiune INTEGER PRIMARY KEY AUTOINCREMENT,
+            continut_hash TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            sursa TEXT,
+            creat_la REAL NOT NULL,
+            verificat_la REAL NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_produse (
+            versiune INTEGER NOT NULL,
+            pozitie INTEGER NOT NULL,
+            sku TEXT NOT NULL,
+            nume TEXT NOT NULL,
+            brand TEXT,
+            PRIMARY KEY (versiune, pozitie)
+        )
+    ''')
+    return conn
+
+
+def _curata_rand(sku, nume, brand):
+    """Normalizează un rând din foaie; None dacă lipsește SKU-ul sau numele"""
+    sku = str(sku).strip() if sku is not None else ''
+    nume = str(nume).strip() if nume is not None else ''
+    brand = str(brand).strip() if brand is not None else ''
+
+    if not sku or not nume or sku.lower() == 'nan' or nume.lower() == 'nan':
+        return None
+    return (sku, nume, brand if brand.lower() != 'nan' else '')
+
+
+def _parseaza_csv(continut):
+    """Parsează CSV-ul exportat din Google Sheets. Returns: lista de (sku, nume, brand)"""
+    text = continut.decode('utf-8-sig')
+    produse = []
+    for row in csv.DictReader(io.StringIO(text)):
+        rand = _curata_rand(row.get(COLOANA_SKU), row.get(COLOANA_NUME), row.get(COLOANA_BRAND))
+        if rand:
+            produse.append(rand)
+    return produse
+
+
+def _ultima_versiune(conn):
+    return conn.execute('''
+        SELECT versiune, continut_hash, etag, last_modified, sursa, creat_la, verificat_la
+        FROM catalog_versiuni
+        ORDER BY versiune DESC
+        LIMIT 1
+    ''').fetchone()
+
+
+def _salveaza_versiune(conn, produse, continut_hash, etag, last_modified, sursa):
+    """Scrie o versiune nouă într-o singură tranzacție și șterge versiunile vechi"""
+    acum = time.time()
+    with conn:
+        cur = conn.execute('''
+            INSERT INTO catalog_versiuni (continut_hash, etag, last_modified, sursa, creat_la, verificat_la)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (continut_hash, etag, last_modified, sursa, acum, acum))
+        versiune = cur.lastrowid
+
+        conn.executemany('''
+            INSERT INTO catalog_produse (versiune, pozitie, sku, nume, brand)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(versiune, i, sku, nume, brand) for i, (sku, nume, brand) in enumerate(produse)])
+
+        conn.execute('''
+            DELETE FROM catalog_produse WHERE versiune <= ?
+        ''', (versiune - PASTREAZA_VERSIUNI,))
+        conn.execute('''
+            DELETE FROM catalog_versiuni WHERE versiune <= ?
+        ''', (versiune - PASTREAZA_VERSIUNI,))
+
+    logger.info(f"💾 Catalog salvat: versiunea {versiune} ({len(produse)} produse, sursa: {sursa})")
+    return SnapshotCatalog(versiune, produse, acum, acum, sursa)
+
+
+def incarca_snapshot():
+    """
+    Încarcă ultima versiune a catalogului din SQLite (fără rețea)
+    Returns: SnapshotCatalog sau None dacă nu există încă nicio versiune
+    """
+    try:
+        conn = _conexiune()
+    except sqlite3.Error as e:
+        logger.error(f"❌ Eroare deschidere catalog local: {e}")
+        return None
+
+    try:
+        ultima = _ultima_versiune(conn)
+        if not ultima:
+            return None
+
+        versiune, _, _, _, sursa, creat_la, verificat_la = ultima
+        produse = conn.execute('''
+            SELECT sku, nume, brand FROM catalog_produse
+            WHERE versiune = ?
+            ORDER BY pozitie
+        ''', (versiune,)).fetchall()
+
+        return SnapshotCatalog(versiune, produse, creat_la, verificat_la, sursa)
+    except sqlite3.Error as e:
+        logger.error(f"❌ Eroare citire catalog local: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def reimprospateaza(url=GOOGLE_SHEET_URL, timeout=30):
+    """
+    Verifică foaia Google cu o cerere condiționată și salvează o versiune nouă doar dacă
+    s-a schimbat conținutul.
+
+    Returns: SnapshotCatalog (nou sau cel existent dacă nu s-a schimbat nimic)
+    Raises: requests.RequestException / ValueError dacă descărcarea sau parsarea eșuează
+    """
+    conn = _conexiune()
+    try:
+        ultima = _ultima_versiune(conn)
+
+        headers = {}
+        if ultima:
+            _, _, etag, last_modified, _, _, _ = ultima
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
+
+        if response.status_code == 304 and ultima:
+            with conn:
+                conn.execute('UPDATE catalog_versiuni SET verificat_la = ? WHERE versiune = ?',
+                             (time.time(), ultima[0]))
+            logger.info(f"✅ Catalog neschimbat (304), versiunea {ultima[0]}")
+            return incarca_snapshot()
+
+        response.raise_for_status()
+
+        continut = response.content
+        continut_hash = hashlib.sha256(continut).hexdigest()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        # Google Sheets nu trimite mereu ETag - hash-ul conținutului decide dacă e versiune nouă
+        if ultima and ultima[1] == continut_hash:
+            with conn:
+                conn.execute('''
+                    UPDATE catalog_versiuni SET verificat_la = ?, etag = ?, last_modified = ?
+                    WHERE versiune = ?
+                ''', (time.time(), etag, last_modified, ultima[0]))
+            logger.info(f"✅ Catalog neschimbat (hash identic), versiunea {ultima[0]}")
+            return incarca_snapshot()
+
+        produse = _parseaza_csv(continut)
+        if not produse:
+            raise ValueError('CSV-ul descărcat nu conține niciun produs valid')
+
+        return _salveaza_versiune(conn, produse, continut_hash, etag, last_modified, 'google_sheets')
+    finally:
+        conn.close()
+
+
+def importa_din_excel(cale):
+    """
+    Creează o versiune a catalogului dintr-un fișier Excel local (ex: produse.xlsx din repo)
+    Folosit ca sursă inițială când foaia Google nu este accesibilă.
+    """
+    import pandas as pd
+
+    df = pd.read_excel(cale, dtype=str)
+    brand = df[COLOANA_BRAND] if COLOANA_BRAND in df.columns else [None] * len(df)
+
+    produse = []
+    for sku, nume, marca in zip(df[COLOANA_SKU], df[COLOANA_NUME], brand):
+        rand = _curata_rand(sku, nume, marca)
+        if rand:
+            produse.append(rand)
+
+    with open(cale, 'rb') as f:
+        continut_hash = hashlib.sha256(f.read()).hexdigest()
+
+    conn = _conexiune()
+    try:
+        return _salveaza_versiune(conn, produse, continut_hash, None, None, f"fisier:{os.path.basename(cale)}")
+    finally:
+        conn.close()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Cookie jar persistent pentru sesiunea Oblio (criptat în volumul uploads)
+Cookie-urile Oblio sunt HttpOnly, deci frontend-ul nu le poate trimite - fără jar, fiecare
+rulare face login complet cu email/parolă. După un login reușit cookie-urile se salvează
+criptat (Fernet), iar la pornirea unui browser nou se restaurează înainte de prima navigare.
+
+Cheia: OBLIO_COOKIES_KEY (cheie Fernet) sau, dacă lipsește, derivată (PBKDF2) din
+OBLIO_EMAIL + OBLIO_PASSWORD - fișierul singur, fără variabilele de mediu, nu poate fi decriptat.
+"""
+
+import base64
+import json
+import logging
+import os
+import time
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+logger = logging.getLogger(__name__)
+
+COOKIES_PATH = os.getenv('OBLIO_COOKIES_PATH', os.path.join('uploads', 'oblio_cookies.enc'))
+
+# Un jar mai vechi de atât nu se mai restaurează (secunde)
+COOKIES_DURATA_MAX = int(os.getenv('OBLIO_COOKIES_DURATA_MAX', str(14 * 24 * 3600)))
+
+DOMENIU_OBLIO = 'oblio.eu'
+
+_SARE_DERIVARE = b'obsid-decant-manager/oblio-cookies'
+_ITERATII_DERIVARE = 200_000
+
+_cache_cheie = {}
+
+
+def _cheie():
+    """Cheia Fernet (din OBLIO_COOKIES_KEY sau derivată din credențiale). None dacă nu există."""
+    cheie = os.environ.get('OBLIO_COOKIES_KEY')
+    if cheie:
+        return cheie.encode()
+
+    email = os.environ.get('OBLIO_EMAIL')
+    password = os.environ.get('OBLIO_PASSWORD')
+    if not (email and password):
+        return None
+
+    secret = f"{email}\0{password}".encode('utf-8')
+    if secret not in _cache_cheie:
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=_SARE_DERIVARE,
+                         iterations=_ITERATII_DERIVARE)
+        _cache_cheie.clear()
+        _cache_cheie[secret] = base64.urlsafe_b64encode(kdf.derive(secret))
+    return _cache_cheie[secret]
+
+
+def _fernet():
+    cheie = _cheie()
+    if not cheie:
+        return None
+    try:
+        return Fernet(cheie)
+    except ValueError as e:
+        logger.error(f"❌ OBLIO_COOKIES_KEY invalidă (trebuie să fie o cheie Fernet): {e}")
+        return None
+
+
+def salveaza(cookies):
+    """
+    Salvează criptat cookie-urile Oblio (din driver.get_cookies())
+
+    Returns: True dacă jar-ul a fost scris
+    """
+    fernet = _fernet()
+    if fernet is None:
+        logger.warning("⚠️ Cookie-urile Oblio nu se salvează: lipsește cheia (OBLIO_COOKIES_KEY / credențiale)")
+        return False
+
+    cookies = [c for c in cookies if DOMENIU_OBLIO in c.get('domain', '')]
+    if not cookies:
+        return False
+
+    token = fernet.encrypt(json.dumps(cookies).encode('utf-8'))
+
+    try:
+        director = os.path.dirname(COOKIES_PATH)
+        if director:
+            os.makedirs(director, exist_ok=True)
+
+        tmp = COOKIES_PATH + '.tmp'
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(token)
+        os.replace(tmp, COOKIES_PATH)
+    except OSError as e:
+        logger.error(f"❌ Eroare salvare cookie-uri Oblio: {e}")
+        return False
+
+    logger.info(f"🍪 Sesiune Oblio salvată ({len(cookies)} cookie-uri, criptat)")
+    return True
+
+
+def incarca():
+    """
+    Citește jar-ul salvat
+    Returns: lista de cookie-uri sau None (lipsă, expirat, cheie schimbată, fișier corupt)
+    """
+    fernet = _fernet()
+    if fernet is None:
+        return None
+
+    try:
+        with open(COOKIES_PATH, 'rb') as f:
+            token = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.error(f"❌ Eroare citire cookie-uri Oblio: {e}")
+        return None
+
+    try:
+        cookies = json.loads(fernet.decrypt(token, ttl=COOKIES_DURATA_MAX))
+    except (InvalidToken, ValueError):
+        logger.info("🍪 Sesiunea Oblio salvată e expirată sau a fost criptată cu altă cheie - ignorată")
+        sterge()
+        return None
+
+    # Cookie-urile cu dată de expirare deja trecută nu se mai trimit
+    acum = time.time()
+    return [c for c in cookies if not c.get('expiry') or c['expiry'] > acum]
+
+
+def sterge():
+    """Șterge jar-ul (sesiune respinsă de Oblio)"""
+    try:
+        os.remove(COOKIES_PATH)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"❌ Eroare ștergere cookie-uri Oblio: {e}")
@@ -1,15 +1,278 @@
 import os
+import re
+import time
 import logging
+import threading
+from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from datetime import datetime
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor, execute_values
+from datetime import date, datetime
+
+import metrici
 
 # Configurare logging
 logger = logging.getLogger(__name__)
 
+# Configurare pool de conexiuni (o conexiune TLS nouă costă 30-80 ms pe Postgres-ul gestionat)
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '5'))
+# Cât așteaptă un apel după o conexiune liberă când pool-ul e plin (secunde)
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# Conexiunile inactive mai mult de atât sunt verificate cu SELECT 1 înainte de folosire (secunde)
+DB_POOL_VERIFICARE = float(os.getenv('DB_POOL_VERIFICARE', '30'))
+
+
+class EroareDateBonuri(Exception):
+    """Postgres a respins rândurile (date / constrângeri), nu conexiunea - reîncercarea nu ajută"""
+
+
+def _asteapta_eventlet(conn, timeout=-1):
+    """
+    Wait callback pentru psycopg2 sub eventlet (ca psycogreen): în loc să blocheze tot
+    procesul în libpq, cedează hub-ului până când socket-ul conexiunii e gata
+    """
+    from eventlet.hubs import trampoline
+
+    while True:
+        stare = conn.poll()
+        if stare == extensions.POLL_OK:
+            break
+        elif stare == extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif stare == extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError(f"Stare poll necunoscută: {stare}")
+
+
+def _activeaza_eventlet():
+    """Înregistrează wait callback-ul doar dacă aplicația rulează cu eventlet.monkey_patch()"""
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return False
+
+    if not patcher.is_monkey_patched('socket'):
+        return False
+
+    if extensions.get_wait_callback() is None:
+        extensions.set_wait_callback(_asteapta_eventlet)
+        logger.info("🟢 psycopg2 cooperativ cu eventlet (wait callback activ)")
+    return True
+
+
+class PoolConexiuni:
+    """
+    Pool de conexiuni PostgreSQL (sigur sub eventlet: lock-urile din threading sunt
+    înlocuite cu variante green de monkey_patch, iar I/O-ul cedează hub-ului)
+    """
+
+    def __init__(self, database_url, minim=DB_POOL_MIN, maxim=DB_POOL_MAX,
+                 timeout=DB_POOL_TIMEOUT, verificare=DB_POOL_VERIFICARE):
+        self.database_url = database_url
+        self.minim = max(0, min(minim, maxim))
+        self.maxim = max(1, maxim)
+        self.timeout = timeout
+        self.verificare = verificare
+
+        self._lock = threading.Lock()
+        self._locuri = threading.BoundedSemaphore(self.maxim)
+        self._libere = []          # lista de (conexiune, momentul eliberării)
+        self._deschise = 0
+        self.create = 0
+        self.refolosite = 0
+        self.aruncate = 0
+
+        for _ in range(self.minim):
+            conn = self._conecteaza()
+            if conn is None:
+                break
+            self._libere.append((conn, time.monotonic()))
+
+    def _conecteaza(self):
+        try:
+            conn = psycopg2.connect(self.database_url)
+        except Exception as e:
+            logger.error(f"❌ Eroare conectare DB: {e}")
+            return None
+
+        with self._lock:
+            self._deschise += 1
+            self.create += 1
+        return conn
+
+    def _arunca(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._deschise -= 1
+            self.aruncate += 1
+
+    def _sanatoasa(self, conn, inactiva_de):
+        """Health check la împrumut: conexiunea închisă sau care nu răspunde e aruncată"""
+        if conn.closed:
+            return False
+        if inactiva_de < self.verificare:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Conexiune DB moartă în pool, se reconectează: {e}")
+            return False
+
+    def imprumuta(self):
+        """
+        Ia o conexiune din pool (sau deschide una nouă dacă nu e nicio conexiune liberă)
+        Returns: conexiunea sau None dacă pool-ul e plin / DB-ul nu răspunde
+        """
+        if not self._locuri.acquire(timeout=self.timeout):
+            logger.error(f"❌ Pool DB epuizat ({self.maxim} conexiuni ocupate de peste {self.timeout:.0f}s)")
+            return None
+
+        try:
+            while True:
+                with self._lock:
+                    liber = self._libere.pop() if self._libere else None
+
+                if liber is None:
+                    conn = self._conecteaza()
+                    break
+
+                conn, eliberata_la = liber
+                if self._sanatoasa(conn, time.monotonic() - eliberata_la):
+                    with self._lock:
+                        self.refolosite += 1
+                    break
+                self._arunca(conn)
+        except BaseException:
+            self._locuri.release()
+            raise
+
+        if conn is None:
+            self._locuri.release()
+        return conn
+
+    def returneaza(self, conn, stricata=False):
+        """Pune conexiunea înapoi în pool (tranzacțiile rămase deschise sunt anulate)"""
+        try:
+            if stricata or conn.closed:
+                self._arunca(conn)
+                return
+
+            if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    self._arunca(conn)
+                    return
+
+            with self._lock:
+                self._libere.append((conn, time.monotonic()))
+        finally:
+            self._locuri.release()
+
+    def inchide(self):
+        """Închide toate conexiunile libere"""
+        with self._lock:
+            libere, self._libere = self._libere, []
+        for conn, _ in libere:
+            self._arunca(conn)
+
+    def statistici(self):
+        with self._lock:
+            return {
+                'deschise': self._deschise,
+                'libere': len(self._libere),
+                'ocupate': self._deschise - len(self._libere),
+                'minim': self.minim,
+                'maxim': self.maxim,
+                'create': self.create,
+                'refolosite': self.refolosite,
+                'aruncate': self.aruncate,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Pool-ul global, creat la primul apel (DATABASE_URL poate fi încărcat din .env după import)
+    Returns: PoolConexiuni sau None dacă DATABASE_URL nu este setat
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        logger.warning("⚠️ DATABASE_URL nu este setat!")
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            _activeaza_eventlet()
+            _pool = PoolConexiuni(database_url)
+            logger.info(f"🔌 Pool DB creat (min {_pool.minim}, max {_pool.maxim} conexiuni)")
+    return _pool
+
+
+def get_statistici_pool():
+    """Statisticile pool-ului (pentru /health/detalii și /test-db)"""
+    return _pool.statistici() if _pool is not None else None
+
+
+@contextmanager
+def conexiune():
+    """
+    Împrumută o conexiune din pool pe durata blocului `with`:
+    - commit la ieșirea normală, rollback la excepție
+    - conexiunile rupte (OperationalError / InterfaceError) nu se mai întorc în pool
+
+    Yields: conexiunea sau None dacă baza de date nu este disponibilă
+    """
+    pool = get_pool()
+    if pool is None:
+        yield None
+        return
+
+    with metrici.DB_ASTEPTARE_SECUNDE.cronometreaza():
+        conn = pool.imprumuta()
+    if conn is None:
+        yield None
+        return
+
+    stricata = False
+    inceput = time.monotonic()
+    try:
+        yield conn
+        conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        stricata = True
+        raise
+    except BaseException:
+        try:
+            conn.rollback()
+        except Exception:
+            stricata = True
+        raise
+    finally:
+        metrici.DB_INTEROGARE_SECUNDE.observa(time.monotonic() - inceput)
+        pool.returneaza(conn, stricata=stricata or bool(conn.closed))
+
+
 def get_db_connection():
     """
-    Creează o conexiune la baza de date PostgreSQL folosind variabila de mediu DATABASE_URL
+    Creează o conexiune nouă (în afara pool-ului) folosind variabila de mediu DATABASE_URL
+    Pentru operațiile obișnuite folosiți `with conexiune() as conn:`
     """
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
@@ -23,47 +286,509 @@ def get_db_connection():
         logger.error(f"❌ Eroare conectare DB: {e}")
         return None
 
-def init_db():
-    """Inițializează tabelul dacă nu există"""
-    conn = get_db_connection()
-    if not conn:
-        return
+# ============================================================
+# Schema: migrări versionate + partiții lunare
+# ============================================================
+
+# Cheie fixă pentru pg_advisory_xact_lock - două procese nu aplică migrările simultan
+_CHEIE_LOCK_MIGRARI = 4242001
+# Spațiul de chei pentru lock-ul per comandă din adauga_bonuri_bulk (pg_advisory_xact_lock(spațiu, comandă))
+_SPATIU_LOCK_COMENZI = 4242002
+
+# Partițiile lunare mai vechi de atâtea luni sunt detașate în schema de arhivă (0 = niciodată)
+BONURI_LUNI_ACTIVE = int(os.getenv('BONURI_LUNI_ACTIVE', '12'))
+# Câte luni în avans se creează partițiile
+LUNI_INAINTE = 2
+# Cât de des se reia întreținerea partițiilor într-un proces care rulează mult (secunde)
+INTERVAL_INTRETINERE = float(os.getenv('PARTITII_INTERVAL', '86400'))
+SCHEMA_ARHIVA = 'arhiva_bonuri'
+# Opțional: Smart Resume caută doar în ultimele atâtea luni (0 = toate partițiile active)
+SMART_RESUME_LUNI = int(os.getenv('SMART_RESUME_LUNI', '0'))
+
+_PATTERN_PARTITIE = re.compile(r'^bonuri_procesate_p(\d{4})_(\d{2})$')
+
+
+def _luna_urmatoare(luna):
+    return date(luna.year + luna.month // 12, luna.month % 12 + 1, 1)
+
+
+def _luna_anterioara(luna):
+    return date(luna.year - (luna.month == 1), (luna.month - 2) % 12 + 1, 1)
+
+
+def _inceput_fereastra(luni):
+    """Prima zi a lunii de acum `luni` luni (luna curentă pentru 0)"""
+    luna = date.today().replace(day=1)
+    for _ in range(luni):
+        luna = _luna_anterioara(luna)
+    return luna
 
-    try:
-        cur = conn.cursor()
 
-        # Tabel pentru bonuri de producție cu order tracking
+def _nume_partitie(luna):
+    return f"bonuri_procesate_p{luna:%Y_%m}"
+
+
+def _creeaza_partitie(cur, luna):
+    """
+    Creează partiția lunii, dacă lipsește. Rândurile ajunse între timp în partiția DEFAULT
+    (ex: aplicația nu a fost repornită de la o lună la alta) sunt mutate în partiția nouă.
+    """
+    nume = _nume_partitie(luna)
+    cur.execute('SELECT to_regclass(%s)', (nume,))
+    if cur.fetchone()[0]:
+        return False
+
+    interval = (luna.isoformat(), _luna_urmatoare(luna).isoformat())
+    cur.execute('''
+        SELECT EXISTS (
+            SELECT 1 FROM bonuri_procesate_default
+            WHERE data_procesare >= %s AND data_procesare < %s
+        )
+    ''', interval)
+    de_mutat = cur.fetchone()[0]
+
+    if de_mutat:
+        cur.execute('CREATE TEMP TABLE _bonuri_mutate (LIKE bonuri_procesate)')
         cur.execute('''
-            CREATE TABLE IF NOT EXISTS bonuri_procesate (
-                id SERIAL PRIMARY KEY,
-                sku VARCHAR(100) NOT NULL,
-                nume_produs TEXT,
-                cantitate DECIMAL(10, 2),
-                order_id INTEGER,
-                order_number INTEGER,
-                data_procesare DATE DEFAULT CURRENT_DATE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            WITH mutate AS (
+                DELETE FROM bonuri_procesate_default
+                WHERE data_procesare >= %s AND data_procesare < %s
+                RETURNING *
             )
-        ''')
+            INSERT INTO _bonuri_mutate SELECT * FROM mutate
+        ''', interval)
 
-        # Index unic pentru a preveni duplicate (același SKU + același order_number)
-        cur.execute('''
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_sku_order_unique
-            ON bonuri_procesate (sku, order_number)
-        ''')
+    # Limitele sunt literali text (PG11 nu acceptă expresii de tipul '...'::date aici)
+    cur.execute(f'''
+        CREATE TABLE {nume} PARTITION OF bonuri_procesate
+        FOR VALUES FROM (%s) TO (%s)
+    ''', interval)
 
-        # Index pentru căutare rapidă după dată
-        cur.execute('''
-            CREATE INDEX IF NOT EXISTS idx_data_procesare
-            ON bonuri_procesate (data_procesare)
-        ''')
+    if de_mutat:
+        cur.execute('INSERT INTO bonuri_procesate SELECT * FROM _bonuri_mutate')
+        cur.execute('DROP TABLE _bonuri_mutate')
 
-        conn.commit()
-        cur.close()
-        conn.close()
+    logger.info(f"🗂️ Partiție creată: {nume}")
+    return True
+
+
+def _migrare_tabel_initial(cur):
+    """Tabelul inițial (echivalent cu vechiul init_db - no-op pe bazele existente)"""
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS bonuri_procesate (
+            id SERIAL PRIMARY KEY,
+            sku VARCHAR(100) NOT NULL,
+            nume_produs TEXT,
+            cantitate DECIMAL(10, 2),
+            order_id INTEGER,
+            order_number INTEGER,
+            data_procesare DATE DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cur.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_sku_order_unique
+        ON bonuri_procesate (sku, order_number)
+    ''')
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_data_procesare
+        ON bonuri_procesate (data_procesare)
+    ''')
+
+
+def _migrare_index_acoperitor(cur):
+    """
+    Smart Resume caută după order_number = ANY(...) - indexul unic (sku, order_number)
+    are coloanele în ordinea greșită. Indexul acoperitor permite index-only scan.
+    """
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_order_number_sku
+        ON bonuri_procesate (order_number) INCLUDE (sku)
+    ''')
+
+
+def _migrare_partitionare_lunara(cur):
+    """
+    Transformă bonuri_procesate în tabel partiționat lunar după data_procesare.
+    Cheia unică devine (sku, order_number, data_procesare): Postgres cere cheia de
+    partiționare în orice index unic. Id-urile existente și secvența se păstrează.
+    Unicitatea (sku, order_number) peste zile rămâne în grija aplicației (migrarea 6).
+    """
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('bonuri_procesate')")
+    if cur.fetchone()[0] == 'p':
+        return
+
+    cur.execute('ALTER TABLE bonuri_procesate RENAME TO bonuri_procesate_vechi')
+    cur.execute('ALTER INDEX IF EXISTS bonuri_procesate_pkey RENAME TO bonuri_procesate_vechi_pkey')
+    cur.execute("SELECT pg_get_serial_sequence('bonuri_procesate_vechi', 'id')")
+    secventa = cur.fetchone()[0]
+    cur.execute(f'ALTER SEQUENCE {secventa} OWNED BY NONE')
+
+    cur.execute(f'''
+        CREATE TABLE bonuri_procesate (
+            id INTEGER NOT NULL DEFAULT nextval('{secventa}'),
+            sku VARCHAR(100) NOT NULL,
+            nume_produs TEXT,
+            cantitate DECIMAL(10, 2),
+            order_id INTEGER,
+            order_number INTEGER,
+            data_procesare DATE NOT NULL DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, data_procesare)
+        ) PARTITION BY RANGE (data_procesare)
+    ''')
+    cur.execute(f'ALTER SEQUENCE {secventa} OWNED BY bonuri_procesate.id')
+    cur.execute('CREATE TABLE bonuri_procesate_default PARTITION OF bonuri_procesate DEFAULT')
+
+    cur.execute('''
+        SELECT DISTINCT date_trunc('month', COALESCE(data_procesare, created_at::date, CURRENT_DATE))::date
+        FROM bonuri_procesate_vechi
+    ''')
+    for (luna,) in cur.fetchall():
+        _creeaza_partitie(cur, luna)
+
+    cur.execute('''
+        INSERT INTO bonuri_procesate (id, sku, nume_produs, cantitate, order_id, order_number, data_procesare, created_at)
+        SELECT id, sku, nume_produs, cantitate, order_id, order_number,
+               COALESCE(data_procesare, created_at::date, CURRENT_DATE), created_at
+        FROM bonuri_procesate_vechi
+    ''')
+    mutate = cur.rowcount
+    cur.execute('DROP TABLE bonuri_procesate_vechi')
+
+    # Indecșii partiționați (propagați automat în fiecare partiție, inclusiv cele viitoare)
+    cur.execute('''
+        CREATE UNIQUE INDEX idx_sku_order_unique
+        ON bonuri_procesate (sku, order_number, data_procesare)
+    ''')
+    cur.execute('''
+        CREATE INDEX idx_order_number_sku
+        ON bonuri_procesate (order_number) INCLUDE (sku)
+    ''')
+
+    logger.info(f"🗂️ bonuri_procesate partiționat lunar ({mutate} rânduri mutate)")
+
+
+def _migrare_statistici_zilnice(cur):
+    """
+    Tabele de statistici pre-agregate (per zi și SKU, plus comenzile distincte per zi),
+    întreținute incremental de un trigger pe bonuri_procesate - dashboard-urile citesc
+    rânduri deja agregate în loc să scaneze istoricul.
+    """
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS statistici_zilnice_sku (
+            data DATE NOT NULL,
+            sku VARCHAR(100) NOT NULL,
+            ml INTEGER,
+            bonuri INTEGER NOT NULL DEFAULT 0,
+            cantitate DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (data, sku)
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS statistici_zilnice_comenzi (
+            data DATE NOT NULL,
+            order_number INTEGER NOT NULL,
+            PRIMARY KEY (data, order_number)
+        )
+    ''')
+
+    # ml = sufixul numeric al SKU-ului de decant (NULL pentru produse întregi)
+    cur.execute(r'''
+        CREATE OR REPLACE FUNCTION actualizeaza_statistici_zilnice() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO statistici_zilnice_sku (data, sku, ml, bonuri, cantitate)
+                VALUES (OLD.data_procesare, OLD.sku, substring(OLD.sku from '-(\d+)$')::integer,
+                        -1, -COALESCE(OLD.cantitate, 0))
+                ON CONFLICT (data, sku) DO UPDATE SET
+                    bonuri = statistici_zilnice_sku.bonuri + EXCLUDED.bonuri,
+                    cantitate = statistici_zilnice_sku.cantitate + EXCLUDED.cantitate;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO statistici_zilnice_sku (data, sku, ml, bonuri, cantitate)
+                VALUES (NEW.data_procesare, NEW.sku, substring(NEW.sku from '-(\d+)$')::integer,
+                        1, COALESCE(NEW.cantitate, 0))
+                ON CONFLICT (data, sku) DO UPDATE SET
+                    bonuri = statistici_zilnice_sku.bonuri + EXCLUDED.bonuri,
+                    cantitate = statistici_zilnice_sku.cantitate + EXCLUDED.cantitate;
+
+                IF NEW.order_number IS NOT NULL THEN
+                    INSERT INTO statistici_zilnice_comenzi (data, order_number)
+                    VALUES (NEW.data_procesare, NEW.order_number)
+                    ON CONFLICT DO NOTHING;
+                END IF;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    cur.execute('DROP TRIGGER IF EXISTS trg_statistici_zilnice ON bonuri_procesate')
+    cur.execute('''
+        CREATE TRIGGER trg_statistici_zilnice
+        AFTER INSERT OR UPDATE OR DELETE ON bonuri_procesate
+        FOR EACH ROW EXECUTE FUNCTION actualizeaza_statistici_zilnice()
+    ''')
+
+    # Populare inițială din istoricul existent (în aceeași tranzacție cu trigger-ul)
+    cur.execute('TRUNCATE statistici_zilnice_sku, statistici_zilnice_comenzi')
+    cur.execute(r'''
+        INSERT INTO statistici_zilnice_sku (data, sku, ml, bonuri, cantitate)
+        SELECT data_procesare, sku, substring(sku from '-(\d+)$')::integer,
+               COUNT(*), COALESCE(SUM(cantitate), 0)
+        FROM bonuri_procesate
+        GROUP BY data_procesare, sku
+    ''')
+    cur.execute('''
+        INSERT INTO statistici_zilnice_comenzi (data, order_number)
+        SELECT DISTINCT data_procesare, order_number
+        FROM bonuri_procesate
+        WHERE order_number IS NOT NULL
+    ''')
+
+
+def _migrare_statistici_comenzi_numarate(cur):
+    """
+    statistici_zilnice_comenzi ținea doar perechile (zi, comandă) inserate: un DELETE sau o mutare
+    a order_number / data_procesare nu le scădea, iar total_comenzi se îndepărta de
+    COUNT(DISTINCT order_number). Acum fiecare pereche numără rândurile din bonuri_procesate și
+    dispare la 0 (la fel rândurile din statistici_zilnice_sku).
+    """
+    cur.execute('''
+        ALTER TABLE statistici_zilnice_comenzi
+        ADD COLUMN IF NOT EXISTS bonuri INTEGER NOT NULL DEFAULT 0
+    ''')
+
+    # O mutare între partiții (UPDATE pe data_procesare) ajunge aici ca DELETE + INSERT
+    cur.execute(r'''
+        CREATE OR REPLACE FUNCTION actualizeaza_statistici_zilnice() RETURNS trigger AS $$
+        DECLARE
+            mutat BOOLEAN := TRUE;  -- perechea (zi, comandă) se schimbă
+        BEGIN
+            IF TG_OP = 'UPDATE' THEN
+                mutat := OLD.order_number IS DISTINCT FROM NEW.order_number
+                    OR OLD.data_procesare IS DISTINCT FROM NEW.data_procesare;
+            END IF;
+
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO statistici_zilnice_sku (data, sku, ml, bonuri, cantitate)
+                VALUES (OLD.data_procesare, OLD.sku, substring(OLD.sku from '-(\d+)$')::integer,
+                        -1, -COALESCE(OLD.cantitate, 0))
+                ON CONFLICT (data, sku) DO UPDATE SET
+                    bonuri = statistici_zilnice_sku.bonuri + EXCLUDED.bonuri,
+                    cantitate = statistici_zilnice_sku.cantitate + EXCLUDED.cantitate;
+
+                IF mutat AND OLD.order_number IS NOT NULL THEN
+                    UPDATE statistici_zilnice_comenzi SET bonuri = bonuri - 1
+                    WHERE data = OLD.data_procesare AND order_number = OLD.order_number;
+                    DELETE FROM statistici_zilnice_comenzi
+                    WHERE data = OLD.data_procesare AND order_number = OLD.order_number AND bonuri <= 0;
+                END IF;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO statistici_zilnice_sku (data, sku, ml, bonuri, cantitate)
+                VALUES (NEW.data_procesare, NEW.sku, substring(NEW.sku from '-(\d+)$')::integer,
+                        1, COALESCE(NEW.cantitate, 0))
+                ON CONFLICT (data, sku) DO UPDATE SET
+                    bonuri = statistici_zilnice_sku.bonuri + EXCLUDED.bonuri,
+                    cantitate = statistici_zilnice_sku.cantitate + EXCLUDED.cantitate;
+
+                IF mutat AND NEW.order_number IS NOT NULL THEN
+                    INSERT INTO statistici_zilnice_comenzi (data, order_number, bonuri)
+                    VALUES (NEW.data_procesare, NEW.order_number, 1)
+                    ON CONFLICT (data, order_number) DO UPDATE SET
+                        bonuri = statistici_zilnice_comenzi.bonuri + 1;
+                END IF;
+            END IF;
+
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM statistici_zilnice_sku
+                WHERE data = OLD.data_procesare AND sku = OLD.sku AND bonuri <= 0;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    # Numărătoarea se reconstruiește din istoricul existent (în aceeași tranzacție cu funcția)
+    cur.execute('TRUNCATE statistici_zilnice_comenzi')
+    cur.execute('''
+        INSERT INTO statistici_zilnice_comenzi (data, order_number, bonuri)
+        SELECT data_procesare, order_number, COUNT(*)
+        FROM bonuri_procesate
+        WHERE order_number IS NOT NULL
+        GROUP BY data_procesare, order_number
+    ''')
+    cur.execute('DELETE FROM statistici_zilnice_sku WHERE bonuri <= 0')
+
+
+def _migrare_un_rand_per_pereche(cur):
+    """
+    Un singur rând per (sku, order_number), indiferent de zi. Indexul unic include data_procesare
+    (cheia de partiționare), deci aceeași pereche salvată în altă zi (force mode, o reîncercare
+    după miezul nopții) devenea un al doilea rând, numărat și în statisticile zilnice.
+    Unicitatea peste zile e păstrată de adauga_bonuri_bulk: perechile existente sunt căutate prin
+    indexul acoperitor și actualizate pe rândul lor inițial, sub un lock per comandă.
+    Aici se șterg duplicatele existente - rămâne rândul cel mai vechi (trigger-ul scade
+    statisticile rândurilor șterse).
+    """
+    cur.execute('''
+        DELETE FROM bonuri_procesate b
+        USING bonuri_procesate p
+        WHERE b.order_number IS NOT NULL
+          AND p.sku = b.sku AND p.order_number = b.order_number
+          AND (p.data_procesare, p.id) < (b.data_procesare, b.id)
+    ''')
+    if cur.rowcount:
+        logger.info(f"🧹 {cur.rowcount} bonuri duplicate (aceeași pereche SKU / comandă) șterse")
+
+
+# (versiune, descriere, funcție) - se aplică în ordine, o singură dată, într-o tranzacție
+MIGRARI = [
+    (1, 'tabel bonuri_procesate', _migrare_tabel_initial),
+    (2, 'index acoperitor (order_number) INCLUDE (sku)', _migrare_index_acoperitor),
+    (3, 'partiționare lunară după data_procesare', _migrare_partitionare_lunara),
+    (4, 'statistici zilnice pre-agregate (trigger)', _migrare_statistici_zilnice),
+    (5, 'statistici zilnice: comenzi numărate (DELETE / UPDATE)', _migrare_statistici_comenzi_numarate),
+    (6, 'un singur rând per (sku, order_number)', _migrare_un_rand_per_pereche),
+]
+
+
+def _aplica_migrari(cur):
+    """Aplică migrările lipsă. Returns: lista versiunilor aplicate acum"""
+    cur.execute('SELECT pg_advisory_xact_lock(%s)', (_CHEIE_LOCK_MIGRARI,))
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrari (
+            versiune INTEGER PRIMARY KEY,
+            descriere TEXT,
+            aplicata_la TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cur.execute('SELECT versiune FROM schema_migrari')
+    existente = {row[0] for row in cur.fetchall()}
+
+    aplicate = []
+    for versiune, descriere, migrare in MIGRARI:
+        if versiune in existente:
+            continue
+        logger.info(f"🔧 Migrare DB {versiune}: {descriere}")
+        migrare(cur)
+        cur.execute('INSERT INTO schema_migrari (versiune, descriere) VALUES (%s, %s)', (versiune, descriere))
+        aplicate.append(versiune)
+    return aplicate
+
+
+def _arhiveaza_partitii(cur, luni_active):
+    """
+    Detașează partițiile lunare mai vechi de `luni_active` luni și le mută în schema de arhivă.
+    Rămân interogabile (arhiva_bonuri.bonuri_procesate_pAAAA_LL), dar nu mai sunt parcurse
+    de căutările Smart Resume - latența rămâne constantă pe măsură ce istoricul crește.
+    DETACH nu declanșează trigger-ul, așa că zilele lunii ies explicit din statisticile zilnice
+    (care reflectă doar bonuri_procesate).
+    """
+    limita = _inceput_fereastra(luni_active)
+
+    cur.execute('''
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'bonuri_procesate'::regclass
+    ''')
+    arhivate = []
+    for (nume,) in cur.fetchall():
+        match = _PATTERN_PARTITIE.match(nume)
+        if not match:
+            continue
+        luna = date(int(match.group(1)), int(match.group(2)), 1)
+        if _luna_urmatoare(luna) > limita:
+            continue
+
+        cur.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA_ARHIVA}')
+        cur.execute(f'ALTER TABLE bonuri_procesate DETACH PARTITION {nume}')
+        cur.execute(f'ALTER TABLE {nume} SET SCHEMA {SCHEMA_ARHIVA}')
+        interval = (luna.isoformat(), _luna_urmatoare(luna).isoformat())
+        cur.execute('DELETE FROM statistici_zilnice_sku WHERE data >= %s AND data < %s', interval)
+        cur.execute('DELETE FROM statistici_zilnice_comenzi WHERE data >= %s AND data < %s', interval)
+        arhivate.append(nume)
+
+    return arhivate
+
+
+def intretinere_partitii(luni_active=None):
+    """
+    Creează partițiile pentru luna curentă și următoarele LUNI_INAINTE luni și arhivează
+    partițiile vechi. Apelată la pornire (init_db) și zilnic din bucla_intretinere_partitii;
+    poate fi rulată oricând.
+
+    Returns: dict cu partițiile create și arhivate
+    """
+    luni_active = BONURI_LUNI_ACTIVE if luni_active is None else luni_active
+    rezultat = {'create': [], 'arhivate': []}
+
+    try:
+        with conexiune() as conn:
+            if not conn:
+                return rezultat
+
+            cur = conn.cursor()
+            cur.execute('SELECT pg_advisory_xact_lock(%s)', (_CHEIE_LOCK_MIGRARI,))
+
+            luna = date.today().replace(day=1)
+            for _ in range(LUNI_INAINTE + 1):
+                if _creeaza_partitie(cur, luna):
+                    rezultat['create'].append(_nume_partitie(luna))
+                luna = _luna_urmatoare(luna)
+
+            if luni_active > 0:
+                rezultat['arhivate'] = _arhiveaza_partitii(cur, luni_active)
+            cur.close()
+
+        if rezultat['arhivate']:
+            logger.info(f"📦 Partiții arhivate în {SCHEMA_ARHIVA}: {', '.join(rezultat['arhivate'])}")
+    except Exception as e:
+        logger.error(f"❌ Eroare întreținere partiții: {e}")
+
+    return rezultat
+
+
+def bucla_intretinere_partitii(interval=None):
+    """
+    Întreținerea periodică a partițiilor (green thread eventlet) - un container care rulează
+    mai mult de LUNI_INAINTE luni fără restart ar scrie altfel în bonuri_procesate_default
+    și nu ar arhiva nimic
+    """
+    interval = INTERVAL_INTRETINERE if interval is None else interval
+    while True:
+        time.sleep(interval)
+        try:
+            intretinere_partitii()
+        except Exception as e:
+            logger.error(f"❌ Eroare întreținere periodică partiții: {e}")
+
+
+def init_db():
+    """Inițializează schema: aplică migrările lipsă și pregătește partițiile lunare"""
+    try:
+        with conexiune() as conn:
+            if not conn:
+                return
+
+            cur = conn.cursor()
+            aplicate = _aplica_migrari(cur)
+            cur.close()
+
+        if aplicate:
+            logger.info(f"✅ Migrări DB aplicate: {aplicate}")
         logger.info("✅ Baza de date PostgreSQL inițializată cu succes.")
     except Exception as e:
         logger.error(f"❌ Eroare inițializare DB: {e}")
+        return
+
+    intretinere_partitii()
 
 
 def adauga_bon(sku, nume, cantitate, order_id=None, order_number=None):
@@ -80,36 +805,106 @@ def adauga_bon(sku, nume, cantitate, order_id=None, order_number=None):
     Returns:
         True dacă salvarea a reușit, False altfel
     """
-    conn = get_db_connection()
-    if not conn:
+    # Aceeași regulă ca la salvarea bulk: o pereche (sku, comandă) existentă este actualizată
+    if not adauga_bonuri_bulk([(sku, nume, cantitate, order_id, order_number)]):
+        return False
+    logger.info(f"💾 Bon salvat în DB: {sku} (comanda #{order_number})")
+    return True
+
+
+def adauga_bonuri_bulk(rows, data_procesare=None, ridica_erori_date=False):
+    """
+    Salvează mai multe bonuri într-o singură tranzacție (o conexiune, un INSERT multi-rând).
+    Folosit la finalizarea unui bon de producție care acoperă mai multe comenzi.
+    O pereche (sku, order_number) deja salvată, chiar și în altă zi, nu primește un rând nou:
+    se actualizează cantitatea rândului existent (data_procesare inițială rămâne).
+
+    Args:
+        rows: Listă de tuple (sku, nume, cantitate, order_id, order_number)
+        data_procesare: Data bonurilor 'YYYY-MM-DD' (implicit azi; jurnalul o păstrează pe cea originală)
+        ridica_erori_date: True = rândurile respinse de Postgres (DataError / IntegrityError) sau
+                           malformate ridică EroareDateBonuri, ca apelantul să le poată separa
+                           de erorile de conexiune (jurnal_bonuri)
+
+    Returns:
+        True dacă salvarea a reușit (sau nu era nimic de salvat), False altfel
+    """
+    today = data_procesare or datetime.now().strftime('%Y-%m-%d')
+
+    # ON CONFLICT nu acceptă aceeași cheie de două ori în aceeași comandă SQL -
+    # păstrăm ultima apariție pentru fiecare (sku, order_number). Rândurile fără
+    # order_number nu intră în conflict (NULL e distinct în indexul unic).
+    unice = {}
+    try:
+        for idx, (sku, nume, cantitate, order_id, order_number) in enumerate(rows):
+            cheie = (sku, order_number) if order_number is not None else idx
+            unice[cheie] = (sku, nume, cantitate, order_id, order_number, today)
+    except (TypeError, ValueError) as e:
+        logger.error(f"❌ Rânduri de bonuri malformate: {e}")
+        if ridica_erori_date:
+            raise EroareDateBonuri(f"Rânduri malformate: {e}") from e
         return False
 
+    valori = list(unice.values())
+    if not valori:
+        return True
     try:
-        cur = conn.cursor()
-        today = datetime.now().strftime('%Y-%m-%d')
+        comenzi = sorted({v[4] for v in valori if v[4] is not None})
+    except TypeError as e:
+        logger.error(f"❌ Numere de comandă malformate: {e}")
+        if ridica_erori_date:
+            raise EroareDateBonuri(f"Numere de comandă malformate: {e}") from e
+        return False
 
-        # INSERT cu ON CONFLICT pentru a evita duplicate
-        cur.execute('''
-            INSERT INTO bonuri_procesate (sku, nume_produs, cantitate, order_id, order_number, data_procesare)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (sku, order_number) DO UPDATE SET
-                cantitate = EXCLUDED.cantitate,
-                data_procesare = EXCLUDED.data_procesare
-            RETURNING id
-        ''', (sku, nume, cantitate, order_id, order_number, today))
-
-        result = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+    try:
+        with conexiune() as conn:
+            if not conn:
+                return False
 
-        logger.info(f"💾 Bon salvat în DB: {sku} (comanda #{order_number})")
+            cur = conn.cursor()
+
+            # Un rând per (sku, order_number) peste toate zilele (migrarea 6): perechile deja
+            # salvate se actualizează pe rândul lor. Lock-ul per comandă (în ordine, fără deadlock)
+            # împiedică două salvări simultane ale aceleiași perechi să insereze amândouă.
+            existente = {}
+            if comenzi:
+                for order_number in comenzi:
+                    cur.execute('SELECT pg_advisory_xact_lock(%s, %s)', (_SPATIU_LOCK_COMENZI, order_number))
+                cur.execute('''
+                    SELECT sku, order_number, id, data_procesare FROM bonuri_procesate
+                    WHERE order_number = ANY(%s)
+                ''', (comenzi,))
+                existente = {(sku, order_number): (id_bon, data) for sku, order_number, id_bon, data in cur.fetchall()}
+
+            actualizari = [(v[2], *existente[(v[0], v[4])]) for v in valori if (v[0], v[4]) in existente]
+            noi = [v for v in valori if (v[0], v[4]) not in existente]
+
+            if actualizari:
+                execute_values(cur, '''
+                    UPDATE bonuri_procesate AS b SET cantitate = v.cantitate
+                    FROM (VALUES %s) AS v (cantitate, id, data_procesare)
+                    WHERE b.id = v.id AND b.data_procesare = v.data_procesare
+                ''', actualizari, template='(%s::numeric, %s::integer, %s::date)', page_size=len(actualizari))
+            if noi:
+                execute_values(cur, '''
+                    INSERT INTO bonuri_procesate (sku, nume_produs, cantitate, order_id, order_number, data_procesare)
+                    VALUES %s
+                    ON CONFLICT (sku, order_number, data_procesare) DO UPDATE SET
+                        cantitate = EXCLUDED.cantitate
+                ''', noi, page_size=len(noi))
+            cur.close()
+
+        logger.info(f"💾 {len(valori)} bonuri salvate în DB ({len(noi)} noi, {len(actualizari)} actualizate)")
         return True
+    except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+        logger.error(f"❌ Bonuri respinse de DB (date invalide): {e}")
+        if ridica_erori_date:
+            raise EroareDateBonuri(str(e).strip()) from e
+        return False
     except Exception as e:
-        logger.error(f"❌ Eroare salvare în DB: {e}")
+        logger.error(f"❌ Eroare salvare bulk în DB: {e}")
         return False
 
-
 def verificare_bon_exista(sku, order_number):
     """
     Verifică dacă un bon pentru un SKU și o comandă specifică există deja.
@@ -121,20 +916,19 @@ def verificare_bon_exista(sku, order_number):
     Returns:
         True dacă există, False altfel
     """
-    conn = get_db_connection()
-    if not conn:
-        return False
-
     try:
-        cur = conn.cursor()
-        cur.execute('''
-            SELECT id FROM bonuri_procesate
-            WHERE sku = %s AND order_number = %s
-        ''', (sku, order_number))
+        with conexiune() as conn:
+            if not conn:
+                return False
+
+            cur = conn.cursor()
+            cur.execute('''
+                SELECT id FROM bonuri_procesate
+                WHERE sku = %s AND order_number = %s
+            ''', (sku, order_number))
 
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
+            result = cur.fetchone()
+            cur.close()
 
         return result is not None
     except Exception as e:
@@ -142,33 +936,54 @@ def verificare_bon_exista(sku, order_number):
         return False
 
 
-def get_bonuri_procesate_pentru_comenzi(order_numbers):
+def luni_smart_resume(luni=None):
+    """Fereastra căutării Smart Resume, în luni (0 = toate partițiile active)"""
+    luni = max(SMART_RESUME_LUNI if luni is None else luni, 0)
+    return min(luni, BONURI_LUNI_ACTIVE) if BONURI_LUNI_ACTIVE > 0 else luni
+
+
+def get_bonuri_procesate_pentru_comenzi(order_numbers, luni=None):
     """
     Returnează toate bonurile procesate pentru o listă de comenzi.
     Util pentru Smart Resume - verifică ce s-a procesat deja.
 
+    Implicit caută în toate partițiile active: latența rămâne constantă prin indexul acoperitor
+    (order_number) INCLUDE (sku) și prin arhivarea partițiilor mai vechi de BONURI_LUNI_ACTIVE.
+    Bonurile din partițiile arhivate (arhiva_bonuri) nu sunt consultate - comenzile mai vechi
+    de BONURI_LUNI_ACTIVE luni nu mai sunt recunoscute ca procesate.
+    O fereastră mai îngustă (SMART_RESUME_LUNI / `luni` > 0) adaugă un predicat pe cheia de
+    partiționare; e opțională, pentru că bonurile din afara ei ar fi create din nou.
+
     Args:
         order_numbers: Lista de numere de comenzi
+        luni: fereastra în luni (None = SMART_RESUME_LUNI, 0 = fără fereastră)
 
     Returns:
         Set de tuple (sku, order_number) deja procesate
     """
-    conn = get_db_connection()
-    if not conn:
-        return set()
+    luni = luni_smart_resume(luni)
 
     try:
-        cur = conn.cursor()
+        with conexiune() as conn:
+            if not conn:
+                return set()
 
-        # Folosim ANY pentru a căuta în lista de comenzi
-        cur.execute('''
-            SELECT sku, order_number FROM bonuri_procesate
-            WHERE order_number = ANY(%s)
-        ''', (list(order_numbers),))
+            cur = conn.cursor()
+
+            # Folosim ANY pentru a căuta în lista de comenzi
+            if luni:
+                cur.execute('''
+                    SELECT sku, order_number FROM bonuri_procesate
+                    WHERE order_number = ANY(%s) AND data_procesare >= %s
+                ''', (list(order_numbers), _inceput_fereastra(luni)))
+            else:
+                cur.execute('''
+                    SELECT sku, order_number FROM bonuri_procesate
+                    WHERE order_number = ANY(%s)
+                ''', (list(order_numbers),))
 
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+            rows = cur.fetchall()
+            cur.close()
 
         # Returnăm set de tuple pentru căutare rapidă O(1)
         return {(row[0], row[1]) for row in rows}
@@ -179,23 +994,22 @@ def get_bonuri_procesate_pentru_comenzi(order_numbers):
 
 def get_bonuri_azi():
     """Returnează lista de bonuri procesate astăzi (pentru compatibilitate)"""
-    conn = get_db_connection()
-    if not conn:
-        return []
-
     try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        today = datetime.now().strftime('%Y-%m-%d')
+        with conexiune() as conn:
+            if not conn:
+                return []
 
-        cur.execute('''
-            SELECT sku, nume_produs, order_id, order_number
-            FROM bonuri_procesate
-            WHERE data_procesare = %s
-        ''', (today,))
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            today = datetime.now().strftime('%Y-%m-%d')
+
+            cur.execute('''
+                SELECT sku, nume_produs, order_id, order_number
+                FROM bonuri_procesate
+                WHERE data_procesare = %s
+            ''', (today,))
 
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+            rows = cur.fetchall()
+            cur.close()
 
         rezultate = []
         for row in rows:
@@ -213,33 +1027,137 @@ def get_bonuri_azi():
 
 
 def get_statistici_azi():
-    """Returnează statistici pentru ziua curentă"""
-    conn = get_db_connection()
-    if not conn:
+    """Returnează statistici pentru ziua curentă (din tabelele pre-agregate)"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    zile = get_statistici_zilnice(today, today)
+    if zile is None:
         return {}
 
+    zi = zile[0] if zile else {}
+    return {
+        'total_bonuri': zi.get('total_bonuri', 0),
+        'total_comenzi': zi.get('total_comenzi', 0),
+        'total_cantitate': zi.get('total_cantitate', 0.0)
+    }
+
+
+def get_statistici_zilnice(data_start, data_sfarsit):
+    """
+    Totalurile per zi dintr-un interval (inclusiv capetele), din statistici_zilnice_*
+
+    Args:
+        data_start: Data de început 'YYYY-MM-DD' (sau date)
+        data_sfarsit: Data de sfârșit 'YYYY-MM-DD' (sau date)
+
+    Returns:
+        Listă de dict-uri {data, total_bonuri, total_comenzi, total_cantitate} ordonate după dată,
+        sau None dacă baza de date nu este disponibilă
+    """
     try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        today = datetime.now().strftime('%Y-%m-%d')
+        with conexiune() as conn:
+            if not conn:
+                return None
 
-        cur.execute('''
-            SELECT
-                COUNT(*) as total_bonuri,
-                COUNT(DISTINCT order_number) as total_comenzi,
-                SUM(cantitate) as total_cantitate
-            FROM bonuri_procesate
-            WHERE data_procesare = %s
-        ''', (today,))
-
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-
-        return {
-            'total_bonuri': row['total_bonuri'] or 0,
-            'total_comenzi': row['total_comenzi'] or 0,
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute('''
+                SELECT s.data,
+                       SUM(s.bonuri) AS total_bonuri,
+                       SUM(s.cantitate) AS total_cantitate,
+                       (SELECT COUNT(*) FROM statistici_zilnice_comenzi c WHERE c.data = s.data) AS total_comenzi
+                FROM statistici_zilnice_sku s
+                WHERE s.data BETWEEN %s AND %s
+                GROUP BY s.data
+                HAVING SUM(s.bonuri) > 0
+                ORDER BY s.data
+            ''', (data_start, data_sfarsit))
+
+            rows = cur.fetchall()
+            cur.close()
+
+        return [{
+            'data': row['data'].isoformat(),
+            'total_bonuri': int(row['total_bonuri'] or 0),
+            'total_comenzi': int(row['total_comenzi'] or 0),
             'total_cantitate': float(row['total_cantitate'] or 0)
-        }
+        } for row in rows]
     except Exception as e:
         logger.error(f"❌ Eroare statistici DB: {e}")
-        return {}
+        return None
+
+
+def get_statistici_sku(data_start, data_sfarsit, ml=None):
+    """
+    Totalurile per SKU dintr-un interval (pentru dashboard-ul pe produse)
+
+    Args:
+        data_start / data_sfarsit: Intervalul 'YYYY-MM-DD' (inclusiv capetele)
+        ml: Filtrează doar decanturile de această mărime (opțional)
+
+    Returns:
+        Listă de dict-uri {sku, ml, bonuri, cantitate} ordonate descrescător după cantitate,
+        sau None dacă baza de date nu este disponibilă
+    """
+    try:
+        with conexiune() as conn:
+            if not conn:
+                return None
+
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute('''
+                SELECT sku, ml, SUM(bonuri) AS bonuri, SUM(cantitate) AS cantitate
+                FROM statistici_zilnice_sku
+                WHERE data BETWEEN %s AND %s
+                  AND (%s IS NULL OR ml = %s)
+                GROUP BY sku, ml
+                HAVING SUM(bonuri) > 0
+                ORDER BY SUM(cantitate) DESC, sku
+            ''', (data_start, data_sfarsit, ml, ml))
+
+            rows = cur.fetchall()
+            cur.close()
+
+        return [{
+            'sku': row['sku'],
+            'ml': row['ml'],
+            'bonuri': int(row['bonuri']),
+            'cantitate': float(row['cantitate'] or 0)
+        } for row in rows]
+    except Exception as e:
+        logger.error(f"❌ Eroare statistici DB: {e}")
+        return None
+
+
+def get_statistici_ml(data_start, data_sfarsit):
+    """
+    Totalurile per mărime de decant (3 / 5 / 10 ml; None = produse întregi) dintr-un interval
+
+    Returns:
+        Listă de dict-uri {ml, bonuri, cantitate, produse}, sau None dacă baza de date nu este disponibilă
+    """
+    try:
+        with conexiune() as conn:
+            if not conn:
+                return None
+
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute('''
+                SELECT ml, SUM(bonuri) AS bonuri, SUM(cantitate) AS cantitate, COUNT(DISTINCT sku) AS produse
+                FROM statistici_zilnice_sku
+                WHERE data BETWEEN %s AND %s
+                GROUP BY ml
+                HAVING SUM(bonuri) > 0
+                ORDER BY ml NULLS LAST
+            ''', (data_start, data_sfarsit))
+
+            rows = cur.fetchall()
+            cur.close()
+
+        return [{
+            'ml': row['ml'],
+            'bonuri': int(row['bonuri']),
+            'cantitate': float(row['cantitate'] or 0),
+            'produse': int(row['produse'])
+        } for row in rows]
+    except Exception as e:
+        logger.error(f"❌ Eroare statistici DB: {e}")
+        return None
@@ -6,7 +6,6 @@ OBSID - Platformă de management decanturi parfumuri
 
 from flask import Flask, render_template, request, jsonify, send_file
 import pandas as pd
-import re
 from collections import defaultdict
 from pathlib import Path
 import os
@@ -14,6 +13,12 @@ from datetime import datetime
 from werkzeug.utils import secure_filename
 import io
 
+# gunicorn rulează "app.app:app" din rădăcina proiectului, local se rulează direct din app/
+try:
+    from app.tokenizer_produse import tokenizeazaProdus
+except ImportError:
+    from tokenizer_produse import tokenizeazaProdus
+
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -36,25 +41,11 @@ def extrageInfoProdus(text_produs):
     Extrage informații din textul produsului
     Returns: (nume_parfum, cantitate_ml, numar_bucati) sau None dacă nu e decant
     """
-    if 'Decant' not in text_produs:
-        return None
-
-    # Extrage cantitatea în ml (3 ml, 5 ml, 10 ml)
-    match_ml = re.search(r'Decant (\d+) ml parfum (.+?),', text_produs)
-    if not match_ml:
+    record = tokenizeazaProdus(text_produs)
+    if not record.este_decant:
         return None
 
-    cantitate_ml = int(match_ml.group(1))
-    nume_parfum = match_ml.group(2).strip()
-
-    # Extrage numărul de bucăți
-    match_bucati = re.search(r'(\d+\.\d+)$', text_produs.strip())
-    if match_bucati:
-        numar_bucati = float(match_bucati.group(1))
-    else:
-        numar_bucati = 1.0
-
-    return (nume_parfum, cantitate_ml, int(numar_bucati))
+    return (record.nume_parfum, record.ml, record.bucati)
 
 
 def proceseazaComenzi(fisier_path):
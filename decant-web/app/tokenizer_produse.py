@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Tokenizer pentru liniile de produs din exporturile de comenzi
+O singură expresie precompilată parcurge linia o dată și extrage toate câmpurile:
+decant / produs întreg, ml, nume parfum, brand, bucăți, nume curățat și cheia normalizată.
+
+Exemple de linii:
+    "Decant 5 ml parfum Yum Yum Armaf, parfum femei, 1.00"
+    "Parfum Opulent Red, Lattafa, Femei - 100 ml, 1.00"
+"""
+
+import re
+from collections import namedtuple
+
+# Gramatica liniei (ancorată, un singur pas, fără backtracking pe prefix):
+#   [<orice> "Decant " <ml> " ml parfum " <nume> ","]  [<orice> <non-cifră>]  <coada din cifre și puncte>
+# Prefixul sare peste fiecare "D" care nu începe un decant valid (echivalent cu re.search),
+# iar coada e ultima secvență de cifre / puncte, din care se ia cantitatea "X.YY".
+_PATTERN_LINIE = re.compile(
+    r'(?:[^D]*+(?:D(?!ecant \d+ ml parfum (?-s:.+?),)[^D]*+)*+'
+    r'Decant (?P<ml>\d+) ml parfum (?P<nume>(?-s:.+?)),)?'
+    r'(?:.*[^\d.])?+'
+    r'(?P<coada>[\d.]*)$',
+    re.DOTALL
+)
+
+# Caracterele păstrate de normalizare: doar a-z și 0-9 (restul octeților ASCII sunt șterși)
+_OCTETI_NON_ALFANUMERICI = bytes(
+    c for c in range(128) if not (ord('a') <= c <= ord('z') or ord('0') <= c <= ord('9'))
+)
+
+RecordProdus = namedtuple('RecordProdus', [
+    'este_decant',   # linie "Decant X ml parfum ..., ..." recunoscută
+    'este_intreg',   # linie fără "Decant" (produs întreg: parfum 100ml, difuzor etc.)
+    'ml',            # cantitatea decantului (0 pentru produse întregi)
+    'nume_parfum',   # numele parfumului din linia de decant (None pentru produse întregi)
+    'brand',         # brandul recunoscut din catalog (None dacă nu e găsit)
+    'bucati',        # numărul de bucăți (ultimul "X.YY" din linie, default 1)
+    'nume_curat',    # linia fără ", X.YY" de la final (folosită pentru căutarea SKU)
+    'nume_intreg',   # numele produsului întreg (linia fără ultimul segment ", X.YY")
+    'cheie',         # nume_curat normalizat (cheia din PRODUCT_DB)
+])
+
+
+def normalizeaza(text):
+    """
+    Normalizează numele produsului pentru matching:
+    - lowercase
+    - elimină 'parfum'
+    - elimină caractere non-alfanumerice
+    """
+    if not isinstance(text, str):
+        return ""
+    # Caracterele non-ASCII nu sunt niciodată a-z / 0-9, deci pot fi aruncate la codare
+    text = text.lower().replace('parfum', '').encode('ascii', 'ignore')
+    return text.translate(None, _OCTETI_NON_ALFANUMERICI).decode('ascii')
+
+
+def _cantitateDinCoada(coada):
+    """
+    Cantitatea "X.YY" de la finalul cozii de cifre / puncte (ca re.search(r'(\d+\.\d+)$'))
+    Returns: textul cantității sau None
+    """
+    inainte, punct, zecimale = coada.rpartition('.')
+    if not punct or not zecimale:
+        return None
+    intregi = inainte.rpartition('.')[2]
+    if not intregi:
+        return None
+    return f"{intregi}.{zecimale}"
+
+
+class TokenizerProduse:
+    """Tokenizer cu pattern-uri precompilate (inclusiv lista de branduri din catalog)"""
+
+    def __init__(self, branduri=()):
+        branduri = sorted({b.strip() for b in branduri if isinstance(b, str) and b.strip()},
+                          key=len, reverse=True)
+        self._branduri = {b.lower(): b for b in branduri}
+        self._pattern_brand = None
+        if branduri:
+            # Cele mai lungi primele, ca "Lattafa Perfumes" să câștige în fața "Lattafa"
+            self._pattern_brand = re.compile(
+                r'\b(?:' + '|'.join(re.escape(b) for b in branduri) + r')\b',
+                re.IGNORECASE
+            )
+
+    def _gasesteBrand(self, text):
+        if self._pattern_brand is None or not text:
+            return None
+        match = self._pattern_brand.search(text)
+        return self._branduri.get(match.group(0).lower()) if match else None
+
+    def tokenizeaza(self, text_produs):
+        """
+        Parsează o linie de produs
+        Returns: RecordProdus
+        """
+        text = text_produs.strip()
+        match = _PATTERN_LINIE.match(text)
+
+        ml = match.group('ml')
+        nume_parfum = match.group('nume')
+        bucati_text = _cantitateDinCoada(match.group('coada'))
+
+        if bucati_text is not None:
+            bucati = int(float(bucati_text))
+            start = len(text) - len(bucati_text)
+            # Doar ", X.YY" de la final se scoate din nume (ca re.sub(r', \d+\.\d+$', ...))
+            nume_curat = text[:start - 2] if text[start - 2:start] == ', ' else text
+            nume_intreg = text.rsplit(',', 1)[0].strip()
+        else:
+            bucati = 1
+            nume_curat = text
+            nume_intreg = text
+
+        if ml is not None:
+            nume_parfum = nume_parfum.strip()
+            este_intreg = False
+        else:
+            este_intreg = 'Decant' not in text
+
+        return RecordProdus(
+            ml is not None,                 # este_decant
+            este_intreg,
+            int(ml) if ml is not None else 0,
+            nume_parfum,
+            self._gasesteBrand(nume_parfum if ml is not None else nume_curat),
+            bucati,
+            nume_curat,
+            nume_intreg,
+            normalizeaza(nume_curat),       # cheie
+        )
+
+
+# Tokenizer-ul implicit (fără branduri până la încărcarea catalogului)
+_tokenizer = TokenizerProduse()
+
+
+def seteazaBranduri(branduri):
+    """Reconstruiește tokenizer-ul implicit cu brandurile din catalog"""
+    global _tokenizer
+    _tokenizer = TokenizerProduse(branduri)  # Înlocuire atomică a referinței
+
+
+def tokenizeazaProdus(text_produs):
+    """Parsează o linie de produs cu tokenizer-ul implicit. Returns: RecordProdus"""
+    return _tokenizer.tokenizeaza(text_produs)
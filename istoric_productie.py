@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Index local, incremental, al bonurilor de producție din raportul Oblio (/report/production)
+Smart Resume parcurgea la fiecare rulare până la 10 pagini de raport (cu time.sleep(2) per pagină),
+păstra textul brut al rândurilor și căuta fiecare SKU / nume de parfum în fiecare text (O(bonuri × rânduri)).
+Acum rândurile se parsează o singură dată în înregistrări (id producție, număr, dată, produs, SKU,
+cantitate) și se păstrează în SQLite. La sincronizare se citesc doar paginile cu bonuri mai noi
+decât ultimul id văzut. Dacă o sincronizare se oprește la max_pages înainte de rândurile deja
+indexate, ținta ei (limita de jos) se păstrează, iar următoarele citesc până la ea - altfel
+bonurile din gol n-ar mai fi indexate niciodată. Verificarea unui bon devine o căutare într-un set:
+- SKU-urile exacte din rând (nu subșir: "6291107450445" nu mai "găsește" "6291107450445-3")
+- perechea (ml, nume parfum normalizat) din "Decant X ml parfum <nume>"
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import tokenizer_produse
+
+logger = logging.getLogger(__name__)
+
+ISTORIC_DB_PATH = os.getenv('ISTORIC_PRODUCTIE_PATH', os.path.join('uploads', 'istoric_productie.sqlite'))
+
+# Rândurile mai vechi de atâtea zile se șterg (Smart Resume folosește doar ziua curentă)
+ISTORIC_PASTRARE_ZILE = int(os.getenv('ISTORIC_PASTRARE_ZILE', '30'))
+
+_RE_ID = re.compile(r'/preview_production/(\d+)')
+_RE_DATA = re.compile(r'\b(\d{2})\.(\d{2})\.(\d{4})\b')
+# SKU-urile sunt coduri EAN cu sufix opțional de decant (-3, -5, -10) sau coduri alfanumerice cu cifre
+_RE_TOKEN = re.compile(r'[A-Za-z0-9]+(?:-[A-Za-z0-9]+)*')
+_RE_DECANT = re.compile(r'Decant (\d+) ?ml (?:parfum )?(.+)', re.IGNORECASE)
+_RE_CANTITATE = re.compile(r'^\d+(?:[.,]\d+)?$')
+
+RandProductie = namedtuple('RandProductie', ['productie_id', 'numar', 'data', 'produs', 'skuri', 'cantitate'])
+
+_lock = threading.Lock()
+_stare = {'sincronizari': 0, 'randuri_noi': 0, 'pagini_citite': 0, 'ultima_sincronizare': None}
+
+
+def _conexiune():
+    """Conexiune SQLite (o conexiune per apel, ca în catalog_produse.py)"""
+    director = os.path.dirname(ISTORIC_DB_PATH)
+    if director:
+        os.makedirs(director, exist_ok=True)
+
+    conn = sqlite3.connect(ISTORIC_DB_PATH, timeout=10)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bonuri_oblio (
+            productie_id INTEGER PRIMARY KEY,
+            numar TEXT,
+            data TEXT NOT NULL,
+            produs TEXT,
+            skuri TEXT,
+            cantitate REAL,
+            vazut_la REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bonuri_oblio_data ON bonuri_oblio (data)')
+    conn.execute('CREATE TABLE IF NOT EXISTS stare_sincronizare (cheie TEXT PRIMARY KEY, valoare INTEGER)')
+    return conn
+
+
+def _este_sku(token):
+    return len(token) > 3 and any(c.isdigit() for c in token)
+
+
+def cheie_parfum(nume):
+    """
+    Cheia (ml, nume parfum normalizat) a unui decant, ex. "Decant 5 ml parfum Khamrah, Lattafa"
+    Returns: tuple sau None pentru produse care nu sunt decanturi / nume prea scurte
+    """
+    match = _RE_DECANT.search(nume or '')
+    if not match:
+        return None
+    nume_parfum = tokenizer_produse.normalizeaza(match.group(2))
+    if len(nume_parfum) <= 4:
+        return None
+    return int(match.group(1)), nume_parfum
+
+
+def parseaza_rand(href, numar, celule):
+    """
+    Un rând din tabelul raportului: link-ul bonului (a.font-bold) și textele celulelor
+    Returns: RandProductie sau None dacă rândul nu are id de producție sau dată
+    """
+    match_id = _RE_ID.search(href or '')
+    if not match_id:
+        return None
+
+    data = None
+    produs = None
+    cantitate = None
+    skuri = set()
+
+    for celula in celule:
+        text = (celula or '').strip()
+        if not text:
+            continue
+        if data is None:
+            match_data = _RE_DATA.search(text)
+            if match_data:
+                zi, luna, an = match_data.groups()
+                data = f"{an}-{luna}-{zi}"
+                continue
+        if text == numar:
+            continue
+        if _RE_CANTITATE.match(text):
+            if cantitate is None:
+                cantitate = float(text.replace(',', '.'))
+            continue
+
+        skuri.update(token for token in _RE_TOKEN.findall(text) if _este_sku(token))
+        # Produsul: celula cu decantul, altfel cea mai lungă celulă de text
+        if _RE_DECANT.search(text) or produs is None or (not _RE_DECANT.search(produs) and len(text) > len(produs)):
+            produs = text
+
+    if data is None:
+        return None
+    return RandProductie(int(match_id.group(1)), numar, data, produs, frozenset(skuri), cantitate)
+
+
+def ultimul_id():
+    """Cel mai nou id de producție deja indexat (0 dacă indexul e gol)"""
+    with _lock:
+        conn = _conexiune()
+        try:
+            return conn.execute('SELECT COALESCE(MAX(productie_id), 0) FROM bonuri_oblio').fetchone()[0]
+        finally:
+            conn.close()
+
+
+def limita_jos():
+    """
+    Ținta rămasă de la o sincronizare întreruptă: rândurile cu id mai mare au fost citite doar parțial
+    Returns: id-ul până la care trebuie citit raportul sau None dacă indexul nu are goluri
+    """
+    with _lock:
+        conn = _conexiune()
+        try:
+            rand = conn.execute("SELECT valoare FROM stare_sincronizare WHERE cheie = 'limita_jos'").fetchone()
+        finally:
+            conn.close()
+    return rand[0] if rand else None
+
+
+def seteaza_limita_jos(valoare):
+    """Păstrează ținta unei sincronizări neterminate (None = indexul e complet)"""
+    with _lock:
+        conn = _conexiune()
+        try:
+            with conn:
+                if valoare is None:
+                    conn.execute("DELETE FROM stare_sincronizare WHERE cheie = 'limita_jos'")
+                else:
+                    conn.execute("INSERT OR REPLACE INTO stare_sincronizare (cheie, valoare) VALUES ('limita_jos', ?)",
+                                 (valoare,))
+        finally:
+            conn.close()
+
+
+def adauga(randuri):
+    """Salvează rândurile parsate (un rând deja indexat nu se dublează). Returns: numărul de rânduri noi"""
+    randuri = [r for r in randuri if r is not None]
+    if not randuri:
+        return 0
+
+    acum = time.time()
+    with _lock:
+        conn = _conexiune()
+        try:
+            with conn:
+                inainte = conn.total_changes
+                conn.executemany(
+                    'INSERT OR IGNORE INTO bonuri_oblio (productie_id, numar, data, produs, skuri, cantitate, vazut_la) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [
+                        (r.productie_id, r.numar, r.data, r.produs, ' '.join(sorted(r.skuri)), r.cantitate, acum)
+                        for r in randuri
+                    ]
+                )
+                noi = conn.total_changes - inainte
+                limita = datetime.fromtimestamp(acum - ISTORIC_PASTRARE_ZILE * 86400).strftime('%Y-%m-%d')
+                conn.execute('DELETE FROM bonuri_oblio WHERE data < ?', (limita,))
+        finally:
+            conn.close()
+        _stare['randuri_noi'] += noi
+    return noi
+
+
+def inregistreaza_sincronizare(pagini):
+    with _lock:
+        _stare['sincronizari'] += 1
+        _stare['pagini_citite'] += pagini
+        _stare['ultima_sincronizare'] = time.time()
+
+
+class IndexZi:
+    """Bonurile unei zile, gata de căutare O(1) după SKU sau după (ml, nume parfum)"""
+
+    def __init__(self, randuri):
+        self.randuri = len(randuri)
+        self.skuri = set()
+        self.parfumuri = set()
+        for produs, skuri in randuri:
+            self.skuri.update((skuri or '').split())
+            cheie = cheie_parfum(produs)
+            if cheie:
+                self.parfumuri.add(cheie)
+
+    def contine(self, sku, nume):
+        """Bonul (SKU, nume produs) apare deja în raportul zilei"""
+        if sku and len(sku) > 3 and sku in self.skuri:
+            return True
+        cheie = cheie_parfum(nume)
+        return cheie is not None and cheie in self.parfumuri
+
+
+def index_zi(data=None):
+    """IndexZi pentru data 'YYYY-MM-DD' (implicit azi)"""
+    data = data or datetime.now().strftime('%Y-%m-%d')
+    with _lock:
+        conn = _conexiune()
+        try:
+            randuri = conn.execute('SELECT produs, skuri FROM bonuri_oblio WHERE data = ?', (data,)).fetchall()
+        finally:
+            conn.close()
+    return IndexZi(randuri)
+
+
+def statistici():
+    """Starea indexului (pentru /health/detalii)"""
+    try:
+        with _lock:
+            conn = _conexiune()
+            try:
+                total, maxim = conn.execute('SELECT COUNT(*), MAX(productie_id) FROM bonuri_oblio').fetchone()
+                gol = conn.execute("SELECT valoare FROM stare_sincronizare WHERE cheie = 'limita_jos'").fetchone()
+            finally:
+                conn.close()
+    except sqlite3.Error as e:
+        return {'eroare': str(e)}
+    return {'randuri': total, 'ultimul_id': maxim, 'limita_jos': gol[0] if gol else None, **_stare}
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Joburi persistente pentru rulările automatizării (SQLite în uploads/, ca celelalte cache-uri locale)
+Până acum o rulare exista doar în memoria procesului (automation_active, stop_requested, lista de
+bonuri din task-ul de fundal): la un restart sau la închiderea tab-ului progresul se pierdea.
+Un job păstrează lista de bonuri și starea fiecăruia, așa că o rulare mare se reia exact de unde
+a rămas, fără un nou scraping al bonurilor de azi din Oblio.
+
+Stări job:  in_asteptare -> in_lucru -> finalizat / oprit / eroare
+            in_lucru -> intrerupt (procesul a murit în timpul rulării; se reia)
+Stări bon:  in_asteptare -> reusit / esuat (definitiv, ex. stoc insuficient) / reincercare / omis
+            (omis = deja procesat, găsit de Smart Resume la prima rulare)
+
+- creeaza(): job nou în coadă; revendica(): îl ia în lucru atomic (un singur executant)
+- bonuri_ramase(): ce mai e de făcut - bonurile poartă cheia '_job_idx' prin tot fluxul
+- marcheaza_bon() / finalizeaza(): progresul, scris imediat pe disc
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOBURI_DB_PATH = os.getenv('JOBURI_PATH', os.path.join('uploads', 'joburi.sqlite'))
+
+# Stările din care un job poate fi (re)luat în lucru
+STARI_RELUABILE = ('in_asteptare', 'intrerupt', 'oprit', 'eroare')
+# Stările bonurilor care mai trebuie procesate la o reluare
+STARI_BON_RAMASE = ('in_asteptare', 'reincercare')
+
+_lock = threading.Lock()
+
+
+def _conexiune():
+    """Conexiune SQLite (o conexiune per apel, ca în catalog_produse.py)"""
+    director = os.path.dirname(JOBURI_DB_PATH)
+    if director:
+        os.makedirs(director, exist_ok=True)
+
+    conn = sqlite3.connect(JOBURI_DB_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS joburi (
+            id TEXT PRIMARY KEY,
+            stare TEXT NOT NULL,
+            force_mode INTEGER NOT NULL DEFAULT 0,
+            verificat INTEGER NOT NULL DEFAULT 0,
+            transfer TEXT NOT NULL DEFAULT 'nefacut',
+            oprire_ceruta INTEGER NOT NULL DEFAULT 0,
+            rulari INTEGER NOT NULL DEFAULT 0,
+            eroare TEXT,
+            creat_la REAL NOT NULL,
+            actualizat_la REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS bonuri_job (
+            job_id TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            sku TEXT,
+            bon TEXT NOT NULL,
+            stare TEXT NOT NULL DEFAULT 'in_asteptare',
+            incercari INTEGER NOT NULL DEFAULT 0,
+            mesaj TEXT,
+            actualizat_la REAL NOT NULL,
+            PRIMARY KEY (job_id, idx)
+        );
+        CREATE INDEX IF NOT EXISTS idx_joburi_stare ON joburi (stare, creat_la);
+    ''')
+    return conn
+
+
+def _executa(functie):
+    """Rulează functie(conn) într-o tranzacție, serializat în proces"""
+    with _lock:
+        conn = _conexiune()
+        try:
+            with conn:
+                return functie(conn)
+        finally:
+            conn.close()
+
+
+def _fara_cheie_job(bon):
+    return {k: v for k, v in bon.items() if k != '_job_idx'}
+
+
+def creeaza(bonuri, force_mode=False):
+    """
+    Pune în coadă un job nou
+
+    Args:
+        bonuri (list): dict-uri bon (sku, cantitate, nume, order_ids, order_numbers)
+        force_mode (bool): fără verificarea duplicatelor la prima rulare
+
+    Returns:
+        str: ID-ul jobului
+    """
+    job_id = uuid.uuid4().hex[:12]
+    acum = time.time()
+
+    def scrie(conn):
+        conn.execute(
+            'INSERT INTO joburi (id, stare, force_mode, creat_la, actualizat_la) VALUES (?, ?, ?, ?, ?)',
+            (job_id, 'in_asteptare', int(bool(force_mode)), acum, acum)
+        )
+        conn.executemany(
+            'INSERT INTO bonuri_job (job_id, idx, sku, bon, actualizat_la) VALUES (?, ?, ?, ?, ?)',
+            [
+                (job_id, idx, bon.get('sku'), json.dumps(_fara_cheie_job(bon), ensure_ascii=False, default=str), acum)
+                for idx, bon in enumerate(bonuri, 1)
+            ]
+        )
+
+    _executa(scrie)
+    logger.info(f"📋 Job {job_id} creat: {len(bonuri)} bonuri")
+    return job_id
+
+
+def revendica(job_id=None):
+    """
+    Ia un job în lucru (atomic - două apeluri simultane nu pot lua același job)
+
+    Args:
+        job_id: jobul de reluat; None = cel mai vechi job din coadă (in_asteptare)
+
+    Returns:
+        dict-ul jobului (ca în job()) sau None dacă nu există / nu poate fi reluat
+    """
+    def actualizeaza(conn):
+        if job_id is None:
+            rand = conn.execute(
+                "SELECT id FROM joburi WHERE stare = 'in_asteptare' ORDER BY creat_la LIMIT 1"
+            ).fetchone()
+            if rand is None:
+                return None
+            de_luat = rand['id']
+        else:
+            de_luat = job_id
+
+        cursor = conn.execute(
+            f'''UPDATE joburi SET stare = 'in_lucru', oprire_ceruta = 0, eroare = NULL,
+                   rulari = rulari + 1, actualizat_la = ?
+                WHERE id = ? AND stare IN ({','.join('?' * len(STARI_RELUABILE))})''',
+            (time.time(), de_luat, *STARI_RELUABILE)
+        )
+        return de_luat if cursor.rowcount == 1 else None
+
+    luat = _executa(actualizeaza)
+    return job(luat) if luat else None
+
+
+def job(job_id, cu_bonuri=False):
+    """
+    Starea unui job: câmpurile lui + numărul de bonuri per stare (și lista bonurilor, opțional)
+    Returns: dict sau None dacă jobul nu există
+    """
+    def citeste(conn):
+        rand = conn.execute('SELECT * FROM joburi WHERE id = ?', (job_id,)).fetchone()
+        if rand is None:
+            return None
+        rezultat = dict(rand)
+        rezultat['force_mode'] = bool(rezultat['force_mode'])
+        rezultat['verificat'] = bool(rezultat['verificat'])
+        rezultat['oprire_ceruta'] = bool(rezultat['oprire_ceruta'])
+        rezultat['bonuri_pe_stari'] = {
+            stare: numar for stare, numar in conn.execute(
+                'SELECT stare, COUNT(*) FROM bonuri_job WHERE job_id = ? GROUP BY stare', (job_id,)
+            )
+        }
+        rezultat['total'] = sum(rezultat['bonuri_pe_stari'].values())
+        if cu_bonuri:
+            rezultat['bonuri'] = [
+                {
+                    'idx': r['idx'],
+                    'sku': r['sku'],
+                    'nume': json.loads(r['bon']).get('nume'),
+                    'stare': r['stare'],
+                    'incercari': r['incercari'],
+                    'mesaj': r['mesaj'],
+                }
+                for r in conn.execute(
+                    'SELECT idx, sku, bon, stare, incercari, mesaj FROM bonuri_job WHERE job_id = ? ORDER BY idx',
+                    (job_id,)
+                )
+            ]
+        return rezultat
+
+    return _executa(citeste)
+
+
+def lista(limita=20):
+    """Cele mai recente joburi (fără lista bonurilor)"""
+    ids = _executa(lambda conn: [
+        r['id'] for r in conn.execute('SELECT id FROM joburi ORDER BY creat_la DESC LIMIT ?', (limita,))
+    ])
+    return [j for j in (job(job_id) for job_id in ids) if j]
+
+
+def _bonuri_in_stari(job_id, stari):
+    def citeste(conn):
+        return [
+            {**json.loads(r['bon']), '_job_idx': r['idx']}
+            for r in conn.execute(
+                f'''SELECT idx, bon FROM bonuri_job
+                    WHERE job_id = ? AND stare IN ({','.join('?' * len(stari))}) ORDER BY idx''',
+                (job_id, *stari)
+            )
+        ]
+    return _executa(citeste)
+
+
+def bonuri_ramase(job_id):
+    """Bonurile încă neprocesate (sau de reîncercat), în ordinea inițială, cu cheia '_job_idx'"""
+    return _bonuri_in_stari(job_id, STARI_BON_RAMASE)
+
+
+def bonuri_reusite(job_id):
+    """Bonurile create cu succes (și la rulările anterioare) - pentru nota de transfer"""
+    return _bonuri_in_stari(job_id, ('reusit',))
+
+
+def marcheaza_bon(job_id, bon, stare, mesaj=None):
+    """Starea unui bon după o încercare (bon = dict cu '_job_idx'; fără cheie nu face nimic)"""
+    idx = bon.get('_job_idx')
+    if not job_id or idx is None:
+        return
+
+    _executa(lambda conn: conn.execute(
+        '''UPDATE bonuri_job SET stare = ?, mesaj = ?, incercari = incercari + 1, actualizat_la = ?
+           WHERE job_id = ? AND idx = ?''',
+        (stare, mesaj, time.time(), job_id, idx)
+    ))
+
+
+def aplica_verificare(job_id, bonuri_de_procesat):
+    """
+    Rezultatul Smart Resume de la prima rulare: bonurile care lipsesc din listă devin 'omis',
+    iar cele rămase își salvează forma filtrată (doar comenzile neprocesate)
+    """
+    pastrate = {bon['_job_idx']: bon for bon in bonuri_de_procesat if '_job_idx' in bon}
+    acum = time.time()
+
+    def scrie(conn):
+        # Bonurile rămase dar lipsă din lista filtrată devin 'omis' (-1 ține lista IN nevidă)
+        conn.execute(
+            f'''UPDATE bonuri_job SET stare = 'omis', mesaj = 'Deja procesat', actualizat_la = ?
+                WHERE job_id = ? AND stare IN ({','.join('?' * len(STARI_BON_RAMASE))})
+                  AND idx NOT IN ({','.join(['-1'] + ['?'] * len(pastrate))})''',
+            (acum, job_id, *STARI_BON_RAMASE, *pastrate)
+        )
+        conn.executemany(
+            'UPDATE bonuri_job SET bon = ?, actualizat_la = ? WHERE job_id = ? AND idx = ?',
+            [
+                (json.dumps(_fara_cheie_job(bon), ensure_ascii=False, default=str), acum, job_id, idx)
+                for idx, bon in pastrate.items()
+            ]
+        )
+        conn.execute('UPDATE joburi SET verificat = 1, actualizat_la = ? WHERE id = ?', (acum, job_id))
+
+    _executa(scrie)
+
+
+def marcheaza_transfer(job_id, stare):
+    """Starea notei de transfer: 'facut' / 'esuat' (o reluare nu o mai emite după 'facut')"""
+    _executa(lambda conn: conn.execute(
+        'UPDATE joburi SET transfer = ?, actualizat_la = ? WHERE id = ?', (stare, time.time(), job_id)
+    ))
+
+
+def finalizeaza(job_id, stare, eroare=None):
+    """Încheie rularea curentă: 'finalizat', 'oprit' sau 'eroare'"""
+    _executa(lambda conn: conn.execute(
+        'UPDATE joburi SET stare = ?, eroare = ?, actualizat_la = ? WHERE id = ?',
+        (stare, eroare, time.time(), job_id)
+    ))
+    logger.info(f"📋 Job {job_id}: {stare}{f' ({eroare})' if eroare else ''}")
+
+
+def cere_oprire(job_id):
+    """Oprire cerută din UI / REST - executantul o vede înainte de următorul bon"""
+    return _executa(lambda conn: conn.execute(
+        "UPDATE joburi SET oprire_ceruta = 1, actualizat_la = ? WHERE id = ? AND stare = 'in_lucru'",
+        (time.time(), job_id)
+    ).rowcount == 1)
+
+
+def oprire_ceruta(job_id):
+    if not job_id:
+        return False
+    return bool(_executa(lambda conn: conn.execute(
+        'SELECT oprire_ceruta FROM joburi WHERE id = ?', (job_id,)
+    ).fetchone()[0]))
+
+
+def recupereaza():
+    """
+    La pornirea aplicației: joburile rămase 'in_lucru' aparțin procesului anterior (mort) și
+    devin 'intrerupt', gata de reluare
+
+    Returns:
+        list: ID-urile joburilor întrerupte, cel mai vechi primul
+    """
+    def scrie(conn):
+        ids = [r['id'] for r in conn.execute(
+            "SELECT id FROM joburi WHERE stare = 'in_lucru' ORDER BY creat_la"
+        )]
+        conn.execute(
+            "UPDATE joburi SET stare = 'intrerupt', actualizat_la = ? WHERE stare = 'in_lucru'", (time.time(),)
+        )
+        return ids
+
+    try:
+        ids = _executa(scrie)
+    except sqlite3.Error as e:
+        logger.error(f"❌ Eroare recuperare joburi: {e}")
+        return []
+    if ids:
+        logger.info(f"🔁 Joburi întrerupte de restart: {', '.join(ids)}")
+    return ids
+
+
+def statistici():
+    """Numărul de joburi per stare (pentru /health/detalii)"""
+    try:
+        return _executa(lambda conn: {
+            stare: numar for stare, numar in conn.execute('SELECT stare, COUNT(*) FROM joburi GROUP BY stare')
+        })
+    except sqlite3.Error as e:
+        return {'eroare': str(e)}
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+Jurnal local (write-behind) pentru bonurile salvate în PostgreSQL
+Selenium nu mai așteaptă după baza de date: bonul finalizat în Oblio se scrie într-un
+fișier JSONL append-only (cu fsync), iar un green thread îl golește în Postgres în loturi,
+cu reîncercare. Ce a rămas negolit (DB căzut, restart) se reia la următoarea pornire.
+
+Format: o linie JSON per bon finalizat
+    {"la": 1700000000.0, "data": "2025-01-31", "rows": [[sku, nume, cantitate, order_id, order_number], ...]}
+Progresul golirii este offset-ul în octeți din fișierul <jurnal>.offset (scris atomic).
+Intrările respinse de Postgres ca date invalide (nu din cauza conexiunii) sunt mutate în
+<jurnal>.carantina, cu eroarea, ca să nu blocheze bonurile de după ele.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import database
+
+logger = logging.getLogger(__name__)
+
+JURNAL_PATH = os.getenv('JURNAL_BONURI_PATH', os.path.join('uploads', 'jurnal_bonuri.jsonl'))
+
+# Cât de des verifică flusher-ul jurnalul când nu a fost semnalat (secunde)
+INTERVAL_GOLIRE = float(os.getenv('JURNAL_INTERVAL', '2'))
+# Rânduri maxime trimise într-un singur upsert
+LOT_MAXIM = int(os.getenv('JURNAL_LOT', '500'))
+# Pauza maximă între reîncercări când Postgres nu răspunde (secunde)
+PAUZA_MAXIMA = 60
+
+_lock_scriere = threading.Lock()   # append-uri + compactare
+_lock_golire = threading.Lock()    # o singură golire la un moment dat
+_semnal = threading.Event()
+
+_stare = {
+    'flusher_activ': False,
+    'inregistrate': 0,
+    'golite': 0,
+    'in_carantina': 0,
+    'ultima_golire': None,
+    'ultima_eroare': None,
+    'ultima_eroare_la': None,
+}
+
+
+def _cale_offset():
+    return JURNAL_PATH + '.offset'
+
+
+def _cale_carantina():
+    return JURNAL_PATH + '.carantina'
+
+
+def _marime_jurnal():
+    try:
+        return os.path.getsize(JURNAL_PATH)
+    except OSError:
+        return 0
+
+
+def _citeste_offset():
+    """Offset-ul golit deja (0 dacă lipsește sau dacă jurnalul a fost compactat între timp)"""
+    try:
+        with open(_cale_offset(), 'r') as f:
+            offset = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+    return offset if offset <= _marime_jurnal() else 0
+
+
+def _scrie_offset(offset):
+    """Scriere atomică a offset-ului (tmp + fsync + os.replace)"""
+    tmp = _cale_offset() + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(str(offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _cale_offset())
+
+
+def _repara_coada():
+    """
+    Taie o ultimă linie incompletă (crash în timpul scrierii) - nu a fost confirmată
+    niciodată apelantului, iar un append după ea ar strica și linia următoare
+    """
+    marime = _marime_jurnal()
+    if not marime:
+        return
+
+    with open(JURNAL_PATH, 'rb+') as f:
+        f.seek(marime - 1)
+        if f.read(1) == b'\n':
+            return
+
+        # Căutăm înapoi, pe bucăți, ultimul '\n' (o linie poate depăși o bucată)
+        nou = 0
+        pozitie = marime
+        while pozitie > 0:
+            start = max(0, pozitie - 4096)
+            f.seek(start)
+            ultima = f.read(pozitie - start).rfind(b'\n')
+            if ultima >= 0:
+                nou = start + ultima + 1
+                break
+            pozitie = start
+
+        f.truncate(nou)
+        f.flush()
+        os.fsync(f.fileno())
+    logger.warning(f"⚠️ Jurnal bonuri: linie incompletă eliminată ({marime - nou} octeți)")
+
+
+def inregistreaza(rows, data_procesare=None):
+    """
+    Adaugă bonurile în jurnal (fsync) și trezește flusher-ul
+
+    Args:
+        rows: Listă de tuple (sku, nume, cantitate, order_id, order_number)
+        data_procesare: Data bonurilor 'YYYY-MM-DD' (implicit azi)
+
+    Returns:
+        True dacă intrarea este durabilă pe disc, False dacă scrierea a eșuat
+    """
+    rows = [list(row) for row in rows]
+    if not rows:
+        return True
+
+    intrare = {
+        'la': time.time(),
+        'data': data_procesare or datetime.now().strftime('%Y-%m-%d'),
+        'rows': rows,
+    }
+    linie = (json.dumps(intrare, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+    try:
+        director = os.path.dirname(JURNAL_PATH)
+        if director:
+            os.makedirs(director, exist_ok=True)
+
+        with _lock_scriere:
+            with open(JURNAL_PATH, 'ab') as f:
+                f.write(linie)
+                f.flush()
+                os.fsync(f.fileno())
+            _stare['inregistrate'] += len(rows)
+    except OSError as e:
+        logger.error(f"❌ Eroare scriere jurnal bonuri: {e}")
+        return False
+
+    if _stare['flusher_activ']:
+        _semnal.set()
+    else:
+        # Fără flusher (ex: scriptul Selenium rulat direct) golim imediat
+        goleste()
+    return True
+
+
+def _citeste_intrari(offset, limita_randuri=None):
+    """
+    Citește intrările complete de la offset
+    Returns: (lista de intrări, offset-ul de după ultima intrare citită)
+    """
+    intrari = []
+    randuri = 0
+
+    try:
+        f = open(JURNAL_PATH, 'rb')
+    except FileNotFoundError:
+        return intrari, offset
+
+    with f:
+        f.seek(offset)
+        for linie in f:
+            if not linie.endswith(b'\n'):
+                break  # linie încă în scriere
+            offset += len(linie)
+
+            try:
+                intrare = json.loads(linie)
+                if not isinstance(intrare, dict):
+                    raise ValueError("intrarea nu este un obiect JSON")
+            except ValueError:
+                logger.error(f"❌ Linie coruptă în jurnalul de bonuri ignorată (offset {offset - len(linie)})")
+                continue
+
+            intrari.append(intrare)
+            randuri += len(intrare.get('rows', []))
+            if limita_randuri and randuri >= limita_randuri:
+                break
+
+    return intrari, offset
+
+
+def _compacteaza(offset):
+    """Golește fișierul când tot conținutul a ajuns în Postgres"""
+    with _lock_scriere:
+        if offset and offset == _marime_jurnal():
+            with open(JURNAL_PATH, 'rb+') as f:
+                f.truncate(0)
+                os.fsync(f.fileno())
+            _scrie_offset(0)
+
+
+def _numar_randuri(intrari):
+    return sum(len(intrare.get('rows') or []) for intrare in intrari)
+
+
+def _pune_in_carantina(intrare, eroare):
+    """Mută o intrare respinsă ca date invalide în fișierul de carantină (fsync)"""
+    linie = json.dumps(dict(intrare, eroare=str(eroare), carantina_la=time.time()), ensure_ascii=False, default=str)
+    with open(_cale_carantina(), 'ab') as f:
+        f.write((linie + '\n').encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+    randuri = _numar_randuri([intrare])
+    _stare['in_carantina'] += randuri
+    logger.error(f"☣️ Jurnal bonuri: {randuri} bonuri mutate în carantină ({_cale_carantina()}): {eroare}")
+    return randuri
+
+
+def _trimite_zi(data_procesare, intrari):
+    """
+    Upsert-ul intrărilor unei zile: întâi tot lotul, iar dacă Postgres respinge datele,
+    intrare cu intrare - cele respinse merg în carantină, restul se salvează
+
+    Returns: câte rânduri au mers în carantină, sau None dacă Postgres nu e disponibil
+    """
+    def randuri(intrari):
+        # Un rând malformat ajunge neschimbat la adauga_bonuri_bulk, care îl raportează ca eroare de date
+        return [tuple(row) if isinstance(row, list) else row for intrare in intrari for row in (intrare.get('rows') or [])]
+
+    try:
+        return 0 if database.adauga_bonuri_bulk(randuri(intrari), data_procesare, ridica_erori_date=True) else None
+    except database.EroareDateBonuri as e:
+        if len(intrari) == 1:
+            return _pune_in_carantina(intrari[0], e)
+
+    in_carantina = 0
+    for intrare in intrari:
+        try:
+            if not database.adauga_bonuri_bulk(randuri([intrare]), data_procesare, ridica_erori_date=True):
+                return None
+        except database.EroareDateBonuri as e:
+            in_carantina += _pune_in_carantina(intrare, e)
+    return in_carantina
+
+
+def goleste():
+    """
+    Trimite în Postgres tot ce nu a fost golit încă, în loturi de maxim LOT_MAXIM rânduri
+
+    Returns: True dacă jurnalul a fost golit complet, False dacă Postgres nu a fost disponibil
+    """
+    with _lock_golire:
+        offset = _citeste_offset()
+
+        while True:
+            intrari, offset_nou = _citeste_intrari(offset, LOT_MAXIM)
+            if not intrari:
+                _compacteaza(offset)
+                return True
+
+            # Un upsert per dată de procesare (ziua originală a bonului, nu ziua golirii)
+            pe_zile = {}
+            for intrare in intrari:
+                pe_zile.setdefault(intrare.get('data'), []).append(intrare)
+
+            golite = 0
+            for data_procesare, intrari_zi in pe_zile.items():
+                in_carantina = _trimite_zi(data_procesare, intrari_zi)
+                if in_carantina is None:
+                    _stare['ultima_eroare'] = f"Upsert eșuat pentru {_numar_randuri(intrari_zi)} bonuri"
+                    _stare['ultima_eroare_la'] = time.time()
+                    return False
+                golite += _numar_randuri(intrari_zi) - in_carantina
+
+            # Upsert-ul e idempotent: un crash înainte de offset doar retrimite lotul
+            _scrie_offset(offset_nou)
+            offset = offset_nou
+
+            _stare['golite'] += golite
+            _stare['ultima_golire'] = time.time()
+            logger.info(f"🗄️ Jurnal bonuri: {golite} bonuri golite în PostgreSQL")
+
+
+def bucla_golire():
+    """Flusher-ul din fundal (green thread eventlet), cu pauză exponențială la erori"""
+    pauza = INTERVAL_GOLIRE
+    while True:
+        _semnal.wait(pauza)
+        _semnal.clear()
+        try:
+            if goleste():
+                pauza = INTERVAL_GOLIRE
+            else:
+                pauza = min(pauza * 2, PAUZA_MAXIMA)
+                logger.warning(f"⚠️ Jurnal bonuri: PostgreSQL indisponibil, reîncercare în {pauza:.0f}s")
+        except Exception as e:
+            _stare['ultima_eroare'] = str(e)
+            _stare['ultima_eroare_la'] = time.time()
+            pauza = min(pauza * 2, PAUZA_MAXIMA)
+            logger.error(f"❌ Eroare golire jurnal bonuri: {e}")
+
+
+def porneste():
+    """
+    Pregătește jurnalul la pornirea aplicației (repară coada, raportează ce e negolit)
+    Bucla de golire se pornește separat: socketio.start_background_task(bucla_golire)
+    """
+    try:
+        _repara_coada()
+    except OSError as e:
+        logger.error(f"❌ Eroare verificare jurnal bonuri: {e}")
+
+    ramase = _marime_jurnal() - _citeste_offset()
+    if ramase > 0:
+        logger.info(f"🔁 Jurnal bonuri: {ramase} octeți negoliți de la rularea anterioară, se reiau")
+
+    _stare['flusher_activ'] = True
+    _semnal.set()
+
+
+def in_asteptare():
+    """
+    Perechile (sku, order_number) înregistrate în jurnal dar încă negolite în Postgres
+    Folosit de Smart Resume, ca bonurile deja create în Oblio să nu fie duplicate
+    """
+    intrari, _ = _citeste_intrari(_citeste_offset())
+    return {
+        (row[0], row[4])
+        for intrare in intrari + _intrari_carantina()
+        for row in intrare.get('rows') or []
+        if isinstance(row, list) and len(row) >= 5 and row[4] is not None
+    }
+
+
+def _intrari_carantina():
+    """Intrările din carantină - bonurile lor există în Oblio, chiar dacă nu au ajuns în Postgres"""
+    try:
+        with open(_cale_carantina(), 'rb') as f:
+            linii = f.readlines()
+    except FileNotFoundError:
+        return []
+
+    intrari = []
+    for linie in linii:
+        try:
+            intrari.append(json.loads(linie))
+        except ValueError:
+            continue
+    return intrari
+
+
+def statistici():
+    """Starea jurnalului (pentru /health/detalii)"""
+    return {
+        'octeti_in_asteptare': max(0, _marime_jurnal() - _citeste_offset()),
+        'inregistrate': _stare['inregistrate'],
+        'golite': _stare['golite'],
+        'in_carantina': _stare['in_carantina'],
+        'ultima_golire': _stare['ultima_golire'],
+        'ultima_eroare': _stare['ultima_eroare'],
+        'ultima_eroare_la': _stare['ultima_eroare_la'],
+    }
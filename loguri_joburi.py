@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Jurnalul live al fiecărui job, păstrat pe disc și reluabil de la un offset
+Evenimentele unei rulări (log, progress, bon_complete, automation_complete) mergeau doar
+către client_sid-ul care a pornit-o: după o deconectare sau un refresh pagina rămânea goală.
+Acum fiecare eveniment primește un număr de secvență și se adaugă în
+uploads/loguri_joburi/<job_id>.jsonl, apoi pleacă prin transportul grupat către toți
+clienții abonați la job (camera 'job_<id>'). Un client care se (re)conectează trimite
+ultima secvență văzută și primește doar ce i-a lipsit, urmat de evenimentele live.
+
+Format: o linie JSON per eveniment {"s": secventa, "e": eveniment, "d": date, "t": timestamp}
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LOGURI_JOBURI_DIR = os.getenv('LOGURI_JOBURI_DIR', os.path.join('uploads', 'loguri_joburi'))
+# Jurnalele mai vechi de atâtea zile se șterg la pornire
+LOGURI_JOBURI_PASTRARE_ZILE = float(os.getenv('LOGURI_JOBURI_PASTRARE_ZILE', '14'))
+
+_ID_VALID = re.compile(r'^[0-9a-f]{1,32}$')
+
+_lock = threading.Lock()
+_joburi = {}   # job_id -> {'lock', 'fisier', 'secventa'}
+
+
+def camera(job_id):
+    """Camera transportului în care ajung evenimentele jobului"""
+    return f'job_{job_id}'
+
+
+def _cale(job_id):
+    if not _ID_VALID.match(job_id or ''):
+        raise ValueError(f"ID job invalid: {job_id!r}")
+    return os.path.join(LOGURI_JOBURI_DIR, f'{job_id}.jsonl')
+
+
+def _stare_job(job_id):
+    """Lock-ul și ultima secvență ale jobului (citită din fișier la prima folosire)"""
+    with _lock:
+        stare = _joburi.get(job_id)
+        if stare is None:
+            stare = _joburi[job_id] = {'lock': threading.Lock(), 'fisier': None, 'secventa': None}
+
+    if stare['secventa'] is None:
+        with stare['lock']:
+            if stare['secventa'] is None:
+                stare['secventa'] = max((s for s, _, _ in _citeste_fisier(job_id, 0)), default=0)
+    return stare
+
+
+def _citeste_fisier(job_id, dupa):
+    """Evenimentele cu secvența > dupa: listă de (secventa, eveniment, date)"""
+    rezultat = []
+    try:
+        f = open(_cale(job_id), 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return rezultat
+
+    with f:
+        for linie in f:
+            if not linie.endswith('\n'):
+                break  # linie incompletă (crash în timpul scrierii)
+            try:
+                intrare = json.loads(linie)
+            except ValueError:
+                continue
+            if intrare.get('s', 0) > dupa:
+                rezultat.append((intrare['s'], intrare.get('e'), intrare.get('d')))
+    return rezultat
+
+
+def _adauga(stare, job_id, eveniment, date):
+    """Scrie evenimentul în jurnal (apelat sub lock-ul jobului). Returns: secvența lui"""
+    if stare['fisier'] is None:
+        os.makedirs(LOGURI_JOBURI_DIR, exist_ok=True)
+        cale = _cale(job_id)
+        # O ultimă linie incompletă de la un crash nu trebuie lipită de prima linie nouă
+        incompleta = False
+        if os.path.exists(cale) and os.path.getsize(cale):
+            with open(cale, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                incompleta = f.read(1) != b'\n'
+        stare['fisier'] = open(cale, 'a', encoding='utf-8')
+        if incompleta:
+            stare['fisier'].write('\n')
+
+    stare['secventa'] += 1
+    linie = json.dumps({'s': stare['secventa'], 'e': eveniment, 'd': date, 't': time.time()},
+                       ensure_ascii=False, default=str)
+    stare['fisier'].write(linie + '\n')
+    stare['fisier'].flush()
+    return stare['secventa']
+
+
+class EmitatorJob:
+    """
+    Emițătorul evenimentelor unei rulări: jurnal pe disc + transport către toți clienții abonați
+    emit() are semnătura lui socketio.emit; room este ignorat (destinația e camera jobului)
+    """
+
+    def __init__(self, transport, job_id):
+        self.transport = transport
+        self.job_id = job_id
+        self.camera = camera(job_id)
+
+    def emit(self, eveniment, date=None, room=None):
+        stare = _stare_job(self.job_id)
+        with stare['lock']:
+            try:
+                secventa = _adauga(stare, self.job_id, eveniment, date)
+            except OSError as e:
+                logger.error(f"❌ Eroare scriere jurnal job {self.job_id}: {e}")
+                secventa = None
+            # Sub același lock ca abonarea: un client nou nu poate pierde sau primi de două ori un eveniment
+            self.transport.emit_camera(self.camera, eveniment, date, secventa)
+
+
+def aboneaza(transport, job_id, sid, dupa=0):
+    """
+    Abonează clientul la evenimentele jobului; primește întâi tot ce are secvența > dupa
+
+    Returns:
+        int: numărul de evenimente reluate din jurnal
+    """
+    stare = _stare_job(job_id)
+    with stare['lock']:
+        istoric = _citeste_fisier(job_id, dupa)
+        transport.aboneaza(camera(job_id), sid, istoric)
+    return len(istoric)
+
+
+def citeste(job_id, dupa=0):
+    """Evenimentele jurnalizate cu secvența > dupa, ca în frame-urile log_batch: [eveniment, date, secventa]"""
+    return [[eveniment, date, secventa] for secventa, eveniment, date in _citeste_fisier(job_id, dupa)]
+
+
+def ultima_secventa(job_id):
+    return _stare_job(job_id)['secventa']
+
+
+def inchide(job_id):
+    """Închide fișierul jobului la finalul rulării (o reluare îl redeschide și recitește secvența)"""
+    with _lock:
+        stare = _joburi.pop(job_id, None)
+    if stare is None:
+        return
+    with stare['lock']:
+        if stare['fisier'] is not None:
+            stare['fisier'].close()
+            stare['fisier'] = None
+
+
+def curata(zile=LOGURI_JOBURI_PASTRARE_ZILE):
+    """Șterge jurnalele nemodificate de mai mult de `zile` zile"""
+    limita = time.time() - zile * 86400
+    sterse = 0
+    try:
+        intrari = os.listdir(LOGURI_JOBURI_DIR)
+    except FileNotFoundError:
+        return 0
+
+    for nume in intrari:
+        cale = os.path.join(LOGURI_JOBURI_DIR, nume)
+        try:
+            if nume.endswith('.jsonl') and os.path.getmtime(cale) < limita:
+                os.remove(cale)
+                sterse += 1
+        except OSError as e:
+            logger.warning(f"⚠️ Nu s-a putut șterge jurnalul {nume}: {e}")
+    if sterse:
+        logger.info(f"🧹 {sterse} jurnale de joburi mai vechi de {zile:.0f} zile șterse")
+    return sterse
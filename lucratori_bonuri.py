@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Lucrători concurenți pentru bonurile de producție - mai multe browsere independente
+Modul batch deschide 5 tab-uri, dar le conduce pe rând din același WebDriver (switch_to.window),
+deci bonurile se creează de fapt secvențial. Aici fiecare lucrător are propria sesiune browser
+(împrumutată din pool_sesiuni, autentificată o singură dată și refolosită pentru toate bonurile lui)
+și trage bonuri dintr-o coadă comună până o golește:
+- LUCRATORI_BONURI: câte browsere lucrează în paralel la o rulare (limitat de pool_sesiuni.SESIUNI_MAX)
+- OBLIO_CONCURENTA_MAX: câte bonuri pot fi trimise simultan în Oblio, global pe proces - locul se
+  ia doar pentru trimitere (salvare, lansare, finalizare); completarea formularului rulează liber
+- login-ul se verifică o singură dată, la împrumutul sesiunii; fiecare bon se completează pe pagina
+  de producție a lucrătorului (create_production_voucher), fără pre-check și fără tab-uri noi
+- rezultatele ajung la apelant imediat ce un bon se termină (la_rezultat), în ordinea finalizării
+
+Lucrătorii sunt thread-uri - sub eventlet.monkey_patch devin green threads, iar cererile HTTP
+către chromedriver / Oblio cedează controlul, deci browserele chiar lucrează în paralel.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import motor_http_oblio
+import pool_sesiuni
+import trasare_oblio
+
+logger = logging.getLogger(__name__)
+
+# Browsere care lucrează în paralel la o rulare (1 = comportamentul vechi, un singur browser)
+LUCRATORI_BONURI = int(os.getenv('LUCRATORI_BONURI', str(pool_sesiuni.SESIUNI_MAX)))
+# Bonuri în lucru simultan în Oblio, pentru toate rulările procesului (protecție rate-limit)
+OBLIO_CONCURENTA_MAX = int(os.getenv('OBLIO_CONCURENTA_MAX', '3'))
+# Cât așteaptă un lucrător suplimentar o sesiune din pool înainte să renunțe (secunde)
+LUCRATORI_TIMEOUT_SESIUNE = float(os.getenv('LUCRATORI_TIMEOUT_SESIUNE', '30'))
+# După atâtea excepții consecutive browser-ul lucrătorului e considerat stricat și se retrage
+LUCRATORI_ERORI_MAX = 3
+
+_concurenta = threading.BoundedSemaphore(max(1, OBLIO_CONCURENTA_MAX))
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _loc_oblio():
+    """Un loc din OBLIO_CONCURENTA_MAX, ținut cât bonul e trimis în Oblio"""
+    inceput = time.monotonic()
+    with _concurenta:
+        # Cât a stat bonul după un loc liber în Oblio
+        trasare_oblio.inregistreaza('lucrator.asteptare_concurenta', time.monotonic() - inceput)
+        yield
+
+
+_stare = {'rulari': 0, 'bonuri': 0, 'lucratori_activi': 0, 'lucratori_maxim': 0}
+
+
+class _Lucrator:
+    """Un browser care trage bonuri din coada comună până se golește"""
+
+    def __init__(self, nr, automation, coada, email, password, la_rezultat, oprit, proprie):
+        self.nr = nr
+        self.automation = automation
+        self.coada = coada
+        self.email = email
+        self.password = password
+        self.la_rezultat = la_rezultat
+        self.oprit = oprit
+        self.proprie = proprie      # sesiunea a fost împrumutată de lucrător (și se returnează de el)
+        self.bonuri = 0
+
+    def _un_bon(self, bon):
+        """
+        Un bon pe sesiunea deja autentificată a lucrătorului: motorul HTTP (dacă e activ), apoi
+        formularul Selenium pe pagina de producție curentă - o singură încărcare de pagină per bon
+        """
+        sku = bon.get('sku')
+        if motor_http_oblio.MOTOR_OBLIO == 'http':
+            with _loc_oblio():
+                rezultate, _ramase = self.automation._batch_http([bon])
+            if rezultate:
+                return rezultate[0]
+
+        reusit = self.automation.create_production_voucher(
+            sku, bon.get('cantitate', 1), None, self.email, self.password,
+            nume=bon.get('nume'), order_ids=bon.get('order_ids'), order_numbers=bon.get('order_numbers'),
+            sectiune_trimitere=_loc_oblio()
+        )
+        if reusit:
+            return {'sku': sku, 'success': True, 'message': 'Bon creat cu succes'}
+        return {'sku': sku, 'success': False,
+                'message': self.automation.ultima_eroare_bon or 'Bonul nu a fost creat'}
+
+    def ruleaza(self):
+        erori_consecutive = 0
+        stricata = False
+        with _lock:
+            _stare['lucratori_activi'] += 1
+            _stare['lucratori_maxim'] = max(_stare['lucratori_maxim'], _stare['lucratori_activi'])
+        try:
+            while not self.oprit():
+                try:
+                    index, bon = self.coada.get_nowait()
+                except queue.Empty:
+                    break
+
+                try:
+                    rezultat = self._un_bon(bon)
+                    erori_consecutive = 0
+                except Exception as e:
+                    logger.error(f"❌ Lucrător {self.nr}: eroare la bonul {bon.get('sku')}: {e}")
+                    rezultat = {'sku': bon.get('sku'), 'success': False, 'message': str(e)}
+                    erori_consecutive += 1
+
+                self.bonuri += 1
+                with _lock:
+                    _stare['bonuri'] += 1
+                try:
+                    self.la_rezultat(index, bon, rezultat)
+                except Exception as e:
+                    logger.error(f"❌ Eroare la raportarea rezultatului pentru {bon.get('sku')}: {e}")
+
+                # Doar browserele proprii se retrag - lucrătorul apelantului golește coada oricum
+                if self.proprie and erori_consecutive >= LUCRATORI_ERORI_MAX:
+                    logger.warning(f"⚠️ Lucrător {self.nr}: {erori_consecutive} erori consecutive - se retrage")
+                    stricata = True
+                    break
+        finally:
+            with _lock:
+                _stare['lucratori_activi'] -= 1
+            if self.proprie:
+                pool_sesiuni.pool.returneaza(self.automation, stricata=stricata)
+            logger.info(f"🏁 Lucrător {self.nr}: {self.bonuri} bonuri procesate")
+
+
+def numar_lucratori(total_bonuri, automatizare_principala, maxim=None):
+    """Câte browsere merită pornite pentru o listă de bonuri"""
+    maxim = LUCRATORI_BONURI if maxim is None else maxim
+    # Fără headless (Chrome local cu profilul utilizatorului) nu se pot deschide browsere suplimentare
+    if not automatizare_principala.headless:
+        return 1
+    return max(1, min(maxim, pool_sesiuni.pool.maxim, total_bonuri))
+
+
+def proceseaza(bonuri, automatizare_principala, fabrica_automatizare, email, password,
+               la_rezultat, oprit=lambda: False, lucratori=None):
+    """
+    Creează bonurile cu mai multe browsere în paralel
+
+    Args:
+        bonuri (list): dict-uri bon (sku, cantitate, nume, order_ids, order_numbers)
+        automatizare_principala: OblioAutomation deja autentificat - lucrătorul 1 (rămâne al apelantului)
+        fabrica_automatizare: funcție nr_lucrator -> OblioAutomation headless nou (lucrătorii 2..N)
+        email / password: credențiale Oblio pentru login-ul sesiunilor noi
+        la_rezultat: apelat la fiecare bon terminat: la_rezultat(index 1-based, bon, rezultat)
+            rezultat = {'sku', 'success', 'message'} ca în create_production_vouchers_batch
+        oprit: funcție fără argumente; True = lucrătorii nu mai iau bonuri noi
+        lucratori: numărul de browsere (implicit LUCRATORI_BONURI)
+
+    Returns:
+        list: (index, bon, rezultat) în ordinea finalizării; bonurile rămase în coadă la oprire lipsesc
+    """
+    if not bonuri:
+        return []
+
+    coada = queue.Queue()
+    for index, bon in enumerate(bonuri, 1):
+        coada.put((index, bon))
+
+    rezultate = []
+
+    def colecteaza(index, bon, rezultat):
+        rezultate.append((index, bon, rezultat))
+        la_rezultat(index, bon, rezultat)
+
+    numar = numar_lucratori(len(bonuri), automatizare_principala, lucratori)
+    with _lock:
+        _stare['rulari'] += 1
+    logger.info(f"👷 {len(bonuri)} bonuri, {numar} lucrători (concurență Oblio max {OBLIO_CONCURENTA_MAX})")
+
+    def porneste_suplimentar(nr):
+        # Sesiunea proprie se împrumută în thread-ul lucrătorului, ca login-urile să fie și ele paralele
+        try:
+            automation = fabrica_automatizare(nr)
+            cronometru = trasare_oblio.Cronometru('lucrator.', automation.trasare, lucrator=nr)
+            sesiune = pool_sesiuni.pool.imprumuta(automation, email, password, timeout=LUCRATORI_TIMEOUT_SESIUNE)
+            cronometru.marcheaza('sesiune')
+            cronometru.incheie(sesiune=sesiune)
+            if not sesiune:
+                automation._log(f"⚠️ Lucrător {nr}: nicio sesiune browser disponibilă - continuă ceilalți", 'warning')
+                return
+        except Exception as e:
+            logger.error(f"❌ Lucrător {nr}: pornirea browser-ului a eșuat: {e}")
+            return
+        _Lucrator(nr, automation, coada, email, password, colecteaza, oprit, proprie=True).ruleaza()
+
+    threaduri = []
+    for nr in range(2, numar + 1):
+        thread = threading.Thread(target=porneste_suplimentar, args=(nr,), name=f'lucrator-bonuri-{nr}', daemon=True)
+        thread.start()
+        threaduri.append(thread)
+
+    # Lucrătorul 1 rulează în thread-ul apelantului, cu sesiunea deja deschisă
+    _Lucrator(1, automatizare_principala, coada, email, password, colecteaza, oprit, proprie=False).ruleaza()
+
+    for thread in threaduri:
+        thread.join()
+
+    return rezultate
+
+
+def statistici():
+    """Starea lucrătorilor (pentru /health/detalii)"""
+    with _lock:
+        return {
+            'lucratori': LUCRATORI_BONURI,
+            'concurenta_max': OBLIO_CONCURENTA_MAX,
+            **_stare,
+        }
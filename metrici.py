@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Metrici în format text Prometheus pentru /metrics
+/health spune doar că aplicația răspunde; pentru dimensionarea containerului e nevoie de serii
+în timp: cât durează parsarea unui export, cât de vechi e catalogul, cât de ocupat e pool-ul DB,
+câte bonuri reușesc / eșuează / se reiau per rulare, câte browsere sunt deschise, cât de plină
+e coada de evenimente Socket.IO.
+
+Registru minimal, fără dependențe (prometheus_client nu e în requirements.txt):
+- Contor: valoare care doar crește (.inc)
+- Histograma: distribuție pe intervale cumulative (.observa / with .cronometreaza())
+- indicator(): valoare citită la fiecare scrape dintr-o funcție (vârsta catalogului, pool-uri, cozi)
+- colector(): funcție care întoarce direct text Prometheus (ex. trasare_oblio.metrici_prometheus)
+Seriile se identifică prin etichete: metrica.inc(tip='raport') -> nume{tip="raport"}
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Intervale implicite pentru durate (secunde)
+LIMITE_DURATA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_metrici = []      # în ordinea înregistrării
+_colectori = []
+
+
+def _format_valoare(valoare):
+    if valoare == float('inf'):
+        return '+Inf'
+    if isinstance(valoare, float) and valoare.is_integer():
+        return str(int(valoare))
+    return repr(valoare) if isinstance(valoare, float) else str(valoare)
+
+
+def _escape(valoare):
+    return str(valoare).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etichete_text(nume_etichete, valori, extra=()):
+    perechi = [f'{nume}="{_escape(valoare)}"' for nume, valoare in zip(nume_etichete, valori)]
+    perechi.extend(f'{nume}="{_escape(valoare)}"' for nume, valoare in extra)
+    return '{' + ','.join(perechi) + '}' if perechi else ''
+
+
+class _Metrica:
+    tip = None
+
+    def __init__(self, nume, ajutor, etichete=()):
+        self.nume = nume
+        self.ajutor = ajutor
+        self.etichete = tuple(etichete)
+        self._lock = threading.Lock()
+        self._serii = {}
+        with _lock:
+            _metrici.append(self)
+
+    def _cheie(self, etichete):
+        if set(etichete) != set(self.etichete):
+            raise ValueError(f"{self.nume}: etichete așteptate {self.etichete}, primite {tuple(etichete)}")
+        return tuple(etichete[nume] for nume in self.etichete)
+
+    def _antet(self):
+        return [f'# HELP {self.nume} {self.ajutor}', f'# TYPE {self.nume} {self.tip}']
+
+
+class Contor(_Metrica):
+    tip = 'counter'
+
+    def inc(self, valoare=1, **etichete):
+        if valoare < 0:
+            raise ValueError(f"{self.nume}: un contor nu poate scădea")
+        cheie = self._cheie(etichete)
+        with self._lock:
+            self._serii[cheie] = self._serii.get(cheie, 0) + valoare
+
+    def exporta(self):
+        with self._lock:
+            serii = sorted(self._serii.items())
+        linii = self._antet()
+        for cheie, valoare in serii:
+            linii.append(f'{self.nume}{_etichete_text(self.etichete, cheie)} {_format_valoare(valoare)}')
+        return linii
+
+
+class Histograma(_Metrica):
+    tip = 'histogram'
+
+    def __init__(self, nume, ajutor, etichete=(), limite=LIMITE_DURATA):
+        super().__init__(nume, ajutor, etichete)
+        self.limite = tuple(sorted(limite))
+
+    def observa(self, valoare, **etichete):
+        cheie = self._cheie(etichete)
+        with self._lock:
+            serie = self._serii.get(cheie)
+            if serie is None:
+                serie = self._serii[cheie] = {'intervale': [0] * len(self.limite), 'suma': 0.0, 'numar': 0}
+            for i, limita in enumerate(self.limite):
+                if valoare <= limita:
+                    serie['intervale'][i] += 1
+                    break
+            serie['suma'] += valoare
+            serie['numar'] += 1
+
+    @contextmanager
+    def cronometreaza(self, **etichete):
+        """Observă durata blocului `with` (și când blocul aruncă excepție)"""
+        inceput = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observa(time.monotonic() - inceput, **etichete)
+
+    def exporta(self):
+        with self._lock:
+            serii = sorted((cheie, dict(serie, intervale=list(serie['intervale'])))
+                           for cheie, serie in self._serii.items())
+        linii = self._antet()
+        for cheie, serie in serii:
+            cumulat = 0
+            for limita, numar in zip(self.limite, serie['intervale']):
+                cumulat += numar
+                etichete = _etichete_text(self.etichete, cheie, [('le', _format_valoare(float(limita)))])
+                linii.append(f'{self.nume}_bucket{etichete} {cumulat}')
+            etichete = _etichete_text(self.etichete, cheie, [('le', '+Inf')])
+            linii.append(f'{self.nume}_bucket{etichete} {serie["numar"]}')
+            linii.append(f'{self.nume}_sum{_etichete_text(self.etichete, cheie)} {_format_valoare(serie["suma"])}')
+            linii.append(f'{self.nume}_count{_etichete_text(self.etichete, cheie)} {serie["numar"]}')
+        return linii
+
+
+class _Indicator(_Metrica):
+    """Valori citite la scrape: functie() -> număr sau {valoare_eticheta / tuplu: număr}"""
+
+    def __init__(self, nume, ajutor, functie, etichete=(), tip='gauge'):
+        super().__init__(nume, ajutor, etichete)
+        self.functie = functie
+        self.tip = tip
+
+    def exporta(self):
+        try:
+            valori = self.functie()
+        except Exception as e:
+            logger.warning(f"⚠️ Metrica {self.nume} nu a putut fi citită: {e}")
+            return []
+        if valori is None:
+            return []
+        if not isinstance(valori, dict):
+            valori = {(): valori}
+
+        linii = self._antet()
+        for cheie, valoare in sorted(valori.items(), key=lambda x: str(x[0])):
+            if valoare is None:
+                continue
+            cheie = cheie if isinstance(cheie, tuple) else (cheie,)
+            linii.append(f'{self.nume}{_etichete_text(self.etichete, cheie)} {_format_valoare(valoare)}')
+        return linii
+
+
+def indicator(nume, ajutor, functie, etichete=(), tip='gauge'):
+    """Înregistrează o metrică citită la fiecare scrape (tip='counter' pentru contoare ținute în altă parte)"""
+    return _Indicator(nume, ajutor, functie, etichete, tip)
+
+
+def colector(functie):
+    """Înregistrează o funcție care întoarce text Prometheus gata formatat"""
+    with _lock:
+        _colectori.append(functie)
+
+
+def exporta():
+    """Toate metricile în text exposition format 0.0.4"""
+    with _lock:
+        metrici = list(_metrici)
+        colectori = list(_colectori)
+
+    linii = []
+    for metrica in metrici:
+        linii.extend(metrica.exporta())
+    text = '\n'.join(linii) + '\n'
+    for functie in colectori:
+        try:
+            text += functie()
+        except Exception as e:
+            logger.warning(f"⚠️ Colector de metrici eșuat: {e}")
+    return text
+
+
+# ---------------------------------------------------------------------------
+# Metricile aplicației (folosite din app.py și database.py)
+# ---------------------------------------------------------------------------
+
+PARSARE_SECUNDE = Histograma(
+    'decanturi_parsare_export_secunde', 'Durata parsării unui export de comenzi încărcat', ('tip',),
+    limite=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+PARSARE_RANDURI = Contor(
+    'decanturi_parsare_export_randuri_total', 'Rânduri (comenzi) citite din exporturile încărcate', ('tip',)
+)
+PARSARE_EXPORTURI = Contor(
+    'decanturi_parsare_exporturi_total', 'Exporturi de comenzi parsate', ('tip',)
+)
+
+CATALOG_REIMPROSPATARE_SECUNDE = Histograma(
+    'decanturi_catalog_reimprospatare_secunde', 'Durata verificării / reîmprospătării catalogului de produse',
+    limite=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+CATALOG_REIMPROSPATARI = Contor(
+    'decanturi_catalog_reimprospatari_total', 'Verificări ale catalogului de produse, după rezultat', ('rezultat',)
+)
+
+DB_INTEROGARE_SECUNDE = Histograma(
+    'decanturi_db_operatie_secunde', 'Durata unei operații DB (blocul with conexiune(), inclusiv commit)'
+)
+DB_ASTEPTARE_SECUNDE = Histograma(
+    'decanturi_db_asteptare_conexiune_secunde', 'Cât se așteaptă o conexiune din pool-ul DB'
+)
+
+BONURI = Contor(
+    'decanturi_bonuri_total', 'Bonuri de producție procesate de automatizare, după rezultat', ('rezultat',)
+)
+BONURI_PER_RULARE = Histograma(
+    'decanturi_bonuri_per_rulare', 'Bonuri create / eșuate / reîncercate într-o rulare de automatizare', ('rezultat',),
+    limite=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+RULARI = Contor(
+    'decanturi_rulari_automatizare_total', 'Rulări de automatizare încheiate, după starea finală', ('stare',)
+)
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+Motor HTTP direct pentru bonurile de producție Oblio (fără DOM)
+Un bon prin Selenium înseamnă SKU tastat caracter cu caracter, așteptarea autocomplete-ului,
+pauze și redirect-uri: 8-15 s. Motorul de aici refă exact cererile pe care le face pagina
+/stock/production/ (vezi "Bon de productie - Oblio.html"), cu un requests.Session care
+primește cookie-urile sesiunii Selenium deja autentificate:
+
+1. GET  /stock/production/                            - valorile implicite ale formularului (gestiune, dată...)
+2. POST /nomenclator/get_products_values/?from_production=1   - autocomplete: SKU -> pp_name_id (cache_produse_oblio)
+3. POST /nomenclator/get_product_recipe_add/          - rețeta pentru cantitate (+ stoc insuficient)
+4. POST /nomenclator/get_produs_gestiune_values/      - prețul de vânzare (pp_price)
+5. POST /stock/validate_np                            - validarea stocului negativ (ca submit_form_doc)
+6. POST /stock/production/ (multipart)                - submit_form_doc_final -> /stock/preview_production/<id>
+7. GET  production_save/<id>, production_complete/<id> - Lansare + Finalizare
+
+Interfața e compatibilă cu OblioAutomation.create_production_vouchers_batch. Rezultatele
+cu 'fallback': True nu au atins Oblio (nimic creat) și pot fi refăcute prin Selenium.
+Activare: OBLIO_MOTOR=http. OBLIO_BASE_URL permite rularea contra unui server local de test
+(stub_oblio.py; fluxul complet e verificat de test_motor_http_oblio.py).
+"""
+
+import html
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+import cache_produse_oblio
+
+logger = logging.getLogger(__name__)
+
+# 'selenium' (implicit) sau 'http'
+MOTOR_OBLIO = os.getenv('OBLIO_MOTOR', 'selenium').strip().lower()
+OBLIO_BASE_URL = os.getenv('OBLIO_BASE_URL', 'https://www.oblio.eu')
+HTTP_TIMEOUT = float(os.getenv('OBLIO_HTTP_TIMEOUT', '30'))
+
+ID_FORMULAR = 'form_add_production'
+TIP_REZIDUAL = '94'  # pr_type pentru produsele reziduale din rețetă (nu consumă stoc)
+
+_RE_PREVIEW = re.compile(r'/preview_production/(\d+)')
+_RE_ALERTA = re.compile(r'class="[^"]*alert-danger[^"]*"[^>]*>(.*?)</div>', re.S)
+_RE_TAG = re.compile(r'<[^>]+>')
+
+
+class EroareMotorHttp(Exception):
+    """
+    Bon eșuat în motorul HTTP
+    fallback=True înseamnă că formularul nu a fost trimis - bonul se poate reface prin Selenium
+    """
+
+    def __init__(self, mesaj, fallback=False):
+        super().__init__(mesaj)
+        self.fallback = fallback
+
+
+class SesiuneExpirata(EroareMotorHttp):
+    """Oblio a răspuns cu redirect la login - cookie-urile nu mai sunt valide"""
+
+    def __init__(self, mesaj="Sesiune Oblio expirată (redirect la login)"):
+        super().__init__(mesaj, fallback=True)
+
+
+class _ParserFormular(HTMLParser):
+    """Valorile implicite ale câmpurilor din formularul de producție + link-urile din pagină"""
+
+    def __init__(self, id_formular):
+        super().__init__(convert_charrefs=True)
+        self.id_formular = id_formular
+        self.campuri = {}
+        self.linkuri = []
+        self._in_formular = False
+        self._adancime = 0
+        self._select = None
+        self._select_ales = False
+        self._textarea = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'a' and attrs.get('href'):
+            self.linkuri.append(attrs['href'])
+
+        if tag == 'form':
+            if attrs.get('id') == self.id_formular:
+                self._in_formular = True
+                self._adancime = 0
+            elif self._in_formular:
+                self._adancime += 1
+            return
+        if not self._in_formular:
+            return
+
+        nume = attrs.get('name')
+        if tag == 'input' and nume:
+            tip = (attrs.get('type') or 'text').lower()
+            if tip in ('checkbox', 'radio') and 'checked' not in attrs:
+                return
+            if tip in ('button', 'submit', 'file'):
+                return
+            self.campuri[nume] = attrs.get('value') or ''
+        elif tag == 'select' and nume:
+            self._select = nume
+            self._select_ales = False
+        elif tag == 'option' and self._select and not self._select_ales:
+            # Prima opțiune e implicită, până la una marcată selected
+            if 'selected' in attrs or self._select not in self.campuri:
+                self.campuri[self._select] = attrs.get('value') or ''
+                self._select_ales = 'selected' in attrs
+        elif tag == 'textarea' and nume:
+            self._textarea = nume
+            self.campuri[nume] = ''
+
+    def handle_endtag(self, tag):
+        if tag == 'select':
+            self._select = None
+        elif tag == 'textarea':
+            self._textarea = None
+        elif tag == 'form' and self._in_formular:
+            if self._adancime:
+                self._adancime -= 1
+            else:
+                self._in_formular = False
+
+    def handle_data(self, data):
+        if self._textarea:
+            self.campuri[self._textarea] += data
+
+
+def _text_alerta(pagina):
+    """Textul primei alerte de eroare (.alert-danger) din pagină, sau None"""
+    potrivire = _RE_ALERTA.search(pagina or '')
+    if not potrivire:
+        return None
+    return re.sub(r'\s+', ' ', html.unescape(_RE_TAG.sub(' ', potrivire.group(1)))).strip() or None
+
+
+class MotorHttpOblio:
+    """Creează bonuri de producție Oblio prin cereri HTTP directe"""
+
+    def __init__(self, cookies=None, base_url=None, user_agent=None, log_callback=None, timeout=HTTP_TIMEOUT):
+        """
+        Args:
+            cookies: listă de cookie-uri în formatul driver.get_cookies()
+            base_url: rădăcina Oblio (un server local pentru teste)
+            user_agent: același User-Agent ca browser-ul care a făcut login
+            log_callback: funcție(mesaj, nivel) - de obicei OblioAutomation._log
+        """
+        self.base_url = (base_url or OBLIO_BASE_URL).rstrip('/') + '/'
+        self.timeout = timeout
+        self.log_callback = log_callback
+        self.session = requests.Session()
+        self.session.headers['Accept-Language'] = 'ro-RO,ro;q=0.9'
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+
+        for cookie in cookies or []:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain', ''), path=cookie.get('path', '/')
+            )
+
+        self._produse = {}  # SKU -> produsul din autocomplete (în cadrul sesiunii)
+
+    @classmethod
+    def din_driver(cls, driver, **kwargs):
+        """Motor care folosește sesiunea autentificată a unui WebDriver"""
+        try:
+            user_agent = driver.execute_script("return navigator.userAgent;")
+        except Exception:
+            user_agent = None
+
+        cookies = driver.get_cookies()
+        # Cookie-urile de pe www.oblio.eu trebuie să ajungă și la serverul local de test
+        if urlsplit(kwargs.get('base_url') or OBLIO_BASE_URL).hostname in ('localhost', '127.0.0.1'):
+            cookies = [{**c, 'domain': ''} for c in cookies]
+        return cls(cookies, user_agent=user_agent, **kwargs)
+
+    def _log(self, mesaj, nivel='info'):
+        if self.log_callback:
+            self.log_callback(mesaj, nivel)
+        else:
+            getattr(logger, 'warning' if nivel == 'warning' else 'error' if nivel == 'error' else 'info')(mesaj)
+
+    def _url(self, cale):
+        return urljoin(self.base_url, cale.lstrip('/'))
+
+    def _verifica(self, raspuns):
+        """Ridică SesiuneExpirata la redirect spre login, HTTPError la status de eroare"""
+        if 'login' in urlsplit(raspuns.url).path.lower():
+            raise SesiuneExpirata()
+        raspuns.raise_for_status()
+        return raspuns
+
+    def _get(self, cale):
+        return self._verifica(self.session.get(self._url(cale), timeout=self.timeout))
+
+    def _post_ajax(self, cale, date):
+        """POST ca getjqxhr() din pagină (form-urlencoded + from_javascript=1), răspuns JSON"""
+        date = dict(date, from_javascript=1)
+        raspuns = self._verifica(self.session.post(
+            self._url(cale), data=date, timeout=self.timeout,
+            headers={'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json, text/javascript, */*'}
+        ))
+        try:
+            rezultat = raspuns.json()
+        except ValueError:
+            rezultat = raspuns.text.strip()
+        if rezultat == 'redirect_to_login':
+            raise SesiuneExpirata()
+        return rezultat
+
+    def formular(self):
+        """Valorile implicite ale formularului de producție (gestiune, dată, doc_id...)"""
+        pagina = self._get('/stock/production/').text
+        parser = _ParserFormular(ID_FORMULAR)
+        parser.feed(pagina)
+        if 'pp_name' not in parser.campuri:
+            raise EroareMotorHttp("Formularul de producție nu a fost găsit în pagină", fallback=True)
+        return parser.campuri
+
+    def rezolva_produs(self, sku):
+        """
+        pp_name_id pentru un SKU, prin endpoint-ul de autocomplete al câmpului #pp_name
+        Returns: dict-ul produsului ({'value': id, 'label': ..., 'label_show': ..., 'all': {...}})
+        """
+        if sku in self._produse:
+            return self._produse[sku]
+
+        intrare = cache_produse_oblio.cauta(sku)
+        if intrare:
+            produs_id, eticheta = intrare
+            produs = {'value': produs_id, 'label_show': eticheta, 'all': {}, 'din_cache': True}
+            self._produse[sku] = produs
+            return produs
+
+        rezultate = self._post_ajax('/nomenclator/get_products_values/?from_production=1', {'q': html.escape(sku)})
+        produse = [p for p in (rezultate or []) if isinstance(p, dict) and p.get('value') not in (None, '', 'custom')]
+        if not produse:
+            raise EroareMotorHttp(f"Produsul cu SKU '{sku}' NU EXISTĂ în baza de date Oblio! Verifică SKU-ul.")
+
+        # Selenium alege primul rezultat - preferăm totuși potrivirea exactă pe cod, dacă există
+        produs = next(
+            (p for p in produse if str((p.get('all') or {}).get('code', '')).strip().lower() == sku.lower()),
+            produse[0]
+        )
+        self._produse[sku] = produs
+        cache_produse_oblio.memoreaza(sku, produs['value'], produs.get('label_show') or produs.get('label'))
+        return produs
+
+    def _reteta(self, pid, gestiune, cantitate, data):
+        """Rețeta pentru cantitatea cerută (ca get_product_recipe_add() după selecția din autocomplete)"""
+        reteta = self._post_ajax('/nomenclator/get_product_recipe_add/', {
+            'pid': pid, 'gid': gestiune, 'quantity': cantitate, 'date': data, 'origq': 1
+        })
+        if isinstance(reteta, dict):
+            reteta = list(reteta.values())
+        return reteta if isinstance(reteta, list) else []
+
+    def creeaza_bon(self, sku, cantitate):
+        """
+        Creează, lansează și finalizează un bon de producție
+
+        Returns: ID-ul bonului în Oblio
+        Raises: EroareMotorHttp / SesiuneExpirata
+        """
+        campuri = self.formular()
+        produs = self.rezolva_produs(sku)
+        pid = str(produs['value'])
+        gestiune = campuri.get('pp_gestiune', '')
+        data = campuri.get('pp_date') or datetime.now().strftime('%d/%m/%Y')
+
+        reteta = self._reteta(pid, gestiune, cantitate, data)
+        if not reteta and produs.get('din_cache'):
+            # ID respins (produs șters / recreat în Oblio) - îl rezolvăm din nou prin autocomplete
+            self._log(f"🗑️ [HTTP] ID-ul din cache pentru {sku} ({pid}) a fost respins - se folosește autocomplete", 'warning')
+            cache_produse_oblio.invalideaza(sku)
+            del self._produse[sku]
+            produs = self.rezolva_produs(sku)
+            pid = str(produs['value'])
+            reteta = self._reteta(pid, gestiune, cantitate, data)
+        if not reteta:
+            raise EroareMotorHttp(f"Produsul '{sku}' nu are rețetă de producție în Oblio")
+
+        # products.checkInsufficientStock()
+        for materie in reteta:
+            if str(materie.get('pr_type')) != TIP_REZIDUAL and materie.get('insufficient_stock'):
+                raise EroareMotorHttp(f"Stoc insuficient ({materie.get('name', 'materie primă')})")
+
+        # Rândurile rețetei, numerotate ca în addFromRecipe() (entry_item_1, entry_item_2, ...)
+        produse = [dict(materie, id=nr, full_id=f"entry_item_{nr}") for nr, materie in enumerate(reteta, 1)]
+
+        pret = self._post_ajax('/nomenclator/get_produs_gestiune_values/', {'pid': pid, 'gid': 0, 'gid2': gestiune})
+        if not isinstance(pret, dict):
+            pret = {}
+
+        validare = self._post_ajax('/stock/validate_np', {
+            'id': 0, 'product_id': pid, 'quantity': cantitate, 'gestiune': gestiune,
+            'action': 'save', 'date_init': data, 'products': json.dumps(produse)
+        })
+        if isinstance(validare, dict) and validare.get('type') == 'err':
+            raise EroareMotorHttp(f"Eroare Oblio: {validare.get('message') or validare}")
+
+        campuri.update({
+            'pp_name': produs.get('label_show') or produs.get('label') or sku,
+            'pp_name_id': pid,
+            'pp_cod_produs': (produs.get('all') or {}).get('code', campuri.get('pp_cod_produs', '')),
+            'pp_quantity': str(cantitate),
+            'pp_date': data,
+            'all_products': json.dumps(produse),
+        })
+        if pret.get('price') not in (None, '', '0'):
+            campuri['pp_price'] = str(pret['price'])
+        if pret.get('currency'):
+            campuri['pp_currency_2'] = str(pret['currency'])
+
+        # De aici încolo bonul poate exista deja în Oblio - nu se mai reface prin Selenium
+        try:
+            raspuns = self.session.post(
+                self._url('/stock/production/'),
+                files={nume: (None, valoare) for nume, valoare in campuri.items()},
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise EroareMotorHttp(f"Trimiterea formularului a eșuat, verifică bonul în Oblio: {e}")
+
+        potrivire = _RE_PREVIEW.search(urlsplit(raspuns.url).path)
+        if not potrivire:
+            if 'login' in urlsplit(raspuns.url).path.lower():
+                raise EroareMotorHttp("Sesiune Oblio expirată la trimiterea formularului")
+            alerta = _text_alerta(raspuns.text)
+            if alerta:
+                raise EroareMotorHttp(f"Eroare Oblio: {alerta}")
+            raise EroareMotorHttp(f"Nu s-a făcut redirect la preview. URL curent: {raspuns.url}")
+
+        prod_id = potrivire.group(1)
+        try:
+            self._lanseaza_si_finalizeaza(prod_id, raspuns.text)
+        except EroareMotorHttp as e:
+            raise EroareMotorHttp(f"Bon {prod_id} salvat dar nefinalizat: {e}") from e
+        except requests.RequestException as e:
+            raise EroareMotorHttp(f"Bon {prod_id} salvat dar nefinalizat: {e}") from e
+        return prod_id
+
+    def _link(self, pagina, actiune, prod_id):
+        """Link-ul de acțiune (production_save / production_complete) din pagină, sau cel construit"""
+        parser = _ParserFormular(ID_FORMULAR)
+        parser.feed(pagina or '')
+        for href in parser.linkuri:
+            cale = urlsplit(href).path
+            if f'{actiune}/{prod_id}' in cale:
+                return cale
+        return f'/stock/{actiune}/{prod_id}'
+
+    def _lanseaza_si_finalizeaza(self, prod_id, pagina_preview):
+        """Butoanele "Lanseaza in Productie" și "Finalizeaza Productia" sunt link-uri simple"""
+        lansare = self._get(self._link(pagina_preview, 'production_save', prod_id))
+        alerta = _text_alerta(lansare.text)
+        if alerta:
+            raise EroareMotorHttp(f"Lansare respinsă: {alerta}")
+
+        finalizare = self._get(self._link(lansare.text, 'production_complete', prod_id))
+        alerta = _text_alerta(finalizare.text)
+        if alerta:
+            raise EroareMotorHttp(f"Finalizare respinsă: {alerta}")
+
+    def create_production_vouchers_batch(self, batch_list):
+        """
+        Aceeași interfață ca OblioAutomation.create_production_vouchers_batch
+
+        Args:
+            batch_list (list): Listă de dict-uri {'sku': '...', 'cantitate': ...}
+
+        Returns:
+            list: [{'sku', 'success', 'message', 'fallback', 'prod_id'}] în ordinea din batch_list
+        """
+        results = []
+        sesiune_expirata = None
+
+        for item in batch_list:
+            sku = item.get('sku')
+            qty = item.get('cantitate', 1)
+
+            if sesiune_expirata:
+                results.append({'sku': sku, 'success': False, 'message': str(sesiune_expirata),
+                                'fallback': True, 'prod_id': None})
+                continue
+
+            try:
+                prod_id = self.creeaza_bon(sku, qty)
+                self._log(f"⚡ [HTTP] Bon {prod_id} finalizat pentru {sku} (x{qty})", 'success')
+                results.append({'sku': sku, 'success': True, 'message': 'Bon creat cu succes',
+                                'fallback': False, 'prod_id': prod_id})
+            except SesiuneExpirata as e:
+                self._log(f"🔐 [HTTP] {e} - bonurile rămase trec pe Selenium", 'warning')
+                sesiune_expirata = e
+                results.append({'sku': sku, 'success': False, 'message': str(e), 'fallback': True, 'prod_id': None})
+            except EroareMotorHttp as e:
+                stoc = str(e).startswith("Stoc insuficient")
+                self._log(f"{'⚠️' if stoc else '❌'} [HTTP] {sku}: {e}", 'warning' if e.fallback or stoc else 'error')
+                results.append({'sku': sku, 'success': False, 'message': str(e), 'fallback': e.fallback,
+                                'prod_id': None})
+            except requests.RequestException as e:
+                # Eșec înainte de trimiterea formularului (creeaza_bon tratează tot ce urmează)
+                self._log(f"⚠️ [HTTP] {sku}: eroare rețea ({e}) - reîncercare prin Selenium", 'warning')
+                results.append({'sku': sku, 'success': False, 'message': f"Eroare rețea: {e}",
+                                'fallback': True, 'prod_id': None})
+
+        return results
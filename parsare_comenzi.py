@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de parsare columnar pentru exporturile de comenzi
+Înlocuiește buclele iterrows() + re.search per produs cu operații vectorizate pandas:
+explode pe coloana 'Produse comandate', tokenizer_produse pentru câmpuri (o dată per text distinct),
+apoi agregare cu groupby. Rezultatele sunt identice cu implementarea rând-cu-rând.
+
+Exporturile .xlsx sunt citite în flux (openpyxl read-only), doar coloanele necesare, în blocuri
+de rânduri agregate incremental. Blocurile sunt păstrate într-un cache pe disc (cheie = SHA-256
+al fișierului), astfel încât /export și /process-vouchers nu mai parsează din nou Excel-ul.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict, defaultdict
+
+import pandas as pd
+
+from tokenizer_produse import RecordProdus, tokenizeazaProdus
+
+logger = logging.getLogger(__name__)
+
+# Cache exporturi parsate (DataFrame-uri pickle, evacuare LRU după mtime)
+CACHE_DIR = os.getenv('PARSARE_CACHE_DIR', os.path.join('uploads', '.cache'))
+CACHE_MAX_BYTES = int(os.getenv('PARSARE_CACHE_MAX_MB', '256')) * 1024 * 1024
+CACHE_MAX_INTRARI = int(os.getenv('PARSARE_CACHE_MAX_INTRARI', '50'))
+
+_cache_lock = threading.Lock()
+
+# Numărul de rânduri citite din Excel înainte de a trimite un bloc la agregare
+MARIME_BLOC = int(os.getenv('PARSARE_MARIME_BLOC', '5000'))
+
+# Numărul maxim de linii de produs distincte păstrate în memo (LRU)
+MEMO_MAX_INTRARI = int(os.getenv('PARSARE_MEMO_MAX_INTRARI', '20000'))
+
+SEPARATOR_PRODUSE = ' | '
+
+PATTERN_SKU_DECANT = r'-\d+$'
+
+# SKU-uri din coloana de atribute - format: "SKU: (atribute...)"
+PATTERN_SKU_ATRIBUTE = r'(\d{10,}-\d{1,2}|\d{10,}):\s*\('
+PATTERN_SKU_ATRIBUTE_GENERIC = r'([^,\s]+):\s*\('
+
+
+def hashFisier(fisier_path):
+    """Calculează SHA-256 al conținutului fișierului (citire în blocuri de 1 MB)"""
+    h = hashlib.sha256()
+    with open(fisier_path, 'rb') as f:
+        for bloc in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def _curataCache():
+    """Șterge cele mai vechi intrări (LRU după mtime) peste limita de mărime / număr"""
+    try:
+        intrari = []
+        for nume in os.listdir(CACHE_DIR):
+            if not nume.endswith('.pkl'):
+                continue
+            cale = os.path.join(CACHE_DIR, nume)
+            st = os.stat(cale)
+            intrari.append((st.st_mtime, st.st_size, cale))
+    except OSError:
+        return
+
+    intrari.sort(reverse=True)
+    total = 0
+    for index, (_, marime, cale) in enumerate(intrari):
+        total += marime
+        if index >= CACHE_MAX_INTRARI or total > CACHE_MAX_BYTES:
+            try:
+                os.remove(cale)
+                logger.info(f"🧹 Cache export evacuat: {os.path.basename(cale)}")
+            except OSError:
+                pass
+
+
+def coloaneNecesare(header):
+    """
+    Selectează din header doar coloanele folosite la procesare, cu aceleași reguli ca
+    detecteazaColoane() și detecția order_id / order_number din app.py
+    (prima coloană status / produse / atribute, ultima coloană id / număr comandă)
+
+    Returns: lista de indecși (în ordinea din fișier)
+    """
+    index_status = index_produse = index_atribute = None
+    index_order_id = index_order_number = None
+
+    for index, col in enumerate(header):
+        col_lower = str(col).lower()
+        if index_status is None and any(k in col_lower for k in ['status', 'stare', 'statu']):
+            index_status = index
+        if index_produse is None and any(k in col_lower for k in ['produse', 'produs', 'articol', 'item']):
+            index_produse = index
+        if index_atribute is None and any(k in col_lower for k in ['atribute', 'atribut']):
+            index_atribute = index
+        if 'id comanda' in col_lower or 'id_comanda' in col_lower:
+            index_order_id = index
+        if 'numar comanda' in col_lower or 'numar_comanda' in col_lower:
+            index_order_number = index
+
+    indecsi = {index_status, index_produse, index_atribute, index_order_id, index_order_number}
+    return sorted(i for i in indecsi if i is not None)
+
+
+def _numeColoane(header):
+    """Nume de coloane ca la pd.read_excel ('Unnamed: N' pentru celule goale, '.1' pentru duplicate)"""
+    nume = []
+    vazute = defaultdict(int)
+    for index, col in enumerate(header):
+        col = f"Unnamed: {index}" if col is None else col
+        if vazute[col]:
+            nume.append(f"{col}.{vazute[col]}")
+        else:
+            nume.append(col)
+        vazute[col] += 1
+    return nume
+
+
+def _citesteXlsxInBlocuri(fisier_path, marime_bloc):
+    """
+    Citire openpyxl read-only / values-only: rândurile sunt parcurse pe rând, doar coloanele
+    necesare sunt păstrate, iar în memorie se află cel mult un bloc de `marime_bloc` rânduri
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fisier_path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        ws.reset_dimensions()
+        randuri = ws.iter_rows(values_only=True)
+
+        header = next(randuri, None) or ()
+        indecsi = coloaneNecesare(header)
+        coloane = [_numeColoane(header)[i] for i in indecsi]
+
+        bloc = []
+        randuri_goale = 0
+        emis = False
+        for rand in randuri:
+            # Ca pd.read_excel: rândurile goale de la final sunt ignorate, cele din mijloc păstrate
+            if all(v is None for v in rand):
+                randuri_goale += 1
+                continue
+            if randuri_goale:
+                bloc.extend([[float('nan')] * len(indecsi)] * randuri_goale)
+                randuri_goale = 0
+
+            bloc.append([
+                float('nan') if i >= len(rand) or rand[i] is None else rand[i]
+                for i in indecsi
+            ])
+            if len(bloc) >= marime_bloc:
+                yield pd.DataFrame(bloc, columns=coloane)
+                emis = True
+                bloc = []
+
+        if bloc or not emis:
+            yield pd.DataFrame(bloc, columns=coloane)
+    finally:
+        wb.close()
+
+
+def _citesteExcelInBlocuri(fisier_path, marime_bloc):
+    """Fallback pentru .xls (format vechi, fără citire streaming): pd.read_excel + tăiere în blocuri"""
+    df = pd.read_excel(fisier_path)
+    df = df.iloc[:, coloaneNecesare(df.columns)]
+    for start in range(0, max(len(df), 1), marime_bloc):
+        yield df.iloc[start:start + marime_bloc].reset_index(drop=True)
+
+
+def citesteExportInBlocuri(fisier_path, marime_bloc=None, cache=True):
+    """
+    Citește exportul de comenzi în blocuri de rânduri (DataFrame-uri înguste, doar coloanele necesare)
+    Memoria folosită e limitată de mărimea blocului, indiferent de mărimea exportului.
+
+    Blocurile sunt salvate și în cache-ul de pe disc (cheie = SHA-256 al fișierului), ca flux de
+    obiecte pickle, astfel încât re-exportul / extragerea bonurilor nu mai parsează Excel-ul.
+    """
+    marime_bloc = marime_bloc or MARIME_BLOC
+
+    if fisier_path.lower().endswith('.xls'):
+        cititor = _citesteExcelInBlocuri
+    else:
+        cititor = _citesteXlsxInBlocuri
+
+    if not cache:
+        yield from cititor(fisier_path, marime_bloc)
+        return
+
+    try:
+        cheie = hashFisier(fisier_path)
+    except OSError:
+        yield from cititor(fisier_path, marime_bloc)
+        return
+
+    cale_cache = os.path.join(CACHE_DIR, f"{cheie}.pkl")
+
+    if os.path.exists(cale_cache):
+        emise = 0
+        try:
+            os.utime(cale_cache)  # Marchează intrarea ca folosită recent (LRU)
+            logger.info(f"⚡ Export din cache: {os.path.basename(fisier_path)} ({cheie[:12]})")
+            with open(cale_cache, 'rb') as f:
+                while True:
+                    try:
+                        bloc = pickle.load(f)
+                    except EOFError:
+                        break
+                    yield bloc
+                    emise += 1
+            return
+        except Exception as e:
+            # Dacă s-au trimis deja blocuri, recitirea ar dubla rândurile - eroarea se propagă
+            if emise:
+                raise
+            logger.warning(f"⚠ Intrare cache coruptă ({cheie[:12]}): {e}. Recitesc Excel-ul.")
+            try:
+                os.remove(cale_cache)
+            except OSError:
+                pass
+
+    cale_tmp = f"{cale_cache}.{os.getpid()}.{threading.get_ident()}.tmp"
+    f = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        f = open(cale_tmp, 'wb')
+    except OSError as e:
+        logger.warning(f"⚠ Nu s-a putut salva exportul în cache: {e}")
+
+    complet = False
+    try:
+        for bloc in cititor(fisier_path, marime_bloc):
+            if f:
+                pickle.dump(bloc, f, protocol=pickle.HIGHEST_PROTOCOL)
+            yield bloc
+        complet = True
+    finally:
+        if f:
+            f.close()
+            try:
+                if complet:
+                    with _cache_lock:
+                        os.replace(cale_tmp, cale_cache)
+                        _curataCache()
+                else:
+                    os.remove(cale_tmp)
+            except OSError as e:
+                logger.warning(f"⚠ Nu s-a putut salva exportul în cache: {e}")
+
+
+def convertesteInt(valoare):
+    """Conversie tolerantă la int (None dacă valoarea lipsește sau e invalidă)"""
+    try:
+        return int(valoare)
+    except (ValueError, TypeError):
+        return None
+
+
+def explodeazaProduse(serie_produse):
+    """
+    Sparge coloana de produse (separate prin ' | ') într-un rând per produs
+
+    Returns: DataFrame cu coloanele:
+        'comanda' - poziția rândului în export (0..n-1)
+        'pozitie' - poziția produsului în comandă
+        'produs'  - textul produsului (fără spații la capete)
+    """
+    liste = serie_produse.astype(str).reset_index(drop=True).str.split(SEPARATOR_PRODUSE, regex=False)
+    produse = liste.explode()
+
+    rezultat = pd.DataFrame({
+        'comanda': produse.index,
+        'produs': produse.astype(str).str.strip().values
+    })
+    rezultat['pozitie'] = rezultat.groupby('comanda').cumcount()
+    return rezultat
+
+
+def rezolvaSku(record, catalog):
+    """
+    SKU-ul unei linii tokenizate: potrivire exactă pe cheia normalizată
+    (potrivirea aproximativă e doar o sugestie în log, vezi sugestiiNegasite)
+    Returns: SKU, 'N/A' dacă nu e găsit, sau None pentru linii care nu sunt produse
+    """
+    if not (record.este_decant or record.este_intreg):
+        return None
+
+    return catalog.nume_la_sku.get(record.cheie) or 'N/A'
+
+
+class MemoLinii:
+    """
+    Memo LRU mărginit: text linie de produs -> (RecordProdus, SKU)
+    Aceleași câteva sute de linii apar în toate exporturile din zi, deci costul parsării
+    depinde de numărul de produse distincte, nu de volumul comenzilor.
+    Se golește automat când se schimbă versiunea catalogului.
+    """
+
+    def __init__(self, max_intrari=MEMO_MAX_INTRARI):
+        self.max_intrari = max_intrari
+        self._intrari = OrderedDict()
+        self._versiune_catalog = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidari = 0
+
+    def invalideaza(self):
+        self._intrari.clear()
+        self.invalidari += 1
+
+    def rezolva(self, text, catalog):
+        if catalog.versiune != self._versiune_catalog:
+            if self._intrari:
+                logger.info(f"♻ Memo linii golit (catalog v{self._versiune_catalog} -> v{catalog.versiune})")
+            self.invalideaza()
+            self._versiune_catalog = catalog.versiune
+
+        rezultat = self._intrari.get(text)
+        if rezultat is not None:
+            self._intrari.move_to_end(text)
+            self.hits += 1
+            return rezultat
+
+        self.misses += 1
+        record = tokenizeazaProdus(text)
+        rezultat = (record, rezolvaSku(record, catalog))
+
+        self._intrari[text] = rezultat
+        if len(self._intrari) > self.max_intrari:
+            self._intrari.popitem(last=False)
+        return rezultat
+
+    def statistici(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+            'intrari': len(self._intrari),
+            'max_intrari': self.max_intrari,
+            'versiune_catalog': self._versiune_catalog,
+            'invalidari': self.invalidari
+        }
+
+
+# Memo-ul partajat de toate upload-urile din proces
+memo_linii = MemoLinii()
+
+
+def extrageCampuriProduse(produse, catalog=None):
+    """
+    Extrage câmpurile din textul produselor (o singură dată per text distinct)
+
+    Args:
+        produse: DataFrame returnat de explodeazaProduse()
+        catalog: snapshot-ul catalogului (catalog_produse.SnapshotCatalog). Dacă e dat,
+                 liniile trec prin memo_linii și se adaugă și coloana 'sku'.
+
+    Returns: același DataFrame, cu coloanele adăugate:
+        'este_decant', 'este_intreg', 'cantitate_ml', 'nume_parfum', 'brand',
+        'bucati', 'produs_clean', 'produs_norm', 'nume_intreg' (+ 'sku')
+    """
+    # Exporturile repetă aceleași câteva sute de produse - tokenizăm doar textele distincte
+    unice = produse['produs'].unique()
+    skus = None
+    if catalog is not None:
+        rezolvate = [memo_linii.rezolva(text, catalog) for text in unice]
+        recorduri = [record for record, _ in rezolvate]
+        skus = [sku for _, sku in rezolvate]
+    else:
+        recorduri = [tokenizeazaProdus(text) for text in unice]
+
+    campuri = pd.DataFrame.from_records(recorduri, columns=RecordProdus._fields)
+    # Tipuri explicite - altfel un bloc fără produse ar avea coloane object (măștile bool nu mai merg)
+    campuri = campuri.astype({'este_decant': bool, 'este_intreg': bool, 'ml': int, 'bucati': int})
+    campuri = campuri.rename(columns={
+        'ml': 'cantitate_ml',
+        'nume_curat': 'produs_clean',
+        'cheie': 'produs_norm'
+    })
+    if skus is not None:
+        campuri['sku'] = pd.Series(skus, dtype=object)
+    campuri.index = pd.Index(unice, dtype=object)
+
+    rezultat = campuri.reindex(produse['produs']).reset_index(drop=True)
+    rezultat.insert(0, 'produs', produse['produs'].values)
+    rezultat.insert(0, 'pozitie', produse['pozitie'].values)
+    rezultat.insert(0, 'comanda', produse['comanda'].values)
+    return rezultat
+
+
+def sugestiiNegasite(produse, index_fuzzy, cu_ml):
+    """
+    Potrivirea aproximativă pentru produsele cu SKU 'N/A' (o căutare per nume distinct)
+    SKU-ul rămâne 'N/A': sugestia apare doar în log, ca să fie verificată de om, nu adunată
+    la cantitățile altui produs.
+
+    Args:
+        produse: DataFrame cu coloanele 'produs_clean', 'cantitate_ml', 'sku'
+        index_fuzzy: rezolvare_fuzzy.IndexFuzzy al snapshot-ului curent
+        cu_ml: True pentru decanturi (candidați doar cu același sufix -ml)
+
+    Returns: dict {produs_clean: PotrivireFuzzy}
+    """
+    sugestii = {}
+    if index_fuzzy is None:
+        return sugestii
+    negasite = produse.loc[produse['sku'] == 'N/A', ['produs_clean', 'cantitate_ml']]
+    for produs_clean, ml in negasite.drop_duplicates('produs_clean').itertuples(index=False):
+        potrivire = index_fuzzy.rezolva(produs_clean, ml if cu_ml else None)
+        if potrivire:
+            sugestii[produs_clean] = potrivire
+    return sugestii
+
+
+def _textSugestie(potrivire):
+    if potrivire is None:
+        return ''
+    return f" Sugestie aproximativă (de verificat): {potrivire.sku} (scor {potrivire.scor})."
+
+
+def agregheazaRaport(campuri, product_db, raport=None, raport_intregi=None, index_fuzzy=None):
+    """
+    Agregare pe SKU pentru decanturi și produse întregi
+
+    Args:
+        campuri: DataFrame returnat de extrageCampuriProduse() (dacă are deja coloana 'sku',
+                 product_db nu mai e folosit)
+        product_db: dict {nume_normalizat: sku}
+        raport, raport_intregi: rapoartele blocurilor anterioare (agregare incrementală)
+        index_fuzzy: index pentru sugestiile din log la produsele negăsite exact (None = fără sugestii)
+
+    Returns: (raport, raport_intregi) - aceleași structuri ca proceseazaComenzi() din app.py
+    """
+    if raport is None:
+        raport = defaultdict(lambda: {'nume': '', 'cantitate_ml': 0, 'bucati': 0})
+    if raport_intregi is None:
+        raport_intregi = defaultdict(lambda: {'nume': '', 'bucati': 0})
+
+    # 1. DECANTURI
+    decanturi = campuri[campuri['este_decant']].copy()
+    if 'sku' not in decanturi.columns:
+        decanturi['sku'] = decanturi['produs_norm'].map(product_db).fillna('N/A')
+
+    sugestii = sugestiiNegasite(decanturi, index_fuzzy, cu_ml=True)
+    negasite = decanturi[decanturi['sku'] == 'N/A'].drop_duplicates('produs_clean')
+    for produs_clean, produs_norm in zip(negasite['produs_clean'], negasite['produs_norm']):
+        logger.warning(
+            f"⚠ Produs negăsit în DB: {produs_clean} (norm: {produs_norm}). SKU setat la N/A."
+            f"{_textSugestie(sugestii.get(produs_clean))}"
+        )
+
+    # FILTRARE SUPLIMENTARĂ: Exclude produsele care nu sunt decanturi (nu au extensie -3/-5/-10)
+    non_decant = (decanturi['sku'] != 'N/A') & ~decanturi['sku'].str.contains(PATTERN_SKU_DECANT, regex=True)
+    for nume_parfum, sku in decanturi.loc[non_decant, ['nume_parfum', 'sku']].drop_duplicates().itertuples(index=False):
+        logger.info(f"Produs exclus (SKU non-decant): {nume_parfum} | SKU: {sku}")
+    decanturi = decanturi[~non_decant]
+
+    grupat = decanturi.groupby('sku', sort=False).agg(
+        nume=('nume_parfum', 'last'),
+        cantitate_ml=('cantitate_ml', 'last'),
+        bucati=('bucati', 'sum')
+    )
+    for sku, nume, cantitate_ml, bucati in grupat.itertuples():
+        raport[sku]['nume'] = nume
+        raport[sku]['cantitate_ml'] = int(cantitate_ml)
+        raport[sku]['bucati'] += int(bucati)
+
+    # 2. PRODUSE ÎNTREGI (nu conțin 'Decant')
+    intregi = campuri[campuri['este_intreg']].copy()
+    if 'sku' not in intregi.columns:
+        intregi['sku'] = intregi['produs_norm'].map(product_db).fillna('N/A')
+    for produs_clean, potrivire in sugestiiNegasite(intregi, index_fuzzy, cu_ml=False).items():
+        logger.warning(f"⚠ Produs întreg negăsit în DB: {produs_clean}. SKU setat la N/A.{_textSugestie(potrivire)}")
+    intregi['cheie'] = intregi['sku'].where(intregi['sku'] != 'N/A', intregi['nume_intreg'])
+
+    grupat = intregi.groupby('cheie', sort=False).agg(
+        nume=('nume_intreg', 'last'),
+        bucati=('bucati', 'sum'),
+        sku=('sku', 'last')
+    )
+    for cheie, nume, bucati, sku in grupat.itertuples():
+        raport_intregi[cheie]['nume'] = nume
+        raport_intregi[cheie]['bucati'] += int(bucati)
+        raport_intregi[cheie]['sku'] = sku
+
+    return raport, raport_intregi
+
+
+def asociazaSkuPozitional(campuri, serie_atribute):
+    """
+    Asociază fiecărui produs SKU-ul de pe aceeași poziție din coloana de atribute
+    (produsul i din comandă <-> al i-lea "SKU: (...)" din atribute)
+
+    Returns: Series cu SKU-ul asociat (NaN dacă atributele au mai puține SKU-uri)
+    """
+    skus = serie_atribute.astype(str).reset_index(drop=True).str.extractall(PATTERN_SKU_ATRIBUTE_GENERIC)[0]
+    skus.index = skus.index.set_names(['comanda', 'pozitie'])
+    chei = pd.MultiIndex.from_arrays([campuri['comanda'], campuri['pozitie']])
+    return pd.Series(skus.reindex(chei).values, index=campuri.index)
+
+
+def extrageBonuriDinAtribute(df_finalizate, coloana_atribute, coloana_order_id=None, coloana_order_number=None):
+    """
+    Extrage TOATE SKU-urile de decant din coloana de atribute, câte un rând per (comandă, SKU)
+
+    Returns: DataFrame cu coloanele 'sku', 'order_id', 'order_number'
+             (order_id / order_number sunt int sau None)
+    """
+    atribute = df_finalizate[coloana_atribute].astype(str).reset_index(drop=True)
+    skus = atribute.str.extractall(PATTERN_SKU_ATRIBUTE)[0]
+
+    # Doar decanturi (SKU-uri care au sufixul -3, -5 sau -10) - parfumurile 100ml sunt ignorate
+    skus = skus[skus.str.contains(r'-\d{1,2}$', regex=True)]
+    randuri = skus.index.get_level_values(0)
+
+    def coloanaComenzi(coloana):
+        if not coloana:
+            return [None] * len(randuri)
+        valori = [convertesteInt(v) for v in df_finalizate[coloana].tolist()]
+        return [valori[r] for r in randuri]
+
+    return pd.DataFrame({
+        'sku': skus.values,
+        'order_id': pd.Series(coloanaComenzi(coloana_order_id), dtype=object),
+        'order_number': pd.Series(coloanaComenzi(coloana_order_number), dtype=object)
+    })
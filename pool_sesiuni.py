@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de sesiuni browser (WebDriver) autentificate în Oblio, deținut de procesul aplicației
+Fiecare rulare a automatizării pornea un Chromium nou și se loga de la zero (10-20 s, uneori
+2FA din nou). Pool-ul păstrează sesiunile calde între rulări:
+- imprumuta() / returneaza(): o sesiune e folosită de o singură automatizare la un moment dat
+- la împrumut sesiunea e verificată pe pagina de producție (câmpul #pp_name, fără redirect la login)
+- sesiunile inactive prea mult sau prea vechi sunt închise (bucla_curatare)
+- memoria rezidentă totală a proceselor Chromium are o limită - peste ea sesiunile nu se mai păstrează
+  și nu se mai pornesc altele noi
+"""
+
+import logging
+import os
+import platform
+import threading
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+URL_PRODUCTIE = "https://www.oblio.eu/stock/production/"
+
+# Numărul maxim de sesiuni (Chromium) deschise simultan
+SESIUNI_MAX = int(os.getenv('SESIUNI_MAX', '2'))
+# Sesiuni pornite și autentificate la pornirea aplicației (necesită OBLIO_EMAIL / OBLIO_PASSWORD)
+SESIUNI_MIN = int(os.getenv('SESIUNI_MIN', '0'))
+# O sesiune nefolosită de atâtea secunde este închisă
+SESIUNI_INACTIVITATE = float(os.getenv('SESIUNI_INACTIVITATE', '900'))
+# O sesiune mai veche de atât este reciclată (Chromium acumulează memorie în timp)
+SESIUNI_DURATA_MAX = float(os.getenv('SESIUNI_DURATA_MAX', str(4 * 3600)))
+# Limita de memorie rezidentă pentru toate procesele Chromium din pool (MB)
+SESIUNI_MEMORIE_MAX_MB = float(os.getenv('SESIUNI_MEMORIE_MAX_MB', '1500'))
+# Cât timp statisticile refolosesc ultima măsurare a memoriei (parcurgerea /proc la fiecare /health/detalii și scrape)
+SESIUNI_MEMORIE_CACHE = float(os.getenv('SESIUNI_MEMORIE_CACHE', '10'))
+# Cât așteaptă un împrumut după o sesiune liberă când pool-ul e plin (secunde)
+SESIUNI_TIMEOUT = float(os.getenv('SESIUNI_TIMEOUT', '120'))
+
+
+def _procese_copii():
+    """Harta pid părinte -> lista de pid-uri copii, din /proc (doar Linux)"""
+    copii = {}
+    for intrare in os.listdir('/proc'):
+        if not intrare.isdigit():
+            continue
+        try:
+            with open(f'/proc/{intrare}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Numele procesului e între paranteze și poate conține spații - ppid vine după ')'
+        ppid = int(stat[stat.rfind(b')') + 2:].split()[1])
+        copii.setdefault(ppid, []).append(int(intrare))
+    return copii
+
+
+def memorie_rezidenta_mb(pids):
+    """
+    Memoria rezidentă (VmRSS) a proceselor date și a tuturor descendenților lor, în MB
+    Returns: float sau None dacă /proc nu este disponibil (Windows / macOS)
+    """
+    if platform.system() != 'Linux' or not os.path.isdir('/proc'):
+        return None
+
+    copii = _procese_copii()
+    de_vizitat = [pid for pid in pids if pid]
+    vazute = set()
+    total_kb = 0
+
+    while de_vizitat:
+        pid = de_vizitat.pop()
+        if pid in vazute:
+            continue
+        vazute.add(pid)
+        de_vizitat.extend(copii.get(pid, ()))
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for linie in f:
+                    if linie.startswith('VmRSS:'):
+                        total_kb += int(linie.split()[1])
+                        break
+        except OSError:
+            continue
+
+    return total_kb / 1024
+
+
+class SesiuneBrowser:
+    """Un WebDriver pornit și (de obicei) autentificat în Oblio"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.creata_la = time.monotonic()
+        self.eliberata_la = self.creata_la
+        self.folosiri = 0
+
+    @property
+    def pid(self):
+        """PID-ul procesului chromedriver (Chromium rulează ca descendent al lui)"""
+        try:
+            return self.driver.service.process.pid
+        except AttributeError:
+            return None
+
+    def expirata(self, acum=None):
+        acum = time.monotonic() if acum is None else acum
+        return (acum - self.eliberata_la > SESIUNI_INACTIVITATE or
+                acum - self.creata_la > SESIUNI_DURATA_MAX)
+
+    def inchide(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.debug(f"Eroare la închiderea sesiunii browser: {e}")
+
+
+def sesiune_valida(driver, timeout=10):
+    """Sesiunea e validă dacă pagina de producție se încarcă cu #pp_name, fără redirect la login"""
+    try:
+        driver.get(URL_PRODUCTIE)
+        WebDriverWait(driver, timeout).until(
+            lambda d: "login" in d.current_url.lower() or d.find_elements(By.ID, "pp_name")
+        )
+        return "login" not in driver.current_url.lower() and bool(driver.find_elements(By.ID, "pp_name"))
+    except Exception:
+        return False
+
+
+class PoolSesiuni:
+    """Pool de sesiuni WebDriver cu semantică împrumut / returnare"""
+
+    def __init__(self, maxim=SESIUNI_MAX, memorie_max_mb=SESIUNI_MEMORIE_MAX_MB):
+        self.maxim = max(1, maxim)
+        self.memorie_max_mb = memorie_max_mb
+        self._lock = threading.Lock()
+        self._locuri = threading.BoundedSemaphore(self.maxim)
+        self._libere = []                  # sesiuni calde, cea mai recent folosită la final
+        self._imprumutate = {}             # id(automation) -> SesiuneBrowser
+        self.create = 0
+        self.refolosite = 0
+        self.reciclate = 0
+        self._memorie = (float('-inf'), None)   # (momentul măsurării, MB)
+
+    def memorie_mb(self, vechime_max=0.0):
+        """
+        Memoria rezidentă a tuturor sesiunilor din pool (MB, None fără /proc)
+        O măsurare mai nouă de `vechime_max` secunde este refolosită
+        """
+        acum = time.monotonic()
+        with self._lock:
+            masurata_la, memorie = self._memorie
+            if acum - masurata_la < vechime_max:
+                return memorie
+            toate = self._libere + list(self._imprumutate.values())
+        memorie = memorie_rezidenta_mb([s.pid for s in toate]) if toate else 0.0
+        with self._lock:
+            self._memorie = (acum, memorie)
+        return memorie
+
+    def _scoate_libera(self):
+        """Cea mai recent folosită sesiune neexpirată (cele expirate sunt închise)"""
+        while True:
+            with self._lock:
+                if not self._libere:
+                    return None
+                sesiune = self._libere.pop()
+            if not sesiune.expirata():
+                return sesiune
+            self._recicleaza(sesiune, 'expirată')
+
+    def _recicleaza(self, sesiune, motiv):
+        logger.info(f"♻️ Sesiune browser închisă ({motiv}, {sesiune.folosiri} folosiri)")
+        sesiune.inchide()
+        with self._lock:
+            self.reciclate += 1
+
+    def imprumuta(self, automation, email=None, password=None, timeout=None):
+        """
+        Atașează automatizării o sesiune autentificată (caldă din pool sau una nouă)
+
+        Args:
+            automation: OblioAutomation (primește sesiunea în automation.driver)
+            email / password: credențiale Oblio pentru login-ul unei sesiuni noi / expirate
+            timeout: cât se așteaptă o sesiune liberă când pool-ul e plin (implicit SESIUNI_TIMEOUT)
+
+        Returns:
+            True dacă automation.driver este gata de lucru, False altfel
+        """
+        # Fără headless (Windows / Chrome local cu remote debugging) nu are sens păstrarea sesiunii
+        if not automation.headless:
+            return automation.setup_driver()
+
+        if not self._locuri.acquire(timeout=SESIUNI_TIMEOUT if timeout is None else timeout):
+            automation._log(f"❌ Toate cele {self.maxim} sesiuni browser sunt ocupate", 'error')
+            return False
+
+        try:
+            while True:
+                sesiune = self._scoate_libera()
+                if sesiune is None:
+                    break
+                automation._log("♨️ Sesiune browser caldă din pool - verificare autentificare...", 'info')
+                if sesiune_valida(sesiune.driver):
+                    with self._lock:
+                        self.refolosite += 1
+                    return self._ataseaza(automation, sesiune)
+
+                # Browser-ul e viu dar delogat - încercăm re-login pe loc înainte de a-l arunca
+                automation.driver = sesiune.driver
+                if automation.login_if_needed(email, password) and sesiune_valida(sesiune.driver):
+                    return self._ataseaza(automation, sesiune)
+                automation.driver = None
+                self._recicleaza(sesiune, 'sesiune invalidă')
+
+            # Limita de memorie contează și înainte de a porni încă un Chromium
+            memorie = self.memorie_mb()
+            if memorie is not None and memorie > self.memorie_max_mb:
+                automation._log(f"❌ Limita de memorie a browserelor atinsă ({memorie:.0f}/{self.memorie_max_mb:.0f} MB)"
+                                f" - nu se pornește o sesiune nouă", 'error')
+                self._locuri.release()
+                return False
+
+            # Nicio sesiune caldă - pornim Chromium și ne autentificăm o dată
+            if not automation.setup_driver():
+                self._locuri.release()
+                return False
+
+            sesiune = SesiuneBrowser(automation.driver)
+            with self._lock:
+                self.create += 1
+            if not automation.login_if_needed(email, password):
+                # Un browser nelogat ar eșua la fiecare bon - nu îl atașăm
+                automation._log("❌ Login Oblio eșuat - sesiunea browser nouă a fost închisă", 'error')
+                automation.driver = None
+                self._recicleaza(sesiune, 'login eșuat')
+                self._locuri.release()
+                return False
+            return self._ataseaza(automation, sesiune)
+        except BaseException:
+            self._locuri.release()
+            raise
+
+    def _ataseaza(self, automation, sesiune):
+        sesiune.folosiri += 1
+        automation.driver = sesiune.driver
+        with self._lock:
+            self._imprumutate[id(automation)] = sesiune
+        return True
+
+    def returneaza(self, automation, stricata=False):
+        """
+        Ia sesiunea înapoi de la automatizare (automation.driver devine None)
+        Sesiunile stricate sau care depășesc limita de memorie sunt închise în loc să fie păstrate.
+        """
+        with self._lock:
+            sesiune = self._imprumutate.pop(id(automation), None)
+
+        if sesiune is None:
+            # Sesiune care nu e din pool (non-headless) - comportamentul vechi
+            automation.close()
+            automation.driver = None
+            return
+
+        automation.driver = None
+        try:
+            if stricata:
+                self._recicleaza(sesiune, 'eroare în rulare')
+                return
+
+            # Tab-urile rămase din modul batch nu se păstrează
+            try:
+                ferestre = sesiune.driver.window_handles
+                for fereastra in ferestre[1:]:
+                    sesiune.driver.switch_to.window(fereastra)
+                    sesiune.driver.close()
+                sesiune.driver.switch_to.window(ferestre[0])
+            except Exception:
+                self._recicleaza(sesiune, 'browser inaccesibil')
+                return
+
+            if sesiune.expirata():
+                self._recicleaza(sesiune, 'expirată')
+                return
+
+            sesiune.eliberata_la = time.monotonic()
+            with self._lock:
+                self._libere.append(sesiune)
+        finally:
+            self._locuri.release()
+
+        self._aplica_limita_memorie()
+
+    def _aplica_limita_memorie(self):
+        """Închide sesiunile libere (cele mai vechi primele) cât timp memoria totală depășește limita"""
+        while True:
+            with self._lock:
+                if not self._libere:
+                    return
+            memorie = self.memorie_mb()
+            if memorie is None or memorie <= self.memorie_max_mb:
+                return
+
+            with self._lock:
+                if not self._libere:
+                    return
+                sesiune = self._libere.pop(0)
+            self._recicleaza(sesiune, f'limită memorie {memorie:.0f}/{self.memorie_max_mb:.0f} MB')
+
+    def curata(self):
+        """Închide sesiunile libere expirate (inactivitate / vârstă) și aplică limita de memorie"""
+        acum = time.monotonic()
+        with self._lock:
+            expirate = [s for s in self._libere if s.expirata(acum)]
+            self._libere = [s for s in self._libere if not s.expirata(acum)]
+        for sesiune in expirate:
+            self._recicleaza(sesiune, 'inactivă')
+        self._aplica_limita_memorie()
+
+    def inchide(self):
+        """Închide toate sesiunile libere (cele împrumutate se închid la returnare)"""
+        with self._lock:
+            libere, self._libere = self._libere, []
+        for sesiune in libere:
+            sesiune.inchide()
+
+    def statistici(self):
+        with self._lock:
+            rezultat = {
+                'libere': len(self._libere),
+                'imprumutate': len(self._imprumutate),
+                'maxim': self.maxim,
+                'create': self.create,
+                'refolosite': self.refolosite,
+                'reciclate': self.reciclate,
+            }
+        memorie = self.memorie_mb(vechime_max=SESIUNI_MEMORIE_CACHE)
+        rezultat['memorie_mb'] = round(memorie, 1) if memorie is not None else None
+        rezultat['memorie_max_mb'] = self.memorie_max_mb
+        return rezultat
+
+
+pool = PoolSesiuni()
+
+
+def preincalzeste(automation_factory, email, password, numar=SESIUNI_MIN):
+    """
+    Pornește și autentifică `numar` sesiuni la pornirea aplicației (fără 2FA interactiv)
+
+    Args:
+        automation_factory: funcție fără argumente care creează un OblioAutomation headless
+    """
+    automatizari = []
+    try:
+        for _ in range(numar):
+            automation = automation_factory()
+            if not pool.imprumuta(automation, email, password):
+                break
+            automatizari.append(automation)
+    finally:
+        for automation in automatizari:
+            pool.returneaza(automation)
+    if automatizari:
+        logger.info(f"♨️ {len(automatizari)} sesiuni browser pregătite în pool")
+
+
+def bucla_curatare(interval=60):
+    """Curățarea periodică a sesiunilor inactive (green thread eventlet)"""
+    while True:
+        time.sleep(interval)
+        try:
+            pool.curata()
+        except Exception as e:
+            logger.error(f"❌ Eroare curățare sesiuni browser: {e}")
@@ -7,10 +7,12 @@ pentru fiecare parfum și cantitate (3ml, 5ml, 10ml)
 
 import pandas as pd
 import sys
-import re
 from collections import defaultdict
 from pathlib import Path
 
+import parsare_comenzi
+from tokenizer_produse import tokenizeazaProdus
+
 # Configurare encoding pentru output
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -20,26 +22,11 @@ def extrageInfoProdus(text_produs):
     Extrage informații din textul produsului
     Returns: (nume_parfum, cantitate_ml, numar_bucati) sau None dacă nu e decant
     """
-    # Verifică dacă este un decant
-    if 'Decant' not in text_produs:
-        return None
-
-    # Extrage cantitatea în ml (3 ml, 5 ml, 10 ml)
-    match_ml = re.search(r'Decant (\d+) ml parfum (.+?),', text_produs)
-    if not match_ml:
+    record = tokenizeazaProdus(text_produs)
+    if not record.este_decant:
         return None
 
-    cantitate_ml = int(match_ml.group(1))
-    nume_parfum = match_ml.group(2).strip()
-
-    # Extrage numărul de bucăți (ultimul număr din șir, format X.00)
-    match_bucati = re.search(r'(\d+\.\d+)$', text_produs.strip())
-    if match_bucati:
-        numar_bucati = float(match_bucati.group(1))
-    else:
-        numar_bucati = 1.0
-
-    return (nume_parfum, cantitate_ml, int(numar_bucati))
+    return (record.nume_parfum, record.ml, record.bucati)
 
 
 def detecteazaColoane(df):
@@ -86,50 +73,45 @@ def proceseazaComenzi(cale_fisier):
     """
     Procesează fișierul cu comenzi și returnează raportul de producție
     """
-    # Citire fișier Excel
-    df = pd.read_excel(cale_fisier)
-
-    # Detectare coloane
-    try:
-        coloana_status, coloana_produse, coloana_atribute = detecteazaColoane(df)
-    except ValueError as e:
-        print(f"Eroare structură fișier: {e}")
-        return {}, 0, len(df)
-
-    # Filtrare comenzi finalizate (include și Confirmata pentru flexibilitate)
-    # Caută 'Finalizata' sau 'Confirmata' (case insensitive)
-    df_finalizate = df[df[coloana_status].astype(str).str.contains('Finalizata|Confirmata', case=False, na=False)]
-
     # Dicționar pentru agregare: {(nume_parfum, cantitate_ml): total_bucati}
     raport = defaultdict(int)
-
-    # Procesare comenzi
-    for idx, row in df_finalizate.iterrows():
-        # Split produse separate prin ' | '
-        produse = str(row[coloana_produse]).split(' | ')
-        atribute_text = str(row[coloana_atribute]) if coloana_atribute else ''
-
-        # Extrage SKU-uri din atribute
-        sku_matches = re.findall(r'([^,\s]+):\s*\(', atribute_text) if atribute_text else []
-
-        for i, produs in enumerate(produse):
-            info = extrageInfoProdus(produs.strip())
-            if info:
-                nume_parfum, cantitate_ml, numar_bucati = info
-
-                # Verificare SKU (dacă există)
-                # User request: exclude produsele care nu au extensie -3/-5/-10 (parfumuri întregi)
-                if i < len(sku_matches):
-                    sku = sku_matches[i]
-                    # Verifică dacă SKU se termină în -cifră (ex: -3, -5, -10)
-                    if not re.search(r'-\d+$', sku):
-                        # Dacă SKU-ul nu are extensie de decant, îl ignorăm
-                        # Chiar dacă numele conține "Decant" (posibilă eroare în denumire sau parsare)
-                        continue
-
-                raport[(nume_parfum, cantitate_ml)] += numar_bucati
-
-    return raport, len(df_finalizate), len(df)
+    total_comenzi = 0
+    total_finalizate = 0
+
+    # Citire fișier Excel în flux (blocuri de rânduri, doar coloanele necesare)
+    blocuri = parsare_comenzi.citesteExportInBlocuri(str(cale_fisier), cache=False)
+
+    for df in blocuri:
+        # Detectare coloane
+        try:
+            coloana_status, coloana_produse, coloana_atribute = detecteazaColoane(df)
+        except ValueError as e:
+            print(f"Eroare structură fișier: {e}")
+            return {}, 0, len(df) + sum(len(bloc) for bloc in blocuri)
+
+        # Filtrare comenzi finalizate (include și Confirmata pentru flexibilitate)
+        # Caută 'Finalizata' sau 'Confirmata' (case insensitive)
+        df_finalizate = df[df[coloana_status].astype(str).str.contains('Finalizata|Confirmata', case=False, na=False)]
+        total_comenzi += len(df)
+        total_finalizate += len(df_finalizate)
+
+        # Procesare columnară: un rând per produs (split ' | ' + explode)
+        produse = parsare_comenzi.explodeazaProduse(df_finalizate[coloana_produse])
+        campuri = parsare_comenzi.extrageCampuriProduse(produse)
+        decanturi = campuri[campuri['este_decant']]
+
+        # Verificare SKU (dacă există) - produsul i din comandă <-> al i-lea SKU din atribute
+        # User request: exclude produsele care nu au extensie -3/-5/-10 (parfumuri întregi)
+        if coloana_atribute:
+            skus = parsare_comenzi.asociazaSkuPozitional(decanturi, df_finalizate[coloana_atribute])
+            non_decant = skus.notna() & ~skus.astype(str).str.contains(r'-\d+$', regex=True)
+            decanturi = decanturi[~non_decant]
+
+        grupat = decanturi.groupby(['nume_parfum', 'cantitate_ml'], sort=False)['bucati'].sum()
+        for (nume_parfum, cantitate_ml), numar_bucati in grupat.items():
+            raport[(nume_parfum, int(cantitate_ml))] += int(numar_bucati)
+
+    return raport, total_finalizate, total_comenzi
 
 
 def afiseazaRaport(raport, comenzi_finalizate, total_comenzi):
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Rezolvare aproximativă (fuzzy) a SKU-urilor pentru produsele negăsite exact în catalog
+Index invers de trigrame, construit o singură dată per snapshot. Candidații sunt grupați după
+tipul SKU-ului (decant 3/5/10 ml sau produs întreg), deci o căutare compară doar cu produsele
+de același tip. Scorul este coeficientul Dice pe trigrame.
+
+Trigramele se calculează doar pe numele parfumului (cheie_esentiala): prefixul comun
+"Decant X ml parfum", brandul și genul (femei / barbati / unisex) sunt scoase. Altfel ele fac
+cea mai mare parte din scor și "Opulent Musk" ajunge la "Opulent Red" cu 0.82.
+O potrivire se acceptă doar peste prag ȘI cu o marjă clară față de al doilea candidat.
+"""
+
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict, namedtuple
+from itertools import chain
+
+# Scorul minim (0..1) pentru a accepta o potrivire aproximativă
+PRAG_IMPLICIT = float(os.getenv('FUZZY_PRAG', '0.85'))
+# Diferența minimă de scor față de cel mai bun candidat cu alt SKU
+MARJA_IMPLICITA = float(os.getenv('FUZZY_MARJA', '0.1'))
+
+GRUPA_INTREG = 'intreg'
+
+_PATTERN_SUFIX_ML = re.compile(r'-(\d+)$')
+_PATTERN_ML = re.compile(r'\b(?:decant\s+)?\d+(?:[.,]\d+)?\s*ml\b')
+_PATTERN_NON_ALFANUMERIC = re.compile(r'[^a-z0-9]+')
+# Cuvinte prezente în aproape toate denumirile - nu deosebesc un parfum de altul
+_CUVINTE_COMUNE = frozenset({'decant', 'parfum', 'femei', 'barbati', 'unisex'})
+
+PotrivireFuzzy = namedtuple('PotrivireFuzzy', ['sku', 'scor', 'cheie_catalog'])
+
+
+def trigrame(cheie):
+    """Trigramele unei chei normalizate (cu margini marcate, ca începutul/sfârșitul să conteze)"""
+    text = f"${cheie}$"
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def grupaSku(sku):
+    """Grupa unui SKU: cantitatea decantului ('3', '5', '10') sau 'intreg' pentru produse întregi"""
+    match = _PATTERN_SUFIX_ML.search(sku)
+    return match.group(1) if match else GRUPA_INTREG
+
+
+def _cuvinte(text):
+    """Textul fără diacritice, lowercase, cu cuvintele separate printr-un singur spațiu"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    return _PATTERN_NON_ALFANUMERIC.sub(' ', text).strip()
+
+
+def patternBranduri(branduri):
+    """Regex pentru brandurile din catalog (cele mai lungi primele), aplicat pe textul din _cuvinte()"""
+    variante = sorted({_cuvinte(b) for b in branduri if isinstance(b, str)} - {''}, key=len, reverse=True)
+    if not variante:
+        return None
+    return re.compile(r'\b(?:' + '|'.join(re.escape(v) for v in variante) + r')\b')
+
+
+def cheie_esentiala(nume, pattern_branduri=None):
+    """
+    Numele parfumului, normalizat, fără prefixul de decant, cantități, brand și gen
+    Ex: "Decant 5 ml parfum Opulent Musk, Lattafa, Femei" -> "opulentmusk"
+
+    Returns: cheia sau '' dacă nu rămâne nimic
+    """
+    if not isinstance(nume, str):
+        return ''
+    text = _PATTERN_ML.sub(' ', _cuvinte(nume))
+    if pattern_branduri is not None:
+        fara_brand = pattern_branduri.sub(' ', text)
+        # Un parfum care poartă chiar numele brandului își păstrează numele
+        if fara_brand.strip():
+            text = fara_brand
+    return ''.join(cuvant for cuvant in text.split() if cuvant not in _CUVINTE_COMUNE)
+
+
+class IndexFuzzy:
+    """Index de trigrame peste numele de parfum din catalog (imutabil, construit o dată per catalog)"""
+
+    def __init__(self, produse, branduri=(), prag=PRAG_IMPLICIT, marja=MARJA_IMPLICITA):
+        """
+        Args:
+            produse: iterabil de (sku, nume, ...) - ca SnapshotCatalog.produse
+            branduri: brandurile din catalog (scoase din nume înainte de scor)
+        """
+        self.prag = prag
+        self.marja = marja
+        self._pattern_branduri = patternBranduri(branduri)
+        self._chei = []
+        self._skus = []
+        self._trigrame = []
+        # grupa -> trigramă -> lista de id-uri
+        self._postari = defaultdict(lambda: defaultdict(list))
+
+        for sku, nume, *_ in produse:
+            cheie = cheie_esentiala(nume, self._pattern_branduri)
+            if not cheie or not sku:
+                continue
+            id_cheie = len(self._chei)
+            tri = trigrame(cheie)
+            self._chei.append(cheie)
+            self._skus.append(sku)
+            self._trigrame.append(tri)
+
+            postari = self._postari[grupaSku(sku)]
+            for t in tri:
+                postari[t].append(id_cheie)
+
+        # Fără defaultdict la căutare - o grupă / trigramă necunoscută nu trebuie să creeze intrări
+        self._postari = {grupa: dict(postari) for grupa, postari in self._postari.items()}
+
+    def __len__(self):
+        return len(self._chei)
+
+    def rezolva(self, nume, ml=None):
+        """
+        Caută produsul din catalog cu același nume de parfum
+
+        Args:
+            nume: denumirea produsului din comandă (ex. record.nume_curat)
+            ml: cantitatea decantului, sau None pentru produse întregi
+
+        Returns: PotrivireFuzzy(sku, scor, cheie_catalog) sau None dacă scorul e sub prag
+                 sau al doilea candidat (alt SKU) e prea aproape
+        """
+        postari = self._postari.get(str(ml) if ml else GRUPA_INTREG)
+        cheie = cheie_esentiala(nume, self._pattern_branduri)
+        if not postari or not cheie:
+            return None
+
+        tri = trigrame(cheie)
+        comune = Counter(chain.from_iterable(postari.get(t, ()) for t in tri))
+        if not comune:
+            return None
+
+        n = len(tri)
+        scoruri = sorted(
+            ((2.0 * numar / (n + len(self._trigrame[id_cheie])), -id_cheie) for id_cheie, numar in comune.items()),
+            reverse=True
+        )
+        scor_maxim, cel_mai_bun = scoruri[0][0], -scoruri[0][1]
+        if scor_maxim < self.prag:
+            return None
+
+        sku = self._skus[cel_mai_bun]
+        al_doilea = next((scor for scor, id_negat in scoruri[1:] if self._skus[-id_negat] != sku), 0.0)
+        if scor_maxim - al_doilea < self.marja:
+            return None
+
+        return PotrivireFuzzy(sku, round(scor_maxim, 3), self._chei[cel_mai_bun])
@@ -68,6 +68,8 @@ document.addEventListener('DOMContentLoaded', () => {
     };
 
     initTypewriter();
+    updateCatalogStatus();
+    setInterval(updateCatalogStatus, 60000);
     
     try {
         initEventListeners();
@@ -105,6 +107,42 @@ function initTypewriter() {
     }
 }
 
+// Vârsta catalogului de produse + ultima eroare de reîmprospătare (din /health/detalii)
+function formatAge(seconds) {
+    if (seconds === null || seconds === undefined) return '?';
+    if (seconds < 60) return `${seconds}s`;
+    if (seconds < 3600) return `${Math.floor(seconds / 60)}m`;
+    if (seconds < 86400) return `${Math.floor(seconds / 3600)}h`;
+    return `${Math.floor(seconds / 86400)}d`;
+}
+
+async function updateCatalogStatus() {
+    const el = document.getElementById('catalogStatus');
+    if (!el) return;
+
+    try {
+        const response = await fetch('/health/detalii');
+        const data = await response.json();
+        const catalog = data.catalog || {};
+
+        if (!catalog.versiune) {
+            el.textContent = 'NOT_LOADED';
+            el.className = 'val-error';
+        } else {
+            el.textContent = `v${catalog.versiune} // ${catalog.produse} SKU // AGE ${formatAge(catalog.varsta_secunde)} // CHECKED ${formatAge(catalog.verificat_acum_secunde)} AGO`;
+            el.className = 'val-info';
+        }
+
+        if (catalog.ultima_eroare) {
+            el.textContent += ` // REFRESH_ERR: ${catalog.ultima_eroare}`;
+            el.className = 'val-error';
+        }
+    } catch (e) {
+        el.textContent = 'UNAVAILABLE';
+        el.className = 'val-error';
+    }
+}
+
 function initEventListeners() {
     // Navigation
     dom.nav.analysis.addEventListener('click', (e) => {
@@ -238,6 +276,9 @@ function switchModule(moduleName) {
     logSystem('NAV', `Switched to module: ${moduleName.toUpperCase()}`);
 }
 
+// Fragmentul în care se strâng intrările unui frame 'log_batch' (un singur reflow / scroll per frame)
+let pendingLogFragment = null;
+
 function logSystem(source, message, type = 'info') {
     const entry = document.createElement('div');
     entry.className = 'log-entry';
@@ -250,11 +291,28 @@ function logSystem(source, message, type = 'info') {
         <span class="${colorClass}">${source}:</span>
         <span>${message}</span>
     `;
-    
+
+    if (pendingLogFragment) {
+        pendingLogFragment.appendChild(entry);
+        return;
+    }
     dom.logs.appendChild(entry);
     dom.logs.scrollTop = dom.logs.scrollHeight;
 }
 
+function beginLogBatch() {
+    pendingLogFragment = document.createDocumentFragment();
+}
+
+function endLogBatch() {
+    const fragment = pendingLogFragment;
+    pendingLogFragment = null;
+    if (fragment && fragment.childNodes.length) {
+        dom.logs.appendChild(fragment);
+        dom.logs.scrollTop = dom.logs.scrollHeight;
+    }
+}
+
 function exportLogs() {
     // Colectează toate log-urile din terminal
     const logEntries = dom.logs.querySelectorAll('.log-entry');
@@ -623,13 +681,7 @@ function startAutomation() {
     logSystem('AUTO_INIT', 'Initializing Oblio Automation Bot...');
 
     // Show stop button, hide run button
-    dom.production.runBtn.style.display = 'none';
-    dom.production.stopBtn.style.display = 'inline-block';
-    dom.production.stopBtn.disabled = false;
-    dom.production.status.textContent = 'STATUS: RUNNING';
-    dom.production.status.className = 'val-success blink';
-
-    isProcessing = true;
+    setRunningUI();
 
     // Check if force mode is enabled
     const forceModeCheckbox = document.getElementById('forceModeCheckbox');
@@ -652,31 +704,89 @@ function stopAutomation() {
 
 socket.on('connect', () => {
     logSystem('NET', 'Socket connected.');
+    checkUnfinishedJob();
+});
+
+// Jobul ultimei rulări - dacă a rămas neterminat (restart / tab închis) poate fi reluat cu 'resume'
+// Ultima secvență din jurnalul jobului afișată în pagina curentă (o pagină nouă pornește de la 0)
+let lastJobSeq = 0;
+
+socket.on('job_creat', (data) => {
+    localStorage.setItem('lastJobId', data.job_id);
+    lastJobSeq = 0;
+    logSystem('JOB', `Job ${data.job_id} created (${data.total} vouchers).`, 'info');
+});
+
+socket.on('job_urmarit', (data) => {
+    if (data.reluate > 0) {
+        logSystem('JOB', `Attached to job ${data.job_id}: ${data.reluate} missed entries replayed.`, 'info');
+    }
 });
 
-socket.on('log', (data) => {
+function checkUnfinishedJob() {
+    const jobId = localStorage.getItem('lastJobId');
+    if (!jobId) return;
+
+    fetch(`/joburi/${jobId}`)
+        .then(response => response.ok ? response.json() : null)
+        .then(job => {
+            if (!job) return;
+            const remaining = (job.bonuri_pe_stari.in_asteptare || 0) + (job.bonuri_pe_stari.reincercare || 0);
+            if (job.stare === 'in_lucru') {
+                // Ne reatașăm la rulare: serverul trimite doar intrările de după lastJobSeq, apoi cele live
+                logSystem('JOB', `Job ${jobId} is still running on the server (${remaining} vouchers left).`, 'info');
+                setRunningUI();
+                socket.emit('urmareste_job', { job_id: jobId, dupa: lastJobSeq });
+            } else if (['intrerupt', 'oprit', 'eroare'].includes(job.stare) && remaining > 0) {
+                logSystem('JOB', `Job ${jobId} is unfinished (${job.stare}, ${remaining}/${job.total} vouchers left). Type 'resume' to continue.`, 'warning');
+            }
+        })
+        .catch(() => {});
+}
+
+function resumeJob() {
+    const jobId = localStorage.getItem('lastJobId');
+    if (!jobId) {
+        logSystem('INFO', 'No job to resume.', 'info');
+        return;
+    }
+
+    setRunningUI();
+    socket.emit('resume_job', { job_id: jobId });
+}
+
+function setRunningUI() {
+    dom.production.runBtn.style.display = 'none';
+    dom.production.stopBtn.style.display = 'inline-block';
+    dom.production.stopBtn.disabled = false;
+    dom.production.status.textContent = 'STATUS: RUNNING';
+    dom.production.status.className = 'val-success blink';
+    isProcessing = true;
+}
+
+function onServerLog(data) {
     // data = { type: 'info'|'error'|'success', message: "..." }
     logSystem('SERVER', data.message, data.type);
-});
+}
 
 socket.on('automation_stopped', (data) => {
     logSystem('STOP_CONFIRM', 'Process stopped by user.', 'success');
     resetAutomationUI();
 });
 
-socket.on('progress', (data) => {
+function onProgress(data) {
     logSystem('PROGRESS', `Processing ${data.current}/${data.total}: ${data.sku} (${data.nume})`, 'info');
-});
+}
 
-socket.on('bon_complete', (data) => {
+function onBonComplete(data) {
     if (data.success) {
         logSystem('SUCCESS', data.message, 'success');
     } else {
         logSystem('FAIL', data.message, 'error');
     }
-});
+}
 
-socket.on('automation_complete', (data) => {
+function onAutomationComplete(data) {
     logSystem('COMPLETE', data.message || 'Automation sequence finished.', data.success ? 'success' : 'error');
 
     // Salvează statisticile și produsele eșuate
@@ -698,11 +808,44 @@ socket.on('automation_complete', (data) => {
     }
 
     resetAutomationUI();
-});
+}
 
-socket.on('input_required', (prompt) => {
+function onInputRequired(prompt) {
     logSystem('INPUT', prompt.message || `Input required: ${prompt.type}`, 'warning');
     showInputSection(prompt);
+}
+
+// Evenimentele rulării: sosesc individual sau grupate în frame-uri 'log_batch'
+const serverEvents = {
+    'log': onServerLog,
+    'progress': onProgress,
+    'bon_complete': onBonComplete,
+    'automation_complete': onAutomationComplete,
+    'input_required': onInputRequired
+};
+
+Object.entries(serverEvents).forEach(([name, handler]) => socket.on(name, handler));
+
+// frame = { evenimente: [[name, data, seq], ...], omise: N }; ack-ul îi spune serverului că poate trimite următorul
+// seq numerotează jurnalul jobului: intrările deja afișate (reluate de două ori la reconectare) se ignoră
+socket.on('log_batch', (frame, ack) => {
+    beginLogBatch();
+    try {
+        if (frame.omise) {
+            logSystem('NET', `${frame.omise} low-priority messages skipped (terminal was behind).`, 'warning');
+        }
+        (frame.evenimente || []).forEach(([name, data, seq]) => {
+            if (seq != null) {
+                if (seq <= lastJobSeq) return;
+                lastJobSeq = seq;
+            }
+            const handler = serverEvents[name];
+            if (handler) handler(data);
+        });
+    } finally {
+        endLogBatch();
+        if (typeof ack === 'function') ack();
+    }
 });
 
 function resetAutomationUI() {
@@ -724,7 +867,7 @@ function handleCliCommand(cmd) {
 
     switch(command) {
         case 'help':
-            logSystem('HELP', 'Available commands: help, clear, status, analysis, production, stop, /stop');
+            logSystem('HELP', 'Available commands: help, clear, status, analysis, production, stop, /stop, resume');
             break;
         case 'clear':
             dom.logs.innerHTML = '';
@@ -746,6 +889,13 @@ function handleCliCommand(cmd) {
                 logSystem('INFO', 'No automation running.', 'info');
             }
             break;
+        case 'resume':
+            if (isProcessing) {
+                logSystem('INFO', 'Automation already running.', 'info');
+            } else {
+                resumeJob();
+            }
+            break;
         default:
             logSystem('ERR', `Command not found: ${command}`, 'error');
     }
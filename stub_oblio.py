@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Server local care imită endpoint-urile Oblio folosite de motor_http_oblio.py
+Pagina formularului este "Bon de productie - Oblio.html" (salvată din Oblio), iar restul
+răspunsurilor au forma celor reale: autocomplete, rețetă (cu stoc insuficient), preț,
+validate_np, submit multipart cu redirect la preview, Lansare + Finalizare.
+Cererile fără cookie-ul de sesiune primesc redirect la /login (sau "redirect_to_login" la AJAX),
+ca sesiunile expirate să poată fi testate.
+
+Rulare manuală:
+    python stub_oblio.py 8765
+    OBLIO_MOTOR=http OBLIO_BASE_URL=http://127.0.0.1:8765 python app.py
+"""
+
+import email
+import email.policy
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PAGINA_FORMULAR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Bon de productie - Oblio.html')
+
+COOKIE_SESIUNE = 'stub_sesiune'
+SESIUNE_VALIDA = 'valida'
+
+# SKU -> id produs Oblio (pp_name_id)
+PRODUSE_IMPLICITE = {
+    '6291108737095-3': 1001,
+    '6291108737095-5': 1002,
+    '6291107450445-5': 1003,
+}
+
+
+def _campuri_multipart(tip_continut, corp):
+    """Câmpurile unui formular multipart/form-data (ce trimite submit_form_doc_final)"""
+    mesaj = email.message_from_bytes(
+        b'Content-Type: ' + tip_continut.encode('latin-1') + b'\r\n\r\n' + corp,
+        policy=email.policy.HTTP
+    )
+    campuri = {}
+    for parte in mesaj.iter_parts():
+        nume = parte.get_param('name', header='content-disposition')
+        if nume:
+            campuri[nume] = parte.get_payload(decode=True).decode('utf-8')
+    return campuri
+
+
+class StubOblio:
+    """
+    Serverul de test, pornit într-un thread
+    Starea e expusă pentru verificări: bonurile trimise, lansate și finalizate, cererile primite.
+    """
+
+    def __init__(self, produse=None, fara_stoc=(), port=0):
+        self.produse = dict(PRODUSE_IMPLICITE if produse is None else produse)
+        self.fara_stoc = set(fara_stoc)   # SKU-uri cu materie primă insuficientă
+        self.bonuri_trimise = []          # câmpurile formularului, per bon
+        self.lansate = []
+        self.finalizate = []
+        self.cereri = []                  # (metodă, cale)
+        self._urmatorul_id = 100
+        self._lock = threading.Lock()
+        with open(PAGINA_FORMULAR, 'r', encoding='utf-8') as f:
+            self._pagina_formular = f.read()
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self._thread = None
+
+    def porneste(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def opreste(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.porneste()
+
+    def __exit__(self, *exc):
+        self.opreste()
+
+    def cookies(self, valida=True):
+        """Cookie-urile unui browser autentificat (format driver.get_cookies())"""
+        return [{'name': COOKIE_SESIUNE, 'value': SESIUNE_VALIDA if valida else 'expirata',
+                 'domain': '.oblio.eu', 'path': '/'}]
+
+    def _id_nou(self):
+        with self._lock:
+            self._urmatorul_id += 1
+            return str(self._urmatorul_id)
+
+    def _sku_dupa_id(self, pid):
+        return next((sku for sku, id_produs in self.produse.items() if str(id_produs) == str(pid)), None)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _trimite(self, corp, tip='text/html; charset=utf-8', cod=200, locatie=None):
+                date = corp.encode('utf-8') if isinstance(corp, str) else corp
+                self.send_response(cod)
+                if locatie:
+                    self.send_header('Location', locatie)
+                self.send_header('Content-Type', tip)
+                self.send_header('Content-Length', str(len(date)))
+                self.end_headers()
+                self.wfile.write(date)
+
+            def _json(self, valoare):
+                self._trimite(json.dumps(valoare), 'application/json')
+
+            def _autentificat(self):
+                return f'{COOKIE_SESIUNE}={SESIUNE_VALIDA}' in (self.headers.get('Cookie') or '')
+
+            def do_GET(self):
+                cale = urlsplit(self.path).path
+                stub.cereri.append(('GET', cale))
+                if cale == '/login':
+                    return self._trimite('<form id="login_form"></form>')
+                if not self._autentificat():
+                    return self._trimite('', cod=302, locatie='/login')
+
+                if cale == '/stock/production/':
+                    return self._trimite(stub._pagina_formular)
+                if cale.startswith('/stock/preview_production/'):
+                    prod_id = cale.rsplit('/', 1)[1]
+                    return self._trimite(f'<a class="btn" href="https://www.oblio.eu/stock/production_save/{prod_id}">'
+                                         f'Lanseaza in Productie</a>')
+                if cale.startswith('/stock/production_save/'):
+                    prod_id = cale.rsplit('/', 1)[1]
+                    stub.lansate.append(prod_id)
+                    return self._trimite(f'<a class="btn" href="https://www.oblio.eu/stock/production_complete/{prod_id}">'
+                                         f'Finalizeaza Productia</a>')
+                if cale.startswith('/stock/production_complete/'):
+                    stub.finalizate.append(cale.rsplit('/', 1)[1])
+                    return self._trimite('<div class="alert alert-success">Productie finalizata</div>')
+                self._trimite('Not found', cod=404)
+
+            def do_POST(self):
+                cale = urlsplit(self.path).path
+                stub.cereri.append(('POST', cale))
+                corp = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if not self._autentificat():
+                    if cale == '/stock/production/':
+                        return self._trimite('', cod=302, locatie='/login')
+                    return self._json('redirect_to_login')
+
+                if cale == '/stock/production/':
+                    campuri = _campuri_multipart(self.headers.get('Content-Type', ''), corp)
+                    stub.bonuri_trimise.append(campuri)
+                    return self._trimite('', cod=302, locatie=f'/stock/preview_production/{stub._id_nou()}')
+
+                date = {cheie: valori[0] for cheie, valori in parse_qs(corp.decode('utf-8')).items()}
+                if date.get('from_javascript') != '1':
+                    return self._trimite('Bad request', cod=400)
+
+                if cale == '/nomenclator/get_products_values/':
+                    sku = date.get('q', '')
+                    if sku not in stub.produse:
+                        return self._json([])
+                    return self._json([{
+                        'value': stub.produse[sku], 'label': sku, 'label_show': f'Decant {sku}',
+                        'all': {'code': sku, 'stock': '10', 'um': 'buc'}
+                    }])
+                if cale == '/nomenclator/get_product_recipe_add/':
+                    sku = stub._sku_dupa_id(date.get('pid'))
+                    if sku is None:
+                        return self._json([])
+                    return self._json([{
+                        'name': 'Flacon decant', 'pr_type': '1', 'quantity': date.get('quantity'),
+                        'insufficient_stock': sku in stub.fara_stoc
+                    }])
+                if cale == '/nomenclator/get_produs_gestiune_values/':
+                    return self._json({'price': '45', 'currency': '99'})
+                if cale == '/stock/validate_np':
+                    return self._json({'type': 'ok'})
+                self._trimite('Not found', cod=404)
+
+        return Handler
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    stub = StubOblio(port=port)
+    print(f"Stub Oblio pe {stub.base_url} (cookie {COOKIE_SESIUNE}={SESIUNE_VALIDA})")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Test coada durabilă de joburi (joburi.py) pe un JOBURI_PATH temporar
+Revendicare atomică, recuperarea după restart, rezultatul Smart Resume și bonurile rămase.
+
+    python -m unittest test_joburi
+"""
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import joburi  # noqa: E402
+
+
+def bon(sku, *order_numbers):
+    return {'sku': sku, 'cantitate': len(order_numbers) or 1, 'nume': f'Decant {sku}',
+            'order_ids': list(range(1, len(order_numbers) + 1)), 'order_numbers': list(order_numbers)}
+
+
+def stari_bonuri(job_id):
+    return {b['idx']: b['stare'] for b in joburi.job(job_id, cu_bonuri=True)['bonuri']}
+
+
+class TestJoburi(unittest.TestCase):
+
+    def setUp(self):
+        director = tempfile.mkdtemp(prefix='test_joburi_')
+        patch = mock.patch.object(joburi, 'JOBURI_DB_PATH', os.path.join(director, 'joburi.sqlite'))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def revendicari_simultane(self, job_id, executanti=8):
+        bariera = threading.Barrier(executanti)
+        rezultate = []
+
+        def executant():
+            bariera.wait()
+            rezultate.append(joburi.revendica(job_id))
+
+        threaduri = [threading.Thread(target=executant) for _ in range(executanti)]
+        for thread in threaduri:
+            thread.start()
+        for thread in threaduri:
+            thread.join()
+        return [r for r in rezultate if r is not None]
+
+    def test_revendica_simultan_un_singur_castigator(self):
+        job_id = joburi.creeaza([bon('A-3', 1001)])
+
+        castigatori = self.revendicari_simultane(job_id)
+
+        self.assertEqual(len(castigatori), 1)
+        self.assertEqual(castigatori[0]['stare'], 'in_lucru')
+        self.assertEqual(castigatori[0]['rulari'], 1)
+        self.assertIsNone(joburi.revendica(job_id))
+
+    def test_revendica_simultan_fara_lock_de_proces(self):
+        # Ca două procese: doar UPDATE-ul condiționat din SQLite decide
+        joburi.creeaza([bon('A-3', 1001)])
+        with mock.patch.object(joburi, '_lock', contextlib.nullcontext()):
+            castigatori = self.revendicari_simultane(None)
+
+        self.assertEqual(len(castigatori), 1)
+        self.assertEqual(castigatori[0]['rulari'], 1)
+
+    def test_recupereaza_marcheaza_in_lucru_ca_intrerupt(self):
+        vechi = joburi.creeaza([bon('A-3', 1001)])
+        nou = joburi.creeaza([bon('B-5', 1002)])
+        in_coada = joburi.creeaza([bon('C-10', 1003)])
+        joburi.revendica(vechi)
+        joburi.revendica(nou)
+
+        self.assertEqual(joburi.recupereaza(), [vechi, nou])
+
+        self.assertEqual(joburi.job(vechi)['stare'], 'intrerupt')
+        self.assertEqual(joburi.job(nou)['stare'], 'intrerupt')
+        self.assertEqual(joburi.job(in_coada)['stare'], 'in_asteptare')
+        # Un job întrerupt se poate relua
+        self.assertEqual(joburi.revendica(vechi)['rulari'], 2)
+
+    def test_aplica_verificare_omite_bonurile_filtrate(self):
+        job_id = joburi.creeaza([bon('A-3', 1001, 1002), bon('B-5', 1003), bon('C-10', 1004, 1005)])
+        joburi.revendica(job_id)
+        ramase = joburi.bonuri_ramase(job_id)
+
+        # Smart Resume: B-5 e deja procesat, iar A-3 mai are doar comanda 1002
+        a3 = dict(ramase[0], order_numbers=[1002], order_ids=[2], cantitate=1)
+        joburi.aplica_verificare(job_id, [a3, ramase[2]])
+
+        self.assertEqual(stari_bonuri(job_id), {1: 'in_asteptare', 2: 'omis', 3: 'in_asteptare'})
+        self.assertTrue(joburi.job(job_id)['verificat'])
+
+        reluate = joburi.bonuri_ramase(job_id)
+        self.assertEqual([b['sku'] for b in reluate], ['A-3', 'C-10'])
+        self.assertEqual(reluate[0]['order_numbers'], [1002])
+        self.assertEqual(reluate[0]['cantitate'], 1)
+        self.assertEqual(reluate[1]['order_numbers'], [1004, 1005])
+
+    def test_bonuri_ramase_doar_in_asteptare_si_reincercare_in_ordine(self):
+        skus = ['A-3', 'B-5', 'C-10', 'D-3', 'E-5', 'F-10']
+        job_id = joburi.creeaza([bon(sku, 1000 + i) for i, sku in enumerate(skus)])
+        joburi.revendica(job_id)
+        bonuri = {b['sku']: b for b in joburi.bonuri_ramase(job_id)}
+
+        joburi.marcheaza_bon(job_id, bonuri['E-5'], 'reincercare', 'Timeout')
+        joburi.marcheaza_bon(job_id, bonuri['A-3'], 'reusit')
+        joburi.marcheaza_bon(job_id, bonuri['C-10'], 'esuat', 'Stoc insuficient')
+        joburi.marcheaza_bon(job_id, bonuri['B-5'], 'reincercare', 'Timeout')
+        joburi.aplica_verificare(job_id, [bonuri[sku] for sku in ('B-5', 'E-5', 'F-10')])
+
+        ramase = joburi.bonuri_ramase(job_id)
+        self.assertEqual([b['sku'] for b in ramase], ['B-5', 'E-5', 'F-10'])
+        self.assertEqual([b['_job_idx'] for b in ramase], [2, 5, 6])
+        self.assertEqual(stari_bonuri(job_id)[4], 'omis')
+        self.assertEqual([b['sku'] for b in joburi.bonuri_reusite(job_id)], ['A-3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
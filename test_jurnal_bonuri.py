@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Test jurnal local de bonuri (jurnal_bonuri.py) - database.adauga_bonuri_bulk este înlocuit
+Golire întreruptă reluată de la offset, carantina pentru date invalide (fără să blocheze
+intrările de după), reîncercare la conexiune pierdută și perechile văzute de Smart Resume.
+
+    python -m unittest test_jurnal_bonuri
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database  # noqa: E402
+import jurnal_bonuri  # noqa: E402
+
+
+class BazaFalsa:
+    """adauga_bonuri_bulk cu același contract: True / False (conexiune) / EroareDateBonuri"""
+
+    def __init__(self):
+        self.salvate = []          # (data_procesare, rânduri) per apel reușit
+        self.disponibila = True
+        self.sku_respinse = set()
+
+    def adauga_bonuri_bulk(self, rows, data_procesare=None, ridica_erori_date=False):
+        if not self.disponibila:
+            return False
+        if any(row[0] in self.sku_respinse for row in rows):
+            raise database.EroareDateBonuri('value too long for type character varying(100)')
+        self.salvate.append((data_procesare, list(rows)))
+        return True
+
+    def skus(self):
+        return [row[0] for _, rows in self.salvate for row in rows]
+
+
+class TestJurnalBonuri(unittest.TestCase):
+
+    def setUp(self):
+        director = tempfile.mkdtemp(prefix='test_jurnal_')
+        self.baza = BazaFalsa()
+
+        for patch in (
+            mock.patch.object(jurnal_bonuri, 'JURNAL_PATH', os.path.join(director, 'jurnal_bonuri.jsonl')),
+            mock.patch.object(jurnal_bonuri, 'LOT_MAXIM', 1),
+            # Flusher "activ": inregistreaza() doar scrie, golirea o pornește testul
+            mock.patch.dict(jurnal_bonuri._stare, flusher_activ=True, in_carantina=0),
+            mock.patch.object(database, 'adauga_bonuri_bulk', self.baza.adauga_bonuri_bulk),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def inregistreaza(self, sku, order_number, data='2026-10-17'):
+        self.assertTrue(jurnal_bonuri.inregistreaza([(sku, f'Decant {sku}', 1, 7, order_number)], data))
+
+    def test_golire_intrerupta_se_reia_de_la_offset(self):
+        for i, sku in enumerate(['A-3', 'B-5', 'C-10'], 1):
+            self.inregistreaza(sku, 1000 + i)
+
+        # Conexiunea cade după primul lot
+        original = self.baza.adauga_bonuri_bulk
+
+        def cade_dupa_primul(*args, **kwargs):
+            rezultat = original(*args, **kwargs)
+            self.baza.disponibila = False
+            return rezultat
+
+        with mock.patch.object(database, 'adauga_bonuri_bulk', cade_dupa_primul):
+            self.assertFalse(jurnal_bonuri.goleste())
+        self.assertEqual(self.baza.skus(), ['A-3'])
+        self.assertGreater(jurnal_bonuri._citeste_offset(), 0)
+
+        # Restart: o linie scrisă pe jumătate la crash este tăiată, restul se reia de la offset
+        with open(jurnal_bonuri.JURNAL_PATH, 'ab') as f:
+            f.write(b'{"la": 1, "data": "2026-10-17", "rows": [["D-')
+        jurnal_bonuri.porneste()
+
+        self.baza.disponibila = True
+        self.assertTrue(jurnal_bonuri.goleste())
+        self.assertEqual(self.baza.skus(), ['A-3', 'B-5', 'C-10'])
+        self.assertEqual(jurnal_bonuri.in_asteptare(), set())
+        self.assertEqual(jurnal_bonuri.statistici()['octeti_in_asteptare'], 0)
+
+    def test_carantina_nu_blocheaza_intrarile_urmatoare(self):
+        self.baza.sku_respinse = {'RAU-5'}
+        self.inregistreaza('A-3', 1001)
+        self.inregistreaza('RAU-5', 1002)
+        self.inregistreaza('C-10', 1003)
+
+        with mock.patch.object(jurnal_bonuri, 'LOT_MAXIM', 500):
+            self.assertTrue(jurnal_bonuri.goleste())
+
+        self.assertEqual(self.baza.skus(), ['A-3', 'C-10'])
+        self.assertEqual(jurnal_bonuri.statistici()['in_carantina'], 1)
+        self.assertEqual(jurnal_bonuri.statistici()['octeti_in_asteptare'], 0)
+
+        carantina = jurnal_bonuri._intrari_carantina()
+        self.assertEqual(len(carantina), 1)
+        self.assertEqual(carantina[0]['rows'][0][:1], ['RAU-5'])
+        self.assertIn('value too long', carantina[0]['eroare'])
+
+    def test_conexiune_pierduta_nu_pune_in_carantina(self):
+        self.inregistreaza('A-3', 1001)
+        self.baza.disponibila = False
+
+        self.assertFalse(jurnal_bonuri.goleste())
+        self.assertEqual(jurnal_bonuri._intrari_carantina(), [])
+        self.assertEqual(jurnal_bonuri.in_asteptare(), {('A-3', 1001)})
+
+        self.baza.disponibila = True
+        self.assertTrue(jurnal_bonuri.goleste())
+        self.assertEqual(self.baza.skus(), ['A-3'])
+
+    def test_in_asteptare_include_carantina(self):
+        self.baza.sku_respinse = {'RAU-5'}
+        self.inregistreaza('RAU-5', 1002)
+        self.assertTrue(jurnal_bonuri.goleste())
+
+        # Negolit încă (Postgres căzut) + respins în carantină - ambele există deja în Oblio
+        self.baza.disponibila = False
+        self.inregistreaza('B-5', 1003, data='2026-10-18')
+        self.assertFalse(jurnal_bonuri.goleste())
+
+        self.assertEqual(jurnal_bonuri.in_asteptare(), {('RAU-5', 1002), ('B-5', 1003)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Test motor HTTP Oblio contra serverului local (stub_oblio.py)
+Rulează tot fluxul refăcut din pagină: formularul implicit, autocomplete, rețetă, submit,
+redirect la preview, Lansare + Finalizare - și cazurile care trec bonurile pe Selenium.
+
+    python -m unittest test_motor_http_oblio
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Cache-ul de produse Oblio într-un director temporar (înainte de import)
+_TMP = tempfile.mkdtemp(prefix='test_motor_http_')
+os.environ['CACHE_PRODUSE_OBLIO_PATH'] = os.path.join(_TMP, 'produse_oblio.sqlite')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import motor_http_oblio  # noqa: E402
+from stub_oblio import StubOblio  # noqa: E402
+
+SKU_1 = '6291108737095-3'
+SKU_2 = '6291108737095-5'
+SKU_FARA_STOC = '6291107450445-5'
+
+
+class DriverFals:
+    """Doar ce folosește MotorHttpOblio.din_driver dintr-un WebDriver"""
+
+    def __init__(self, cookies):
+        self._cookies = cookies
+        self.current_url = 'https://www.oblio.eu/stock/production/'
+
+    def execute_script(self, script):
+        return 'Mozilla/5.0 (test)'
+
+    def get_cookies(self):
+        return self._cookies
+
+
+class TestMotorHttpOblio(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubOblio(fara_stoc={SKU_FARA_STOC}).porneste()
+        self.addCleanup(self.stub.opreste)
+
+    def motor(self, sesiune_valida=True):
+        return motor_http_oblio.MotorHttpOblio.din_driver(
+            DriverFals(self.stub.cookies(sesiune_valida)), base_url=self.stub.base_url
+        )
+
+    def test_bonuri_create_lansate_si_finalizate(self):
+        rezultate = self.motor().create_production_vouchers_batch([
+            {'sku': SKU_1, 'cantitate': 2},
+            {'sku': SKU_2, 'cantitate': 3},
+        ])
+
+        self.assertEqual([r['success'] for r in rezultate], [True, True])
+        self.assertEqual([r['prod_id'] for r in rezultate], ['101', '102'])
+        self.assertEqual(self.stub.lansate, ['101', '102'])
+        self.assertEqual(self.stub.finalizate, ['101', '102'])
+
+        # Valorile implicite vin din pagina formularului, restul din autocomplete / rețetă / preț
+        trimis = self.stub.bonuri_trimise[0]
+        self.assertEqual(trimis['pp_gestiune'], '237258')
+        self.assertEqual(trimis['pp_name_id'], '1001')
+        self.assertEqual(trimis['pp_quantity'], '2')
+        self.assertEqual(trimis['pp_price'], '45')
+        self.assertEqual(json.loads(trimis['all_products'])[0]['full_id'], 'entry_item_1')
+
+    def test_erori_oblio_nu_trec_pe_selenium(self):
+        rezultate = self.motor().create_production_vouchers_batch([
+            {'sku': 'SKU-INEXISTENT-5'},
+            {'sku': SKU_FARA_STOC},
+        ])
+
+        self.assertFalse(any(r['success'] or r['fallback'] for r in rezultate))
+        self.assertIn('NU EXISTĂ', rezultate[0]['message'])
+        self.assertIn('Stoc insuficient', rezultate[1]['message'])
+        self.assertEqual(self.stub.bonuri_trimise, [])
+
+    def test_sesiune_expirata_trece_pe_selenium(self):
+        rezultate = self.motor(sesiune_valida=False).create_production_vouchers_batch([
+            {'sku': SKU_1}, {'sku': SKU_2},
+        ])
+
+        self.assertTrue(all(r['fallback'] and not r['success'] for r in rezultate))
+        self.assertIn('login', rezultate[0]['message'])
+        self.assertEqual(self.stub.bonuri_trimise, [])
+
+    def test_server_indisponibil_trece_pe_selenium(self):
+        base_url = self.stub.base_url
+        self.stub.opreste()
+
+        motor = motor_http_oblio.MotorHttpOblio.din_driver(
+            DriverFals(self.stub.cookies()), base_url=base_url, timeout=2
+        )
+        rezultate = motor.create_production_vouchers_batch([{'sku': SKU_1}])
+
+        self.assertTrue(rezultate[0]['fallback'])
+        self.assertFalse(rezultate[0]['success'])
+
+
+class TestBatchHttpAutomatizare(unittest.TestCase):
+    """OblioAutomation._batch_http: ce reușește se salvează, ce nu a ajuns în Oblio se reia prin Selenium"""
+
+    def setUp(self):
+        import automatizare_oblio_selenium
+
+        self.stub = StubOblio().porneste()
+        self.addCleanup(self.stub.opreste)
+
+        patch_url = mock.patch.object(motor_http_oblio, 'OBLIO_BASE_URL', self.stub.base_url)
+        patch_url.start()
+        self.addCleanup(patch_url.stop)
+
+        self.salvate = []
+        patch_db = mock.patch.object(
+            automatizare_oblio_selenium.OblioAutomation, '_salveaza_bonuri_db',
+            staticmethod(lambda rows: self.salvate.append(rows) or True)
+        )
+        patch_db.start()
+        self.addCleanup(patch_db.stop)
+
+        self.automatizare = automatizare_oblio_selenium.OblioAutomation.__new__(
+            automatizare_oblio_selenium.OblioAutomation
+        )
+        self.automatizare.stats = {'success': 0, 'failed': 0, 'errors': [], 'total': 0}
+        self.automatizare._log = lambda mesaj, nivel='info': None
+
+    def batch(self):
+        return [
+            {'sku': SKU_1, 'cantitate': 1, 'nume': 'Decant 3 ml', 'order_ids': [7], 'order_numbers': [5001]},
+            {'sku': SKU_2, 'cantitate': 1, 'nume': 'Decant 5 ml'},
+        ]
+
+    def test_succes(self):
+        self.automatizare.driver = DriverFals(self.stub.cookies())
+        rezultate, ramase = self.automatizare._batch_http(self.batch())
+
+        self.assertEqual(ramase, [])
+        self.assertEqual([r['success'] for r in rezultate], [True, True])
+        self.assertEqual(self.automatizare.stats['success'], 2)
+        self.assertEqual(self.salvate[0], [(SKU_1, 'Decant 3 ml', 1, 7, 5001)])
+
+    def test_sesiune_expirata_reia_prin_selenium(self):
+        self.automatizare.driver = DriverFals(self.stub.cookies(valida=False))
+        batch = self.batch()
+        rezultate, ramase = self.automatizare._batch_http(batch)
+
+        self.assertEqual(rezultate, [])
+        self.assertEqual(ramase, batch)
+        self.assertEqual(self.automatizare.stats['success'], 0)
+        self.assertEqual(self.automatizare.stats['failed'], 0)
+        self.assertEqual(self.salvate, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Transport grupat pentru log-urile și evenimentele live ale automatizării (Socket.IO)
+Fiecare _log din OblioAutomation și fiecare progress / bon_complete era un frame separat:
+o rulare de 300 de bonuri înseamnă zeci de mii de frame-uri mici, iar un client lent
+ține hub-ul eventlet ocupat. Aici evenimentele se adună per client și pleacă o dată la
+LOG_INTERVAL_MS într-un singur frame 'log_batch':
+    {'evenimente': [[nume_eveniment, date, secventa], ...], 'omise': N}
+(secventa există doar pentru evenimentele jurnalizate ale unui job - vezi loguri_joburi.py)
+
+Camere: evenimentele emise într-o cameră (emit_camera, ex. 'job_<id>') ajung la fiecare client
+abonat, fiecare cu buffer-ul și backpressure-ul lui.
+
+Backpressure: pentru un client anume (sid) frame-ul se trimite cu ack - următorul pleacă
+doar după ce browser-ul l-a randat (sau după LOG_ACK_TIMEOUT). Cât timp clientul e în urmă,
+evenimentele se strâng într-un buffer limitat (LOG_BUFFER_MAX) din care se aruncă întâi
+cele mai puțin importante: debug, apoi progress / info, apoi warning / success.
+Erorile și evenimentele de stare (bon_complete, automation_complete, input_required) se
+păstrează; automation_complete și input_required pleacă imediat, după log-urile dinaintea lor.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Fereastra de grupare (ms)
+LOG_INTERVAL_MS = float(os.getenv('LOG_INTERVAL_MS', '150'))
+# Evenimente păstrate per client cât timp acesta e în urmă
+LOG_BUFFER_MAX = int(os.getenv('LOG_BUFFER_MAX', '2000'))
+# Evenimente maxime într-un singur frame
+LOG_LOT_MAX = int(os.getenv('LOG_LOT_MAX', '500'))
+# După cât timp fără ack se trimite totuși următorul frame (secunde)
+LOG_ACK_TIMEOUT = float(os.getenv('LOG_ACK_TIMEOUT', '5'))
+
+# Prioritate: se aruncă întâi 0, niciodată 3 cât timp există ceva mai puțin important
+PRIORITATI_NIVEL = {'debug': 0, 'info': 1, 'success': 2, 'warning': 2, 'error': 3}
+PRIORITATI_EVENIMENT = {'progress': 0}
+# Evenimente după care frame-ul pleacă imediat (clientul așteaptă după ele)
+EVENIMENTE_URGENTE = ('automation_complete', 'input_required')
+
+BROADCAST = '__toti__'
+
+
+def prioritate(eveniment, date):
+    if eveniment == 'log':
+        return PRIORITATI_NIVEL.get((date or {}).get('type'), 1)
+    return PRIORITATI_EVENIMENT.get(eveniment, 3)
+
+
+class _BufferClient:
+    """Buffer-ul limitat al unui client: o coadă per prioritate, ordinea globală prin număr de secvență"""
+
+    def __init__(self, capacitate):
+        self.capacitate = capacitate
+        self.cozi = [deque() for _ in range(4)]
+        self.istoric = deque()     # evenimente reluate la abonare - pleacă înaintea celor live, fără limită
+        self.marime = 0
+        self.omise = 0
+        self.urgent = False
+        self.in_zbor_din = None    # momentul trimiterii frame-ului încă neconfirmat
+        self.ultima_activitate = time.monotonic()
+
+    def adauga(self, ordine, prioritate_eveniment, intrare):
+        self.cozi[prioritate_eveniment].append((ordine, intrare))
+        self.marime += 1
+        self.ultima_activitate = time.monotonic()
+        while self.marime > self.capacitate:
+            # Cel mai vechi eveniment din cea mai mică prioritate nevidă
+            coada = next(c for c in self.cozi if c)
+            coada.popleft()
+            self.marime -= 1
+            self.omise += 1
+
+    def are_evenimente(self):
+        return bool(self.marime or self.istoric)
+
+    def scoate(self, limita):
+        """Primele `limita` evenimente în ordinea sosirii (istoricul reluat întâi)"""
+        if self.istoric:
+            return [self.istoric.popleft() for _ in range(min(limita, len(self.istoric)))]
+
+        lot = []
+        for ordine, intrare in heapq.merge(*self.cozi, key=lambda element: element[0]):
+            lot.append((ordine, intrare))
+            if len(lot) >= limita:
+                break
+        # Evenimentele luate sunt mereu primele din cozile lor (ordinea e păstrată per coadă)
+        luate = {ordine for ordine, _ in lot}
+        for coada in self.cozi:
+            while coada and coada[0][0] in luate:
+                coada.popleft()
+        self.marime -= len(lot)
+        return [intrare for _, intrare in lot]
+
+
+class TransportLoguri:
+    """Emițătorul grupat; emit() are aceeași semnătură ca socketio.emit pentru evenimentele rulării"""
+
+    def __init__(self, socketio, interval_ms=LOG_INTERVAL_MS, capacitate=LOG_BUFFER_MAX):
+        self.socketio = socketio
+        self.interval = interval_ms / 1000
+        self.capacitate = capacitate
+        self._lock = threading.Lock()
+        self._clienti = {}     # room (sid sau BROADCAST) -> _BufferClient
+        self._camere = {}      # cameră -> set de sid-uri abonate
+        self._ordine = itertools.count()
+        self._semnal = threading.Event()
+        self._pornit = False
+        self._stare = {'evenimente': 0, 'frameuri': 0, 'omise': 0, 'ack_expirate': 0}
+
+    def _client(self, cheie):
+        client = self._clienti.get(cheie)
+        if client is None:
+            client = self._clienti[cheie] = _BufferClient(self.capacitate)
+        return client
+
+    def emit(self, eveniment, date=None, room=None):
+        """Pune evenimentul în buffer-ul clientului (room=None: toți clienții conectați)"""
+        self._adauga([room or BROADCAST], [eveniment, date], eveniment, date)
+
+    def emit_camera(self, camera, eveniment, date=None, secventa=None):
+        """Evenimentul ajunge la fiecare client abonat la cameră (fără abonați nu pleacă nicăieri)"""
+        with self._lock:
+            destinatari = list(self._camere.get(camera, ()))
+        self._adauga(destinatari, [eveniment, date, secventa], eveniment, date)
+
+    def _adauga(self, destinatari, intrare, eveniment, date):
+        nivel = prioritate(eveniment, date)
+        with self._lock:
+            ordine = next(self._ordine)
+            self._stare['evenimente'] += 1
+            for cheie in destinatari:
+                client = self._client(cheie)
+                omise_inainte = client.omise
+                client.adauga(ordine, nivel, intrare)
+                self._stare['omise'] += client.omise - omise_inainte
+                if eveniment in EVENIMENTE_URGENTE:
+                    client.urgent = True
+                    self._semnal.set()
+
+        if not self._pornit:
+            self._porneste()
+
+    def aboneaza(self, camera, sid, istoric=()):
+        """
+        Clientul primește de acum evenimentele camerei, precedate de `istoric`
+        (listă de (secventa, eveniment, date), ex. din jurnalul jobului)
+        """
+        with self._lock:
+            self._camere.setdefault(camera, set()).add(sid)
+            client = self._client(sid)
+            client.istoric.extend([eveniment, date, secventa] for secventa, eveniment, date in istoric)
+            client.ultima_activitate = time.monotonic()
+        if istoric:
+            self._semnal.set()
+        if not self._pornit:
+            self._porneste()
+
+    def dezaboneaza(self, sid):
+        """Client deconectat: iese din toate camerele, buffer-ul lui se eliberează"""
+        with self._lock:
+            for camera in list(self._camere):
+                self._camere[camera].discard(sid)
+                if not self._camere[camera]:
+                    del self._camere[camera]
+            self._clienti.pop(sid, None)
+
+    def _porneste(self):
+        with self._lock:
+            if self._pornit:
+                return
+            self._pornit = True
+        self.socketio.start_background_task(self._bucla)
+
+    def _bucla(self):
+        """Green thread-ul care trimite frame-urile (o dată la interval sau imediat la un eveniment urgent)"""
+        while True:
+            self._semnal.wait(self.interval)
+            self._semnal.clear()
+            try:
+                self.goleste()
+            except Exception as e:
+                logger.error(f"❌ Eroare transport log-uri: {e}")
+
+    def goleste(self):
+        """Trimite câte un frame fiecărui client care are evenimente și nu așteaptă un ack"""
+        acum = time.monotonic()
+        de_trimis = []
+
+        with self._lock:
+            for cheie, client in list(self._clienti.items()):
+                if not client.are_evenimente():
+                    # Clienții fără activitate (deconectați) nu se păstrează
+                    if client.in_zbor_din is None and acum - client.ultima_activitate > 60:
+                        del self._clienti[cheie]
+                    continue
+
+                if client.in_zbor_din is not None and not client.urgent:
+                    if acum - client.in_zbor_din < LOG_ACK_TIMEOUT:
+                        continue
+                    self._stare['ack_expirate'] += 1
+
+                frame = {'evenimente': client.scoate(LOG_LOT_MAX), 'omise': client.omise}
+                client.omise = 0
+                # Un eveniment urgent rămas după LOG_LOT_MAX pleacă la următorul interval, fără ack
+                client.urgent = client.urgent and client.are_evenimente()
+                if cheie != BROADCAST:
+                    client.in_zbor_din = acum
+                de_trimis.append((cheie, frame))
+                self._stare['frameuri'] += 1
+
+        for cheie, frame in de_trimis:
+            if cheie == BROADCAST:
+                self.socketio.emit('log_batch', frame)
+            else:
+                self.socketio.emit('log_batch', frame, room=cheie,
+                                   callback=lambda *args, cheie=cheie: self._confirmat(cheie))
+
+    def _confirmat(self, cheie):
+        """Ack de la client: frame-ul a fost randat, se poate trimite următorul"""
+        with self._lock:
+            client = self._clienti.get(cheie)
+            if client is not None:
+                client.in_zbor_din = None
+                client.ultima_activitate = time.monotonic()
+
+    def statistici(self):
+        """Starea transportului (pentru /health/detalii)"""
+        with self._lock:
+            return {
+                'clienti': len(self._clienti),
+                'camere': {camera: len(abonati) for camera, abonati in self._camere.items()},
+                'in_buffer': sum(c.marime for c in self._clienti.values()),
+                'interval_ms': self.interval * 1000,
+                **self._stare,
+            }
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Trasarea pașilor din fluxurile Oblio (bon de producție, batch, transfer)
+Un bon de 12 secunde nu spunea unde se duce timpul: verificarea login-ului, navigarea, tastarea
+SKU-ului, autocomplete-ul, recalcularea rețetei, verificarea stocului, click-ul de salvare,
+redirect-ul sau scrierea în DB. Aici fiecare pas devine un span (nume, început, durată, atribute):
+- Cronometru: pașii unei operații (un bon, un batch, un transfer); marcheaza('pas') încheie
+  pasul curent - durata se măsoară de la marcajul anterior
+- Rulare: toate operațiile unei rulări de automatizare, exportate ca JSON în uploads/trasari/<id>.json
+- agregatul global per pas păstrează ultimele TRASARI_ESANTIOANE durate: p50 / p95 / p99 pentru
+  /health/detalii și /metrics (format text Prometheus, summary)
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+TRASARI_DIR = os.getenv('TRASARI_DIR', os.path.join('uploads', 'trasari'))
+# Câte durate recente se păstrează per pas pentru cuantile
+TRASARI_ESANTIOANE = int(os.getenv('TRASARI_ESANTIOANE', '2048'))
+# Trasările mai vechi de atâtea zile se șterg la pornire
+TRASARI_PASTRARE_ZILE = float(os.getenv('TRASARI_PASTRARE_ZILE', '14'))
+
+CUANTILE = (0.5, 0.95, 0.99)
+
+_ID_VALID = re.compile(r'^[0-9a-f]{1,32}$')
+
+_lock = threading.Lock()
+_pasi = {}   # pas -> _AgregatPas
+
+
+class _AgregatPas:
+    def __init__(self):
+        self.esantioane = deque(maxlen=TRASARI_ESANTIOANE)
+        self.numar = 0
+        self.total = 0.0
+        self.maxim = 0.0
+
+
+def inregistreaza(pas, durata):
+    """Adaugă durata (secunde) în agregatul global al pasului"""
+    with _lock:
+        agregat = _pasi.get(pas)
+        if agregat is None:
+            agregat = _pasi[pas] = _AgregatPas()
+        agregat.esantioane.append(durata)
+        agregat.numar += 1
+        agregat.total += durata
+        agregat.maxim = max(agregat.maxim, durata)
+
+
+def cuantila(valori_sortate, q):
+    """Cuantila q dintr-o listă sortată (interpolare liniară între rangurile vecine)"""
+    if not valori_sortate:
+        return 0.0
+    pozitie = (len(valori_sortate) - 1) * q
+    jos = int(pozitie)
+    sus = min(jos + 1, len(valori_sortate) - 1)
+    return valori_sortate[jos] + (valori_sortate[sus] - valori_sortate[jos]) * (pozitie - jos)
+
+
+def _rezumat_durate(durate, numar=None, total=None, maxim=None):
+    sortate = sorted(durate)
+    numar = len(sortate) if numar is None else numar
+    total = sum(sortate) if total is None else total
+    maxim = (sortate[-1] if sortate else 0.0) if maxim is None else maxim
+    rezumat = {
+        'numar': numar,
+        'medie_ms': round(total / numar * 1000, 1) if numar else 0.0,
+        'maxim_ms': round(maxim * 1000, 1),
+    }
+    for q in CUANTILE:
+        rezumat[f'p{int(q * 100)}_ms'] = round(cuantila(sortate, q) * 1000, 1)
+    return rezumat
+
+
+def statistici():
+    """Durata medie / maximă și p50 / p95 / p99 per pas, de la pornirea aplicației (pentru /health/detalii)"""
+    with _lock:
+        copii = [(pas, list(a.esantioane), a.numar, a.total, a.maxim) for pas, a in sorted(_pasi.items())]
+    return {pas: _rezumat_durate(esantioane, numar, total, maxim) for pas, esantioane, numar, total, maxim in copii}
+
+
+def metrici_prometheus():
+    """Agregatul per pas ca summary Prometheus (text exposition format)"""
+    with _lock:
+        copii = [(pas, sorted(a.esantioane), a.numar, a.total) for pas, a in sorted(_pasi.items())]
+
+    linii = [
+        '# HELP oblio_pas_durata_secunde Durata pașilor din fluxurile Oblio (cuantile pe ultimele eșantioane)',
+        '# TYPE oblio_pas_durata_secunde summary',
+    ]
+    for pas, sortate, numar, total in copii:
+        for q in CUANTILE:
+            linii.append(f'oblio_pas_durata_secunde{{pas="{pas}",quantile="{q}"}} {cuantila(sortate, q):.6f}')
+        linii.append(f'oblio_pas_durata_secunde_sum{{pas="{pas}"}} {total:.6f}')
+        linii.append(f'oblio_pas_durata_secunde_count{{pas="{pas}"}} {numar}')
+    return '\n'.join(linii) + '\n'
+
+
+class Rulare:
+    """
+    Trasarea unei rulări de automatizare: operațiile (bon / batch / transfer) cu span-urile lor
+    Operațiile vin din mai multe thread-uri (lucratori_bonuri) - adăugarea e protejată de lock
+    """
+
+    def __init__(self, id_rulare=None, **atribute):
+        self.id = id_rulare or uuid.uuid4().hex[:16]
+        self.atribute = atribute
+        self.start = time.time()
+        self.operatii = []
+        self._lock = threading.Lock()
+
+    def adauga_operatie(self, operatie):
+        with self._lock:
+            self.operatii.append(operatie)
+
+    def exporta(self):
+        """Trasarea ca dict JSON: operațiile și sumarul per pas al rulării"""
+        with self._lock:
+            operatii = list(self.operatii)
+
+        durate = {}
+        for operatie in operatii:
+            for span in operatie['spanuri']:
+                durate.setdefault(span['pas'], []).append(span['durata_ms'] / 1000)
+
+        return {
+            'id': self.id,
+            'start': self.start,
+            'durata_s': round(time.time() - self.start, 3),
+            'atribute': self.atribute,
+            'pasi': {pas: _rezumat_durate(valori) for pas, valori in sorted(durate.items())},
+            'operatii': operatii,
+        }
+
+    def salveaza(self):
+        """Scrie trasarea în TRASARI_DIR/<id>.json. Returns: calea fișierului sau None la eroare"""
+        try:
+            os.makedirs(TRASARI_DIR, exist_ok=True)
+            cale = os.path.join(TRASARI_DIR, f'{self.id}.json')
+            temporar = cale + '.tmp'
+            with open(temporar, 'w', encoding='utf-8') as f:
+                json.dump(self.exporta(), f, ensure_ascii=False, default=str)
+            os.replace(temporar, cale)
+            return cale
+        except OSError as e:
+            logger.error(f"❌ Eroare salvare trasare {self.id}: {e}")
+            return None
+
+
+class Cronometru:
+    """
+    Span-urile unei operații (un bon, un batch, un transfer), înregistrate în agregatul global
+    și, dacă există, în trasarea rulării
+    """
+
+    def __init__(self, prefix='', rulare=None, **atribute):
+        self.prefix = prefix
+        self.rulare = rulare
+        self.atribute = atribute
+        self.pasi = []             # (nume, durata) - pentru rezumat()
+        self.spanuri = []
+        self.start_epoca = time.time()
+        self.start = self._ultim = time.monotonic()
+        self._incheiat = False
+
+    def _span(self, nume, inceput, durata, atribute):
+        span = {
+            'pas': self.prefix + nume,
+            'start_ms': round((inceput - self.start) * 1000, 1),
+            'durata_ms': round(durata * 1000, 1),
+        }
+        if atribute:
+            span['atribute'] = atribute
+        self.spanuri.append(span)
+        inregistreaza(self.prefix + nume, durata)
+
+    def marcheaza(self, nume, **atribute):
+        acum = time.monotonic()
+        durata = acum - self._ultim
+        self._span(nume, self._ultim, durata, atribute)
+        self.pasi.append((nume, durata))
+        self._ultim = acum
+
+    def total(self):
+        return time.monotonic() - self.start
+
+    def rezumat(self):
+        """Ex: 'total 3.21s | navigare 0.80s, produs 0.35s, cantitate 0.41s, redirect 1.10s'"""
+        pasi = ', '.join(f"{nume} {durata:.2f}s" for nume, durata in self.pasi)
+        return f"total {self.total():.2f}s | {pasi}"
+
+    def incheie(self, **atribute):
+        """Încheie operația: durata totală intră în agregat, operația în trasarea rulării (o singură dată)"""
+        if self._incheiat:
+            return
+        self._incheiat = True
+        total = self.total()
+        inregistreaza(self.prefix + 'total', total)
+        if self.rulare is not None:
+            self.rulare.adauga_operatie({
+                'operatie': self.prefix.rstrip('.'),
+                'start': self.start_epoca,
+                'durata_ms': round(total * 1000, 1),
+                'atribute': {**self.atribute, **atribute},
+                'spanuri': self.spanuri,
+            })
+
+
+def citeste(id_rulare):
+    """Trasarea salvată a unei rulări (dict) sau None"""
+    if not _ID_VALID.match(id_rulare or ''):
+        return None
+    try:
+        with open(os.path.join(TRASARI_DIR, f'{id_rulare}.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def lista(limita=50):
+    """Cele mai recente trasări salvate: [{'id', 'modificat_la'}] descrescător"""
+    try:
+        intrari = [nume for nume in os.listdir(TRASARI_DIR) if nume.endswith('.json')]
+    except FileNotFoundError:
+        return []
+    rezultat = []
+    for nume in intrari:
+        try:
+            rezultat.append({'id': nume[:-5], 'modificat_la': os.path.getmtime(os.path.join(TRASARI_DIR, nume))})
+        except OSError:
+            continue
+    rezultat.sort(key=lambda t: t['modificat_la'], reverse=True)
+    return rezultat[:limita]
+
+
+def curata(zile=TRASARI_PASTRARE_ZILE):
+    """Șterge trasările nemodificate de mai mult de `zile` zile"""
+    limita = time.time() - zile * 86400
+    sterse = 0
+    try:
+        intrari = os.listdir(TRASARI_DIR)
+    except FileNotFoundError:
+        return 0
+
+    for nume in intrari:
+        cale = os.path.join(TRASARI_DIR, nume)
+        try:
+            if nume.endswith('.json') and os.path.getmtime(cale) < limita:
+                os.remove(cale)
+                sterse += 1
+        except OSError as e:
+            logger.warning(f"⚠️ Nu s-a putut șterge trasarea {nume}: {e}")
+    if sterse:
+        logger.info(f"🧹 {sterse} trasări mai vechi de {zile:.0f} zile șterse")
+    return sterse